@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+"""
+性能基准测试
+在仓库根目录下运行，例如: python -m benchmarks.bench_scheduler
+"""
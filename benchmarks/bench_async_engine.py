@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+"""
+监控引擎对比基准测试
+在模拟的MySQL/Redis（每次调用固定延迟）上分别运行线程模式（共享时间轮）和asyncio模式的监控引擎，
+比较大量用户下的启动耗时、实际检查吞吐、线程数、CPU时间和内存峰值
+
+每种模式在独立的子进程中运行，内存峰值互不影响
+
+用法:
+    python -m benchmarks.bench_async_engine --users 10000 --duration 10 --latency-ms 1
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import resource
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from benchmarks.bench_order_memory import _make_rows
+
+
+class _Dataset:
+    """模拟的用户、策略和订单数据"""
+
+    def __init__(self, users: int, orders_per_user: int):
+        now = datetime(2024, 1, 1)
+        self.user_ids = list(range(1, users + 1))
+        self.users = {
+            user_id: {'id': user_id, 'username': f"user_{user_id}", 'email': f"user_{user_id}@example.com",
+                      'status': 1, 'created_at': now, 'updated_at': now}
+            for user_id in self.user_ids
+        }
+        self.strategies = {
+            user_id: [{'id': user_id, 'user_id': user_id, 'strategy_name': f"grid_{user_id}",
+                       'strategy_type': 'example', 'status': 1, 'config': {}, 'risk_config': {},
+                       'created_at': now, 'updated_at': now}]
+            for user_id in self.user_ids
+        }
+        template = _make_rows(orders_per_user)
+        self.orders = {}
+        for user_id in self.user_ids:
+            rows = []
+            for row in template:
+                row = dict(row, user_id=user_id, strategy_id=user_id)
+                rows.append(row)
+            self.orders[user_id] = rows
+
+
+class SyncStandIn:
+    """同步MySQL/Redis替身：读操作返回模拟数据，每次调用阻塞固定延迟"""
+
+    def __init__(self, dataset: _Dataset, latency: float):
+        self.dataset = dataset
+        self.latency = latency
+
+    def _io(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+
+    # Redis
+    def get_active_users(self) -> set:
+        self._io()
+        return set(self.dataset.user_ids)
+
+    def get_cached_users(self, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        self._io()
+        return {}
+
+    def get_or_load_user(self, user_id: int, loader) -> Dict[str, Any]:
+        self._io()
+        return self.dataset.users[user_id]
+
+    def get_or_load_user_orders(self, user_id: int, loader) -> List[Dict[str, Any]]:
+        self._io()
+        return self.dataset.orders[user_id]
+
+    def get_cached_active_orders(self, user_id: int) -> List[Dict[str, Any]]:
+        self._io()
+        return [row for row in self.dataset.orders[user_id] if row['status'] in (0, 1)]
+
+    def get_cached_orders(self, user_id: int, order_ids) -> List[Dict[str, Any]]:
+        self._io()
+        order_ids = set(order_ids)
+        return [row for row in self.dataset.orders[user_id] if row['id'] in order_ids]
+
+    def get_local_cache_statistics(self):
+        return None
+
+    def health_check(self) -> bool:
+        return True
+
+    # MySQL
+    def get_users_by_ids(self, user_ids: List[int], batch_size: int = 100) -> List[Dict[str, Any]]:
+        self._io()
+        return [self.dataset.users[user_id] for user_id in user_ids]
+
+    def get_user_strategies(self, user_id: int, status: int = None) -> List[Dict[str, Any]]:
+        self._io()
+        return self.dataset.strategies[user_id]
+
+    def __getattr__(self, name):
+        # 其余写操作（缓存回填、活跃用户集合维护等）在基准中只模拟延迟
+        def write(*args, **kwargs):
+            self._io()
+            return True
+        return write
+
+
+class AsyncMySQLStandIn:
+    """异步MySQL替身"""
+
+    dataset = None
+    latency = 0.0
+
+    async def _io(self) -> None:
+        await asyncio.sleep(self.latency)
+
+    async def initialize(self) -> bool:
+        return True
+
+    async def close(self) -> None:
+        pass
+
+    async def get_user_by_id(self, user_id: int):
+        await self._io()
+        return self.dataset.users[user_id]
+
+    async def get_users_by_ids(self, user_ids: List[int], batch_size: int = 100):
+        await self._io()
+        return [self.dataset.users[user_id] for user_id in user_ids]
+
+    async def get_users_with_active_strategies(self):
+        await self._io()
+        return list(self.dataset.users.values())
+
+    async def get_user_strategies(self, user_id: int, status: int = None):
+        await self._io()
+        return self.dataset.strategies[user_id]
+
+    async def get_user_orders(self, user_id: int, limit: int = 1000):
+        await self._io()
+        return self.dataset.orders[user_id]
+
+
+class AsyncRedisStandIn:
+    """异步Redis替身"""
+
+    dataset = None
+    latency = 0.0
+
+    async def _io(self) -> None:
+        await asyncio.sleep(self.latency)
+
+    async def initialize(self) -> bool:
+        return True
+
+    async def close(self) -> None:
+        pass
+
+    async def get_or_load_user(self, user_id: int, loader):
+        await self._io()
+        return self.dataset.users[user_id]
+
+    async def get_or_load_user_orders(self, user_id: int, loader):
+        await self._io()
+        return self.dataset.orders[user_id]
+
+    async def get_cached_active_orders(self, user_id: int):
+        await self._io()
+        return [row for row in self.dataset.orders[user_id] if row['status'] in (0, 1)]
+
+    async def get_cached_orders(self, user_id: int, order_ids):
+        await self._io()
+        order_ids = set(order_ids)
+        return [row for row in self.dataset.orders[user_id] if row['id'] in order_ids]
+
+    async def get_cached_users(self, user_ids: List[int]):
+        await self._io()
+        return {}
+
+    async def cache_users(self, users) -> bool:
+        await self._io()
+        return True
+
+    async def get_active_users(self) -> set:
+        await self._io()
+        return set(self.dataset.user_ids)
+
+    async def add_active_users(self, user_ids) -> int:
+        await self._io()
+        return len(user_ids)
+
+
+def _install_stand_ins(dataset: _Dataset, latency: float, stand_in: SyncStandIn = None) -> None:
+    """把各模块引用的数据库管理器替换为替身（默认为只读的 SyncStandIn），并关闭用户日志文件"""
+    stand_in = stand_in or SyncStandIn(dataset, latency)
+    _replace_managers(stand_in, stand_in)
+    from framework.monitoring import async_engine
+
+    AsyncMySQLStandIn.dataset = AsyncRedisStandIn.dataset = dataset
+    AsyncMySQLStandIn.latency = AsyncRedisStandIn.latency = latency
+    async_engine.AsyncMySQLManager = AsyncMySQLStandIn
+    async_engine.AsyncRedisManager = AsyncRedisStandIn
+    _silence_user_logs()
+
+
+def _replace_managers(mysql, redis) -> None:
+    """替换监控相关模块引用的 mysql_manager / redis_manager"""
+    import sys
+    import framework.monitoring  # noqa: F401  确保子模块已导入
+    for module_name in ['framework.monitoring.monitoring_engine', 'framework.monitoring.user_monitor',
+                        'framework.strategies.strategy_manager', 'framework.utils.user_order_manager']:
+        module = sys.modules[module_name]
+        module.mysql_manager = mysql
+        module.redis_manager = redis
+
+
+def _silence_user_logs() -> None:
+    """基准测试不写每个用户的日志文件"""
+    import logging
+    from framework.config import LOG_CONFIG
+    from framework.logging import user_logger
+
+    LOG_CONFIG['log_dir'] = tempfile.mkdtemp(prefix='bench_engine_logs_')
+    LOG_CONFIG['log_level'] = 'WARNING'
+    user_logger.UserLogger._setup_handlers = lambda self: self.logger.addHandler(logging.NullHandler())
+    logging.getLogger('framework').setLevel(logging.WARNING)
+
+
+def _total_checks(engine) -> int:
+    with engine.lock:
+        monitors = list(engine.user_monitors.values())
+    return sum(monitor.stats['total_checks'] for monitor in monitors)
+
+
+def _running_monitors(engine) -> int:
+    with engine.lock:
+        monitors = list(engine.user_monitors.values())
+    return sum(1 for monitor in monitors if monitor.is_running())
+
+
+def run_mode(mode: str, users: int, duration: float, latency_ms: float, orders_per_user: int,
+             loops: int, start_timeout: float) -> Dict[str, Any]:
+    """在当前进程中运行一种引擎模式并返回统计结果"""
+    dataset = _Dataset(users, orders_per_user)
+    _install_stand_ins(dataset, latency_ms / 1000.0)
+
+    if mode == 'async':
+        from framework.monitoring.async_engine import AsyncMonitoringEngine
+        engine = AsyncMonitoringEngine(loop_count=loops or None)
+    else:
+        from framework.monitoring.monitoring_engine import MonitoringEngine
+        engine = MonitoringEngine()
+        engine.scheduler_mode = 'wheel' if mode == 'wheel' else 'thread'
+
+    cpu_start = time.process_time()
+    start = time.monotonic()
+    engine.start()
+
+    # 等待所有用户监控器启动
+    while _running_monitors(engine) < users and time.monotonic() - start < start_timeout:
+        time.sleep(0.1)
+    startup_seconds = time.monotonic() - start
+    started = _running_monitors(engine)
+
+    checks_before = _total_checks(engine)
+    window_start = time.monotonic()
+    time.sleep(duration)
+    elapsed = time.monotonic() - window_start
+    checks = _total_checks(engine) - checks_before
+    monitor = engine.get_user_monitor(dataset.user_ids[0])
+    check_interval = monitor.check_interval if monitor else 1.0
+    threads = threading.active_count()
+    cpu_seconds = time.process_time() - cpu_start
+
+    stop_start = time.monotonic()
+    try:
+        engine.stop()
+    except Exception as e:
+        # 停止超时不影响已采集的结果
+        print(f"{mode}: 停止引擎失败: {e!r}")
+    stop_seconds = time.monotonic() - stop_start
+
+    # 每个用户的目标检查频率为 1/check_interval
+    target = users / check_interval
+    return {
+        'mode': mode,
+        'users': users,
+        'started': started,
+        'startup_s': round(startup_seconds, 2),
+        'checks_per_second': round(checks / elapsed, 1) if elapsed else 0.0,
+        'target_checks_per_second': target,
+        'coverage': round(checks / elapsed / target, 3) if elapsed and target else 0.0,
+        'stop_s': round(stop_seconds, 2),
+        'threads': threads,
+        'cpu_s': round(cpu_seconds, 2),
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="监控引擎对比基准测试")
+    parser.add_argument('--users', type=int, nargs='+', default=[10000], help="模拟用户数")
+    parser.add_argument('--modes', nargs='+', default=['wheel', 'async'], choices=['thread', 'wheel', 'async'],
+                        help="引擎模式: thread-每用户一个线程, wheel-共享时间轮, async-asyncio")
+    parser.add_argument('--duration', type=float, default=10.0, help="稳定运行后的测量时长（秒）")
+    parser.add_argument('--latency-ms', type=float, default=1.0, help="模拟的每次MySQL/Redis调用延迟（毫秒）")
+    parser.add_argument('--orders', type=int, default=5, help="每个用户的订单数")
+    parser.add_argument('--loops', type=int, default=0, help="asyncio模式的事件循环数，0表示等于CPU核数")
+    parser.add_argument('--start-timeout', type=float, default=120.0, help="等待全部用户启动的最长时间（秒）")
+    parser.add_argument('--json', action='store_true', help="以JSON格式输出结果")
+    args = parser.parse_args()
+
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for users in args.users:
+        for mode in args.modes:
+            with context.Pool(1) as pool:
+                results.append(pool.apply(run_mode, (mode, users, args.duration, args.latency_ms,
+                                                     args.orders, args.loops, args.start_timeout)))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print(f"{result['mode']:<6} users={result['users']:<6} started={result['started']:<6} "
+                  f"startup={result['startup_s']}s checks/s={result['checks_per_second']} "
+                  f"(coverage {result['coverage']:.0%}) stop={result['stop_s']}s threads={result['threads']} "
+                  f"cpu={result['cpu_s']}s rss={result['max_rss_mb']}MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,528 @@
+# -*- coding: utf-8 -*-
+"""
+监控引擎负载基准测试
+按固定随机种子生成 N 个用户 × 每用户 M 个订单 × K 个策略，装入可写的MySQL/Redis替身
+（--backend memory 时改为装入进程内内存后端，引擎经过真实的 MySQLManager/RedisManager 代码路径），
+以固定速率对活跃订单制造成交，测量 MonitoringEngine 的：
+    - 成交到策略回调的延迟 p50/p99（从替身写入成交到策略 on_order_update 被调用）
+    - 回调吞吐、检查吞吐
+    - 每用户内存（引擎启动前后的常驻内存差）和线程数
+
+结果以JSON输出，可保存后与其他提交的结果比较（--baseline），超出容差时以非0状态码退出
+
+每组配置在独立的子进程中运行
+
+用法:
+    python -m benchmarks.bench_engine_load --users 1000 --orders 20 --strategies 2 --fill-rate 200 --duration 10
+    python -m benchmarks.bench_engine_load --backend memory --users 10000 --latency-ms 0.5
+    python -m benchmarks.bench_engine_load --output result.json
+    python -m benchmarks.bench_engine_load --baseline result.json --tolerance 0.2
+"""
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from benchmarks.bench_async_engine import (SyncStandIn, _install_stand_ins, _replace_managers, _running_monitors,
+                                           _silence_user_logs, _total_checks)
+from benchmarks.bench_scheduler import _percentile
+
+_QUANTITY = Decimal('1.00000000')
+_FILL_STEP = Decimal('0.25000000')  # 每次成交数量，4次成交完成一个订单
+_ZERO = Decimal('0E-8')
+
+# 比较基线时的指标方向: 1-越大越好, -1-越小越好
+_COMPARED_METRICS = {
+    'callbacks_per_second': 1,
+    'checks_per_second': 1,
+    'latency_p50_ms': -1,
+    'latency_p99_ms': -1,
+    'memory_per_user_kb': -1,
+    'threads': -1,
+}
+
+
+class LoadDataset:
+    """按随机种子生成的用户、策略和订单数据"""
+
+    def __init__(self, users: int, orders_per_user: int, strategies_per_user: int, seed: int):
+        rng = random.Random(seed)
+        base_time = datetime(2024, 1, 1)
+        self.user_ids = list(range(1, users + 1))
+        self.users = {
+            user_id: {'id': user_id, 'username': f"user_{user_id}", 'email': f"user_{user_id}@example.com",
+                      'status': 1, 'created_at': base_time, 'updated_at': base_time}
+            for user_id in self.user_ids
+        }
+        self.strategies = {}
+        self.orders = {}  # {user_id: [订单行]}，行只整体替换，不原地修改
+        self.next_order_id = 1
+        for user_id in self.user_ids:
+            strategy_ids = [(user_id - 1) * strategies_per_user + k + 1 for k in range(strategies_per_user)]
+            self.strategies[user_id] = [
+                {'id': strategy_id, 'user_id': user_id, 'strategy_name': f"bench_{strategy_id}",
+                 'strategy_type': 'bench', 'status': 1, 'config': {}, 'risk_config': {},
+                 'created_at': base_time, 'updated_at': base_time}
+                for strategy_id in strategy_ids
+            ]
+            rows = []
+            for i in range(orders_per_user):
+                update_time = base_time + timedelta(seconds=self.next_order_id)
+                rows.append(self.new_order_row(user_id, rng.choice(strategy_ids),
+                                               rng.choice(['BTCUSDT', 'ETHUSDT', 'BNBUSDT']), update_time))
+            self.orders[user_id] = rows
+
+    def new_order_row(self, user_id: int, strategy_id: int, symbol: str, update_time: datetime) -> Dict[str, Any]:
+        order_id = self.next_order_id
+        self.next_order_id += 1
+        return {
+            'id': order_id,
+            'user_id': user_id,
+            'strategy_id': strategy_id,
+            'order_no': f"BENCH{order_id:010d}",
+            'symbol': symbol,
+            'order_type': 1,
+            'quantity': _QUANTITY,
+            'price': Decimal('100.00000000'),
+            'status': 0,
+            'filled_quantity': _ZERO,
+            'avg_price': _ZERO,
+            'commission': _ZERO,
+            'order_time': update_time,
+            'update_time': update_time,
+            'extra_data': None,
+        }
+
+
+class LoadStandIn(SyncStandIn):
+    """可写的MySQL/Redis替身：订单读取返回当前数据（相当于缓存已失效），成交由 apply_fill 写入"""
+
+    def __init__(self, dataset: LoadDataset, latency: float):
+        super().__init__(dataset, latency)
+        self.write_lock = threading.Lock()
+
+    # Redis
+    def get_or_load_user_strategies(self, user_id: int, loader) -> List[Dict[str, Any]]:
+        self._io()
+        return self.dataset.strategies[user_id]
+
+    def get_or_load_user_orders(self, user_id: int, loader) -> List[Dict[str, Any]]:
+        self._io()
+        return list(self.dataset.orders[user_id])
+
+    # MySQL
+    def get_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
+        self._io()
+        return self.dataset.users.get(user_id)
+
+    def get_users_with_active_strategies(self) -> List[Dict[str, Any]]:
+        self._io()
+        return list(self.dataset.users.values())
+
+    def get_active_strategies_for_users(self, user_ids: List[int], batch_size: int = 100) -> List[Dict[str, Any]]:
+        self._io()
+        return [row for user_id in user_ids for row in self.dataset.strategies.get(user_id, [])]
+
+    def get_user_orders(self, user_id: int, strategy_id: int = None, status: int = None,
+                        limit: int = 1000) -> List[Dict[str, Any]]:
+        self._io()
+        rows = [row for row in self.dataset.orders.get(user_id, [])
+                if (strategy_id is None or row['strategy_id'] == strategy_id)
+                and (status is None or row['status'] == status)]
+        return rows[:limit]
+
+    def get_user_orders_since(self, user_id: int, since: datetime, after_id: int = None,
+                              limit: int = 1000) -> List[Dict[str, Any]]:
+        self._io()
+        if after_id is None:
+            rows = [row for row in self.dataset.orders.get(user_id, []) if row['update_time'] >= since]
+        else:
+            rows = [row for row in self.dataset.orders.get(user_id, [])
+                    if (row['update_time'], row['id']) > (since, after_id)]
+        rows.sort(key=lambda row: (row['update_time'], row['id']))
+        return rows[:limit]
+
+    def get_active_orders_for_users(self, user_ids: List[int], batch_size: int = 100) -> List[Dict[str, Any]]:
+        self._io()
+        return [row for user_id in user_ids for row in self.dataset.orders.get(user_id, []) if row['status'] in (0, 1)]
+
+    def get_orders_by_ids(self, order_ids: List[int], batch_size: int = 100) -> List[Dict[str, Any]]:
+        self._io()
+        wanted = set(order_ids)
+        return [row for rows in list(self.dataset.orders.values()) for row in rows if row['id'] in wanted]
+
+    def apply_fill(self, user_id: int, index: int) -> Dict[str, Any]:
+        """
+        对用户的第 index 个订单成交一次；订单完全成交时为同一策略补充一个新的待处理订单
+
+        Returns:
+            Dict: 成交后的订单行
+        """
+        with self.write_lock:
+            rows = self.dataset.orders[user_id]
+            row = rows[index]
+            filled = row['filled_quantity'] + _FILL_STEP
+            now = datetime.now()
+            row = dict(row, filled_quantity=filled, avg_price=row['price'], update_time=now,
+                       status=2 if filled >= row['quantity'] else 1)
+            if row['status'] == 2:
+                rows[index] = self.dataset.new_order_row(user_id, row['strategy_id'], row['symbol'], now)
+                rows.append(row)
+            else:
+                rows[index] = row
+            return row
+
+
+class MemoryBackendWriter(LoadStandIn):
+    """
+    内存后端模式下的成交写入：更新本地数据集（供成交驱动挑选活跃订单）后，
+    像订单网关一样写入 MySQL 并更新 Redis 中的订单缓存
+    """
+
+    def __init__(self, dataset: LoadDataset, latency_ms: float):
+        from framework.database import MemoryMySQLManager, redis_manager
+        super().__init__(dataset, 0.0)
+        self.mysql = MemoryMySQLManager()
+        self.mysql.set_latency(latency_ms)
+        self.redis = redis_manager
+
+    def apply_fill(self, user_id: int, index: int) -> Dict[str, Any]:
+        row = super().apply_fill(user_id, index)
+        if row['status'] == 2:
+            replacement = self.dataset.orders[user_id][index]
+            self.mysql.insert_orders([replacement])
+            self.redis.patch_cached_user_order(user_id, replacement)
+        self.mysql.update_order_status(row['id'], row['status'], filled_quantity=row['filled_quantity'],
+                                       avg_price=row['avg_price'])
+        self.redis.patch_cached_user_order(user_id, row)
+        return row
+
+
+def _install_memory_backends(writer: MemoryBackendWriter, latency_ms: float) -> None:
+    """
+    监控相关模块改用MySQL/Redis内存后端并写入数据集
+
+    基准脚本导入时 framework.database 已按配置创建了管理器，这里替换模块引用的MySQL管理器，
+    并在Redis管理器初始化前把它切换到内存客户端
+    """
+    dataset = writer.dataset
+    writer.redis.config.update({'backend': 'memory', 'memory_latency_ms': latency_ms})
+    if not writer.redis.initialize():
+        raise RuntimeError("Redis内存后端初始化失败")
+    writer.mysql.insert_users(list(dataset.users.values()))
+    writer.mysql.insert_strategies([row for rows in dataset.strategies.values() for row in rows])
+    writer.mysql.insert_orders([row for rows in dataset.orders.values() for row in rows])
+    _replace_managers(writer.mysql, writer.redis)
+    _silence_user_logs()
+
+
+class FillRecorder:
+    """记录成交时间，策略回调时计算延迟"""
+
+    def __init__(self):
+        self.pending = {}  # {订单ID: 最早未被回调的成交时间}
+        self.latencies = []
+        self.fills = 0
+        self.coalesced = 0  # 回调前同一订单再次成交（合并为一次回调）
+        self.lock = threading.Lock()
+
+    def fill(self, order_id: int) -> None:
+        now = time.perf_counter()
+        with self.lock:
+            self.fills += 1
+            if order_id in self.pending:
+                self.coalesced += 1
+            else:
+                self.pending[order_id] = now
+
+    def callback(self, order_id: int) -> None:
+        now = time.perf_counter()
+        with self.lock:
+            filled_at = self.pending.pop(order_id, None)
+            if filled_at is not None:
+                self.latencies.append(now - filled_at)
+
+    def reset(self) -> None:
+        with self.lock:
+            self.pending.clear()
+            self.latencies = []
+            self.fills = 0
+            self.coalesced = 0
+
+
+recorder = FillRecorder()
+
+
+def _register_bench_strategy() -> None:
+    """注册只记录回调延迟的基准策略"""
+    from framework.strategies.base_strategy import BaseStrategy, StrategyFactory
+
+    class BenchStrategy(BaseStrategy):
+        def initialize(self) -> bool:
+            return True
+
+        def on_order_update(self, order) -> None:
+            recorder.callback(order.id)
+
+        def on_market_data(self, symbol: str, market_data: Dict[str, Any]) -> None:
+            pass
+
+        def on_timer(self) -> None:
+            pass
+
+        def on_risk_check(self) -> bool:
+            return True
+
+        def cleanup(self) -> None:
+            pass
+
+    StrategyFactory.register_strategy('bench', BenchStrategy)
+
+
+def _drive_fills(stand_in: LoadStandIn, rate: float, seed: int, stop_event: threading.Event) -> None:
+    """按固定速率对随机用户的随机活跃订单制造成交"""
+    rng = random.Random(seed + 1)
+    user_ids = stand_in.dataset.user_ids
+    period = 0.01
+    due = 0.0
+    last = time.monotonic()
+    while not stop_event.wait(period):
+        now = time.monotonic()
+        due += (now - last) * rate
+        last = now
+        while due >= 1:
+            due -= 1
+            user_id = rng.choice(user_ids)
+            rows = stand_in.dataset.orders[user_id]
+            active = [i for i, row in enumerate(rows) if row['status'] in (0, 1)]
+            if not active:
+                continue
+            index = rng.choice(active)
+            # 先记录成交时间再写入，避免回调早于记录
+            recorder.fill(rows[index]['id'])
+            stand_in.apply_fill(user_id, index)
+
+
+def _current_rss() -> int:
+    """当前常驻内存（字节），无 /proc 时退回到峰值"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run_load(users: int, orders_per_user: int, strategies_per_user: int, fill_rate: float, duration: float,
+             latency_ms: float, scheduler_mode: str, sync_mode: str, batch_polling: bool, adaptive: bool,
+             seed: int, start_timeout: float, backend: str = 'standin') -> Dict[str, Any]:
+    """在当前进程中运行一组配置并返回统计结果"""
+    from framework.config import MONITOR_CONFIG
+    MONITOR_CONFIG.update({
+        'scheduler_mode': scheduler_mode,
+        'order_sync_mode': sync_mode,
+        'batch_order_polling': batch_polling,
+        'adaptive_check': adaptive,
+    })
+
+    dataset = LoadDataset(users, orders_per_user, strategies_per_user, seed)
+    if backend == 'memory':
+        stand_in = MemoryBackendWriter(dataset, latency_ms)
+        _install_memory_backends(stand_in, latency_ms)
+    else:
+        stand_in = LoadStandIn(dataset, latency_ms / 1000.0)
+        _install_stand_ins(dataset, latency_ms / 1000.0, stand_in)
+    _register_bench_strategy()
+
+    from framework.monitoring.monitoring_engine import MonitoringEngine
+    engine = MonitoringEngine()
+
+    gc.collect()
+    rss_before = _current_rss()
+    start = time.monotonic()
+    engine.start()
+    while _running_monitors(engine) < users and time.monotonic() - start < start_timeout:
+        time.sleep(0.1)
+    startup_seconds = time.monotonic() - start
+    started = _running_monitors(engine)
+    gc.collect()
+    rss_after = _current_rss()
+
+    # 测量窗口：只统计窗口内制造的成交
+    recorder.reset()
+    stop_event = threading.Event()
+    driver = threading.Thread(target=_drive_fills, args=(stand_in, fill_rate, seed, stop_event),
+                              name="BenchFillDriver", daemon=True)
+    cpu_start = time.process_time()
+    checks_before = _total_checks(engine)
+    window_start = time.monotonic()
+    driver.start()
+    time.sleep(duration / 2)
+    threads = threading.active_count()
+    time.sleep(duration / 2)
+    stop_event.set()
+    driver.join()
+    elapsed = time.monotonic() - window_start
+    checks = _total_checks(engine) - checks_before
+
+    # 等待窗口末尾的成交被回调
+    drain_deadline = time.monotonic() + 5.0
+    while recorder.pending and time.monotonic() < drain_deadline:
+        time.sleep(0.05)
+    cpu_seconds = time.process_time() - cpu_start
+
+    try:
+        engine.stop()
+    except Exception as e:
+        print(f"停止引擎失败: {e!r}", file=sys.stderr)
+
+    with recorder.lock:
+        latencies = list(recorder.latencies)
+        fills = recorder.fills
+        coalesced = recorder.coalesced
+        undelivered = len(recorder.pending)
+
+    return {
+        'backend': backend,
+        'users': users,
+        'orders_per_user': orders_per_user,
+        'strategies_per_user': strategies_per_user,
+        'scheduler_mode': scheduler_mode,
+        'sync_mode': sync_mode,
+        'batch_polling': batch_polling,
+        'adaptive': adaptive,
+        'started': started,
+        'startup_s': round(startup_seconds, 2),
+        'fills': fills,
+        'callbacks': len(latencies),
+        'coalesced_fills': coalesced,
+        'undelivered_fills': undelivered,
+        'fills_per_second': round(fills / elapsed, 1) if elapsed else 0.0,
+        'callbacks_per_second': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'checks_per_second': round(checks / elapsed, 1) if elapsed else 0.0,
+        'latency_p50_ms': round(_percentile(latencies, 50) * 1000, 3),
+        'latency_p99_ms': round(_percentile(latencies, 99) * 1000, 3),
+        'latency_max_ms': round(max(latencies) * 1000, 3) if latencies else 0.0,
+        'memory_per_user_kb': round((rss_after - rss_before) / 1024 / max(1, started), 2),
+        'threads': threads,
+        'cpu_s': round(cpu_seconds, 2),
+    }
+
+
+def _git_revision() -> Dict[str, Any]:
+    """当前提交和工作区是否有未提交修改"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=root,
+                                    capture_output=True, text=True, timeout=30).stdout.strip())
+    except (OSError, subprocess.SubprocessError):
+        commit, dirty = None, None
+    return {'commit': commit, 'dirty': dirty}
+
+
+def _result_key(result: Dict[str, Any]) -> tuple:
+    return (result.get('backend', 'standin'), result['users'], result['orders_per_user'], result['strategies_per_user'],
+            result['scheduler_mode'], result['sync_mode'], result['batch_polling'], result.get('adaptive', False))
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    与基线结果比较
+
+    Args:
+        results: 本次结果
+        baseline: 基线JSON（本脚本的输出）
+        tolerance: 允许的相对变差比例
+
+    Returns:
+        List[str]: 超出容差的指标说明
+    """
+    regressions = []
+    previous = {_result_key(result): result for result in baseline.get('results', [])}
+    for result in results:
+        base = previous.get(_result_key(result))
+        if base is None:
+            continue
+        for metric, direction in _COMPARED_METRICS.items():
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * direction
+            if change < -tolerance:
+                regressions.append(f"{_result_key(result)} {metric}: {old} -> {new} ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="监控引擎负载基准测试")
+    parser.add_argument('--users', type=int, nargs='+', default=[1000], help="模拟用户数")
+    parser.add_argument('--orders', type=int, default=20, help="每个用户的订单数")
+    parser.add_argument('--strategies', type=int, default=2, help="每个用户的策略数")
+    parser.add_argument('--fill-rate', type=float, default=200.0, help="每秒制造的成交数")
+    parser.add_argument('--duration', type=float, default=10.0, help="测量时长（秒）")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="模拟的每次MySQL/Redis调用延迟（毫秒）")
+    parser.add_argument('--backend', default='standin', choices=['standin', 'memory'],
+                        help="数据后端: standin-替身（只测引擎本身）, memory-内存后端（含管理器和缓存代码路径）")
+    parser.add_argument('--scheduler-modes', nargs='+', default=['wheel'], choices=['thread', 'wheel'],
+                        help="用户检查调度模式")
+    parser.add_argument('--sync-mode', default='full', choices=['full', 'delta'], help="订单同步模式")
+    parser.add_argument('--batch-polling', action='store_true', help="引擎统一批量轮询活跃订单")
+    parser.add_argument('--adaptive', action='store_true', help="按订单活跃程度自适应检查间隔")
+    parser.add_argument('--seed', type=int, default=42, help="随机种子")
+    parser.add_argument('--start-timeout', type=float, default=120.0, help="等待全部用户启动的最长时间（秒）")
+    parser.add_argument('--output', type=str, default=None, help="结果JSON文件路径，默认输出到标准输出")
+    parser.add_argument('--baseline', type=str, default=None, help="用于比较的基线结果JSON")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="与基线比较时允许的相对变差比例")
+    args = parser.parse_args()
+
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for users in args.users:
+        for scheduler_mode in args.scheduler_modes:
+            with context.Pool(1) as pool:
+                results.append(pool.apply(run_load, (
+                    users, args.orders, args.strategies, args.fill_rate, args.duration, args.latency_ms,
+                    scheduler_mode, args.sync_mode, args.batch_polling, args.adaptive, args.seed,
+                    args.start_timeout, args.backend
+                )))
+
+    report = {
+        'benchmark': 'engine_load',
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'args': vars(args),
+        'results': results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"性能回退: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
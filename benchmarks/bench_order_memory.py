@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+订单内存占用基准测试
+统计从数据库行构造大量订单对象时的内存占用和构造耗时
+
+用法:
+    python -m benchmarks.bench_order_memory --orders 5000 50000
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Any, List
+
+from framework.models.order import Order
+
+
+def _make_rows(count: int) -> List[Dict[str, Any]]:
+    """生成模拟的订单查询结果（字段类型与mysql-connector返回值一致）"""
+    base_time = datetime(2024, 1, 1)
+    rows = []
+    for i in range(count):
+        quantity = Decimal(random.randint(1, 10000)).scaleb(-4).quantize(Decimal('0.00000001'))
+        filled = (quantity * Decimal(random.randint(0, 100)) / 100).quantize(Decimal('0.00000001'))
+        rows.append({
+            'id': i + 1,
+            'user_id': 1,
+            'strategy_id': random.randint(1, 20),
+            'order_no': f"ORD{i:010d}",
+            'symbol': random.choice(['BTCUSDT', 'ETHUSDT', 'BNBUSDT']),
+            'order_type': random.choice([1, 2]),
+            'quantity': quantity,
+            'price': Decimal(random.randint(100, 100000)).quantize(Decimal('0.00000001')),
+            'status': random.choice([0, 1]),
+            'filled_quantity': filled,
+            'avg_price': Decimal('0E-8') if not filled else Decimal('101.50000000'),
+            'commission': Decimal('0E-8'),
+            'order_time': base_time + timedelta(seconds=i),
+            'update_time': base_time + timedelta(seconds=i, milliseconds=500),
+            'extra_data': None,
+        })
+    return rows
+
+
+def bench_orders(count: int) -> Dict[str, Any]:
+    """构造 count 个订单并统计内存"""
+    rows = _make_rows(count)
+    gc.collect()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    orders = {row['id']: Order.from_dict(row) for row in rows}
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # 常用访问路径的耗时
+    start = time.perf_counter()
+    active = sum(1 for order in orders.values() if order.is_active())
+    remaining = sum(order.get_remaining_quantity() for order in orders.values())
+    access_elapsed = time.perf_counter() - start
+
+    return {
+        'orders': count,
+        'active': active,
+        'remaining_total': str(remaining),
+        'bytes_total': current,
+        'bytes_peak': peak,
+        'bytes_per_order': round(current / count, 1) if count else 0.0,
+        'build_ms': round(elapsed * 1000, 2),
+        'access_ms': round(access_elapsed * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="订单内存占用基准测试")
+    parser.add_argument('--orders', type=int, nargs='+', default=[5000, 50000], help="订单数")
+    parser.add_argument('--json', action='store_true', help="以JSON格式输出结果")
+    args = parser.parse_args()
+
+    results = []
+    for count in args.orders:
+        result = bench_orders(count)
+        results.append(result)
+        if not args.json:
+            print(f"orders={result['orders']:<8} bytes/order={result['bytes_per_order']:<8} "
+                  f"build={result['build_ms']}ms access={result['access_ms']}ms")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
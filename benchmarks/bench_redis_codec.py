@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Redis缓存解码基准测试
+对比逐字符串试探datetime的旧解码方式、未登记模式的快速过滤方式和按模式解码方式，
+以及各载荷编码器（json/pickle/msgpack）的体积和编解码耗时
+
+用法:
+    python -m benchmarks.bench_redis_codec --orders 5000 --repeat 20
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict, Callable
+
+from framework.database import redis_manager
+from framework.database.codecs import ORDER_SCHEMA, get_codec
+from benchmarks.bench_order_memory import _make_rows
+
+
+def _legacy_is_datetime_string(value: str) -> bool:
+    """旧实现：长度不小于19的字符串都尝试解析一次"""
+    if not isinstance(value, str) or len(value) < 19:
+        return False
+    try:
+        datetime.fromisoformat(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _legacy_convert(data):
+    """旧实现：递归遍历并对候选字符串解析两次"""
+    if isinstance(data, dict):
+        return {key: _legacy_convert(val) for key, val in data.items()}
+    elif isinstance(data, list):
+        return [_legacy_convert(item) for item in data]
+    elif isinstance(data, str) and _legacy_is_datetime_string(data):
+        try:
+            return datetime.fromisoformat(data)
+        except ValueError:
+            return data
+    return data
+
+
+def _make_payload(count: int):
+    """生成订单列表（带有较长的订单号和扩展数据字符串）"""
+    rows = _make_rows(count)
+    for row in rows:
+        row['order_no'] = f"{row['order_no']}-{row['symbol']}-CLIENT-ORDER-ID"
+        row['extra_data'] = {'client_tag': 'strategy-grid-rebalance-v2', 'note': 'auto generated by bench'}
+    return rows
+
+
+def _make_blob(count: int) -> str:
+    """生成订单列表的缓存JSON"""
+    return get_codec('json').encode(_make_payload(count))
+
+
+def _time(func: Callable[[], Any], repeat: int) -> float:
+    """返回单次调用的最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_codec(count: int, repeat: int) -> Dict[str, Any]:
+    """解码 count 条订单组成的缓存值"""
+    blob = _make_blob(count)
+
+    decoders = {
+        'legacy_probe': lambda: _legacy_convert(json.loads(blob)),
+        'filtered_probe': lambda: redis_manager._deserialize_value(blob),
+        'schema': lambda: redis_manager._deserialize_value(blob, ORDER_SCHEMA),
+    }
+
+    # 结果中的datetime字段应一致
+    reference = decoders['legacy_probe']()
+    for name, decode in decoders.items():
+        result = decode()
+        assert result[0]['update_time'] == reference[0]['update_time'], name
+
+    result = {'orders': count, 'bytes': len(blob)}
+    for name, decode in decoders.items():
+        result[f'{name}_ms'] = round(_time(decode, repeat) * 1000, 3)
+    result['speedup'] = round(result['legacy_probe_ms'] / result['schema_ms'], 2) if result['schema_ms'] else 0.0
+    return result
+
+
+def bench_codecs(count: int, repeat: int, names=('json', 'pickle', 'msgpack')) -> Dict[str, Any]:
+    """比较各编码器对单个订单记录（哈希字段）和整个订单列表的体积与耗时"""
+    rows = _make_payload(count)
+    result = {'orders': count}
+    for name in names:
+        try:
+            codec = get_codec(name)
+        except ImportError:
+            result[name] = 'unavailable'
+            continue
+
+        if codec.binary:
+            decode = redis_manager._deserialize_value
+        else:
+            decode = lambda value: redis_manager._deserialize_value(value, ORDER_SCHEMA)
+
+        encoded_rows = [codec.encode(row) for row in rows]
+        blob = codec.encode(rows)
+        assert decode(blob)[0]['quantity'] == rows[0]['quantity'], name
+
+        result[name] = {
+            'record_bytes_avg': round(sum(len(value) for value in encoded_rows) / count, 1),
+            'blob_bytes': len(blob),
+            'encode_ms': round(_time(lambda: codec.encode(rows), repeat) * 1000, 3),
+            'decode_ms': round(_time(lambda: decode(blob), repeat) * 1000, 3),
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redis缓存解码基准测试")
+    parser.add_argument('--orders', type=int, nargs='+', default=[5000], help="每个缓存值包含的订单数")
+    parser.add_argument('--repeat', type=int, default=20, help="重复次数（取最短耗时）")
+    parser.add_argument('--json', action='store_true', help="以JSON格式输出结果")
+    args = parser.parse_args()
+
+    results = [bench_codec(count, args.repeat) for count in args.orders]
+    codec_results = [bench_codecs(count, args.repeat) for count in args.orders]
+
+    if args.json:
+        print(json.dumps({'decode': results, 'codecs': codec_results}, indent=2))
+    else:
+        for result in results:
+            print(f"orders={result['orders']:<6} bytes={result['bytes']:<9} "
+                  f"legacy={result['legacy_probe_ms']}ms filtered={result['filtered_probe_ms']}ms "
+                  f"schema={result['schema_ms']}ms speedup={result['speedup']}x")
+        for result in codec_results:
+            for name, stats in result.items():
+                if name == 'orders':
+                    continue
+                if not isinstance(stats, dict):
+                    print(f"  {name:<8} {stats}")
+                    continue
+                print(f"  {name:<8} record={stats['record_bytes_avg']}B blob={stats['blob_bytes']}B "
+                      f"encode={stats['encode_ms']}ms decode={stats['decode_ms']}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+用户检查调度基准测试
+对比每用户独立线程与共享时间轮两种模式在大量用户下的线程数和调度抖动
+
+用法:
+    python -m benchmarks.bench_scheduler --users 1000 10000 --duration 10
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+from typing import Dict, Any, List
+
+from framework.monitoring.scheduler import WheelScheduler
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """计算百分位数"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+def _summarize(mode: str, users: int, lags: List[float], threads: int, elapsed: float) -> Dict[str, Any]:
+    """汇总调度延迟（毫秒）"""
+    return {
+        'mode': mode,
+        'users': users,
+        'threads': threads,
+        'checks': len(lags),
+        'checks_per_second': round(len(lags) / elapsed, 1) if elapsed else 0.0,
+        'lag_mean_ms': round(statistics.mean(lags) * 1000, 3) if lags else 0.0,
+        'lag_p50_ms': round(_percentile(lags, 50) * 1000, 3),
+        'lag_p99_ms': round(_percentile(lags, 99) * 1000, 3),
+        'lag_max_ms': round(max(lags) * 1000, 3) if lags else 0.0,
+    }
+
+
+def _simulate_work(work_ms: float) -> None:
+    """模拟一次检查的耗时（阻塞I/O）"""
+    if work_ms > 0:
+        time.sleep(work_ms / 1000.0)
+
+
+def bench_wheel(users: int, interval: float, duration: float, work_ms: float,
+                workers: int = None, tick: float = 0.01) -> Dict[str, Any]:
+    """共享时间轮模式"""
+    scheduler = WheelScheduler(max_workers=workers, tick=tick)
+    scheduler.start()
+    lags = []
+    lock = threading.Lock()
+
+    def make_check():
+        job_ref = []
+
+        def check():
+            lag = time.monotonic() - job_ref[0].next_deadline
+            with lock:
+                lags.append(max(0.0, lag))
+            _simulate_work(work_ms)
+            return True
+
+        return check, job_ref
+
+    for _ in range(users):
+        check, job_ref = make_check()
+        job_ref.append(scheduler.schedule_periodic(interval, check,
+                                                   initial_delay=random.uniform(0, interval)))
+
+    start = time.monotonic()
+    time.sleep(duration / 2)
+    threads = threading.active_count()
+    time.sleep(duration / 2)
+    elapsed = time.monotonic() - start
+
+    scheduler.stop()
+    return _summarize('wheel', users, lags, threads, elapsed)
+
+
+def bench_threads(users: int, interval: float, duration: float, work_ms: float) -> Dict[str, Any]:
+    """每用户独立线程模式（与 UserMonitor._monitor_loop 相同的休眠方式）"""
+    running = True
+    lags = []
+    lock = threading.Lock()
+
+    def loop(initial_delay: float):
+        deadline = time.monotonic() + initial_delay
+        while running:
+            sleep_time = deadline - time.monotonic()
+            if sleep_time > 0:
+                time.sleep(sleep_time)
+            start = time.monotonic()
+            with lock:
+                lags.append(max(0.0, start - deadline))
+            _simulate_work(work_ms)
+            deadline = start + interval
+
+    threads = []
+    for i in range(users):
+        thread = threading.Thread(target=loop, args=(random.uniform(0, interval),),
+                                  name=f"BenchUser-{i}", daemon=True)
+        thread.start()
+        threads.append(thread)
+
+    start = time.monotonic()
+    time.sleep(duration / 2)
+    thread_count = threading.active_count()
+    time.sleep(duration / 2)
+    elapsed = time.monotonic() - start
+
+    running = False
+    for thread in threads:
+        thread.join(timeout=interval + 1)
+    return _summarize('thread', users, lags, thread_count, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用户检查调度基准测试")
+    parser.add_argument('--users', type=int, nargs='+', default=[1000, 10000], help="模拟用户数")
+    parser.add_argument('--interval', type=float, default=1.0, help="检查间隔(秒)")
+    parser.add_argument('--duration', type=float, default=10.0, help="每组运行时长(秒)")
+    parser.add_argument('--work-ms', type=float, default=0.0, help="每次检查模拟耗时(毫秒)")
+    parser.add_argument('--workers', type=int, default=None, help="时间轮工作线程数，默认CPU核数")
+    parser.add_argument('--modes', nargs='+', default=['wheel', 'thread'], choices=['wheel', 'thread'])
+    parser.add_argument('--json', action='store_true', help="以JSON格式输出结果")
+    args = parser.parse_args()
+
+    results = []
+    for users in args.users:
+        for mode in args.modes:
+            if mode == 'wheel':
+                result = bench_wheel(users, args.interval, args.duration, args.work_ms, args.workers)
+            else:
+                result = bench_threads(users, args.interval, args.duration, args.work_ms)
+            results.append(result)
+            if not args.json:
+                print(f"{result['mode']:>6} users={result['users']:<6} threads={result['threads']:<6} "
+                      f"checks/s={result['checks_per_second']:<8} p50={result['lag_p50_ms']}ms "
+                      f"p99={result['lag_p99_ms']}ms max={result['lag_max_ms']}ms")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,16 +3,19 @@
 高并发订单监控系统主应用
 整合所有框架组件，提供统一的启动入口
 """
+import os
 import sys
 import signal
 import time
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
 
 from framework.database import mysql_manager, redis_manager
 from framework.logging import log_manager
-from framework.monitoring import monitoring_engine
+from framework.config import MONITOR_CONFIG, METRICS_CONFIG, TRACING_CONFIG, LOG_CONFIG
+from framework.metrics import metrics_exporter, tracer, stack_sampler, write_collapsed
+from framework.monitoring import monitoring_engine, async_monitoring_engine, shard_supervisor
 
 class OrderMonitoringApp:
     """高并发订单监控系统主应用"""
@@ -22,12 +25,22 @@ class OrderMonitoringApp:
         self.running = False
         self.start_time = None
 
+        # 监控引擎实现（线程模式、asyncio模式或多进程分片，接口相同）
+        engine_mode = MONITOR_CONFIG.get('engine_mode', 'thread')
+        if engine_mode == 'async':
+            self.engine = async_monitoring_engine
+        elif engine_mode == 'sharded':
+            self.engine = shard_supervisor
+        else:
+            self.engine = monitoring_engine
+
         # 组件状态
         self.components = {
             'mysql': False,
             'redis': False,
             'logging': False,
-            'monitoring': False
+            'monitoring': False,
+            'metrics': False
         }
 
         # 设置日志
@@ -73,13 +86,9 @@ class OrderMonitoringApp:
                 return False
 
             # 测试MySQL连接
-            with mysql_manager.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT 1")
-                result = cursor.fetchone()
-                if result[0] != 1:
-                    self.logger.error("MySQL连接测试失败")
-                    return False
+            if not mysql_manager.health_check():
+                self.logger.error("MySQL连接测试失败")
+                return False
 
             self.logger.info("MySQL连接正常")
             self.components['mysql'] = True
@@ -123,12 +132,24 @@ class OrderMonitoringApp:
 
             # 初始化监控引擎
             self.logger.info("初始化监控引擎...")
-            if not monitoring_engine.start():
+            if not self.engine.start():
                 self.logger.error("监控引擎启动失败")
                 return False
             self.components['monitoring'] = True
             self.logger.info("监控引擎启动成功")
 
+            # 启动指标导出（失败不影响监控）
+            if METRICS_CONFIG.get('enabled', False):
+                self.logger.info("启动指标导出...")
+                if metrics_exporter.start():
+                    self.components['metrics'] = True
+                else:
+                    self.logger.warning("指标导出启动失败，继续运行")
+
+            # 常驻线程栈采样（默认只在 profile 命令运行期间采样）
+            if TRACING_CONFIG.get('sampler_enabled', False):
+                stack_sampler.start()
+
             self.logger.info("所有组件初始化完成")
             return True
 
@@ -144,18 +165,15 @@ class OrderMonitoringApp:
             # 这里可以加载一些测试数据或初始配置
             # 例如：创建默认用户、策略等
 
-            # 示例：检查是否有活跃用户
-            with mysql_manager.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT COUNT(*) FROM users WHERE status = 'active'")
-                active_users = cursor.fetchone()[0]
+            # 示例：检查是否有活跃用户（通过查询方法，MySQL和内存后端均适用）
+            active_users = len(mysql_manager.get_users_with_active_strategies())
 
-                self.logger.info(f"当前活跃用户数: {active_users}")
+            self.logger.info(f"当前活跃用户数: {active_users}")
 
-                if active_users == 0:
-                    self.logger.warning("没有活跃用户，系统将处于待机状态")
-                else:
-                    self.logger.info(f"系统将监控 {active_users} 个活跃用户")
+            if active_users == 0:
+                self.logger.warning("没有活跃用户，系统将处于待机状态")
+            else:
+                self.logger.info(f"系统将监控 {active_users} 个活跃用户")
 
         except Exception as e:
             self.logger.error(f"加载初始数据失败: {e}")
@@ -210,10 +228,20 @@ class OrderMonitoringApp:
         self.logger.info("=" * 60)
 
         try:
+            # 停止线程栈采样
+            if stack_sampler.running:
+                stack_sampler.stop()
+
+            # 停止指标导出
+            if self.components['metrics']:
+                self.logger.info("停止指标导出...")
+                metrics_exporter.stop()
+                self.components['metrics'] = False
+
             # 停止监控引擎
             if self.components['monitoring']:
                 self.logger.info("停止监控引擎...")
-                monitoring_engine.stop()
+                self.engine.stop()
                 self.components['monitoring'] = False
 
             # 停止日志管理器
@@ -263,7 +291,7 @@ class OrderMonitoringApp:
         # 获取各组件详细状态
         try:
             if self.components['mysql']:
-                status['mysql_stats'] = mysql_manager.get_pool_info()
+                status['mysql_stats'] = mysql_manager.get_pool_status()
 
             if self.components['redis']:
                 status['redis_stats'] = redis_manager.get_connection_info()
@@ -272,13 +300,78 @@ class OrderMonitoringApp:
                 status['logging_stats'] = log_manager.get_statistics()
 
             if self.components['monitoring']:
-                status['monitoring_stats'] = monitoring_engine.get_statistics()
+                status['monitoring_stats'] = self.engine.get_statistics()
+
+            if self.components['metrics']:
+                status['metrics_stats'] = metrics_exporter.get_statistics()
+
+            if tracer.enabled or stack_sampler.running:
+                status['tracing_stats'] = {
+                    'tracer': tracer.get_statistics(),
+                    'sampler': stack_sampler.get_statistics()
+                }
 
         except Exception as e:
             self.logger.error(f"获取状态信息失败: {e}")
 
         return status
 
+    def profile(self, seconds: float = 30, output: Optional[str] = None) -> Dict[str, Any]:
+        """
+        运行系统并采样指定时长，写出折叠栈文件（可用 flamegraph.pl 或 speedscope 生成火焰图）
+
+        Args:
+            seconds: 采样时长（秒）
+            output: 线程栈采样文件路径，默认写入日志目录；区间树写入同名的 .spans 文件
+
+        Returns:
+            Dict: 输出文件、采样次数和各区间的耗时汇总，启动失败时为空
+        """
+        if MONITOR_CONFIG.get('engine_mode', 'thread') == 'sharded':
+            self.logger.warning("分片模式下用户监控运行在子进程中，只能采样监督进程")
+
+        if output is None:
+            output = os.path.join(LOG_CONFIG['log_dir'], f"profile-{datetime.now():%Y%m%d-%H%M%S}.folded")
+        root, ext = os.path.splitext(output)
+        spans_output = f"{root}.spans{ext}"
+
+        started_here = not self.running
+        if started_here and not self.start():
+            return {}
+
+        tracing_enabled = tracer.enabled
+        sampler_running = stack_sampler.running
+        tracer.clear()
+        tracer.enable()
+        stack_sampler.reset()
+        stack_sampler.start()
+        self.logger.info(f"开始采样 {seconds} 秒...")
+
+        try:
+            deadline = time.monotonic() + seconds
+            while self.running and time.monotonic() < deadline:
+                time.sleep(min(1.0, max(0.0, deadline - time.monotonic())))
+        finally:
+            if not sampler_running:
+                stack_sampler.stop()
+            if not tracing_enabled:
+                tracer.disable()
+
+            result = {
+                'output': output,
+                'spans_output': spans_output,
+                'stacks': stack_sampler.write_collapsed(output),
+                'span_stacks': write_collapsed(spans_output, tracer.collapsed()),
+                'sampler': stack_sampler.get_statistics(),
+                'spans': tracer.summary()
+            }
+            self.logger.info(f"采样结果已写入: {output}, 区间: {spans_output}")
+
+            if started_here:
+                self.stop()
+
+        return result
+
     def run(self) -> None:
         """运行应用（阻塞模式）"""
         if not self.start():
@@ -10,6 +10,8 @@ __all__ = [
     'MONITOR_CONFIG',
     'LOG_CONFIG',
     'CACHE_CONFIG',
+    'METRICS_CONFIG',
+    'TRACING_CONFIG',
     'TABLE_NAMES',
     'REDIS_KEYS',
     'SYSTEM_STATUS',
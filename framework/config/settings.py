@@ -27,6 +27,13 @@ MYSQL_CONFIG = {
     'max_overflow': 30,
     'pool_recycle': 3600,  # 1小时回收连接
     'pool_timeout': 30,
+    # 并发限制：同时执行的数据库调用数上限(0表示不限制)，超出时排队等待而不是因连接池耗尽直接失败
+    'max_concurrency': 20,
+    'acquire_timeout': 5,  # 排队等待的最长时间(秒)
+    # 后端: mysql-连接池, memory-进程内内存表（基准测试/规模测试用，数据不持久化、不在进程间共享）
+    'backend': 'mysql',
+    'memory_latency_ms': 0,  # memory后端每次查询注入的延迟(毫秒)，模拟网络往返
+    'memory_jitter_ms': 0,  # 注入延迟的随机抖动上限(毫秒)
 }
 
 # Redis配置
@@ -36,6 +43,9 @@ REDIS_CONFIG = {
     'password': 123456789,
     'db': 0,
     'decode_responses': True,
+    # 字典/列表载荷编码: json-兼容旧数据, msgpack-紧凑二进制(需安装msgpack), pickle-协议5(仅限可信实例)
+    # 二进制编码会自动关闭decode_responses，带版本头的二进制值与旧JSON值可同时读取
+    'codec': 'json',
     'socket_connect_timeout': 5,
     'socket_timeout': 5,
     'retry_on_timeout': True,
@@ -45,7 +55,14 @@ REDIS_CONFIG = {
         'max_connections': 50,
         'socket_keepalive': True,
         'socket_keepalive_options': {},
-    }
+    },
+    # 并发限制：同时执行的Redis命令数上限(0表示不限制，发布/订阅连接不计入)
+    'max_concurrency': 50,
+    'acquire_timeout': 5,  # 排队等待的最长时间(秒)
+    # 后端: redis-连接池, memory-进程内实现（基准测试/规模测试用，数据不持久化、不在进程间共享）
+    'backend': 'redis',
+    'memory_latency_ms': 0,  # memory后端每个命令/管道注入的延迟(毫秒)，模拟网络往返
+    'memory_jitter_ms': 0,  # 注入延迟的随机抖动上限(毫秒)
 }
 
 # 监控配置
@@ -56,6 +73,66 @@ MONITOR_CONFIG = {
     'queue_maxsize': 1000,  # 队列最大大小
     'strategy_check_interval': 5,  # 策略状态检查间隔(秒)
     'user_cleanup_interval': 60,  # 用户清理检查间隔(秒)
+    # 用户检查调度模式: thread-每个用户独立监控线程, wheel-共享时间轮调度
+    'scheduler_mode': 'thread',
+    'scheduler_workers': 0,  # 时间轮工作线程数, 0表示等于CPU核数
+    'scheduler_tick': 0.01,  # 时间轮刻度(秒)
+    'strategy_workers': 0,  # 时间轮模式下共享策略回调线程数, 0表示等于CPU核数
+    # 监控引擎实现: thread-线程模式(MonitoringEngine), async-asyncio模式(AsyncMonitoringEngine，需要安装aiomysql),
+    # sharded-多进程分片(ShardSupervisor，每个子进程运行一个线程模式引擎)
+    'engine_mode': 'thread',
+    'async_loops': 0,  # 异步引擎事件循环数, 0表示等于CPU核数
+    'shard_count': 0,  # 分片进程数, 0表示等于CPU核数
+    'shard_replicas': 100,  # 一致性哈希环每个分片的虚拟节点数
+    'shard_check_interval': 1.0,  # 分片存活检查间隔(秒)
+    'shard_restart_delay': 5.0,  # 分片退出后重启前的等待时间(秒)
+    'shard_start_method': 'spawn',  # 分片子进程启动方式: spawn/forkserver/fork
+    'batch_order_polling': False,  # 引擎统一批量轮询所有用户的活跃订单
+    'order_poll_interval': 1.0,  # 批量订单轮询间隔(秒)
+    # 订单同步模式: full-每次全量重新加载, delta-按update_time水位增量同步
+    'order_sync_mode': 'full',
+    'order_sync_overlap': 2,  # 增量同步水位回看窗口(秒)，覆盖同一秒内及延迟提交的更新
+    'order_sync_batch_size': 1000,  # 增量同步每次查询的最大行数
+    'order_cache_resync_interval': 60,  # 每轮只读取活跃订单(缓存)或变化的订单(增量模式)，按该间隔(秒)全量重新加载对账
+    'order_write_behind': False,  # 订单更新写回缓冲：合并同一订单的多次更新后批量写库
+    'order_write_flush_interval': 0.05,  # 写回最大延迟(秒)
+    'order_write_batch_size': 500,  # 每批写回的最大行数
+    'order_write_max_pending': 5000,  # 待写订单数达到该值时立即刷新
+    'batch_strategy_polling': False,  # 引擎统一查询所有被监控用户的活跃策略快照，只向有变化的用户分发
+    'strategy_poll_interval': 5.0,  # 策略快照查询间隔(秒)
+    # 策略变更订阅：引擎按 updated_at 水位统一轮询并通过Redis通道推送，用户监控器不再定期查询策略表
+    'strategy_change_feed': False,
+    'strategy_feed_poller': True,  # 本进程是否运行水位轮询（多进程部署时可只在一个进程开启）
+    'strategy_feed_interval': 1.0,  # 水位轮询间隔(秒)
+    'strategy_feed_overlap': 2,  # 水位回看窗口(秒)
+    'strategy_feed_batch_size': 1000,  # 每次查询的最大行数
+    'strategy_resync_interval': 300,  # 订阅模式下用户策略全量对账间隔(秒)，兜底删除等无法推送的变化
+    # 集群租约：多个引擎节点按分桶租约（带防护令牌）分担用户，节点失效后由其他节点接管
+    'cluster_leases': False,
+    'lease_bucket_count': 256,  # 用户分桶数 (user_id % 分桶数)
+    'lease_ttl': 15,  # 租约及节点心跳有效期(秒)，节点失效后最长在该时间后被接管
+    'lease_renew_interval': 5,  # 租约续期间隔(秒)，应明显小于 lease_ttl
+    # 自适应检查间隔：有部分成交/活跃订单的用户高频检查，空闲用户按指数退避降低检查频率
+    'adaptive_check': False,
+    'partial_check_interval': 0.25,  # 有部分成交订单时的检查间隔(秒)
+    'active_check_interval': 0.5,  # 有活跃订单时的检查间隔(秒)
+    'idle_check_interval': 1.0,  # 空闲用户的初始检查间隔(秒)
+    'idle_check_max_interval': 30.0,  # 空闲用户退避的最大检查间隔(秒)
+    'idle_backoff_factor': 2.0,  # 空闲用户每次无变化检查后间隔的放大倍数
+    # 全局检查预算：所有用户每秒检查总数上限(0表示不限制)，令牌紧张时按权重公平分配
+    'check_budget_per_second': 0,
+    'check_budget_burst': 0,  # 令牌桶容量, 0表示等于每秒预算
+    'active_check_weight': 4,  # 有活跃订单用户的公平份额权重（空闲用户为1）
+    # 过载保护：数据库调用延迟或排队深度超过阈值时逐级拉长低优先级用户的检查间隔，恢复后逐级还原
+    'load_shedding': True,
+    'db_latency_slo_ms': 200,  # 数据库调用p95延迟阈值(毫秒)
+    'db_queue_depth_slo': 20,  # 等待数据库并发名额的调用数阈值
+    'executor_queue_depth_slo': 200,  # 引擎线程池积压任务数阈值
+    'shed_max_level': 4,  # 最大降级等级，空闲用户检查间隔最多放大 2^等级 倍
+    'shed_evaluate_interval': 1.0,  # 过载判断间隔(秒)
+    'shed_recover_intervals': 3,  # 连续多少次判断正常后降低一级
+    'max_starts_per_scan': 200,  # 每次用户扫描最多启动的监控器数(降级时按等级减半)
+    'start_wait_timeout': 30,  # 每次扫描等待监控器启动的总时间(秒)
 }
 
 # 日志配置
@@ -70,12 +147,45 @@ LOG_CONFIG = {
     'cleanup_interval': 3600,  # 清理检查间隔(秒)
 }
 
+# 指标导出配置（Prometheus文本格式）
+METRICS_CONFIG = {
+    'enabled': False,
+    'host': '127.0.0.1',
+    'port': 9108,  # HTTP端点 /metrics，0表示不启动HTTP服务；分片模式下第N个分片进程使用 port+1+N
+    'textfile_path': None,  # 定期写入的文本文件路径(node_exporter textfile收集器)，None表示不写
+    'textfile_interval': 15,  # 文本文件写入间隔(秒)
+    'namespace': 'order_monitor',  # 指标名前缀
+    'per_user_series': False,  # 是否按user_id导出每个用户的序列（用户多时序列数很大，默认汇总为一个序列）
+}
+
+# 追踪与采样配置（默认关闭，profile 命令运行期间临时开启）
+TRACING_CONFIG = {
+    'enabled': False,  # 在监控流水线热路径上记录区间
+    'buffer_size': 65536,  # 区间环形缓冲区容量
+    'sampler_enabled': False,  # 常驻运行线程栈采样器
+    'sample_interval': 0.01,  # 采样间隔(秒)
+    'max_stack_depth': 64,  # 每个调用栈保留的最大帧数
+    'max_stacks': 20000,  # 最多保留的不同调用栈数量
+}
+
 # 缓存配置
 CACHE_CONFIG = {
     'user_cache_ttl': 300,  # 用户信息缓存5分钟
     'strategy_cache_ttl': 60,  # 策略信息缓存1分钟
     'order_cache_ttl': 30,  # 订单信息缓存30秒
     'batch_cache_size': 1000,  # 批量缓存大小
+    # 进程内本地缓存(L1)：位于Redis之前，其他进程写入时通过发布/订阅通道失效
+    'local_cache_enabled': False,
+    'local_cache_max_size': 10000,  # 最大条目数(LRU淘汰)
+    'local_cache_ttls': {  # 按Redis键前缀设置的L1 TTL(秒)，未列出的键不进入L1
+        'user:': 30,
+        'strategy:': 10,
+        'strategy_status:': 5,
+    },
+    # 缓存未命中时的单飞加载：同一键只有一个加载者，其余调用方等待结果
+    'single_flight_distributed': False,  # 是否额外使用Redis短锁实现跨进程单飞
+    'single_flight_lock_ttl': 10,  # 跨进程加载锁的过期时间(秒)
+    'single_flight_wait_timeout': 5,  # 等待其他加载者结果的最长时间(秒)，超时后自行加载
 }
 
 # 数据库表名
@@ -91,8 +201,15 @@ REDIS_KEYS = {
     'order_prefix': 'order:',
     'strategy_prefix': 'strategy:',
     'user_orders_prefix': 'user_orders:',
+    'user_active_orders_prefix': 'user_active_orders:',
     'active_users': 'active_users',
     'strategy_status': 'strategy_status:',
+    'cache_invalidation_channel': 'cache_invalidation',
+    'load_lock_prefix': 'load_lock:',
+    'strategy_change_channel': 'strategy_changes',
+    'lease_prefix': 'lease:',
+    'lease_fence_prefix': 'lease_fence:',
+    'lease_nodes': 'lease_nodes',
 }
 
 # 系统状态
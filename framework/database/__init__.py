@@ -2,7 +2,18 @@
 """
 数据库模块
 """
-from .mysql_manager import MySQLManager, mysql_manager
+from .mysql_manager import MySQLManager, mysql_manager, create_mysql_manager
 from .redis_manager import RedisManager, redis_manager
+from .codecs import PayloadSchema, register_schema
+from .local_cache import LocalCache, local_cache
+from .single_flight import SingleFlight, single_flight
+from .async_clients import AsyncMySQLManager, AsyncRedisManager
+from .concurrency import ConcurrencyLimiter, LimiterTimeout, mysql_limiter, redis_limiter
+from .memory_backend import MemoryMySQLManager, MemoryRedis, MemoryRedisStore, memory_redis_store
 
-__all__ = ['MySQLManager', 'RedisManager', 'mysql_manager', 'redis_manager']
\ No newline at end of file
+__all__ = ['MySQLManager', 'RedisManager', 'mysql_manager', 'redis_manager',
+           'PayloadSchema', 'register_schema', 'LocalCache', 'local_cache',
+           'SingleFlight', 'single_flight', 'AsyncMySQLManager', 'AsyncRedisManager',
+           'ConcurrencyLimiter', 'LimiterTimeout', 'mysql_limiter', 'redis_limiter',
+           'create_mysql_manager', 'MemoryMySQLManager', 'MemoryRedis', 'MemoryRedisStore',
+           'memory_redis_store']
\ No newline at end of file
@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+"""
+异步数据库客户端
+供异步监控引擎使用的MySQL（aiomysql）和Redis（redis.asyncio）客户端，
+查询语句、键格式和载荷编码与同步管理器保持一致；
+连接池绑定创建它的事件循环，每个事件循环需要各自的客户端实例
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from ..config import MYSQL_CONFIG, REDIS_CONFIG, REDIS_KEYS, CACHE_CONFIG
+from .codecs import ORDER_SCHEMA, get_schema_for_key
+from .redis_manager import redis_manager
+
+try:
+    import aiomysql
+except ImportError:  # aiomysql为可选依赖，只有异步引擎需要
+    aiomysql = None
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis-py 4.2 之前的版本没有asyncio客户端
+    aioredis = None
+
+
+class AsyncMySQLManager:
+    """异步MySQL连接池管理器"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        初始化异步MySQL管理器
+
+        Args:
+            config: 连接配置，默认使用 MYSQL_CONFIG
+        """
+        self.config = (config or MYSQL_CONFIG).copy()
+        self.pool = None
+        self.logger = logging.getLogger(__name__)
+
+    async def initialize(self) -> bool:
+        """初始化连接池（需要在使用它的事件循环中调用）"""
+        if self.pool is not None:
+            return True
+        if aiomysql is None:
+            self.logger.error("异步MySQL客户端需要安装aiomysql")
+            return False
+
+        try:
+            self.pool = await aiomysql.create_pool(
+                host=self.config['host'],
+                port=self.config['port'],
+                user=self.config['user'],
+                password=self.config['password'],
+                db=self.config['database'],
+                charset=self.config['charset'],
+                autocommit=self.config['autocommit'],
+                minsize=1,
+                maxsize=self.config['pool_size'],
+                pool_recycle=self.config.get('pool_recycle', -1),
+                cursorclass=aiomysql.DictCursor
+            )
+            return True
+        except Exception as e:
+            self.logger.error(f"异步MySQL连接池初始化失败: {e}")
+            return False
+
+    async def execute_query(self, query: str, params: Optional[Tuple] = None,
+                            fetch_one: bool = False, fetch_all: bool = True) -> Optional[Any]:
+        """执行查询语句"""
+        try:
+            async with self.pool.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(query, params or ())
+                    if fetch_one:
+                        return await cursor.fetchone()
+                    elif fetch_all:
+                        return list(await cursor.fetchall())
+                    return None
+        except Exception as e:
+            self.logger.error(f"执行查询失败: {query}, 参数: {params}, 错误: {e}")
+            raise
+
+    async def get_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """根据ID获取用户信息"""
+        query = "SELECT * FROM users WHERE id = %s AND status = 1"
+        return await self.execute_query(query, (user_id,), fetch_one=True)
+
+    async def get_users_by_ids(self, user_ids: List[int], batch_size: int = 100) -> List[Dict[str, Any]]:
+        """按ID批量获取启用的用户信息（每批一条IN查询）"""
+        results = []
+        user_ids = list(user_ids)
+        for i in range(0, len(user_ids), batch_size):
+            chunk = user_ids[i:i + batch_size]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            query = f"SELECT * FROM users WHERE id IN ({placeholders}) AND status = 1"
+            results.extend(await self.execute_query(query, tuple(chunk), fetch_all=True) or [])
+        return results
+
+    async def get_users_with_active_strategies(self) -> List[Dict[str, Any]]:
+        """获取有活跃策略的用户列表"""
+        query = """
+        SELECT DISTINCT u.id, u.username, u.email, u.status, u.created_at, u.updated_at
+        FROM users u
+        INNER JOIN user_strategies us ON u.id = us.user_id
+        WHERE u.status = 1 AND us.status = 1
+        ORDER BY u.id
+        """
+        return await self.execute_query(query, fetch_all=True) or []
+
+    async def get_user_strategies(self, user_id: int, status: Optional[int] = None) -> List[Dict[str, Any]]:
+        """获取用户策略列表"""
+        if status is not None:
+            query = "SELECT * FROM user_strategies WHERE user_id = %s AND status = %s ORDER BY created_at DESC"
+            params = (user_id, status)
+        else:
+            query = "SELECT * FROM user_strategies WHERE user_id = %s ORDER BY created_at DESC"
+            params = (user_id,)
+        return await self.execute_query(query, params, fetch_all=True) or []
+
+    async def get_user_orders(self, user_id: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        """获取用户订单列表"""
+        query = "SELECT * FROM orders WHERE user_id = %s ORDER BY order_time DESC LIMIT %s"
+        return await self.execute_query(query, (user_id, limit), fetch_all=True) or []
+
+    async def close(self) -> None:
+        """关闭连接池"""
+        if self.pool is not None:
+            self.pool.close()
+            await self.pool.wait_closed()
+            self.pool = None
+
+
+class AsyncRedisManager:
+    """异步Redis客户端（载荷编码复用同步管理器的编码器和载荷模式）"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        初始化异步Redis管理器
+
+        Args:
+            config: 连接配置，默认使用 REDIS_CONFIG
+        """
+        self.config = (config or REDIS_CONFIG).copy()
+        self.client = None
+        self._loads = {}  # {key: Future} 进行中的回源加载（单个事件循环内合并）
+        self.logger = logging.getLogger(__name__)
+
+    async def initialize(self) -> bool:
+        """创建客户端并测试连接（需要在使用它的事件循环中调用）"""
+        if self.client is not None:
+            return True
+        if aioredis is None:
+            self.logger.error("异步Redis客户端需要 redis>=4.2")
+            return False
+
+        try:
+            self.client = aioredis.Redis(
+                host=self.config['host'],
+                port=self.config['port'],
+                password=self.config['password'],
+                db=self.config['db'],
+                # 二进制编码需要读取原始字节
+                decode_responses=self.config['decode_responses'] and not redis_manager.codec.binary,
+                socket_connect_timeout=self.config['socket_connect_timeout'],
+                socket_timeout=self.config['socket_timeout'],
+                max_connections=self.config['connection_pool_kwargs']['max_connections']
+            )
+            await self.client.ping()
+            return True
+        except Exception as e:
+            self.logger.error(f"异步Redis客户端初始化失败: {e}")
+            self.client = None
+            return False
+
+    def _serialize_value(self, value: Any):
+        return redis_manager._serialize_value(value)
+
+    def _deserialize_value(self, key: str, value: Any) -> Any:
+        return redis_manager._deserialize_value(value, get_schema_for_key(key)) if value else None
+
+    async def get(self, key: str) -> Any:
+        """获取值"""
+        try:
+            return self._deserialize_value(key, await self.client.get(key))
+        except Exception as e:
+            self.logger.error(f"Redis GET失败: key={key}, error={e}")
+            return None
+
+    async def set(self, key: str, value: Any, ex: Optional[int] = None) -> bool:
+        """设置键值"""
+        try:
+            return bool(await self.client.set(key, self._serialize_value(value), ex=ex))
+        except Exception as e:
+            self.logger.error(f"Redis SET失败: key={key}, error={e}")
+            return False
+
+    async def mget(self, keys: List[str]) -> List[Any]:
+        """批量获取值（一次往返），不存在的键对应None"""
+        if not keys:
+            return []
+        try:
+            values = await self.client.mget(keys)
+            return [self._deserialize_value(key, value) for key, value in zip(keys, values)]
+        except Exception as e:
+            self.logger.error(f"Redis MGET失败: keys={len(keys)}, error={e}")
+            return [None] * len(keys)
+
+    async def mset(self, mapping: Dict[str, Any], ex: Optional[int] = None) -> bool:
+        """批量设置值（通过管道逐键SET）"""
+        if not mapping:
+            return True
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key, value in mapping.items():
+                pipe.set(key, self._serialize_value(value), ex=ex)
+            return all(await pipe.execute())
+        except Exception as e:
+            self.logger.error(f"Redis MSET失败: keys={len(mapping)}, error={e}")
+            return False
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]], ex: Optional[int] = None,
+                          getter: Optional[Callable[[], Awaitable[Any]]] = None,
+                          setter: Optional[Callable[[Any], Awaitable[Any]]] = None) -> Any:
+        """
+        读取缓存，未命中时回源加载并回填；同一事件循环内同一键的并发加载合并为一次
+
+        Args:
+            key: 缓存键（同时作为合并键）
+            loader: 回源加载协程函数
+            ex: 回填缓存的过期时间（秒），未指定 setter 时使用
+            getter: 读取缓存的协程函数，默认按键GET
+            setter: 回填缓存的协程函数，默认按键SET
+        """
+        getter = getter or (lambda: self.get(key))
+        setter = setter or (lambda value: self.set(key, value, ex=ex))
+
+        value = await getter()
+        if value is not None:
+            return value
+
+        future = self._loads.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loads[key] = future
+        try:
+            value = await loader()
+            if value:
+                await setter(value)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            # 没有跟随者时避免 "Future exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self._loads.pop(key, None)
+
+    async def get_or_load_user(self, user_id: int, loader: Callable[[], Awaitable[Any]]) -> Optional[Dict[str, Any]]:
+        """读取缓存的用户信息，未命中时合并加载"""
+        return await self.get_or_load(f"{REDIS_KEYS['user_prefix']}{user_id}", loader,
+                                      ex=CACHE_CONFIG['user_cache_ttl'])
+
+    async def get_or_load_user_orders(self, user_id: int,
+                                      loader: Callable[[], Awaitable[Any]]) -> Optional[List[Dict[str, Any]]]:
+        """读取缓存的用户订单，未命中时合并加载"""
+        return await self.get_or_load(
+            f"{REDIS_KEYS['user_orders_prefix']}{user_id}", loader,
+            getter=lambda: self.get_cached_user_orders(user_id),
+            setter=lambda value: self.cache_user_orders(user_id, value)
+        )
+
+    async def cache_user_orders(self, user_id: int, orders: List[Dict[str, Any]]) -> bool:
+        """缓存用户订单（与同步管理器相同的哈希表 + 活跃订单集合结构）"""
+        orders_key, active_key = redis_manager._user_order_keys(user_id)
+        ttl = CACHE_CONFIG['order_cache_ttl']
+        try:
+            pipe = self.client.pipeline(transaction=True)
+            pipe.delete(orders_key, active_key)
+            if orders:
+                pipe.hset(orders_key, mapping={
+                    str(order['id']): self._serialize_value(order) for order in orders
+                })
+                active_ids = [order['id'] for order in orders if order.get('status') in (0, 1)]
+                if active_ids:
+                    pipe.sadd(active_key, *active_ids)
+                pipe.expire(orders_key, ttl)
+                pipe.expire(active_key, ttl)
+            await pipe.execute()
+            return True
+        except Exception as e:
+            self.logger.error(f"缓存用户订单失败: user_id={user_id}, error={e}")
+            return False
+
+    async def get_cached_user_orders(self, user_id: int) -> Optional[List[Dict[str, Any]]]:
+        """获取缓存的用户订单"""
+        orders_key, _ = redis_manager._user_order_keys(user_id)
+        try:
+            data = await self.client.hgetall(orders_key)
+            if not data:
+                return None
+            return [redis_manager._deserialize_value(value, ORDER_SCHEMA) for value in data.values()]
+        except Exception as e:
+            self.logger.error(f"获取缓存的用户订单失败: user_id={user_id}, error={e}")
+            return None
+
+    async def get_cached_active_orders(self, user_id: int) -> Optional[List[Dict[str, Any]]]:
+        """只获取缓存中的活跃订单，缓存不存在时返回None"""
+        orders_key, active_key = redis_manager._user_order_keys(user_id)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.exists(orders_key)
+            pipe.smembers(active_key)
+            exists, active_ids = await pipe.execute()
+            if not exists:
+                return None
+            if not active_ids:
+                return []
+            values = await self.client.hmget(orders_key, list(active_ids))
+            return [redis_manager._deserialize_value(value, ORDER_SCHEMA) for value in values if value]
+        except Exception as e:
+            self.logger.error(f"获取缓存的活跃订单失败: user_id={user_id}, error={e}")
+            return None
+
+    async def get_cached_orders(self, user_id: int, order_ids: Iterable[int]) -> Optional[List[Dict[str, Any]]]:
+        """按订单ID获取缓存中的订单，缓存不存在时返回None"""
+        orders_key, _ = redis_manager._user_order_keys(user_id)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.exists(orders_key)
+            pipe.hmget(orders_key, [str(order_id) for order_id in order_ids])
+            exists, values = await pipe.execute()
+            if not exists:
+                return None
+            return [redis_manager._deserialize_value(value, ORDER_SCHEMA) for value in values if value]
+        except Exception as e:
+            self.logger.error(f"获取缓存订单失败: user_id={user_id}, error={e}")
+            return None
+
+    async def get_cached_users(self, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """批量获取缓存的用户信息"""
+        user_ids = list(user_ids)
+        values = await self.mget([f"{REDIS_KEYS['user_prefix']}{user_id}" for user_id in user_ids])
+        return {user_id: value for user_id, value in zip(user_ids, values) if value}
+
+    async def cache_users(self, users: List[Dict[str, Any]]) -> bool:
+        """批量缓存用户信息"""
+        return await self.mset({f"{REDIS_KEYS['user_prefix']}{user['id']}": user for user in users},
+                               ex=CACHE_CONFIG['user_cache_ttl'])
+
+    async def get_active_users(self) -> set:
+        """获取所有活跃用户"""
+        try:
+            members = await self.client.smembers(REDIS_KEYS['active_users'])
+            return {int(member) for member in members} if members else set()
+        except Exception as e:
+            self.logger.error(f"Redis SMEMBERS失败: error={e}")
+            return set()
+
+    async def add_active_users(self, user_ids: List[int]) -> int:
+        """批量添加活跃用户"""
+        if not user_ids:
+            return 0
+        try:
+            return await self.client.sadd(REDIS_KEYS['active_users'], *[str(user_id) for user_id in user_ids])
+        except Exception as e:
+            self.logger.error(f"Redis SADD失败: error={e}")
+            return 0
+
+    async def close(self) -> None:
+        """关闭客户端"""
+        if self.client is not None:
+            # redis-py 5.0.1 起 close() 改名为 aclose()
+            if hasattr(self.client, 'aclose'):
+                await self.client.aclose()
+            else:
+                await self.client.close()
+            self.client = None
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+缓存载荷编解码
+按载荷类型（用户、订单、策略）登记字段模式，解码时只转换模式中声明的
+datetime/Decimal字段，无需逐个字符串试探解析；
+并提供可插拔的二进制编码（pickle协议5、msgpack），二进制载荷带版本头，
+未带版本头的值按旧的JSON格式读取
+"""
+import json
+import pickle
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, Optional, Union
+from ..config import REDIS_KEYS
+
+try:
+    import msgpack
+except ImportError:  # msgpack为可选依赖
+    msgpack = None
+
+
+def parse_datetime(value: Any) -> Any:
+    """将ISO格式字符串解析为datetime，无法解析时原样返回"""
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    return value
+
+
+def parse_decimal(value: Any) -> Any:
+    """将字符串或数值转换为Decimal，无法转换时原样返回"""
+    if value is None or isinstance(value, Decimal):
+        return value
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return value
+
+
+def looks_like_datetime(value: str) -> bool:
+    """
+    快速判断字符串是否可能是ISO格式的datetime
+
+    只检查长度和分隔符位置（YYYY-MM-DDTHH:MM:SS），用于在真正解析前过滤掉绝大多数普通字符串
+    """
+    return (19 <= len(value) <= 32 and value[4] == '-' and value[7] == '-'
+            and value[10] in 'T ' and value[13] == ':')
+
+
+class PayloadSchema:
+    """缓存载荷的字段类型模式"""
+
+    def __init__(self, name: str, datetime_fields: Iterable[str] = (), decimal_fields: Iterable[str] = ()):
+        """
+        初始化载荷模式
+
+        Args:
+            name: 模式名称
+            datetime_fields: 需要解码为datetime的字段
+            decimal_fields: 需要解码为Decimal的字段
+        """
+        self.name = name
+        self.datetime_fields = tuple(datetime_fields)
+        self.decimal_fields = tuple(decimal_fields)
+
+    def decode_record(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """原地转换单条记录中声明的字段"""
+        for field in self.datetime_fields:
+            value = record.get(field)
+            if value is not None:
+                record[field] = parse_datetime(value)
+        for field in self.decimal_fields:
+            value = record.get(field)
+            if value is not None:
+                record[field] = parse_decimal(value)
+        return record
+
+    def decode(self, data: Any) -> Any:
+        """转换单条记录或记录列表"""
+        if isinstance(data, dict):
+            return self.decode_record(data)
+        if isinstance(data, list):
+            return [self.decode_record(item) if isinstance(item, dict) else item for item in data]
+        return data
+
+    def loads(self, value: str) -> Any:
+        """从JSON字符串解码"""
+        return self.decode(json.loads(value))
+
+    def __repr__(self):
+        return f"<PayloadSchema(name='{self.name}')>"
+
+
+USER_SCHEMA = PayloadSchema(
+    'user',
+    datetime_fields=('created_at', 'updated_at'),
+)
+
+ORDER_SCHEMA = PayloadSchema(
+    'order',
+    datetime_fields=('order_time', 'update_time'),
+    decimal_fields=('quantity', 'price', 'filled_quantity', 'avg_price', 'commission'),
+)
+
+STRATEGY_SCHEMA = PayloadSchema(
+    'strategy',
+    datetime_fields=('start_time', 'end_time', 'created_at', 'updated_at'),
+)
+
+# 按键前缀登记的载荷模式
+_KEY_SCHEMAS = {
+    REDIS_KEYS['user_prefix']: USER_SCHEMA,
+    REDIS_KEYS['strategy_prefix']: STRATEGY_SCHEMA,
+    REDIS_KEYS['user_orders_prefix']: ORDER_SCHEMA,
+    REDIS_KEYS['order_prefix']: ORDER_SCHEMA,
+}
+
+
+def register_schema(key_prefix: str, schema: PayloadSchema) -> None:
+    """
+    为键前缀登记载荷模式
+
+    Args:
+        key_prefix: 键前缀（包含结尾的冒号，如 'user:'）
+        schema: 载荷模式
+    """
+    _KEY_SCHEMAS[key_prefix] = schema
+
+
+def get_schema_for_key(key: str) -> Optional[PayloadSchema]:
+    """根据键前缀（第一个冒号及之前的部分）查找载荷模式"""
+    index = key.find(':')
+    if index < 0:
+        return None
+    return _KEY_SCHEMAS.get(key[:index + 1])
+
+
+# 二进制载荷头: 魔数(0x00) + 格式版本 + 编码器ID；JSON文本不会以0x00开头
+BINARY_MAGIC = b'\x00'
+BINARY_VERSION = 1
+
+
+class JsonCodec:
+    """JSON编码（无载荷头，兼容旧数据）"""
+
+    name = 'json'
+    codec_id = 0
+    binary = False
+
+    def encode(self, value: Any) -> str:
+        return json.dumps(value, ensure_ascii=False, default=json_default)
+
+    def decode(self, body: Union[str, bytes]) -> Any:
+        return json.loads(body)
+
+
+class PickleCodec:
+    """pickle协议5编码，原样保留Decimal和datetime（仅用于可信的Redis实例）"""
+
+    name = 'pickle'
+    codec_id = 1
+    binary = True
+
+    def encode(self, value: Any) -> bytes:
+        return _binary_header(self.codec_id) + pickle.dumps(value, protocol=5)
+
+    def decode(self, body: bytes) -> Any:
+        return pickle.loads(body)
+
+
+class MsgpackCodec:
+    """msgpack编码，Decimal和datetime以扩展类型保存"""
+
+    name = 'msgpack'
+    codec_id = 2
+    binary = True
+
+    EXT_DECIMAL = 1
+    EXT_DATETIME = 2
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError("使用msgpack编码需要安装msgpack")
+
+    def _default(self, obj):
+        if isinstance(obj, Decimal):
+            return msgpack.ExtType(self.EXT_DECIMAL, str(obj).encode())
+        if isinstance(obj, datetime):
+            return msgpack.ExtType(self.EXT_DATETIME, obj.isoformat().encode())
+        if isinstance(obj, (set, tuple)):
+            return list(obj)
+        raise TypeError(f"Object of type {type(obj).__name__} is not msgpack serializable")
+
+    def _ext_hook(self, code: int, data: bytes):
+        if code == self.EXT_DECIMAL:
+            return Decimal(data.decode())
+        if code == self.EXT_DATETIME:
+            return datetime.fromisoformat(data.decode())
+        return msgpack.ExtType(code, data)
+
+    def encode(self, value: Any) -> bytes:
+        return _binary_header(self.codec_id) + msgpack.packb(value, default=self._default, use_bin_type=True)
+
+    def decode(self, body: bytes) -> Any:
+        return msgpack.unpackb(body, ext_hook=self._ext_hook, raw=False, strict_map_key=False)
+
+
+def json_default(obj):
+    """JSON序列化器，处理datetime、Decimal等特殊类型"""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    elif isinstance(obj, Decimal):
+        # 以字符串保存，按模式解码时可无损还原为Decimal
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _binary_header(codec_id: int) -> bytes:
+    return BINARY_MAGIC + bytes((BINARY_VERSION, codec_id))
+
+
+_CODEC_CLASSES = {
+    JsonCodec.name: JsonCodec,
+    PickleCodec.name: PickleCodec,
+    MsgpackCodec.name: MsgpackCodec,
+}
+
+_BINARY_CODECS = {}  # {codec_id: codec} 已实例化的二进制编码器，用于按载荷头解码
+
+
+def get_codec(name: str):
+    """
+    按名称获取编码器
+
+    Args:
+        name: 编码器名称（json/pickle/msgpack）
+
+    Raises:
+        ValueError: 未知的编码器名称
+        ImportError: 编码器依赖的库未安装
+    """
+    codec_class = _CODEC_CLASSES.get(name)
+    if codec_class is None:
+        raise ValueError(f"未知的Redis编码器: {name}")
+    codec = codec_class()
+    if codec.binary:
+        _BINARY_CODECS.setdefault(codec.codec_id, codec)
+    return codec
+
+
+def is_binary_payload(value: Any) -> bool:
+    """值是否为带载荷头的二进制载荷"""
+    return isinstance(value, bytes) and len(value) >= 3 and value[:1] == BINARY_MAGIC
+
+
+def decode_binary_payload(value: bytes) -> Any:
+    """
+    按载荷头解码二进制载荷
+
+    Raises:
+        ValueError: 不支持的格式版本或编码器
+    """
+    version, codec_id = value[1], value[2]
+    if version != BINARY_VERSION:
+        raise ValueError(f"不支持的载荷版本: {version}")
+
+    codec = _BINARY_CODECS.get(codec_id)
+    if codec is None:
+        # 读取由其他编码器写入的数据（迁移期间可能同时存在多种格式）
+        # pickle载荷可执行任意代码，仅在显式配置为pickle编码时读取
+        for codec_class in _CODEC_CLASSES.values():
+            if codec_class.codec_id == codec_id and codec_class is not PickleCodec:
+                codec = get_codec(codec_class.name)
+                break
+        else:
+            raise ValueError(f"未知的编码器ID: {codec_id}")
+    return codec.decode(value[3:])
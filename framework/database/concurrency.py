@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+数据库并发限制
+限制同时进行的MySQL/Redis调用数，超出时排队等待（超时则失败），
+并记录排队深度、等待时间和调用耗时，供过载保护判断数据库是否变慢
+"""
+import threading
+import time
+import logging
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+from ..config import MYSQL_CONFIG, REDIS_CONFIG
+from ..metrics import MetricSet
+
+
+class LimiterTimeout(Exception):
+    """等待并发名额超时"""
+
+
+class ConcurrencyLimiter:
+    """带排队统计的并发限制器（线程安全）"""
+
+    def __init__(self, name: str, max_concurrency: int = 0, acquire_timeout: float = 5.0,
+                 sample_size: int = 2048, sample_window: float = 10.0):
+        """
+        初始化并发限制器
+
+        Args:
+            name: 名称
+            max_concurrency: 最大并发数，0表示不限制（仍然统计耗时）
+            acquire_timeout: 等待名额的最长时间（秒）
+            sample_size: 保留的耗时样本数
+            sample_window: 计算分位数时只使用该时间窗口（秒）内的样本
+        """
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.acquire_timeout = acquire_timeout
+        self.sample_window = sample_window
+        self._semaphore = threading.BoundedSemaphore(max_concurrency) if max_concurrency > 0 else None
+
+        self.in_flight = 0
+        self.waiting = 0
+        self._hold_samples = deque(maxlen=sample_size)  # (完成时间, 调用耗时)
+        self._wait_samples = deque(maxlen=sample_size)  # (完成时间, 排队时间)
+        self.lock = threading.Lock()
+
+        # 统计信息（各限制器按 limiter 标签区分序列）
+        self.stats = MetricSet(
+            'db_limiter',
+            counters=('calls', 'timeouts'),
+            gauges={'max_waiting': 0, 'max_in_flight': 0, 'in_flight': 0, 'waiting': 0},
+            label_name='limiter',
+            label=name
+        )
+        self.stats.set_function('in_flight', lambda: self.in_flight)
+        self.stats.set_function('waiting', lambda: self.waiting)
+
+        self.logger = logging.getLogger(__name__)
+
+    @contextmanager
+    def slot(self):
+        """占用一个并发名额执行调用，名额不足时排队等待"""
+        start = time.monotonic()
+        if self._semaphore is not None:
+            with self.lock:
+                self.waiting += 1
+                if self.waiting > self.stats['max_waiting']:
+                    self.stats.set('max_waiting', self.waiting)
+            acquired = self._semaphore.acquire(timeout=self.acquire_timeout)
+            with self.lock:
+                self.waiting -= 1
+            if not acquired:
+                self.stats.inc('timeouts')
+                raise LimiterTimeout(f"{self.name} 并发已满，等待超过 {self.acquire_timeout} 秒")
+
+        acquired_at = time.monotonic()
+        with self.lock:
+            self.in_flight += 1
+            if self.in_flight > self.stats['max_in_flight']:
+                self.stats.set('max_in_flight', self.in_flight)
+        try:
+            yield
+        finally:
+            end = time.monotonic()
+            with self.lock:
+                self.in_flight -= 1
+                self._hold_samples.append((end, end - acquired_at))
+                self._wait_samples.append((end, acquired_at - start))
+            self.stats.inc('calls')
+            if self._semaphore is not None:
+                self._semaphore.release()
+
+    def _percentile(self, samples: deque, percentile: float) -> Optional[float]:
+        """时间窗口内样本的分位数（秒），没有样本时返回None"""
+        horizon = time.monotonic() - self.sample_window
+        with self.lock:
+            values = sorted(value for finished, value in samples if finished >= horizon)
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(len(values) * percentile / 100))]
+
+    def latency_percentile(self, percentile: float = 95) -> Optional[float]:
+        """最近调用耗时的分位数（秒）"""
+        return self._percentile(self._hold_samples, percentile)
+
+    def wait_percentile(self, percentile: float = 95) -> Optional[float]:
+        """最近排队时间的分位数（秒）"""
+        return self._percentile(self._wait_samples, percentile)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        stats = self.stats.snapshot()
+        stats['max_concurrency'] = self.max_concurrency
+        for percentile in (50, 95, 99):
+            latency = self.latency_percentile(percentile)
+            stats[f"latency_p{percentile}_ms"] = round(latency * 1000, 2) if latency is not None else None
+        wait = self.wait_percentile(95)
+        stats['wait_p95_ms'] = round(wait * 1000, 2) if wait is not None else None
+        return stats
+
+    def __repr__(self):
+        return f"<ConcurrencyLimiter(name='{self.name}', in_flight={self.in_flight}, waiting={self.waiting})>"
+
+
+# 全局并发限制器实例（MySQL默认等于连接池大小：连接池耗尽时排队而不是直接报错）
+mysql_limiter = ConcurrencyLimiter(
+    'mysql',
+    max_concurrency=MYSQL_CONFIG.get('max_concurrency', MYSQL_CONFIG.get('pool_size', 0)),
+    acquire_timeout=MYSQL_CONFIG.get('acquire_timeout', 5.0)
+)
+redis_limiter = ConcurrencyLimiter(
+    'redis',
+    max_concurrency=REDIS_CONFIG.get('max_concurrency', 0),
+    acquire_timeout=REDIS_CONFIG.get('acquire_timeout', 5.0)
+)
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+进程内本地缓存（L1）
+位于Redis之前的有界LRU缓存，按命名空间（Redis键前缀）设置TTL，
+其他进程写入时通过Redis发布/订阅通道失效
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+from ..config import CACHE_CONFIG
+from ..metrics import MetricSet
+
+# 缓存未命中标记（区分未命中和缓存了None）
+MISSING = object()
+
+
+class LocalCache:
+    """有界LRU + TTL的进程内缓存（线程安全）"""
+
+    def __init__(self, max_size: int = 10000, namespace_ttls: Optional[Dict[str, float]] = None):
+        """
+        初始化本地缓存
+
+        Args:
+            max_size: 最大条目数，超出时淘汰最久未使用的条目
+            namespace_ttls: {键前缀: TTL秒数}，只有登记了TTL的命名空间才会被缓存
+        """
+        self.max_size = max_size
+        self.namespace_ttls = dict(namespace_ttls or {})
+        self._entries = OrderedDict()  # {key: (expires_at, value)}
+        self.lock = threading.Lock()
+
+        # 统计信息（分片计数器）
+        self.stats = MetricSet(
+            'local_cache',
+            counters=('hits', 'misses', 'expired', 'evictions', 'invalidations'),
+            gauges={'size': 0}
+        )
+        self.stats.set_function('size', lambda: len(self._entries))
+
+    @staticmethod
+    def namespace_of(key: str) -> str:
+        """键的命名空间（第一个冒号及之前的部分）"""
+        index = key.find(':')
+        return key[:index + 1] if index >= 0 else key
+
+    def ttl_for(self, key: str) -> Optional[float]:
+        """键所在命名空间的TTL，未登记时返回None"""
+        return self.namespace_ttls.get(self.namespace_of(key))
+
+    def get(self, key: str) -> Any:
+        """
+        获取缓存值
+
+        Returns:
+            Any: 缓存值，未命中或已过期时返回 MISSING
+        """
+        with self.lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.inc('misses')
+                return MISSING
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.stats.inc('expired')
+                self.stats.inc('misses')
+                return MISSING
+
+            self._entries.move_to_end(key)
+            self.stats.inc('hits')
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """
+        写入缓存值
+
+        Args:
+            key: 键
+            value: 值（调用方应视为只读）
+            ttl: TTL秒数，默认使用命名空间TTL
+
+        Returns:
+            bool: 是否写入（未登记的命名空间不缓存）
+        """
+        ttl = ttl if ttl is not None else self.ttl_for(key)
+        if not ttl:
+            return False
+
+        with self.lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats.inc('evictions')
+        return True
+
+    def invalidate(self, keys: Iterable[str]) -> int:
+        """使指定键失效，返回实际移除的条目数"""
+        removed = 0
+        with self.lock:
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    removed += 1
+            self.stats.inc('invalidations', removed)
+        return removed
+
+    def invalidate_namespace(self, namespace: str) -> int:
+        """使整个命名空间失效"""
+        with self.lock:
+            keys = [key for key in self._entries if key.startswith(namespace)]
+            for key in keys:
+                del self._entries[key]
+            self.stats.inc('invalidations', len(keys))
+        return len(keys)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self.lock:
+            self.stats.inc('invalidations', len(self._entries))
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        stats = self.stats.snapshot()
+        stats['max_size'] = self.max_size
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def __repr__(self):
+        return f"<LocalCache(size={len(self._entries)}, max_size={self.max_size})>"
+
+
+# 全局本地缓存实例
+local_cache = LocalCache(
+    max_size=CACHE_CONFIG.get('local_cache_max_size', 10000),
+    namespace_ttls=CACHE_CONFIG.get('local_cache_ttls', {})
+)
@@ -0,0 +1,1100 @@
+# -*- coding: utf-8 -*-
+"""
+进程内内存后端
+不依赖外部服务的MySQL和Redis实现，用于基准测试和规模测试：
+- MemoryMySQLManager: users / user_strategies / orders 三张内存表，查询方法与 MySQLManager 语义一致
+- MemoryRedis: 兼容 redis-py 客户端接口的内存实现（字符串、哈希、集合、列表、有序集合、过期时间、
+  管道、发布/订阅，以及 RedisManager 使用的Lua脚本）
+
+两者都经过与真实后端相同的并发限制器和耗时指标，并可按配置注入固定延迟和随机抖动来模拟网络往返；
+数据只保存在当前进程内，不持久化，也不在进程（分片）之间共享
+"""
+import fnmatch
+import hashlib
+import queue
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from mysql.connector.errors import NotSupportedError, PoolError
+from redis.exceptions import ConnectionError, DataError, NoScriptError, ResponseError
+from .concurrency import mysql_limiter, redis_limiter, LimiterTimeout
+from .mysql_manager import MySQLManager, QUERY_SECONDS
+from .redis_manager import RedisManager, COMMAND_SECONDS
+
+
+def _inject_latency(latency_ms: float, jitter_ms: float) -> None:
+    """模拟一次网络往返的延迟"""
+    delay = latency_ms + (random.uniform(0, jitter_ms) if jitter_ms > 0 else 0)
+    if delay > 0:
+        time.sleep(delay / 1000)
+
+
+# ---------------------------------------------------------------------------
+# MySQL
+# ---------------------------------------------------------------------------
+
+# 各表的列默认值（与 schema.sql 一致），时间列在写入时取当前时间
+_TABLE_DEFAULTS = {
+    'users': {
+        'username': None, 'email': None, 'phone': None, 'status': 1,
+        'created_at': None, 'updated_at': None
+    },
+    'user_strategies': {
+        'user_id': None, 'strategy_name': None, 'strategy_type': None, 'status': 1,
+        'config': None, 'risk_config': None, 'performance_data': None,
+        'start_time': None, 'end_time': None, 'created_at': None, 'updated_at': None
+    },
+    'orders': {
+        'user_id': None, 'strategy_id': None, 'order_no': None, 'symbol': None, 'order_type': None,
+        'quantity': None, 'price': None, 'status': 0, 'filled_quantity': 0, 'avg_price': None,
+        'commission': 0, 'order_time': None, 'update_time': None, 'extra_data': None
+    }
+}
+_TIMESTAMP_COLUMNS = {
+    'users': ('created_at', 'updated_at'),
+    'user_strategies': ('created_at', 'updated_at'),
+    'orders': ('order_time', 'update_time')
+}
+# DECIMAL(20,8) 列，与 MySQL 一样以 Decimal 返回
+_DECIMAL_COLUMNS = ('quantity', 'price', 'filled_quantity', 'avg_price', 'commission')
+_DECIMAL_SCALE = Decimal('0.00000001')
+
+# get_users_with_active_strategies 只返回这些列
+_USER_SUMMARY_COLUMNS = ('id', 'username', 'email', 'status', 'created_at', 'updated_at')
+
+
+def _now() -> datetime:
+    """与 NOW() 相同精度（TIMESTAMP 列精确到秒）的当前时间"""
+    return datetime.now().replace(microsecond=0)
+
+
+def _to_decimal(value: Any) -> Optional[Decimal]:
+    if value is None:
+        return None
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return value.quantize(_DECIMAL_SCALE)
+
+
+class MemoryMySQLManager(MySQLManager):
+    """
+    进程内MySQL后端
+
+    表数据按主键保存，订单和策略另按用户ID建立索引；返回的行是副本，修改不影响表中数据。
+    每次查询（批量查询的每一批）占用一个 mysql_limiter 名额并注入一次延迟，与真实后端的往返次数一致；
+    不执行任意SQL，execute_* 和 get_connection 会抛出 NotSupportedError
+    """
+
+    _instance = None
+
+    def __init__(self):
+        if hasattr(self, '_initialized'):
+            return
+
+        super().__init__()
+        self.latency_ms = self.config.get('memory_latency_ms', 0)
+        self.jitter_ms = self.config.get('memory_jitter_ms', 0)
+
+        self.tables = {table: {} for table in _TABLE_DEFAULTS}  # {表名: {主键: 行}}
+        self._strategies_by_user = {}  # {用户ID: {策略ID: 行}}
+        self._orders_by_user = {}  # {用户ID: {订单ID: 行}}
+        self.lock = threading.RLock()
+
+    def _init_pool(self):
+        """内存后端没有连接池"""
+        self.logger.info(f"MySQL内存后端已启用，注入延迟: {self.latency_ms} 毫秒 (抖动 {self.jitter_ms} 毫秒)")
+
+    def set_latency(self, latency_ms: float, jitter_ms: float = 0) -> None:
+        """
+        调整注入的延迟
+
+        Args:
+            latency_ms: 每次查询的固定延迟（毫秒）
+            jitter_ms: 随机抖动上限（毫秒）
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+
+    @contextmanager
+    def _query(self, name: str):
+        """一次查询往返：并发限制、注入延迟、表锁，并记录耗时"""
+        self._ensure_initialized()
+        start = time.perf_counter()
+        try:
+            with mysql_limiter.slot():
+                _inject_latency(self.latency_ms, self.jitter_ms)
+                with self.lock:
+                    yield
+        except LimiterTimeout as e:
+            self.logger.error(f"获取MySQL连接失败: {e}")
+            raise PoolError(msg=str(e))
+        finally:
+            QUERY_SECONDS.observe(time.perf_counter() - start, name)
+
+    @contextmanager
+    def get_connection(self):
+        """内存后端不提供数据库连接"""
+        raise NotSupportedError(msg="MySQL内存后端不执行SQL，请使用查询方法")
+        yield
+
+    # 数据写入（初始化测试数据）
+    def insert_rows(self, table: str, rows: List[Dict[str, Any]]) -> int:
+        """
+        写入行（主键已存在时整行替换，相当于 REPLACE INTO）
+
+        Args:
+            table: 表名（users / user_strategies / orders）
+            rows: 行数据，缺少的列使用表默认值，缺少 id 时自增分配
+
+        Returns:
+            int: 写入的行数
+        """
+        if table not in self.tables:
+            raise ValueError(f"未知的表: {table}")
+
+        with self.lock:
+            data = self.tables[table]
+            next_id = max(data, default=0) + 1
+            now = _now()
+            for source in rows:
+                row = dict(_TABLE_DEFAULTS[table])
+                row.update(source)
+                if row.get('id') is None:
+                    row['id'] = next_id
+                next_id = max(next_id, row['id'] + 1)
+                for column in _TIMESTAMP_COLUMNS[table]:
+                    if row[column] is None:
+                        row[column] = now
+                if table == 'orders':
+                    for column in _DECIMAL_COLUMNS:
+                        row[column] = _to_decimal(row[column])
+
+                self._remove_row(table, row['id'])
+                data[row['id']] = row
+                index = self._user_index(table)
+                if index is not None:
+                    index.setdefault(row['user_id'], {})[row['id']] = row
+            return len(rows)
+
+    def insert_users(self, rows: List[Dict[str, Any]]) -> int:
+        """写入用户"""
+        return self.insert_rows('users', rows)
+
+    def insert_strategies(self, rows: List[Dict[str, Any]]) -> int:
+        """写入用户策略"""
+        return self.insert_rows('user_strategies', rows)
+
+    def insert_orders(self, rows: List[Dict[str, Any]]) -> int:
+        """写入订单"""
+        return self.insert_rows('orders', rows)
+
+    def truncate(self, *tables: str) -> None:
+        """清空表（不指定时清空全部）"""
+        with self.lock:
+            for table in tables or tuple(self.tables):
+                self.tables[table].clear()
+                index = self._user_index(table)
+                if index is not None:
+                    index.clear()
+
+    def table_sizes(self) -> Dict[str, int]:
+        """各表行数"""
+        with self.lock:
+            return {table: len(data) for table, data in self.tables.items()}
+
+    def _user_index(self, table: str) -> Optional[Dict[int, Dict[int, Dict[str, Any]]]]:
+        if table == 'orders':
+            return self._orders_by_user
+        if table == 'user_strategies':
+            return self._strategies_by_user
+        return None
+
+    def _remove_row(self, table: str, row_id: int) -> None:
+        old = self.tables[table].pop(row_id, None)
+        index = self._user_index(table)
+        if old is not None and index is not None:
+            rows = index.get(old['user_id'])
+            if rows is not None:
+                rows.pop(row_id, None)
+                if not rows:
+                    del index[old['user_id']]
+
+    def _select_batches(self, name: str, ids: List[int], batch_size: int,
+                        select: Callable[[List[int]], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """按 batch_size 分批查询（每批一次往返，与真实后端的IN查询一致）"""
+        results = []
+        ids = list(ids)
+        for i in range(0, len(ids), batch_size):
+            chunk = ids[i:i + batch_size]
+            with self._query(name):
+                results.extend(dict(row) for row in select(chunk))
+        return results
+
+    # 查询方法
+    def get_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """根据ID获取用户信息"""
+        with self._query('select:users'):
+            user = self.tables['users'].get(user_id)
+            return dict(user) if user and user['status'] == 1 else None
+
+    def get_users_by_ids(self, user_ids: List[int], batch_size: int = 100) -> List[Dict[str, Any]]:
+        """按ID批量获取启用的用户信息"""
+        users = self.tables['users']
+        return self._select_batches('select:users', user_ids, batch_size, lambda chunk: [
+            users[user_id] for user_id in sorted(set(chunk))
+            if user_id in users and users[user_id]['status'] == 1
+        ])
+
+    def get_user_strategies(self, user_id: int, status: Optional[int] = None) -> List[Dict[str, Any]]:
+        """获取用户策略列表（按 created_at 降序）"""
+        with self._query('select:user_strategies'):
+            rows = [row for row in self._strategies_by_user.get(user_id, {}).values()
+                    if status is None or row['status'] == status]
+            rows.sort(key=lambda row: (row['created_at'], row['id']), reverse=True)
+            return [dict(row) for row in rows]
+
+    def get_active_strategies_for_users(self, user_ids: List[int], batch_size: int = 100) -> List[Dict[str, Any]]:
+        """批量获取多个用户的活跃策略"""
+        def select(chunk):
+            rows = [row for user_id in set(chunk)
+                    for row in self._strategies_by_user.get(user_id, {}).values() if row['status'] == 1]
+            return sorted(rows, key=lambda row: (row['user_id'], row['id']))
+        return self._select_batches('select:user_strategies', user_ids, batch_size, select)
+
+    def get_strategies_updated_since(self, since: datetime, after_id: Optional[int] = None,
+                                     limit: int = 1000) -> List[Dict[str, Any]]:
+        """获取指定时间之后更新过的策略（所有用户，按 updated_at, id 升序）"""
+        with self._query('select:user_strategies'):
+            if after_id is None:
+                rows = [row for row in self.tables['user_strategies'].values() if row['updated_at'] >= since]
+            else:
+                rows = [row for row in self.tables['user_strategies'].values()
+                        if (row['updated_at'], row['id']) > (since, after_id)]
+            rows.sort(key=lambda row: (row['updated_at'], row['id']))
+            return [dict(row) for row in rows[:limit]]
+
+    def get_strategy_update_watermark(self) -> Optional[datetime]:
+        """获取策略表当前最大的 updated_at"""
+        with self._query('select:user_strategies'):
+            return max((row['updated_at'] for row in self.tables['user_strategies'].values()), default=None)
+
+    def get_users_with_active_strategies(self) -> List[Dict[str, Any]]:
+        """获取有活跃策略的用户列表（按用户ID升序）"""
+        with self._query('select:users'):
+            users = self.tables['users']
+            results = []
+            for user_id in sorted(self._strategies_by_user):
+                user = users.get(user_id)
+                if user is None or user['status'] != 1:
+                    continue
+                if any(row['status'] == 1 for row in self._strategies_by_user[user_id].values()):
+                    results.append({column: user[column] for column in _USER_SUMMARY_COLUMNS})
+            return results
+
+    def get_user_orders(self, user_id: int, strategy_id: Optional[int] = None,
+                        status: Optional[int] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        """获取用户订单列表（按 order_time 降序）"""
+        with self._query('select:orders'):
+            rows = [row for row in self._orders_by_user.get(user_id, {}).values()
+                    if (strategy_id is None or row['strategy_id'] == strategy_id)
+                    and (status is None or row['status'] == status)]
+            rows.sort(key=lambda row: (row['order_time'], row['id']), reverse=True)
+            return [dict(row) for row in rows[:limit]]
+
+    def get_user_orders_since(self, user_id: int, since: datetime, after_id: Optional[int] = None,
+                              limit: int = 1000) -> List[Dict[str, Any]]:
+        """获取指定时间之后更新过的用户订单（按 update_time, id 升序）"""
+        with self._query('select:orders'):
+            orders = self._orders_by_user.get(user_id, {}).values()
+            if after_id is None:
+                rows = [row for row in orders if row['update_time'] >= since]
+            else:
+                rows = [row for row in orders if (row['update_time'], row['id']) > (since, after_id)]
+            rows.sort(key=lambda row: (row['update_time'], row['id']))
+            return [dict(row) for row in rows[:limit]]
+
+    def get_active_orders(self, user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """获取活跃订单（待处理和部分成交，按 order_time 升序）"""
+        with self._query('select:orders'):
+            orders = self._orders_by_user.get(user_id, {}).values() if user_id else self.tables['orders'].values()
+            rows = sorted((row for row in orders if row['status'] in (0, 1)),
+                          key=lambda row: (row['order_time'], row['id']))
+            return [dict(row) for row in rows]
+
+    def get_active_orders_for_users(self, user_ids: List[int], batch_size: int = 100) -> List[Dict[str, Any]]:
+        """批量获取多个用户的活跃订单"""
+        def select(chunk):
+            rows = [row for user_id in set(chunk)
+                    for row in self._orders_by_user.get(user_id, {}).values() if row['status'] in (0, 1)]
+            return sorted(rows, key=lambda row: (row['order_time'], row['id']))
+        return self._select_batches('select:orders', user_ids, batch_size, select)
+
+    def get_orders_by_ids(self, order_ids: List[int], batch_size: int = 100) -> List[Dict[str, Any]]:
+        """根据订单ID批量获取订单"""
+        orders = self.tables['orders']
+        return self._select_batches('select:orders', order_ids, batch_size, lambda chunk: [
+            orders[order_id] for order_id in sorted(set(chunk)) if order_id in orders
+        ])
+
+    # 更新方法
+    def update_order_status(self, order_id: int, status: int,
+                            filled_quantity: Optional[float] = None,
+                            avg_price: Optional[float] = None,
+                            commission: Optional[float] = None) -> bool:
+        """更新订单状态"""
+        with self._query('update:orders'):
+            row = self.tables['orders'].get(order_id)
+            if row is None:
+                return False
+            row['status'] = status
+            row['update_time'] = _now()
+            if filled_quantity is not None:
+                row['filled_quantity'] = _to_decimal(filled_quantity)
+            if avg_price is not None:
+                row['avg_price'] = _to_decimal(avg_price)
+            if commission is not None:
+                row['commission'] = _to_decimal(commission)
+            return True
+
+    def update_orders_batch(self, updates: List[Dict[str, Any]]) -> int:
+        """批量更新订单状态（单次提交），返回影响的行数"""
+        if not updates:
+            return 0
+
+        with self._query('batch:update:orders'):
+            affected = 0
+            now = _now()
+            for update in updates:
+                row = self.tables['orders'].get(update['order_id'])
+                if row is None:
+                    continue
+                row['status'] = update['status']
+                row['filled_quantity'] = _to_decimal(update['filled_quantity'])
+                if update.get('avg_price') is not None:
+                    row['avg_price'] = _to_decimal(update['avg_price'])
+                row['commission'] = _to_decimal(update['commission'])
+                row['update_time'] = now
+                affected += 1
+            return affected
+
+    def update_strategy_status(self, strategy_id: int, status: int) -> bool:
+        """更新策略状态"""
+        with self._query('update:user_strategies'):
+            row = self.tables['user_strategies'].get(strategy_id)
+            if row is None:
+                return False
+            row['status'] = status
+            row['updated_at'] = _now()
+            return True
+
+    def get_pool_status(self) -> Dict[str, Any]:
+        """获取后端状态"""
+        return {
+            "backend": "memory",
+            "tables": self.table_sizes(),
+            "latency_ms": self.latency_ms,
+            "jitter_ms": self.jitter_ms,
+            "status": "正常" if self._pool_initialized else "未初始化"
+        }
+
+    def health_check(self) -> bool:
+        """健康检查"""
+        return self.initialize()
+
+    def close_pool(self):
+        """内存后端无需关闭（表数据保留到进程结束）"""
+        self.logger.info("MySQL内存后端已关闭")
+
+    def __repr__(self):
+        return f"<MemoryMySQLManager(tables={self.table_sizes()}, latency_ms={self.latency_ms})>"
+
+
+# ---------------------------------------------------------------------------
+# Redis
+# ---------------------------------------------------------------------------
+
+_WRONGTYPE = "WRONGTYPE Operation against a key holding the wrong kind of value"
+
+
+def _encode(value: Any) -> bytes:
+    """与 redis-py 相同的参数编码规则"""
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    if isinstance(value, bool):
+        raise DataError("Invalid input of type: 'bool'. Convert to a bytes, string, int or float first.")
+    if isinstance(value, int):
+        return str(value).encode()
+    if isinstance(value, float):
+        return repr(value).encode()
+    if isinstance(value, memoryview):
+        return value.tobytes()
+    raise DataError(f"Invalid input of type: '{type(value).__name__}'. Convert to a bytes, string, int or float first.")
+
+
+def _decode(value: Any) -> Any:
+    """decode_responses 为真时把结果中的字节串转为字符串"""
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    if isinstance(value, set):
+        return {_decode(item) for item in value}
+    if isinstance(value, dict):
+        return {_decode(k): _decode(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return tuple(_decode(item) for item in value)
+    return value
+
+
+def _seconds(value: Any) -> float:
+    return value.total_seconds() if isinstance(value, timedelta) else float(value)
+
+
+def _score_bound(value: Any) -> Tuple[float, bool]:
+    """有序集合分数范围边界，返回 (分数, 是否开区间)"""
+    value = value.decode() if isinstance(value, bytes) else str(value)
+    exclusive = value.startswith('(')
+    value = value[1:] if exclusive else value
+    return float(value.replace('+inf', 'inf')), exclusive
+
+
+class _SortedSet(dict):
+    """有序集合 {成员: 分数}"""
+
+
+class MemoryRedisStore:
+    """
+    进程内Redis数据（键空间、过期时间、发布/订阅通道）
+
+    命令方法与 redis-py 同名、参数一致，返回未解码的原始结果；调用方需持有 lock。
+    过期键在访问时惰性删除，另外每秒最多全量清理一次
+    """
+
+    # 客户端可调用的命令
+    COMMANDS = frozenset((
+        'ping', 'info', 'dbsize', 'flushdb', 'flushall', 'keys',
+        'get', 'set', 'mget', 'mset', 'incr', 'incrby', 'delete', 'exists',
+        'expire', 'pexpire', 'ttl', 'pttl', 'persist',
+        'hset', 'hget', 'hgetall', 'hmget', 'hdel', 'hlen', 'hexists', 'hkeys', 'hvals',
+        'sadd', 'srem', 'smembers', 'sismember', 'scard',
+        'lpush', 'rpush', 'lpop', 'rpop', 'llen', 'lrange',
+        'zadd', 'zrem', 'zrange', 'zremrangebyscore', 'zcard', 'zscore',
+        'publish'
+    ))
+
+    def __init__(self):
+        self.data = {}  # {键: 值}，值类型: bytes / dict / set / deque / _SortedSet
+        self.expires = {}  # {键: 过期时间(time.monotonic())}
+        self.subscribers = {}  # {通道: {MemoryPubSub}}
+        self.lock = threading.RLock()
+        self.started_at = time.time()
+        self._last_sweep = time.monotonic()
+
+    # 键空间
+    def _sweep(self, now: float) -> None:
+        if now - self._last_sweep < 1.0:
+            return
+        self._last_sweep = now
+        for key in [key for key, deadline in self.expires.items() if deadline <= now]:
+            self._remove(key)
+
+    def _remove(self, key: bytes) -> bool:
+        self.expires.pop(key, None)
+        return self.data.pop(key, None) is not None
+
+    def _lookup(self, key: Any, kind: Optional[type] = None) -> Any:
+        """取键的值（已过期时删除），类型不符时抛出 WRONGTYPE"""
+        key = _encode(key)
+        now = time.monotonic()
+        self._sweep(now)
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= now:
+            self._remove(key)
+            return None
+        value = self.data.get(key)
+        if value is not None and kind is not None and type(value) is not kind:
+            raise ResponseError(_WRONGTYPE)
+        return value
+
+    def _create(self, key: Any, kind: type) -> Any:
+        value = self._lookup(key, kind)
+        if value is None:
+            value = self.data[_encode(key)] = kind()
+        return value
+
+    def _drop_if_empty(self, key: Any, value: Any) -> None:
+        if not value:
+            self._remove(_encode(key))
+
+    def _set_deadline(self, key: Any, seconds: float) -> bool:
+        if self._lookup(key) is None:
+            return False
+        if seconds <= 0:
+            self._remove(_encode(key))
+        else:
+            self.expires[_encode(key)] = time.monotonic() + seconds
+        return True
+
+    def ping(self, **kwargs) -> bool:
+        return True
+
+    def info(self, section: Optional[str] = None, *args, **kwargs) -> Dict[str, Any]:
+        used_memory = sum(len(key) + self._approximate_size(value) for key, value in self.data.items())
+        return {
+            'redis_version': 'memory',
+            'redis_mode': 'standalone',
+            'connected_clients': 1,
+            'uptime_in_seconds': int(time.time() - self.started_at),
+            'used_memory': used_memory,
+            'used_memory_human': f"{used_memory / (1024 * 1024):.2f}M",
+            'db0': {'keys': len(self.data), 'expires': len(self.expires)}
+        }
+
+    @staticmethod
+    def _approximate_size(value: Any) -> int:
+        if isinstance(value, bytes):
+            return len(value)
+        if isinstance(value, dict):
+            return sum(len(k) + (len(v) if isinstance(v, bytes) else 8) for k, v in value.items())
+        return sum(len(item) for item in value)
+
+    def dbsize(self) -> int:
+        return len(self.data)
+
+    def flushdb(self, **kwargs) -> bool:
+        self.data.clear()
+        self.expires.clear()
+        return True
+
+    flushall = flushdb
+
+    def keys(self, pattern: Any = '*') -> List[bytes]:
+        pattern = _encode(pattern).decode('utf-8')
+        return [key for key in list(self.data)
+                if self._lookup(key) is not None and fnmatch.fnmatchcase(key.decode('utf-8'), pattern)]
+
+    # 字符串
+    def get(self, name: Any) -> Optional[bytes]:
+        return self._lookup(name, bytes)
+
+    def set(self, name: Any, value: Any, ex: Any = None, px: Any = None, nx: bool = False,
+            xx: bool = False, keepttl: bool = False, get: bool = False) -> Any:
+        key = _encode(name)
+        old = self._lookup(key, bytes if get else None)
+        if (nx and old is not None) or (xx and old is None):
+            return old if get else None
+        deadline = self.expires.get(key) if keepttl else None
+        self.data[key] = _encode(value)
+        self.expires.pop(key, None)
+        if ex is not None:
+            deadline = time.monotonic() + _seconds(ex)
+        elif px is not None:
+            deadline = time.monotonic() + _seconds(px) / 1000
+        if deadline is not None:
+            self.expires[key] = deadline
+        return old if get else True
+
+    def mget(self, keys: Any, *args: Any) -> List[Optional[bytes]]:
+        keys = [keys] if isinstance(keys, (str, bytes)) else list(keys)
+        return [self._lookup_string(key) for key in keys + list(args)]
+
+    def _lookup_string(self, key: Any) -> Optional[bytes]:
+        value = self._lookup(key)
+        return value if isinstance(value, bytes) else None
+
+    def mset(self, mapping: Dict[Any, Any]) -> bool:
+        for key, value in mapping.items():
+            self.set(key, value)
+        return True
+
+    def incrby(self, name: Any, amount: int = 1) -> int:
+        value = self._lookup(name, bytes)
+        try:
+            number = int(value or 0) + amount
+        except ValueError:
+            raise ResponseError("value is not an integer or out of range")
+        self.data[_encode(name)] = str(number).encode()
+        return number
+
+    incr = incrby
+
+    def delete(self, *names: Any) -> int:
+        return sum(1 for name in names if self._lookup(name) is not None and self._remove(_encode(name)))
+
+    def exists(self, *names: Any) -> int:
+        return sum(1 for name in names if self._lookup(name) is not None)
+
+    def expire(self, name: Any, time: Any) -> bool:
+        return self._set_deadline(name, _seconds(time))
+
+    def pexpire(self, name: Any, time: Any) -> bool:
+        milliseconds = time.total_seconds() * 1000 if isinstance(time, timedelta) else float(time)
+        return self._set_deadline(name, milliseconds / 1000)
+
+    def pttl(self, name: Any) -> int:
+        if self._lookup(name) is None:
+            return -2
+        deadline = self.expires.get(_encode(name))
+        if deadline is None:
+            return -1
+        return max(0, int(round((deadline - time.monotonic()) * 1000)))
+
+    def ttl(self, name: Any) -> int:
+        remaining = self.pttl(name)
+        return remaining if remaining < 0 else int(round(remaining / 1000))
+
+    def persist(self, name: Any) -> bool:
+        return self._lookup(name) is not None and self.expires.pop(_encode(name), None) is not None
+
+    # 哈希表
+    def hset(self, name: Any, key: Any = None, value: Any = None, mapping: Optional[Dict] = None,
+             items: Optional[List] = None) -> int:
+        pairs = []
+        if key is not None:
+            pairs.append((key, value))
+        if mapping:
+            pairs.extend(mapping.items())
+        if items:
+            pairs.extend(zip(items[::2], items[1::2]))
+        if not pairs:
+            raise DataError("'hset' with no key value pairs")
+        data = self._create(name, dict)
+        added = 0
+        for field, field_value in pairs:
+            field = _encode(field)
+            added += field not in data
+            data[field] = _encode(field_value)
+        return added
+
+    def hget(self, name: Any, key: Any) -> Optional[bytes]:
+        data = self._lookup(name, dict)
+        return data.get(_encode(key)) if data else None
+
+    def hgetall(self, name: Any) -> Dict[bytes, bytes]:
+        return dict(self._lookup(name, dict) or {})
+
+    def hmget(self, name: Any, keys: Any, *args: Any) -> List[Optional[bytes]]:
+        keys = [keys] if isinstance(keys, (str, bytes, int)) else list(keys)
+        data = self._lookup(name, dict) or {}
+        return [data.get(_encode(key)) for key in keys + list(args)]
+
+    def hdel(self, name: Any, *keys: Any) -> int:
+        data = self._lookup(name, dict)
+        if not data:
+            return 0
+        deleted = sum(1 for key in keys if data.pop(_encode(key), None) is not None)
+        self._drop_if_empty(name, data)
+        return deleted
+
+    def hlen(self, name: Any) -> int:
+        return len(self._lookup(name, dict) or ())
+
+    def hexists(self, name: Any, key: Any) -> bool:
+        return _encode(key) in (self._lookup(name, dict) or {})
+
+    def hkeys(self, name: Any) -> List[bytes]:
+        return list(self._lookup(name, dict) or {})
+
+    def hvals(self, name: Any) -> List[bytes]:
+        return list((self._lookup(name, dict) or {}).values())
+
+    # 集合
+    def sadd(self, name: Any, *values: Any) -> int:
+        members = self._create(name, set)
+        before = len(members)
+        members.update(_encode(value) for value in values)
+        return len(members) - before
+
+    def srem(self, name: Any, *values: Any) -> int:
+        members = self._lookup(name, set)
+        if not members:
+            return 0
+        before = len(members)
+        members.difference_update(_encode(value) for value in values)
+        removed = before - len(members)
+        self._drop_if_empty(name, members)
+        return removed
+
+    def smembers(self, name: Any) -> set:
+        return set(self._lookup(name, set) or ())
+
+    def sismember(self, name: Any, value: Any) -> bool:
+        return _encode(value) in (self._lookup(name, set) or ())
+
+    def scard(self, name: Any) -> int:
+        return len(self._lookup(name, set) or ())
+
+    # 列表
+    def lpush(self, name: Any, *values: Any) -> int:
+        items = self._create(name, deque)
+        items.extendleft(_encode(value) for value in values)
+        return len(items)
+
+    def rpush(self, name: Any, *values: Any) -> int:
+        items = self._create(name, deque)
+        items.extend(_encode(value) for value in values)
+        return len(items)
+
+    def _pop(self, name: Any, count: Optional[int], pop: Callable[[deque], bytes]) -> Any:
+        items = self._lookup(name, deque)
+        if not items:
+            return None
+        if count is None:
+            value = pop(items)
+        else:
+            value = [pop(items) for _ in range(min(count, len(items)))]
+        self._drop_if_empty(name, items)
+        return value
+
+    def lpop(self, name: Any, count: Optional[int] = None) -> Any:
+        return self._pop(name, count, deque.popleft)
+
+    def rpop(self, name: Any, count: Optional[int] = None) -> Any:
+        return self._pop(name, count, deque.pop)
+
+    def llen(self, name: Any) -> int:
+        return len(self._lookup(name, deque) or ())
+
+    def lrange(self, name: Any, start: int, end: int) -> List[bytes]:
+        items = list(self._lookup(name, deque) or ())
+        end = len(items) if end == -1 else end + 1
+        return items[start:end] if end else []
+
+    # 有序集合
+    def zadd(self, name: Any, mapping: Dict[Any, float], nx: bool = False, xx: bool = False, **kwargs) -> int:
+        members = self._create(name, _SortedSet)
+        added = 0
+        for member, score in mapping.items():
+            member = _encode(member)
+            exists = member in members
+            if (nx and exists) or (xx and not exists):
+                continue
+            added += not exists
+            members[member] = float(score)
+        self._drop_if_empty(name, members)
+        return added
+
+    def zrem(self, name: Any, *values: Any) -> int:
+        members = self._lookup(name, _SortedSet)
+        if not members:
+            return 0
+        removed = sum(1 for value in values if members.pop(_encode(value), None) is not None)
+        self._drop_if_empty(name, members)
+        return removed
+
+    def _ordered(self, name: Any) -> List[tuple]:
+        members = self._lookup(name, _SortedSet) or {}
+        return sorted(members.items(), key=lambda item: (item[1], item[0]))
+
+    def zrange(self, name: Any, start: int, end: int, desc: bool = False, withscores: bool = False,
+               score_cast_func: Callable = float, **kwargs) -> List[Any]:
+        items = self._ordered(name)
+        if desc:
+            items.reverse()
+        end = len(items) if end == -1 else end + 1
+        items = items[start:end] if end else []
+        if withscores:
+            return [(member, score_cast_func(score)) for member, score in items]
+        return [member for member, _ in items]
+
+    def zremrangebyscore(self, name: Any, min: Any, max: Any) -> int:
+        low, low_open = _score_bound(min)
+        high, high_open = _score_bound(max)
+        members = self._lookup(name, _SortedSet)
+        if not members:
+            return 0
+        doomed = [member for member, score in members.items()
+                  if (score > low if low_open else score >= low) and (score < high if high_open else score <= high)]
+        for member in doomed:
+            del members[member]
+        self._drop_if_empty(name, members)
+        return len(doomed)
+
+    def zcard(self, name: Any) -> int:
+        return len(self._lookup(name, _SortedSet) or ())
+
+    def zscore(self, name: Any, value: Any) -> Optional[float]:
+        return (self._lookup(name, _SortedSet) or {}).get(_encode(value))
+
+    # 发布/订阅
+    def publish(self, channel: Any, message: Any) -> int:
+        channel = _encode(channel)
+        subscribers = list(self.subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            subscriber._deliver({'type': 'message', 'pattern': None, 'channel': channel, 'data': _encode(message)})
+        return len(subscribers)
+
+    # 脚本
+    def run_script(self, script: 'MemoryScript', keys: List[Any], args: List[Any]) -> Any:
+        if script.handler is None:
+            raise NoScriptError(f"NOSCRIPT 内存后端未实现该脚本: {script.sha}")
+        return script.handler(self, [_encode(key) for key in keys], [_encode(arg) for arg in args])
+
+
+# RedisManager 中Lua脚本的等价实现（在存储锁内执行，与脚本一样是原子的）
+def _patch_order_script(store: MemoryRedisStore, keys: List[bytes], args: List[bytes]) -> int:
+    if not store.exists(keys[0]):
+        return 0
+    store.hset(keys[0], args[0], args[1])
+    if args[2] == b'1':
+        store.sadd(keys[1], args[0])
+    else:
+        store.srem(keys[1], args[0])
+    return 1
+
+
+def _release_lock_script(store: MemoryRedisStore, keys: List[bytes], args: List[bytes]) -> int:
+    if store.get(keys[0]) == args[0]:
+        return store.delete(keys[0])
+    return 0
+
+
+def _acquire_lease_script(store: MemoryRedisStore, keys: List[bytes], args: List[bytes]) -> int:
+    current = store.get(keys[0])
+    if current is not None:
+        owner, _, token = current.rpartition(b':')
+        if token.isdigit() and owner == args[0]:
+            store.pexpire(keys[0], int(args[1]))
+            return int(token)
+        return 0
+    token = store.incr(keys[1])
+    store.set(keys[0], args[0] + b':' + str(token).encode(), px=int(args[1]))
+    return token
+
+
+def _renew_lease_script(store: MemoryRedisStore, keys: List[bytes], args: List[bytes]) -> int:
+    if store.get(keys[0]) == args[0]:
+        return int(store.pexpire(keys[0], int(args[1])))
+    return 0
+
+
+_SCRIPT_HANDLERS = {
+    RedisManager._PATCH_ORDER_LUA: _patch_order_script,
+    RedisManager._RELEASE_LOCK_LUA: _release_lock_script,
+    RedisManager._ACQUIRE_LEASE_LUA: _acquire_lease_script,
+    RedisManager._RENEW_LEASE_LUA: _renew_lease_script,
+}
+
+
+def register_script_handler(source: str, handler: Callable[[MemoryRedisStore, List[bytes], List[bytes]], Any]) -> None:
+    """
+    为Lua脚本注册内存后端的等价实现
+
+    Args:
+        source: 脚本源码（与 register_script 传入的相同）
+        handler: handler(store, keys, args)，在存储锁内执行，keys/args 为字节串
+    """
+    _SCRIPT_HANDLERS[source] = handler
+
+
+class MemoryScript:
+    """register_script 返回的脚本对象"""
+
+    def __init__(self, client: 'MemoryRedis', source: str):
+        self.client = client
+        self.sha = hashlib.sha1(source.encode('utf-8')).hexdigest()
+        self.handler = _SCRIPT_HANDLERS.get(source)
+
+    def __call__(self, keys: Optional[List[Any]] = None, args: Optional[List[Any]] = None,
+                 client: Optional[Any] = None) -> Any:
+        return (client if client is not None else self.client)._run_script(self, keys or [], args or [])
+
+
+class MemoryPubSub:
+    """发布/订阅对象，消息在发布时直接投递到本地队列"""
+
+    def __init__(self, client: 'MemoryRedis', ignore_subscribe_messages: bool = False):
+        self.client = client
+        self.ignore_subscribe_messages = ignore_subscribe_messages
+        self.channels = set()
+        self._messages = queue.Queue()
+
+    def _deliver(self, message: Dict[str, Any]) -> None:
+        self._messages.put(message)
+
+    def _confirm(self, kind: str, channel: bytes) -> None:
+        if not self.ignore_subscribe_messages:
+            self._deliver({'type': kind, 'pattern': None, 'channel': channel, 'data': len(self.channels)})
+
+    @property
+    def subscribed(self) -> bool:
+        return bool(self.channels)
+
+    def subscribe(self, *channels: Any) -> None:
+        store = self.client.store
+        with store.lock:
+            for channel in map(_encode, channels):
+                self.channels.add(channel)
+                store.subscribers.setdefault(channel, set()).add(self)
+                self._confirm('subscribe', channel)
+
+    def unsubscribe(self, *channels: Any) -> None:
+        store = self.client.store
+        with store.lock:
+            for channel in list(map(_encode, channels)) or list(self.channels):
+                self.channels.discard(channel)
+                subscribers = store.subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(self)
+                    if not subscribers:
+                        del store.subscribers[channel]
+                self._confirm('unsubscribe', channel)
+
+    def get_message(self, ignore_subscribe_messages: bool = False, timeout: Optional[float] = 0.0):
+        """取一条消息，timeout 秒内没有消息时返回None（timeout 为None时一直等待）"""
+        try:
+            if timeout == 0:
+                message = self._messages.get_nowait()
+            else:
+                message = self._messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if ignore_subscribe_messages and message['type'] != 'message':
+            return None
+        return _decode(message) if self.client.decode_responses else message
+
+    def listen(self):
+        while self.channels:
+            message = self.get_message(timeout=1.0)
+            if message is not None:
+                yield message
+
+    def close(self) -> None:
+        if self.channels:
+            self.unsubscribe()
+
+    reset = close
+
+
+class MemoryPipeline:
+    """管道：命令在 execute() 时于存储锁内一次执行（相当于一次往返）"""
+
+    def __init__(self, client: 'MemoryRedis', transaction: bool = True):
+        self.client = client
+        self.transaction = transaction
+        self.command_stack = []  # [(命令函数, 位置参数, 关键字参数)]
+
+    def __getattr__(self, name: str):
+        if name not in MemoryRedisStore.COMMANDS:
+            raise AttributeError(f"'MemoryPipeline' object has no attribute '{name}'")
+        command = getattr(self.client.store, name)
+
+        def queue_command(*args, **kwargs):
+            self.command_stack.append((command, args, kwargs))
+            return self
+        return queue_command
+
+    def _run_script(self, script: MemoryScript, keys: List[Any], args: List[Any]) -> 'MemoryPipeline':
+        self.command_stack.append((self.client.store.run_script, (script, keys, args), {}))
+        return self
+
+    def __len__(self):
+        return len(self.command_stack)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.reset()
+
+    def execute(self, raise_on_error: bool = True) -> List[Any]:
+        stack, self.command_stack = self.command_stack, []
+        if not stack:
+            return []
+
+        def run():
+            results = []
+            for command, args, kwargs in stack:
+                try:
+                    results.append(command(*args, **kwargs))
+                except ResponseError as e:
+                    results.append(e)
+            return results
+
+        results = self.client._execute('PIPELINE', run)
+        if raise_on_error:
+            for result in results:
+                if isinstance(result, ResponseError):
+                    raise result
+        return results
+
+    def reset(self) -> None:
+        self.command_stack = []
+
+
+class MemoryRedis:
+    """
+    进程内Redis客户端（接口与 redis.Redis 一致）
+
+    同一进程内的客户端默认共享 memory_redis_store；每个命令和每次管道执行占用一个 redis_limiter 名额、
+    注入一次延迟并记录 COMMAND_SECONDS，发布/订阅不计入并发
+    """
+
+    def __init__(self, store: Optional[MemoryRedisStore] = None, decode_responses: bool = False,
+                 latency_ms: float = 0, jitter_ms: float = 0):
+        """
+        初始化客户端
+
+        Args:
+            store: 数据存储，默认使用进程共享的 memory_redis_store
+            decode_responses: 是否把结果中的字节串解码为字符串
+            latency_ms: 每次往返注入的固定延迟（毫秒）
+            jitter_ms: 随机抖动上限（毫秒）
+        """
+        self.store = store or memory_redis_store
+        self.decode_responses = decode_responses
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+
+    def _execute(self, command: str, call: Callable, *args, **kwargs) -> Any:
+        start = time.perf_counter()
+        try:
+            with redis_limiter.slot():
+                _inject_latency(self.latency_ms, self.jitter_ms)
+                with self.store.lock:
+                    result = call(*args, **kwargs)
+        except LimiterTimeout as e:
+            raise ConnectionError(str(e))
+        finally:
+            COMMAND_SECONDS.observe(time.perf_counter() - start, command)
+        return _decode(result) if self.decode_responses else result
+
+    def __getattr__(self, name: str):
+        if name not in MemoryRedisStore.COMMANDS:
+            raise AttributeError(f"'MemoryRedis' object has no attribute '{name}'")
+        command = getattr(self.store, name)
+        label = name.upper() if name != 'delete' else 'DEL'
+
+        def call(*args, **kwargs):
+            return self._execute(label, command, *args, **kwargs)
+        self.__dict__[name] = call
+        return call
+
+    def _run_script(self, script: MemoryScript, keys: List[Any], args: List[Any]) -> Any:
+        return self._execute('EVALSHA', self.store.run_script, script, keys, args)
+
+    def register_script(self, script: str) -> MemoryScript:
+        return MemoryScript(self, script)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Any = None) -> MemoryPipeline:
+        return MemoryPipeline(self, transaction=transaction)
+
+    def pubsub(self, ignore_subscribe_messages: bool = False, **kwargs) -> MemoryPubSub:
+        return MemoryPubSub(self, ignore_subscribe_messages=ignore_subscribe_messages)
+
+    def close(self) -> None:
+        """内存客户端没有连接需要关闭"""
+
+    def __repr__(self):
+        return f"<MemoryRedis(keys={len(self.store.data)}, latency_ms={self.latency_ms})>"
+
+
+# 进程共享的Redis内存数据
+memory_redis_store = MemoryRedisStore()
@@ -3,14 +3,36 @@
 MySQL连接池管理器
 提供高性能、高可靠性的MySQL连接管理
 """
+import re
 import threading
 import time
 import logging
 from contextlib import contextmanager
+from datetime import datetime
 from typing import Optional, Dict, Any, List, Tuple
 import mysql.connector
 from mysql.connector import pooling, Error
+from mysql.connector.errors import PoolError
 from ..config import MYSQL_CONFIG
+from .concurrency import mysql_limiter, LimiterTimeout
+from ..metrics import metrics
+
+# 每个命名查询的耗时（含排队和获取连接）
+QUERY_SECONDS = metrics.histogram('mysql_query_duration_seconds', 'MySQL语句耗时（按查询名称）', label_name='query')
+
+_STATEMENT_TABLE = re.compile(r'^\s*(\w+)(?:(?<=UPDATE)|\b.*?\b(?:FROM|INTO))\s+`?(\w+)', re.IGNORECASE | re.DOTALL)
+_query_names = {}  # {SQL文本: 推导的查询名称}
+
+
+def query_name(query: str) -> str:
+    """由SQL推导查询名称（语句类型:主表），如 select:orders"""
+    name = _query_names.get(query)
+    if name is None:
+        match = _STATEMENT_TABLE.match(query)
+        name = f"{match.group(1).lower()}:{match.group(2)}" if match else query.split(None, 1)[0].lower()
+        if len(_query_names) < 1000:
+            _query_names[query] = name
+    return name
 
 
 class MySQLManager:
@@ -77,25 +99,31 @@ class MySQLManager:
     
     @contextmanager
     def get_connection(self):
-        """获取数据库连接的上下文管理器"""
+        """获取数据库连接的上下文管理器（经过并发限制，连接池已满时排队等待）"""
         self._ensure_initialized()
         connection = None
         try:
-            connection = self.pool.get_connection()
-            if connection.is_connected():
-                yield connection
-            else:
-                raise Error("连接已断开")
+            with mysql_limiter.slot():
+                try:
+                    connection = self.pool.get_connection()
+                    if connection.is_connected():
+                        yield connection
+                    else:
+                        raise Error("连接已断开")
+                finally:
+                    if connection and connection.is_connected():
+                        connection.close()
+        except LimiterTimeout as e:
+            self.logger.error(f"获取MySQL连接失败: {e}")
+            raise PoolError(msg=str(e))
         except Error as e:
             self.logger.error(f"获取MySQL连接失败: {e}")
             raise
-        finally:
-            if connection and connection.is_connected():
-                connection.close()
     
     def execute_query(self, query: str, params: Optional[Tuple] = None, 
-                     fetch_one: bool = False, fetch_all: bool = True) -> Optional[Any]:
-        """执行查询语句"""
+                     fetch_one: bool = False, fetch_all: bool = True, name: Optional[str] = None) -> Optional[Any]:
+        """执行查询语句（name为耗时指标中的查询名称，默认由SQL推导）"""
+        start = time.perf_counter()
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor(dictionary=True)
@@ -113,9 +141,12 @@ class MySQLManager:
         except Error as e:
             self.logger.error(f"执行查询失败: {query}, 参数: {params}, 错误: {e}")
             raise
+        finally:
+            QUERY_SECONDS.observe(time.perf_counter() - start, name or query_name(query))
     
-    def execute_update(self, query: str, params: Optional[Tuple] = None) -> int:
+    def execute_update(self, query: str, params: Optional[Tuple] = None, name: Optional[str] = None) -> int:
         """执行更新语句（INSERT, UPDATE, DELETE）"""
+        start = time.perf_counter()
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
@@ -127,9 +158,12 @@ class MySQLManager:
         except Error as e:
             self.logger.error(f"执行更新失败: {query}, 参数: {params}, 错误: {e}")
             raise
+        finally:
+            QUERY_SECONDS.observe(time.perf_counter() - start, name or query_name(query))
     
-    def execute_batch(self, query: str, params_list: List[Tuple]) -> int:
+    def execute_batch(self, query: str, params_list: List[Tuple], name: Optional[str] = None) -> int:
         """批量执行语句"""
+        start = time.perf_counter()
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
@@ -141,6 +175,8 @@ class MySQLManager:
         except Error as e:
             self.logger.error(f"批量执行失败: {query}, 错误: {e}")
             raise
+        finally:
+            QUERY_SECONDS.observe(time.perf_counter() - start, name or f"batch:{query_name(query)}")
     
     def execute_transaction(self, operations: List[Dict[str, Any]]) -> bool:
         """执行事务"""
@@ -172,6 +208,17 @@ class MySQLManager:
         query = "SELECT * FROM users WHERE id = %s AND status = 1"
         return self.execute_query(query, (user_id,), fetch_one=True)
     
+    def get_users_by_ids(self, user_ids: List[int], batch_size: int = 100) -> List[Dict[str, Any]]:
+        """按ID批量获取启用的用户信息（每批一条IN查询）"""
+        results = []
+        user_ids = list(user_ids)
+        for i in range(0, len(user_ids), batch_size):
+            chunk = user_ids[i:i + batch_size]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            query = f"SELECT * FROM users WHERE id IN ({placeholders}) AND status = 1"
+            results.extend(self.execute_query(query, tuple(chunk), fetch_all=True) or [])
+        return results
+    
     def get_user_strategies(self, user_id: int, status: Optional[int] = None) -> List[Dict[str, Any]]:
         """获取用户策略列表"""
         if status is not None:
@@ -183,6 +230,47 @@ class MySQLManager:
         
         return self.execute_query(query, params, fetch_all=True) or []
     
+    def get_active_strategies_for_users(self, user_ids: List[int], batch_size: int = 100) -> List[Dict[str, Any]]:
+        """批量获取多个用户的活跃策略（按batch_size分批查询，走 idx_user_status 索引）"""
+        results = []
+        user_ids = list(user_ids)
+        for i in range(0, len(user_ids), batch_size):
+            chunk = user_ids[i:i + batch_size]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            query = f"SELECT * FROM user_strategies WHERE user_id IN ({placeholders}) AND status = 1"
+            results.extend(self.execute_query(query, tuple(chunk), fetch_all=True) or [])
+        return results
+    
+    def get_strategies_updated_since(self, since: datetime, after_id: Optional[int] = None,
+                                     limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        获取指定时间之后更新过的策略（所有用户，按 updated_at, id 升序）
+        
+        Args:
+            since: 更新时间下界（包含）
+            after_id: 分页游标，非空时只返回 (updated_at, id) 大于 (since, after_id) 的策略
+            limit: 返回数量上限
+        """
+        if after_id is None:
+            condition = "updated_at >= %s"
+            params = (since, limit)
+        else:
+            condition = "(updated_at > %s OR (updated_at = %s AND id > %s))"
+            params = (since, since, after_id, limit)
+        
+        query = f"""
+        SELECT * FROM user_strategies 
+        WHERE {condition} 
+        ORDER BY updated_at ASC, id ASC 
+        LIMIT %s
+        """
+        return self.execute_query(query, params, fetch_all=True) or []
+    
+    def get_strategy_update_watermark(self) -> Optional[datetime]:
+        """获取策略表当前最大的 updated_at"""
+        result = self.execute_query("SELECT MAX(updated_at) AS watermark FROM user_strategies", fetch_one=True)
+        return result['watermark'] if result else None
+    
     def get_users_with_active_strategies(self) -> List[Dict[str, Any]]:
         """获取有活跃策略的用户列表"""
         query = """
@@ -218,6 +306,32 @@ class MySQLManager:
         
         return self.execute_query(query, tuple(params), fetch_all=True) or []
     
+    def get_user_orders_since(self, user_id: int, since: datetime, after_id: Optional[int] = None,
+                              limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        获取指定时间之后更新过的用户订单（按 update_time, id 升序）
+        
+        Args:
+            user_id: 用户ID
+            since: 更新时间下界（包含）
+            after_id: 分页游标，非空时只返回 (update_time, id) 大于 (since, after_id) 的订单
+            limit: 返回数量上限
+        """
+        if after_id is None:
+            condition = "update_time >= %s"
+            params = (user_id, since, limit)
+        else:
+            condition = "(update_time > %s OR (update_time = %s AND id > %s))"
+            params = (user_id, since, since, after_id, limit)
+        
+        query = f"""
+        SELECT * FROM orders 
+        WHERE user_id = %s AND {condition} 
+        ORDER BY update_time ASC, id ASC 
+        LIMIT %s
+        """
+        return self.execute_query(query, params, fetch_all=True) or []
+    
     def get_active_orders(self, user_id: Optional[int] = None) -> List[Dict[str, Any]]:
         """获取活跃订单（待处理和部分成交）"""
         if user_id:
@@ -237,6 +351,32 @@ class MySQLManager:
         
         return self.execute_query(query, params, fetch_all=True) or []
     
+    def get_active_orders_for_users(self, user_ids: List[int], batch_size: int = 100) -> List[Dict[str, Any]]:
+        """批量获取多个用户的活跃订单（按batch_size分批查询）"""
+        results = []
+        user_ids = list(user_ids)
+        for i in range(0, len(user_ids), batch_size):
+            chunk = user_ids[i:i + batch_size]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            query = f"""
+            SELECT * FROM orders 
+            WHERE user_id IN ({placeholders}) AND status IN (0, 1) 
+            ORDER BY order_time ASC
+            """
+            results.extend(self.execute_query(query, tuple(chunk), fetch_all=True) or [])
+        return results
+    
+    def get_orders_by_ids(self, order_ids: List[int], batch_size: int = 100) -> List[Dict[str, Any]]:
+        """根据订单ID批量获取订单（按batch_size分批查询）"""
+        results = []
+        order_ids = list(order_ids)
+        for i in range(0, len(order_ids), batch_size):
+            chunk = order_ids[i:i + batch_size]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            query = f"SELECT * FROM orders WHERE id IN ({placeholders})"
+            results.extend(self.execute_query(query, tuple(chunk), fetch_all=True) or [])
+        return results
+    
     def update_order_status(self, order_id: int, status: int, 
                            filled_quantity: Optional[float] = None,
                            avg_price: Optional[float] = None,
@@ -263,6 +403,32 @@ class MySQLManager:
         affected_rows = self.execute_update(query, tuple(params))
         return affected_rows > 0
     
+    def update_orders_batch(self, updates: List[Dict[str, Any]]) -> int:
+        """
+        批量更新订单状态（单次提交）
+        
+        Args:
+            updates: 订单更新列表，每项包含 order_id, status, filled_quantity, avg_price, commission
+            
+        Returns:
+            int: 影响的行数
+        """
+        if not updates:
+            return 0
+        
+        query = """
+        UPDATE orders
+        SET status = %s, filled_quantity = %s, avg_price = COALESCE(%s, avg_price),
+            commission = %s, update_time = NOW()
+        WHERE id = %s
+        """
+        params_list = [
+            (update['status'], update['filled_quantity'], update.get('avg_price'),
+             update['commission'], update['order_id'])
+            for update in updates
+        ]
+        return self.execute_batch(query, params_list)
+    
     def update_strategy_status(self, strategy_id: int, status: int) -> bool:
         """更新策略状态"""
         query = "UPDATE user_strategies SET status = %s, updated_at = NOW() WHERE id = %s"
@@ -311,5 +477,13 @@ class MySQLManager:
         self.close_pool()
 
 
+def create_mysql_manager() -> MySQLManager:
+    """按 MYSQL_CONFIG['backend'] 创建MySQL管理器：mysql-连接池，memory-进程内内存表"""
+    if MYSQL_CONFIG.get('backend', 'mysql') == 'memory':
+        from .memory_backend import MemoryMySQLManager
+        return MemoryMySQLManager()
+    return MySQLManager()
+
+
 # 全局MySQL管理器实例
-mysql_manager = MySQLManager()
\ No newline at end of file
+mysql_manager = create_mysql_manager()
\ No newline at end of file
@@ -6,14 +6,147 @@ Redis连接池管理器
 import threading
 import time
 import json
+import uuid
 import logging
 from datetime import datetime
-from decimal import Decimal
-from typing import Optional, Dict, Any, List, Union
+from typing import Optional, Dict, Any, List, Set, Union, Callable, Iterable
 import redis
 from redis.connection import ConnectionPool
 from redis.exceptions import ConnectionError, TimeoutError, RedisError
 from ..config import REDIS_CONFIG, REDIS_KEYS, CACHE_CONFIG
+from .local_cache import local_cache, MISSING
+from .single_flight import single_flight
+from .concurrency import redis_limiter, LimiterTimeout
+from ..metrics import metrics
+from .codecs import (
+    PayloadSchema, ORDER_SCHEMA, get_schema_for_key, looks_like_datetime, parse_datetime,
+    get_codec, is_binary_payload, decode_binary_payload, json_default
+)
+
+
+# 每个命令的耗时（含排队），管道整体记为 PIPELINE
+COMMAND_SECONDS = metrics.histogram('redis_command_duration_seconds', 'Redis命令耗时（按命令）', label_name='command')
+
+
+class _LimitedRedis(redis.Redis):
+    """
+    经过并发限制器并记录耗时的Redis客户端
+
+    普通命令和管道执行占用 redis_limiter 名额；发布/订阅使用独立的长连接，不计入并发
+    """
+
+    def _limited(self, command: str, call, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            with redis_limiter.slot():
+                return call(*args, **kwargs)
+        except LimiterTimeout as e:
+            raise ConnectionError(str(e))
+        finally:
+            COMMAND_SECONDS.observe(time.perf_counter() - start, command)
+
+    def execute_command(self, *args, **options):
+        return self._limited(str(args[0]).upper(), super().execute_command, *args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        pipe = super().pipeline(transaction=transaction, shard_hint=shard_hint)
+        execute = pipe.execute
+        pipe.execute = lambda *args, **kwargs: self._limited('PIPELINE', execute, *args, **kwargs)
+        return pipe
+
+
+class RedisPipeline:
+    """
+    带序列化的Redis管道
+    
+    命令在 execute() 时一次发送，读取类命令的结果按与 RedisManager 相同的规则反序列化
+    """
+    
+    def __init__(self, manager: 'RedisManager', transaction: bool = False):
+        self._manager = manager
+        self._pipe = manager.client.pipeline(transaction=transaction)
+        self._decoders = []  # 每条命令结果的解码函数，None表示原样返回
+        self._written_keys = []  # 管道中写入/删除的键，执行后使本地缓存失效
+    
+    def _queue(self, decoder=None) -> 'RedisPipeline':
+        self._decoders.append(decoder)
+        return self
+    
+    def _value_decoder(self, key: str):
+        schema = get_schema_for_key(key)
+        return lambda value: self._manager._deserialize_value(value, schema) if value else None
+    
+    def set(self, key: str, value: Any, ex: Optional[int] = None, nx: bool = False) -> 'RedisPipeline':
+        self._pipe.set(key, self._manager._serialize_value(value), ex=ex, nx=nx)
+        self._written_keys.append(key)
+        return self._queue()
+    
+    def get(self, key: str) -> 'RedisPipeline':
+        self._pipe.get(key)
+        return self._queue(self._value_decoder(key))
+    
+    def delete(self, *keys: str) -> 'RedisPipeline':
+        self._pipe.delete(*keys)
+        self._written_keys.extend(keys)
+        return self._queue()
+    
+    def expire(self, key: str, time: int) -> 'RedisPipeline':
+        self._pipe.expire(key, time)
+        return self._queue()
+    
+    def hset(self, name: str, mapping: Dict[str, Any]) -> 'RedisPipeline':
+        self._pipe.hset(name, mapping={k: self._manager._serialize_value(v) for k, v in mapping.items()})
+        return self._queue()
+    
+    def hget(self, name: str, key: str) -> 'RedisPipeline':
+        self._pipe.hget(name, key)
+        return self._queue(self._value_decoder(name))
+    
+    def hgetall(self, name: str) -> 'RedisPipeline':
+        self._pipe.hgetall(name)
+        decode = self._value_decoder(name)
+        decode_field = self._manager._decode_field
+        return self._queue(lambda data: {decode_field(k): decode(v) for k, v in data.items()} if data else {})
+    
+    def sadd(self, name: str, *values: Any) -> 'RedisPipeline':
+        self._pipe.sadd(name, *[self._manager._serialize_value(v) for v in values])
+        return self._queue()
+    
+    def srem(self, name: str, *values: Any) -> 'RedisPipeline':
+        self._pipe.srem(name, *[self._manager._serialize_value(v) for v in values])
+        return self._queue()
+    
+    def smembers(self, name: str) -> 'RedisPipeline':
+        self._pipe.smembers(name)
+        return self._queue(lambda members: {self._manager._deserialize_value(m) for m in members}
+                           if members else set())
+    
+    def __len__(self):
+        return len(self._decoders)
+    
+    def execute(self) -> Optional[List[Any]]:
+        """
+        发送所有命令
+        
+        Returns:
+            Optional[List[Any]]: 各命令的结果，失败时返回None
+        """
+        if not self._decoders:
+            return []
+        try:
+            results = self._pipe.execute()
+        except RedisError as e:
+            self._manager.logger.error(f"Redis管道执行失败: 命令数 {len(self._decoders)}, error={e}")
+            return None
+        finally:
+            self._pipe.reset()
+        
+        if self._written_keys:
+            self._manager._invalidate_local(self._written_keys)
+            self._written_keys = []
+        
+        return [decoder(result) if decoder else result
+                for decoder, result in zip(self._decoders, results)]
 
 
 class RedisManager:
@@ -22,6 +155,21 @@ class RedisManager:
     _instance = None
     _lock = threading.Lock()
     
+    # 仅在订单缓存存在时更新单个订单及活跃订单集合
+    # KEYS[1]=订单哈希表 KEYS[2]=活跃订单集合 ARGV[1]=订单ID ARGV[2]=订单记录 ARGV[3]=是否活跃
+    _PATCH_ORDER_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+if ARGV[3] == '1' then
+    redis.call('SADD', KEYS[2], ARGV[1])
+else
+    redis.call('SREM', KEYS[2], ARGV[1])
+end
+return 1
+"""
+    
     def __new__(cls):
         """单例模式"""
         if cls._instance is None:
@@ -30,6 +178,38 @@ class RedisManager:
                     cls._instance = super(RedisManager, cls).__new__(cls)
         return cls._instance
     
+    # 仅释放自己持有的加载锁
+    _RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+    
+    # 获取租约：空闲时递增防护令牌并写入 "节点ID:令牌"，已由本节点持有时续期；返回令牌，被其他节点持有时返回0
+    _ACQUIRE_LEASE_LUA = """
+local current = redis.call('GET', KEYS[1])
+if current then
+    local owner, token = string.match(current, '^(.*):(%d+)$')
+    if owner == ARGV[1] then
+        redis.call('PEXPIRE', KEYS[1], ARGV[2])
+        return tonumber(token)
+    end
+    return 0
+end
+local token = redis.call('INCR', KEYS[2])
+redis.call('SET', KEYS[1], ARGV[1] .. ':' .. token, 'PX', ARGV[2])
+return token
+"""
+    
+    # 续期租约：值仍为 "节点ID:令牌" 时延长过期时间
+    _RENEW_LEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+    
     def __init__(self):
         if hasattr(self, '_initialized'):
             return
@@ -38,7 +218,18 @@ class RedisManager:
         self.pool = None
         self.client = None
         self.config = REDIS_CONFIG.copy()
+        self._patch_order_script = None
+        self._release_lock_script = None
+        self._acquire_lease_script = None
+        self._renew_lease_script = None
         self.logger = logging.getLogger(__name__)
+        self.codec = self._init_codec()
+        
+        # 进程内L1缓存及跨进程失效
+        self.local_cache = local_cache if CACHE_CONFIG.get('local_cache_enabled', False) else None
+        self.node_id = uuid.uuid4().hex
+        self._invalidation_running = False
+        self._invalidation_thread = None
         self._pool_initialized = False
     
     def initialize(self) -> bool:
@@ -49,19 +240,34 @@ class RedisManager:
         try:
             self._init_pool()
             self._pool_initialized = True
+            if self.local_cache is not None:
+                self.start_invalidation_listener()
             return True
         except Exception as e:
             self.logger.error(f"Redis连接池初始化失败: {e}")
             return False
     
     def _init_pool(self):
-        """内部初始化Redis连接池方法"""
+        """内部初始化Redis连接池方法（backend 为 memory 时使用进程内实现，不建立连接）"""
+        if self.config.get('backend', 'redis') == 'memory':
+            from .memory_backend import MemoryRedis
+            self.client = MemoryRedis(
+                decode_responses=self.config['decode_responses'] and not self.codec.binary,
+                latency_ms=self.config.get('memory_latency_ms', 0),
+                jitter_ms=self.config.get('memory_jitter_ms', 0)
+            )
+            self.client.ping()
+            self.logger.info(f"Redis内存后端已启用，注入延迟: {self.client.latency_ms} 毫秒 "
+                             f"(抖动 {self.client.jitter_ms} 毫秒)")
+            return
+        
         self.pool = ConnectionPool(
             host=self.config['host'],
             port=self.config['port'],
             password=self.config['password'],
             db=self.config['db'],
-            decode_responses=self.config['decode_responses'],
+            # 二进制编码需要读取原始字节
+            decode_responses=self.config['decode_responses'] and not self.codec.binary,
             socket_connect_timeout=self.config['socket_connect_timeout'],
             socket_timeout=self.config['socket_timeout'],
             retry_on_timeout=self.config['retry_on_timeout'],
@@ -69,7 +275,7 @@ class RedisManager:
             **self.config['connection_pool_kwargs']
         )
         
-        self.client = redis.Redis(connection_pool=self.pool)
+        self.client = _LimitedRedis(connection_pool=self.pool)
         
         # 测试连接
         self.client.ping()
@@ -81,53 +287,76 @@ class RedisManager:
             if not self.initialize():
                 raise RuntimeError("Redis连接池未初始化")
     
-    def _serialize_value(self, value: Any) -> str:
-        """序列化值"""
+    def _init_codec(self):
+        """按配置创建载荷编码器，不可用时回退到JSON"""
+        name = self.config.get('codec', 'json')
+        try:
+            return get_codec(name)
+        except (ValueError, ImportError) as e:
+            self.logger.error(f"Redis编码器 {name} 不可用，使用JSON编码: {e}")
+            return get_codec('json')
+    
+    def _serialize_value(self, value: Any) -> Union[str, bytes]:
+        """序列化值（字典和列表使用配置的编码器，标量保存为字符串）"""
         if isinstance(value, (dict, list)):
-            return json.dumps(value, ensure_ascii=False, default=self._json_serializer)
+            return self.codec.encode(value)
         return str(value)
     
     def _json_serializer(self, obj):
         """JSON序列化器，处理datetime、Decimal等特殊类型"""
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        elif isinstance(obj, Decimal):
-            return float(obj)
-        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
-    
-    def _deserialize_value(self, value: str) -> Any:
-        """反序列化值"""
+        return json_default(obj)
+    
+    def _deserialize_value(self, value: Union[str, bytes], schema: Optional[PayloadSchema] = None) -> Any:
+        """
+        反序列化值
+        
+        带载荷头的二进制值按头部记录的编码器解码（类型已原样保留），
+        其余值按JSON读取，兼容迁移前写入的数据
+        
+        Args:
+            value: 序列化的值
+            schema: 载荷模式，指定时只转换模式中声明的字段
+        """
         if not value:
             return None
+        if isinstance(value, bytes):
+            if is_binary_payload(value):
+                try:
+                    data = decode_binary_payload(value)
+                except Exception as e:
+                    self.logger.error(f"Redis载荷解码失败: {e}")
+                    return None
+                # 写入方可能传入已序列化为字符串的字段（如 Order.to_dict），同样按模式转换
+                return schema.decode(data) if schema is not None else data
+            value = value.decode('utf-8')
         try:
             data = json.loads(value)
-            return self._convert_datetime_strings(data)
         except (json.JSONDecodeError, TypeError):
             return value
+        if schema is not None:
+            return schema.decode(data)
+        return self._convert_datetime_strings(data)
+    
+    @staticmethod
+    def _decode_field(field: Union[str, bytes]) -> str:
+        """哈希表字段名解码为字符串（二进制编码下连接不自动解码响应）"""
+        return field.decode('utf-8') if isinstance(field, bytes) else field
     
     def _convert_datetime_strings(self, data):
-        """递归转换数据中的datetime字符串"""
+        """递归转换数据中的datetime字符串（未登记模式的键使用）"""
         if isinstance(data, dict):
             return {key: self._convert_datetime_strings(val) for key, val in data.items()}
         elif isinstance(data, list):
             return [self._convert_datetime_strings(item) for item in data]
-        elif isinstance(data, str) and self._is_datetime_string(data):
-            try:
-                return datetime.fromisoformat(data)
-            except ValueError:
-                return data
+        elif isinstance(data, str) and looks_like_datetime(data):
+            return parse_datetime(data)
         return data
     
     def _is_datetime_string(self, value: str) -> bool:
         """检查字符串是否为datetime格式"""
-        if not isinstance(value, str) or len(value) < 19:
-            return False
-        # 检查是否符合ISO格式的datetime字符串
-        try:
-            datetime.fromisoformat(value)
-            return True
-        except ValueError:
+        if not isinstance(value, str) or not looks_like_datetime(value):
             return False
+        return isinstance(parse_datetime(value), datetime)
     
     def set(self, key: str, value: Any, ex: Optional[int] = None, 
             px: Optional[int] = None, nx: bool = False, xx: bool = False) -> bool:
@@ -135,7 +364,9 @@ class RedisManager:
         try:
             self._ensure_initialized()
             serialized_value = self._serialize_value(value)
-            return self.client.set(key, serialized_value, ex=ex, px=px, nx=nx, xx=xx)
+            result = self.client.set(key, serialized_value, ex=ex, px=px, nx=nx, xx=xx)
+            self._invalidate_local([key])
+            return result
         except RedisError as e:
             self.logger.error(f"Redis SET失败: key={key}, error={e}")
             return False
@@ -145,7 +376,7 @@ class RedisManager:
         try:
             self._ensure_initialized()
             value = self.client.get(key)
-            return self._deserialize_value(value) if value else None
+            return self._deserialize_value(value, get_schema_for_key(key)) if value else None
         except RedisError as e:
             self.logger.error(f"Redis GET失败: key={key}, error={e}")
             return None
@@ -153,7 +384,9 @@ class RedisManager:
     def delete(self, *keys: str) -> int:
         """删除键"""
         try:
-            return self.client.delete(*keys)
+            result = self.client.delete(*keys)
+            self._invalidate_local(keys)
+            return result
         except RedisError as e:
             self.logger.error(f"Redis DELETE失败: keys={keys}, error={e}")
             return 0
@@ -195,7 +428,7 @@ class RedisManager:
         """获取哈希表字段值"""
         try:
             value = self.client.hget(name, key)
-            return self._deserialize_value(value) if value else None
+            return self._deserialize_value(value, get_schema_for_key(name)) if value else None
         except RedisError as e:
             self.logger.error(f"Redis HGET失败: name={name}, key={key}, error={e}")
             return None
@@ -204,7 +437,9 @@ class RedisManager:
         """获取哈希表所有字段"""
         try:
             data = self.client.hgetall(name)
-            return {k: self._deserialize_value(v) for k, v in data.items()} if data else {}
+            schema = get_schema_for_key(name)
+            return {self._decode_field(k): self._deserialize_value(v, schema)
+                    for k, v in data.items()} if data else {}
         except RedisError as e:
             self.logger.error(f"Redis HGETALL失败: name={name}, error={e}")
             return {}
@@ -217,6 +452,287 @@ class RedisManager:
             self.logger.error(f"Redis HDEL失败: name={name}, keys={keys}, error={e}")
             return 0
     
+    # 本地缓存（L1）
+    def _get_through_local(self, key: str) -> Any:
+        """
+        先读本地缓存，未命中时读取Redis并回填
+        
+        回填与其他进程的写入之间存在竞争窗口，最长在L1 TTL后自愈
+        """
+        if self.local_cache is None or not self.local_cache.ttl_for(key):
+            return self.get(key)
+        
+        value = self.local_cache.get(key)
+        if value is not MISSING:
+            return value
+        
+        value = self.get(key)
+        if value is not None:
+            self.local_cache.set(key, value)
+        return value
+    
+    def _invalidate_local(self, keys) -> None:
+        """使本地缓存中的键失效，并通知其他进程"""
+        if self.local_cache is None:
+            return
+        keys = [key for key in keys if self.local_cache.ttl_for(key)]
+        if not keys:
+            return
+        
+        self.local_cache.invalidate(keys)
+        try:
+            message = json.dumps({'origin': self.node_id, 'keys': keys})
+            self.client.publish(REDIS_KEYS['cache_invalidation_channel'], message)
+        except RedisError as e:
+            self.logger.error(f"发布缓存失效消息失败: keys={keys}, error={e}")
+    
+    def _handle_invalidation_message(self, data: Union[str, bytes]) -> None:
+        """处理其他进程发布的缓存失效消息"""
+        try:
+            message = json.loads(data)
+        except (json.JSONDecodeError, TypeError):
+            return
+        if message.get('origin') == self.node_id:
+            return
+        self.local_cache.invalidate(message.get('keys', []))
+    
+    def _invalidation_loop(self) -> None:
+        """订阅缓存失效通道，连接中断时清空本地缓存并重新订阅"""
+        channel = REDIS_KEYS['cache_invalidation_channel']
+        
+        while self._invalidation_running:
+            pubsub = None
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(channel)
+                # 订阅建立前的失效消息可能已丢失
+                self.local_cache.clear()
+                
+                while self._invalidation_running:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get('type') == 'message':
+                        self._handle_invalidation_message(message['data'])
+                        
+            except RedisError as e:
+                self.logger.error(f"缓存失效订阅中断: {e}")
+                self.local_cache.clear()
+                time.sleep(1.0)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+    
+    def start_invalidation_listener(self) -> None:
+        """启动缓存失效订阅线程"""
+        if self.local_cache is None or self._invalidation_running:
+            return
+        
+        self._invalidation_running = True
+        self._invalidation_thread = threading.Thread(
+            target=self._invalidation_loop,
+            name="CacheInvalidation",
+            daemon=True
+        )
+        self._invalidation_thread.start()
+        self.logger.info("本地缓存失效订阅已启动")
+    
+    def stop_invalidation_listener(self) -> None:
+        """停止缓存失效订阅线程"""
+        if not self._invalidation_running:
+            return
+        self._invalidation_running = False
+        if self._invalidation_thread and self._invalidation_thread.is_alive():
+            self._invalidation_thread.join(timeout=2.0)
+    
+    def publish(self, channel: str, message: Union[str, bytes]) -> int:
+        """发布消息到通道，返回接收到消息的订阅者数"""
+        try:
+            return self.client.publish(channel, message)
+        except RedisError as e:
+            self.logger.error(f"Redis PUBLISH失败: channel={channel}, error={e}")
+            return 0
+    
+    def pubsub(self):
+        """创建发布/订阅对象（忽略订阅确认消息）"""
+        return self.client.pubsub(ignore_subscribe_messages=True)
+    
+    def get_local_cache_statistics(self) -> Optional[Dict[str, Any]]:
+        """获取本地缓存统计信息，未启用时返回None"""
+        return self.local_cache.get_statistics() if self.local_cache is not None else None
+    
+    # 单飞加载
+    def get_or_load(self, key: str, loader: Callable[[], Any],
+                    getter: Optional[Callable[[], Any]] = None,
+                    setter: Optional[Callable[[Any], Any]] = None,
+                    ex: Optional[int] = None, distributed: Optional[bool] = None) -> Any:
+        """
+        读取缓存，未命中时只由一个调用方执行加载并回填，其余调用方等待其结果
+        
+        Args:
+            key: 缓存键（同时作为合并键）
+            loader: 回源加载函数
+            getter: 读取缓存的函数，默认 get(key)
+            setter: 回填缓存的函数，默认 set(key, value, ex=ex)
+            ex: 默认回填方式的过期时间（秒）
+            distributed: 是否使用Redis锁跨进程合并，默认取配置
+            
+        Returns:
+            Any: 缓存值或加载结果（空结果不回填）
+        """
+        getter = getter or (lambda: self.get(key))
+        setter = setter or (lambda value: self.set(key, value, ex=ex))
+        
+        value = getter()
+        if value:
+            return value
+        
+        if distributed is None:
+            distributed = CACHE_CONFIG.get('single_flight_distributed', False)
+        return single_flight.do(key, lambda: self._load_once(key, loader, getter, setter, distributed))
+    
+    def _load_once(self, key: str, loader: Callable[[], Any], getter: Callable[[], Any],
+                   setter: Callable[[Any], Any], distributed: bool) -> Any:
+        """单飞领导者的加载过程"""
+        # 上一个加载者可能刚刚回填了缓存
+        value = getter()
+        if value:
+            return value
+        
+        token = None
+        if distributed:
+            acquired, token = self._acquire_load_lock(key)
+            if not acquired:
+                # 其他进程正在加载，等待其回填缓存
+                value = self._wait_for_cache(getter)
+                if value:
+                    return value
+                self.logger.warning(f"等待其他进程加载超时，自行加载: {key}")
+        
+        try:
+            value = loader()
+            if value:
+                setter(value)
+            return value
+        finally:
+            if token:
+                self._release_load_lock(key, token)
+    
+    def _acquire_load_lock(self, key: str):
+        """
+        获取跨进程加载锁
+        
+        Returns:
+            (是否可以加载, 锁令牌)；Redis异常时允许直接加载且不持有锁
+        """
+        lock_key = f"{REDIS_KEYS['load_lock_prefix']}{key}"
+        token = uuid.uuid4().hex
+        try:
+            ttl_ms = int(CACHE_CONFIG.get('single_flight_lock_ttl', 10) * 1000)
+            if self.client.set(lock_key, token, nx=True, px=ttl_ms):
+                return True, token
+            return False, None
+        except RedisError as e:
+            self.logger.error(f"获取加载锁失败: key={key}, error={e}")
+            return True, None
+    
+    def _release_load_lock(self, key: str, token: str) -> None:
+        """释放跨进程加载锁（只删除自己持有的锁）"""
+        lock_key = f"{REDIS_KEYS['load_lock_prefix']}{key}"
+        try:
+            if self._release_lock_script is None:
+                self._release_lock_script = self.client.register_script(self._RELEASE_LOCK_LUA)
+            self._release_lock_script(keys=[lock_key], args=[token])
+        except RedisError as e:
+            self.logger.error(f"释放加载锁失败: key={key}, error={e}")
+    
+    def _wait_for_cache(self, getter: Callable[[], Any], poll_interval: float = 0.05) -> Any:
+        """轮询等待缓存被其他进程回填"""
+        deadline = time.monotonic() + CACHE_CONFIG.get('single_flight_wait_timeout', 5)
+        while time.monotonic() < deadline:
+            time.sleep(poll_interval)
+            value = getter()
+            if value:
+                return value
+        return None
+    
+    def get_or_load_user(self, user_id: int, loader: Callable[[], Any]) -> Optional[Dict[str, Any]]:
+        """读取缓存的用户信息，未命中时单飞加载"""
+        return self.get_or_load(
+            f"{REDIS_KEYS['user_prefix']}{user_id}", loader,
+            getter=lambda: self.get_cached_user(user_id),
+            setter=lambda value: self.cache_user(user_id, value)
+        )
+    
+    def get_or_load_user_strategies(self, user_id: int, loader: Callable[[], Any]) -> Optional[List[Dict[str, Any]]]:
+        """读取缓存的用户策略，未命中时单飞加载"""
+        return self.get_or_load(
+            f"{REDIS_KEYS['strategy_prefix']}{user_id}", loader,
+            getter=lambda: self.get_cached_user_strategies(user_id),
+            setter=lambda value: self.cache_user_strategies(user_id, value)
+        )
+    
+    def get_or_load_user_orders(self, user_id: int, loader: Callable[[], Any]) -> Optional[List[Dict[str, Any]]]:
+        """读取缓存的用户订单，未命中时单飞加载"""
+        return self.get_or_load(
+            f"{REDIS_KEYS['user_orders_prefix']}{user_id}", loader,
+            getter=lambda: self.get_cached_user_orders(user_id),
+            setter=lambda value: self.cache_user_orders(user_id, value)
+        )
+    
+    def mget(self, keys: List[str]) -> List[Any]:
+        """批量获取值（一次往返），不存在的键对应None"""
+        if not keys:
+            return []
+        try:
+            self._ensure_initialized()
+            values = self.client.mget(keys)
+            return [self._deserialize_value(value, get_schema_for_key(key)) if value else None
+                    for key, value in zip(keys, values)]
+        except RedisError as e:
+            self.logger.error(f"Redis MGET失败: keys={len(keys)}, error={e}")
+            return [None] * len(keys)
+    
+    def mset(self, mapping: Dict[str, Any], ex: Optional[int] = None) -> bool:
+        """
+        批量设置值（一次往返）
+        
+        Args:
+            mapping: {key: value}
+            ex: 过期时间（秒），指定时通过管道逐键SET
+        """
+        if not mapping:
+            return True
+        try:
+            self._ensure_initialized()
+            if ex is None:
+                result = bool(self.client.mset({k: self._serialize_value(v) for k, v in mapping.items()}))
+            else:
+                pipe = self.client.pipeline(transaction=False)
+                for key, value in mapping.items():
+                    pipe.set(key, self._serialize_value(value), ex=ex)
+                result = all(pipe.execute())
+            self._invalidate_local(mapping.keys())
+            return result
+        except RedisError as e:
+            self.logger.error(f"Redis MSET失败: keys={len(mapping)}, error={e}")
+            return False
+    
+    def pipeline(self, transaction: bool = False) -> RedisPipeline:
+        """
+        创建带序列化的管道
+        
+        Args:
+            transaction: 是否以MULTI/EXEC事务执行
+        """
+        self._ensure_initialized()
+        return RedisPipeline(self, transaction=transaction)
+    
+    def transaction(self) -> RedisPipeline:
+        """创建事务管道（MULTI/EXEC）"""
+        return self.pipeline(transaction=True)
+    
     def sadd(self, name: str, *values: Any) -> int:
         """添加集合成员"""
         try:
@@ -288,7 +804,23 @@ class RedisManager:
     def get_cached_user(self, user_id: int) -> Optional[Dict[str, Any]]:
         """获取缓存的用户信息"""
         key = f"{REDIS_KEYS['user_prefix']}{user_id}"
-        return self.get(key)
+        return self._get_through_local(key)
+    
+    def cache_users(self, users: List[Dict[str, Any]]) -> bool:
+        """批量缓存用户信息（一次往返）"""
+        return self.mset({f"{REDIS_KEYS['user_prefix']}{user['id']}": user for user in users},
+                         ex=CACHE_CONFIG['user_cache_ttl'])
+    
+    def get_cached_users(self, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        批量获取缓存的用户信息（一次往返）
+        
+        Returns:
+            Dict[int, Dict[str, Any]]: {user_id: 用户数据}，未缓存的用户不包含在内
+        """
+        user_ids = list(user_ids)
+        values = self.mget([f"{REDIS_KEYS['user_prefix']}{user_id}" for user_id in user_ids])
+        return {user_id: value for user_id, value in zip(user_ids, values) if value}
     
     def cache_user_strategies(self, user_id: int, strategies: List[Dict[str, Any]]) -> bool:
         """缓存用户策略"""
@@ -298,22 +830,151 @@ class RedisManager:
     def get_cached_user_strategies(self, user_id: int) -> Optional[List[Dict[str, Any]]]:
         """获取缓存的用户策略"""
         key = f"{REDIS_KEYS['strategy_prefix']}{user_id}"
-        return self.get(key)
+        return self._get_through_local(key)
+    
+    def _user_order_keys(self, user_id: int):
+        """用户订单哈希表和活跃订单集合的键"""
+        return (f"{REDIS_KEYS['user_orders_prefix']}{user_id}",
+                f"{REDIS_KEYS['user_active_orders_prefix']}{user_id}")
     
     def cache_user_orders(self, user_id: int, orders: List[Dict[str, Any]]) -> bool:
-        """缓存用户订单"""
-        key = f"{REDIS_KEYS['user_orders_prefix']}{user_id}"
-        return self.set(key, orders, ex=CACHE_CONFIG['order_cache_ttl'])
+        """
+        缓存用户订单
+        
+        订单保存为哈希表（order_id -> 订单记录），活跃订单ID另存一个集合，
+        单个订单变化时只需修改对应字段
+        """
+        orders_key, active_key = self._user_order_keys(user_id)
+        ttl = CACHE_CONFIG['order_cache_ttl']
+        try:
+            self._ensure_initialized()
+            pipe = self.client.pipeline(transaction=True)
+            pipe.delete(orders_key, active_key)
+            if orders:
+                pipe.hset(orders_key, mapping={
+                    str(order['id']): self._serialize_value(order) for order in orders
+                })
+                active_ids = [order['id'] for order in orders if order.get('status') in (0, 1)]
+                if active_ids:
+                    pipe.sadd(active_key, *active_ids)
+                pipe.expire(orders_key, ttl)
+                pipe.expire(active_key, ttl)
+            pipe.execute()
+            return True
+        except RedisError as e:
+            self.logger.error(f"缓存用户订单失败: user_id={user_id}, error={e}")
+            return False
     
     def get_cached_user_orders(self, user_id: int) -> Optional[List[Dict[str, Any]]]:
         """获取缓存的用户订单"""
-        key = f"{REDIS_KEYS['user_orders_prefix']}{user_id}"
-        return self.get(key)
+        orders_key, _ = self._user_order_keys(user_id)
+        try:
+            self._ensure_initialized()
+            data = self.client.hgetall(orders_key)
+            if not data:
+                return None
+            return [self._deserialize_value(value, ORDER_SCHEMA) for value in data.values()]
+        except RedisError as e:
+            self.logger.error(f"获取缓存的用户订单失败: user_id={user_id}, error={e}")
+            return None
+    
+    def get_cached_active_orders(self, user_id: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        只获取缓存中的活跃订单（读取活跃订单集合后HMGET对应字段）
+        
+        Returns:
+            Optional[List[Dict[str, Any]]]: 活跃订单列表，缓存不存在时返回None
+        """
+        orders_key, active_key = self._user_order_keys(user_id)
+        try:
+            self._ensure_initialized()
+            pipe = self.client.pipeline(transaction=False)
+            pipe.exists(orders_key)
+            pipe.smembers(active_key)
+            exists, active_ids = pipe.execute()
+            if not exists:
+                return None
+            if not active_ids:
+                return []
+            values = self.client.hmget(orders_key, list(active_ids))
+            return [self._deserialize_value(value, ORDER_SCHEMA) for value in values if value]
+        except RedisError as e:
+            self.logger.error(f"获取缓存的活跃订单失败: user_id={user_id}, error={e}")
+            return None
+    
+    def get_cached_orders(self, user_id: int, order_ids: Iterable[int]) -> Optional[List[Dict[str, Any]]]:
+        """
+        按订单ID获取缓存中的订单，哈希表中不存在的订单不返回
+        
+        Returns:
+            Optional[List[Dict[str, Any]]]: 订单列表，缓存不存在时返回None
+        """
+        orders_key, _ = self._user_order_keys(user_id)
+        order_ids = [str(order_id) for order_id in order_ids]
+        try:
+            self._ensure_initialized()
+            pipe = self.client.pipeline(transaction=False)
+            pipe.exists(orders_key)
+            pipe.hmget(orders_key, order_ids)
+            exists, values = pipe.execute()
+            if not exists:
+                return None
+            return [self._deserialize_value(value, ORDER_SCHEMA) for value in values if value]
+        except RedisError as e:
+            self.logger.error(f"获取缓存订单失败: user_id={user_id}, error={e}")
+            return None
+    
+    def patch_cached_user_order(self, user_id: int, order: Dict[str, Any]) -> bool:
+        """
+        更新缓存中的单个订单（缓存不存在时不创建，避免产生不完整的缓存）
+        
+        Args:
+            user_id: 用户ID
+            order: 订单数据
+            
+        Returns:
+            bool: 缓存存在并已更新时返回True
+        """
+        orders_key, active_key = self._user_order_keys(user_id)
+        try:
+            self._ensure_initialized()
+            if self._patch_order_script is None:
+                self._patch_order_script = self.client.register_script(self._PATCH_ORDER_LUA)
+            active = 1 if order.get('status') in (0, 1) else 0
+            return bool(self._patch_order_script(
+                keys=[orders_key, active_key],
+                args=[order['id'], self._serialize_value(order), active]
+            ))
+        except RedisError as e:
+            self.logger.error(f"更新缓存订单失败: user_id={user_id}, order_id={order.get('id')}, error={e}")
+            return False
+    
+    def remove_cached_user_order(self, user_id: int, order_id: int) -> bool:
+        """从缓存中移除单个订单"""
+        orders_key, active_key = self._user_order_keys(user_id)
+        try:
+            self._ensure_initialized()
+            pipe = self.client.pipeline(transaction=True)
+            pipe.hdel(orders_key, order_id)
+            pipe.srem(active_key, order_id)
+            pipe.execute()
+            return True
+        except RedisError as e:
+            self.logger.error(f"移除缓存订单失败: user_id={user_id}, order_id={order_id}, error={e}")
+            return False
     
     def add_active_user(self, user_id: int) -> bool:
         """添加活跃用户"""
         return bool(self.sadd(REDIS_KEYS['active_users'], user_id))
     
+    def add_active_users(self, user_ids: List[int], batch_size: int = 1000) -> int:
+        """批量添加活跃用户，每批一条SADD"""
+        user_ids = list(user_ids)
+        added = 0
+        for i in range(0, len(user_ids), batch_size):
+            added += self.sadd(REDIS_KEYS['active_users'], *user_ids[i:i + batch_size])
+        return added
+    
     def remove_active_user(self, user_id: int) -> bool:
         """移除活跃用户"""
         return bool(self.srem(REDIS_KEYS['active_users'], user_id))
@@ -326,6 +987,162 @@ class RedisManager:
         """检查用户是否活跃"""
         return self.sismember(REDIS_KEYS['active_users'], user_id)
     
+    def _lease_keys(self, bucket: int):
+        """租约键和防护令牌计数器键"""
+        return f"{REDIS_KEYS['lease_prefix']}{bucket}", f"{REDIS_KEYS['lease_fence_prefix']}{bucket}"
+    
+    def acquire_leases(self, buckets: List[int], node_id: str, ttl: float) -> Dict[int, int]:
+        """
+        批量尝试获取分桶租约（一次往返）
+        
+        Args:
+            buckets: 分桶编号列表
+            node_id: 节点ID
+            ttl: 租约有效期（秒）
+            
+        Returns:
+            Dict[int, int]: {分桶: 防护令牌}，只包含获取成功的分桶
+        """
+        if not buckets:
+            return {}
+        try:
+            self._ensure_initialized()
+            if self._acquire_lease_script is None:
+                self._acquire_lease_script = self.client.register_script(self._ACQUIRE_LEASE_LUA)
+            pipe = self.client.pipeline(transaction=False)
+            for bucket in buckets:
+                self._acquire_lease_script(keys=list(self._lease_keys(bucket)), args=[node_id, int(ttl * 1000)],
+                                           client=pipe)
+            tokens = pipe.execute()
+            return {bucket: int(token) for bucket, token in zip(buckets, tokens) if token}
+        except RedisError as e:
+            self.logger.error(f"获取租约失败: node={node_id}, error={e}")
+            return {}
+    
+    def renew_leases(self, leases: Dict[int, int], node_id: str, ttl: float) -> Optional[Set[int]]:
+        """
+        批量续期租约（一次往返）
+        
+        Args:
+            leases: {分桶: 防护令牌}
+            node_id: 节点ID
+            ttl: 租约有效期（秒）
+            
+        Returns:
+            Optional[Set[int]]: 续期成功的分桶，Redis异常时返回None（租约是否仍有效未知）
+        """
+        if not leases:
+            return set()
+        buckets = list(leases)
+        try:
+            self._ensure_initialized()
+            if self._renew_lease_script is None:
+                self._renew_lease_script = self.client.register_script(self._RENEW_LEASE_LUA)
+            pipe = self.client.pipeline(transaction=False)
+            for bucket in buckets:
+                self._renew_lease_script(keys=[self._lease_keys(bucket)[0]],
+                                         args=[f"{node_id}:{leases[bucket]}", int(ttl * 1000)], client=pipe)
+            results = pipe.execute()
+            return {bucket for bucket, renewed in zip(buckets, results) if renewed}
+        except RedisError as e:
+            self.logger.error(f"续期租约失败: node={node_id}, error={e}")
+            return None
+    
+    def release_leases(self, leases: Dict[int, int], node_id: str) -> int:
+        """
+        批量释放本节点持有的租约
+        
+        Returns:
+            int: 释放的租约数
+        """
+        if not leases:
+            return 0
+        try:
+            self._ensure_initialized()
+            if self._release_lock_script is None:
+                self._release_lock_script = self.client.register_script(self._RELEASE_LOCK_LUA)
+            pipe = self.client.pipeline(transaction=False)
+            for bucket, token in leases.items():
+                self._release_lock_script(keys=[self._lease_keys(bucket)[0]], args=[f"{node_id}:{token}"],
+                                          client=pipe)
+            return sum(1 for released in pipe.execute() if released)
+        except RedisError as e:
+            self.logger.error(f"释放租约失败: node={node_id}, error={e}")
+            return 0
+    
+    def get_free_lease_buckets(self, buckets: List[int]) -> Set[int]:
+        """获取当前没有节点持有租约的分桶"""
+        if not buckets:
+            return set()
+        try:
+            self._ensure_initialized()
+            values = self.client.mget([self._lease_keys(bucket)[0] for bucket in buckets])
+            return {bucket for bucket, value in zip(buckets, values) if value is None}
+        except RedisError as e:
+            self.logger.error(f"查询空闲租约失败: error={e}")
+            return set()
+    
+    def get_lease_fence(self, bucket: int) -> Optional[int]:
+        """获取分桶最新发放的防护令牌"""
+        try:
+            self._ensure_initialized()
+            value = self.client.get(self._lease_keys(bucket)[1])
+            return int(value) if value is not None else None
+        except RedisError as e:
+            self.logger.error(f"获取防护令牌失败: bucket={bucket}, error={e}")
+            return None
+    
+    def get_lease_fences(self, buckets: List[int]) -> Optional[Dict[int, Optional[int]]]:
+        """
+        批量获取分桶最新发放的防护令牌（一次MGET）
+        
+        Returns:
+            Optional[Dict[int, Optional[int]]]: {分桶: 防护令牌}，Redis异常时返回None
+        """
+        if not buckets:
+            return {}
+        try:
+            self._ensure_initialized()
+            values = self.client.mget([self._lease_keys(bucket)[1] for bucket in buckets])
+            return {bucket: int(value) if value is not None else None for bucket, value in zip(buckets, values)}
+        except RedisError as e:
+            self.logger.error(f"批量获取防护令牌失败: error={e}")
+            return None
+    
+    def heartbeat_lease_node(self, node_id: str, ttl: float) -> Optional[List[str]]:
+        """
+        登记节点心跳并返回所有存活节点
+        
+        Args:
+            node_id: 节点ID
+            ttl: 心跳有效期（秒）
+            
+        Returns:
+            Optional[List[str]]: 存活节点ID列表（已排序），Redis异常时返回None
+        """
+        key = REDIS_KEYS['lease_nodes']
+        now_ms = int(time.time() * 1000)
+        try:
+            self._ensure_initialized()
+            pipe = self.client.pipeline(transaction=True)
+            pipe.zadd(key, {node_id: now_ms + int(ttl * 1000)})
+            pipe.zremrangebyscore(key, '-inf', now_ms)
+            pipe.zrange(key, 0, -1)
+            nodes = pipe.execute()[-1]
+            return sorted(node.decode('utf-8') if isinstance(node, bytes) else node for node in nodes)
+        except RedisError as e:
+            self.logger.error(f"登记节点心跳失败: node={node_id}, error={e}")
+            return None
+    
+    def remove_lease_node(self, node_id: str) -> bool:
+        """移除节点心跳（正常退出时调用，其他节点立即重新分配）"""
+        try:
+            self._ensure_initialized()
+            return bool(self.client.zrem(REDIS_KEYS['lease_nodes'], node_id))
+        except RedisError as e:
+            self.logger.error(f"移除节点心跳失败: node={node_id}, error={e}")
+            return False
+    
     def set_strategy_status(self, strategy_id: int, status: int) -> bool:
         """设置策略状态"""
         key = f"{REDIS_KEYS['strategy_status']}{strategy_id}"
@@ -334,14 +1151,14 @@ class RedisManager:
     def get_strategy_status(self, strategy_id: int) -> Optional[int]:
         """获取策略状态"""
         key = f"{REDIS_KEYS['strategy_status']}{strategy_id}"
-        return self.get(key)
+        return self._get_through_local(key)
     
     def clear_user_cache(self, user_id: int):
         """清除用户相关缓存"""
         keys_to_delete = [
             f"{REDIS_KEYS['user_prefix']}{user_id}",
             f"{REDIS_KEYS['strategy_prefix']}{user_id}",
-            f"{REDIS_KEYS['user_orders_prefix']}{user_id}"
+            *self._user_order_keys(user_id)
         ]
         self.delete(*keys_to_delete)
         self.remove_active_user(user_id)
@@ -370,6 +1187,7 @@ class RedisManager:
     
     def close_pool(self):
         """关闭连接池"""
+        self.stop_invalidation_listener()
         try:
             if self.pool:
                 self.pool.disconnect()
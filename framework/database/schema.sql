@@ -89,9 +89,13 @@ CREATE TABLE IF NOT EXISTS `system_monitor` (
 -- 订单表复合索引
 ALTER TABLE `orders` ADD INDEX `idx_user_symbol_status` (`user_id`, `symbol`, `status`);
 ALTER TABLE `orders` ADD INDEX `idx_strategy_status_time` (`strategy_id`, `status`, `order_time`);
+-- 增量同步按 update_time 水位查询
+ALTER TABLE `orders` ADD INDEX `idx_user_update_time` (`user_id`, `update_time`);
 
 -- 用户策略表复合索引  
 ALTER TABLE `user_strategies` ADD INDEX `idx_user_type_status` (`user_id`, `strategy_type`, `status`);
+-- 策略变更订阅按 updated_at 水位查询
+ALTER TABLE `user_strategies` ADD INDEX `idx_updated_at` (`updated_at`);
 
 -- 插入测试数据（可选）
 INSERT INTO `users` (`username`, `email`, `status`) VALUES 
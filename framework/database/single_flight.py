@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+单飞（single-flight）请求合并
+同一个键同一时间只允许一个加载过程，其余调用方等待并共享它的结果，
+避免缓存过期时大量线程同时回源数据库
+"""
+import threading
+import logging
+from typing import Any, Callable, Dict
+from ..config import CACHE_CONFIG
+from ..metrics import MetricSet
+
+
+class _Call:
+    """一次进行中的加载"""
+
+    __slots__ = ('event', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """进程内单飞请求合并器（线程安全）"""
+
+    def __init__(self, wait_timeout: float = 10.0):
+        """
+        初始化单飞合并器
+
+        Args:
+            wait_timeout: 跟随者等待加载结果的最长时间（秒），超时后自行加载
+        """
+        self.wait_timeout = wait_timeout
+        self._calls = {}  # {key: _Call}
+        self.lock = threading.Lock()
+
+        # 统计信息（分片计数器）
+        self.stats = MetricSet(
+            'single_flight',
+            counters=('leaders', 'followers', 'wait_timeouts', 'errors'),
+            gauges={'in_flight': 0}
+        )
+        self.stats.set_function('in_flight', lambda: len(self._calls))
+
+        self.logger = logging.getLogger(__name__)
+
+    def do(self, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        执行加载，同一键的并发调用合并为一次
+
+        Args:
+            key: 合并键
+            loader: 加载函数
+
+        Returns:
+            Any: 加载结果（领导者抛出的异常会传递给所有跟随者）
+        """
+        with self.lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+            else:
+                call.waiters += 1
+                leader = False
+        self.stats.inc('leaders' if leader else 'followers')
+
+        if not leader:
+            if not call.event.wait(self.wait_timeout):
+                self.stats.inc('wait_timeouts')
+                self.logger.warning(f"等待单飞加载超时，自行加载: {key}")
+                return loader()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = loader()
+            return call.result
+        except Exception as e:
+            call.error = e
+            self.stats.inc('errors')
+            raise
+        finally:
+            with self.lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def in_flight(self) -> int:
+        """进行中的加载数"""
+        return len(self._calls)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        return self.stats.snapshot()
+
+    def __repr__(self):
+        return f"<SingleFlight(in_flight={len(self._calls)})>"
+
+
+# 全局单飞合并器实例（领导者可能先等待其他进程的加载锁，跟随者的等待时间需覆盖锁过期时间）
+single_flight = SingleFlight(
+    wait_timeout=CACHE_CONFIG.get('single_flight_wait_timeout', 5) + CACHE_CONFIG.get('single_flight_lock_ttl', 10)
+)
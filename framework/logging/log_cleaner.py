@@ -11,6 +11,7 @@ from typing import List, Dict, Any
 from datetime import datetime, timedelta
 from pathlib import Path
 from ..config import LOG_CONFIG
+from ..metrics import MetricSet
 
 
 class LogCleaner:
@@ -26,15 +27,12 @@ class LogCleaner:
         self.cleanup_thread = None
         
         # 统计信息
-        self.stats = {
-            'total_cleanups': 0,
-            'total_files_deleted': 0,
-            'total_bytes_freed': 0,
-            'last_cleanup_time': None,
-            'last_cleanup_duration': 0,
-            'errors': 0,
-            'last_error': None
-        }
+        self.stats = MetricSet(
+            'log_cleaner',
+            counters=('total_cleanups', 'total_files_deleted', 'total_bytes_freed', 'errors'),
+            gauges={'last_cleanup_time': None, 'last_cleanup_duration': 0, 'last_error': None},
+            histograms=('cleanup_duration_seconds',)
+        )
         
         self.logger = logging.getLogger(__name__)
         self.lock = threading.RLock()
@@ -208,16 +206,16 @@ class LogCleaner:
             # 清理空目录
             cleanup_stats['dirs_deleted'] = self._cleanup_empty_directories()
             
-            # 更新统计信息
-            with self.lock:
-                self.stats['total_cleanups'] += 1
-                self.stats['total_files_deleted'] += cleanup_stats['files_deleted']
-                self.stats['total_bytes_freed'] += cleanup_stats['bytes_freed']
-                self.stats['last_cleanup_time'] = datetime.now()
-                self.stats['errors'] += cleanup_stats['errors']
-            
             cleanup_stats['duration'] = time.time() - start_time
             
+            # 更新统计信息
+            self.stats.inc('total_cleanups')
+            self.stats.inc('total_files_deleted', cleanup_stats['files_deleted'])
+            self.stats.inc('total_bytes_freed', cleanup_stats['bytes_freed'])
+            self.stats.inc('errors', cleanup_stats['errors'])
+            self.stats.set('last_cleanup_time', datetime.now())
+            self.stats.observe('cleanup_duration_seconds', cleanup_stats['duration'])
+            
             self.logger.info(
                 f"日志清理完成: 删除文件 {cleanup_stats['files_deleted']} 个, "
                 f"释放空间 {cleanup_stats['bytes_freed']} 字节, "
@@ -232,9 +230,8 @@ class LogCleaner:
             cleanup_stats['errors'] += 1
             cleanup_stats['duration'] = time.time() - start_time
             
-            with self.lock:
-                self.stats['errors'] += 1
-                self.stats['last_error'] = str(e)
+            self.stats.inc('errors')
+            self.stats.set('last_error', str(e))
             
             return cleanup_stats
     
@@ -248,17 +245,15 @@ class LogCleaner:
                 cleanup_stats = self.cleanup_once()
                 
                 # 更新统计信息
-                with self.lock:
-                    self.stats['last_cleanup_duration'] = cleanup_stats['duration']
+                self.stats.set('last_cleanup_duration', cleanup_stats['duration'])
                 
                 # 等待下次清理，使用短间隔检查停止标志
                 self._interruptible_sleep(self.cleanup_interval)
                 
             except Exception as e:
                 self.logger.error(f"清理循环异常: {e}")
-                with self.lock:
-                    self.stats['errors'] += 1
-                    self.stats['last_error'] = str(e)
+                self.stats.inc('errors')
+                self.stats.set('last_error', str(e))
                 
                 # 出错时等待较短时间再重试
                 self._interruptible_sleep(60)
@@ -330,7 +325,7 @@ class LogCleaner:
     def get_statistics(self) -> Dict[str, Any]:
         """获取统计信息"""
         with self.lock:
-            stats = self.stats.copy()
+            stats = self.stats.snapshot()
             stats.update({
                 'running': self.running,
                 'log_dir': self.log_dir,
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+指标模块
+提供按线程分片、读取时汇总的计数器/仪表盘/直方图，Prometheus文本格式导出，
+以及热路径区间追踪和线程栈采样
+"""
+
+from .registry import Counter, Gauge, Histogram, MetricsRegistry, MetricSet, metrics
+from .exporter import MetricsExporter, metrics_exporter, render
+from .tracing import Span, Tracer, traced, tracer
+from .sampler import StackSampler, stack_sampler, write_collapsed
+
+__all__ = [
+    'Counter',
+    'Gauge',
+    'Histogram',
+    'MetricsRegistry',
+    'MetricSet',
+    'metrics',
+    'MetricsExporter',
+    'metrics_exporter',
+    'render',
+    'Span',
+    'Tracer',
+    'traced',
+    'tracer',
+    'StackSampler',
+    'stack_sampler',
+    'write_collapsed'
+]
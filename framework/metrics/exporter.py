@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+指标导出
+把注册表中的指标渲染为Prometheus文本格式，通过本地HTTP端点 /metrics 提供，
+或定期写入文本文件供node_exporter的textfile收集器读取
+"""
+import os
+import re
+import threading
+import time
+import logging
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from ..config import METRICS_CONFIG
+from .registry import MetricsRegistry, metrics
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 默认不逐个导出的高基数标签，这些指标汇总为一个无标签序列
+PER_USER_LABEL = 'user_id'
+
+_INVALID_NAME_CHARS = re.compile(r'[^a-zA-Z0-9_:]')
+
+
+def _metric_name(namespace: str, name: str) -> str:
+    name = _INVALID_NAME_CHARS.sub('_', name)
+    return f"{namespace}_{name}" if namespace else name
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def _numeric(value: Any) -> Optional[float]:
+    """仪表盘值转换为数字（时间转换为Unix时间戳），无法转换时返回None"""
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return None
+
+
+def _labels(family, label: Any, extra: str = '') -> str:
+    parts = []
+    if family.label_name is not None and label is not None:
+        parts.append(f'{family.label_name}="{_escape(label)}"')
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def render(registry: Optional[MetricsRegistry] = None, namespace: str = '', per_user_series: bool = False) -> str:
+    """
+    渲染Prometheus文本格式
+
+    Args:
+        registry: 指标注册表，默认使用全局注册表
+        namespace: 指标名前缀
+        per_user_series: 是否逐个导出user_id标签的序列，否则汇总为一个序列
+
+    Returns:
+        str: 文本格式的全部指标
+    """
+    registry = registry or metrics
+    lines = []
+    for family in sorted(registry.families(), key=lambda family: family.name):
+        items = family.series_items()
+        collapse = family.label_name == PER_USER_LABEL and not per_user_series
+        # 汇总时并入已删除序列的累计值，监控器退出后计数器不会回退（否则会被当作重置）
+        retired = family.retired() if collapse else None
+        if not items and retired is None:
+            continue
+        name = _metric_name(namespace, family.name)
+
+        if family.kind == 'counter':
+            if not name.endswith('_total'):
+                name += '_total'
+            if collapse:
+                total = sum(series.value() for _, series in items)
+                samples = [(None, total + retired[0] if retired is not None else total)]
+            else:
+                samples = [(label, series.value()) for label, series in items]
+            body = [f"{name}{_labels(family, label)} {_format_value(value)}" for label, value in samples]
+
+        elif family.kind == 'gauge':
+            if collapse:
+                # 每个用户的仪表盘（启动时间、最近错误等）没有合理的汇总方式
+                continue
+            body = []
+            for label, series in items:
+                value = _numeric(series.value())
+                if value is not None:
+                    body.append(f"{name}{_labels(family, label)} {_format_value(value)}")
+
+        else:
+            if collapse:
+                merged = retired if retired is not None else [0] * (len(family.buckets) + 3)
+                for _, series in items:
+                    for i, value in enumerate(series.merged()):
+                        merged[i] += value
+                samples = [(None, merged)]
+            else:
+                samples = [(label, series.merged()) for label, series in items]
+            body = []
+            for label, merged in samples:
+                cumulative = 0
+                for bound, count in zip(family.buckets + (float('inf'),), merged[:-2]):
+                    cumulative += count
+                    le = 'le="%s"' % _format_value(bound)
+                    body.append(f"{name}_bucket{_labels(family, label, le)} {cumulative}")
+                body.append(f"{name}_sum{_labels(family, label)} {_format_value(merged[-2])}")
+                body.append(f"{name}_count{_labels(family, label)} {merged[-1]}")
+
+        if not body:
+            continue
+        if family.documentation:
+            lines.append(f"# HELP {name} {_escape(family.documentation)}")
+        lines.append(f"# TYPE {name} {family.kind}")
+        lines.extend(body)
+
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsExporter:
+    """指标导出器（HTTP端点和/或文本文件）"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 9108, textfile_path: Optional[str] = None,
+                 textfile_interval: float = 15, namespace: str = '', per_user_series: bool = False,
+                 registry: Optional[MetricsRegistry] = None):
+        """
+        初始化指标导出器
+
+        Args:
+            host: HTTP监听地址
+            port: HTTP端口，0表示不启动HTTP服务
+            textfile_path: 文本文件路径，None表示不写文件
+            textfile_interval: 文本文件写入间隔（秒）
+            namespace: 指标名前缀
+            per_user_series: 是否逐个导出每个用户的序列
+            registry: 指标注册表，默认使用全局注册表
+        """
+        self.host = host
+        self.port = port
+        self.textfile_path = textfile_path
+        self.textfile_interval = textfile_interval
+        self.namespace = namespace
+        self.per_user_series = per_user_series
+        self.registry = registry or metrics
+
+        self.running = False
+        self.server = None
+        self.server_thread = None
+        self.textfile_thread = None
+        self._stop_event = threading.Event()
+
+        # 统计信息
+        self.stats = {
+            'scrapes': 0,
+            'textfile_writes': 0,
+            'errors': 0,
+            'last_render_seconds': None
+        }
+
+        self.logger = logging.getLogger(__name__)
+
+    def render(self) -> str:
+        """渲染当前指标"""
+        start = time.perf_counter()
+        text = render(self.registry, self.namespace, self.per_user_series)
+        self.stats['last_render_seconds'] = time.perf_counter() - start
+        return text
+
+    def _make_handler(self):
+        exporter = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                try:
+                    body = exporter.render().encode('utf-8')
+                    exporter.stats['scrapes'] += 1
+                except Exception as e:
+                    exporter.stats['errors'] += 1
+                    exporter.logger.error(f"渲染指标失败: {e}")
+                    self.send_error(500)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                exporter.logger.debug(format % args)
+
+        return _Handler
+
+    def write_textfile(self) -> bool:
+        """写入一次文本文件（先写临时文件再原子替换，收集器不会读到半个文件）"""
+        if not self.textfile_path:
+            return False
+        try:
+            tmp_path = f"{self.textfile_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.render())
+            os.replace(tmp_path, self.textfile_path)
+            self.stats['textfile_writes'] += 1
+            return True
+        except Exception as e:
+            self.stats['errors'] += 1
+            self.logger.error(f"写入指标文件失败: {self.textfile_path}, 错误: {e}")
+            return False
+
+    def _textfile_loop(self) -> None:
+        while not self._stop_event.wait(self.textfile_interval):
+            self.write_textfile()
+
+    def start(self, port: Optional[int] = None, textfile_path: Optional[str] = None) -> bool:
+        """
+        启动导出器
+
+        Args:
+            port: 覆盖配置的HTTP端口（如分片进程各用一个端口）
+            textfile_path: 覆盖配置的文本文件路径
+
+        Returns:
+            bool: 启动是否成功
+        """
+        if self.running:
+            return True
+        if port is not None:
+            self.port = port
+        if textfile_path is not None:
+            self.textfile_path = textfile_path
+
+        try:
+            self._stop_event.clear()
+            if self.port:
+                self.server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+                self.server.daemon_threads = True
+                self.server_thread = threading.Thread(
+                    target=self.server.serve_forever,
+                    name="MetricsExporter",
+                    daemon=True
+                )
+                self.server_thread.start()
+                self.logger.info(f"指标端点已启动: http://{self.host}:{self.port}/metrics")
+
+            if self.textfile_path:
+                self.textfile_thread = threading.Thread(
+                    target=self._textfile_loop,
+                    name="MetricsTextfile",
+                    daemon=True
+                )
+                self.textfile_thread.start()
+                self.logger.info(f"指标文件导出已启动: {self.textfile_path}")
+
+            self.running = True
+            return True
+
+        except Exception as e:
+            self.logger.error(f"启动指标导出失败: {e}")
+            self.stop()
+            return False
+
+    def stop(self) -> None:
+        """停止导出器（文本文件模式下停止前最后写入一次）"""
+        self._stop_event.set()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.textfile_thread and self.textfile_thread.is_alive():
+            self.textfile_thread.join(timeout=5.0)
+            self.write_textfile()
+        self.textfile_thread = None
+        self.running = False
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        stats = self.stats.copy()
+        stats.update({
+            'running': self.running,
+            'port': self.port if self.server else None,
+            'textfile_path': self.textfile_path
+        })
+        return stats
+
+    def __repr__(self):
+        return f"<MetricsExporter(port={self.port}, running={self.running})>"
+
+
+# 全局指标导出器实例
+metrics_exporter = MetricsExporter(
+    host=METRICS_CONFIG.get('host', '127.0.0.1'),
+    port=METRICS_CONFIG.get('port', 9108),
+    textfile_path=METRICS_CONFIG.get('textfile_path'),
+    textfile_interval=METRICS_CONFIG.get('textfile_interval', 15),
+    namespace=METRICS_CONFIG.get('namespace', ''),
+    per_user_series=METRICS_CONFIG.get('per_user_series', False)
+)
@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""
+指标注册表
+计数器和直方图的每个序列按线程分片：每个线程只写自己的单元格，写入路径不加锁，
+读取时才汇总所有线程的单元格；仪表盘只保存最近一次设置的值（或读取时调用的函数）
+"""
+import threading
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+# 默认直方图桶上界（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Series:
+    """一个标签值的序列：{线程ID: 单元格}，单元格只由对应线程修改"""
+
+    __slots__ = ('cells', 'size')
+
+    def __init__(self, size: int):
+        self.cells = {}
+        self.size = size
+
+    def cell(self) -> list:
+        ident = threading.get_ident()
+        cell = self.cells.get(ident)
+        if cell is None:
+            # 只有本线程会插入自己的ID；线程结束后ID被新线程复用时继续累加，不会丢失或重复计数
+            cell = [0] * self.size
+            self.cells[ident] = cell
+        return cell
+
+    def merged(self) -> list:
+        total = [0] * self.size
+        for cell in list(self.cells.values()):
+            for i, value in enumerate(cell):
+                total[i] += value
+        return total
+
+
+class _Family:
+    """同名指标族，按一个可选标签区分序列"""
+
+    kind = None
+
+    def __init__(self, name: str, documentation: str = '', label_name: Optional[str] = None):
+        self.name = name
+        self.documentation = documentation
+        self.label_name = label_name
+        self._series = {}  # {标签值: 序列}
+        self._retired = None  # 已删除序列的累计值（计数器、直方图），保证汇总值只增不减
+        self._lock = threading.Lock()
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def labels(self, label: Any = None):
+        """获取（或创建）标签值对应的序列"""
+        series = self._series.get(label)
+        if series is None:
+            with self._lock:
+                series = self._series.get(label)
+                if series is None:
+                    series = self._new_series()
+                    self._series[label] = series
+        return series
+
+    def remove(self, label: Any) -> None:
+        """删除标签值对应的序列（如用户监控器退出后）"""
+        with self._lock:
+            series = self._series.pop(label, None)
+            if isinstance(series, _Series):
+                merged = series.merged()
+                if self._retired is None:
+                    self._retired = merged
+                else:
+                    self._retired = [total + value for total, value in zip(self._retired, merged)]
+
+    def retired(self) -> Optional[list]:
+        """已删除序列的累计单元格，没有删除过序列时返回None"""
+        with self._lock:
+            return list(self._retired) if self._retired is not None else None
+
+    def label_values(self) -> Iterable[Any]:
+        with self._lock:
+            return list(self._series)
+
+    def series_items(self) -> list:
+        """[(标签值, 序列)]，供导出时读取原始值"""
+        with self._lock:
+            return list(self._series.items())
+
+
+class _CounterSeries(_Series):
+
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount: float = 1) -> None:
+        self.cell()[0] += amount
+
+    def value(self) -> float:
+        return sum(cell[0] for cell in list(self.cells.values()))
+
+
+class Counter(_Family):
+    """只增计数器"""
+
+    kind = 'counter'
+
+    def _new_series(self):
+        return _CounterSeries()
+
+    def inc(self, amount: float = 1, label: Any = None) -> None:
+        self.labels(label).inc(amount)
+
+    def value(self, label: Any = None) -> float:
+        series = self._series.get(label)
+        return series.value() if series is not None else 0
+
+    def collect(self) -> Dict[Any, float]:
+        """汇总所有标签值 {标签值: 计数}"""
+        return {label: self.value(label) for label in self.label_values()}
+
+
+class _GaugeSeries:
+
+    __slots__ = ('current', 'function')
+
+    def __init__(self):
+        self.current = None
+        self.function = None
+
+    def set(self, value: Any) -> None:
+        self.current = value
+
+    def set_function(self, function: Callable[[], Any]) -> None:
+        self.function = function
+
+    def value(self) -> Any:
+        function = self.function
+        return function() if function is not None else self.current
+
+
+class Gauge(_Family):
+    """仪表盘：最近一次设置的值，或读取时调用函数得到的值"""
+
+    kind = 'gauge'
+
+    def _new_series(self):
+        return _GaugeSeries()
+
+    def set(self, value: Any, label: Any = None) -> None:
+        self.labels(label).set(value)
+
+    def value(self, label: Any = None) -> Any:
+        series = self._series.get(label)
+        return series.value() if series is not None else None
+
+    def collect(self) -> Dict[Any, Any]:
+        return {label: self.value(label) for label in self.label_values()}
+
+
+class _HistogramSeries(_Series):
+    """单元格布局: [各桶计数..., +Inf桶计数, 总和, 总数]"""
+
+    __slots__ = ('bounds',)
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        super().__init__(len(bounds) + 3)
+        self.bounds = bounds
+
+    def observe(self, value: float) -> None:
+        cell = self.cell()
+        cell[bisect_left(self.bounds, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """汇总：总数、总和及按桶估算的分位数"""
+        merged = self.merged()
+        counts = merged[:-2]
+        snapshot = {'count': merged[-1], 'sum': merged[-2]}
+        for percentile in (50, 95, 99):
+            snapshot[f"p{percentile}"] = self._percentile(counts, merged[-1], percentile)
+        return snapshot
+
+    def _percentile(self, counts: list, total: int, percentile: float) -> Optional[float]:
+        """按桶内线性插值估算分位数"""
+        if not total:
+            return None
+        rank = total * percentile / 100
+        seen = 0
+        for i, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                if i >= len(self.bounds):
+                    return lower
+                return lower + (self.bounds[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+
+class Histogram(_Family):
+    """直方图"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str = '', label_name: Optional[str] = None,
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_name)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_series(self):
+        return _HistogramSeries(self.buckets)
+
+    def observe(self, value: float, label: Any = None) -> None:
+        self.labels(label).observe(value)
+
+    def snapshot(self, label: Any = None) -> Optional[Dict[str, Any]]:
+        series = self._series.get(label)
+        return series.snapshot() if series is not None else None
+
+    def collect(self) -> Dict[Any, Dict[str, Any]]:
+        return {label: self.snapshot(label) for label in self.label_values()}
+
+
+class MetricsRegistry:
+    """指标注册表（同名指标只注册一次）"""
+
+    def __init__(self):
+        self._metrics = {}  # {名称: 指标族}
+        self.lock = threading.Lock()
+
+    def _register(self, cls, name: str, documentation: str, label_name: Optional[str], **kwargs) -> _Family:
+        with self.lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, label_name, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"指标 {name} 已注册为 {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str = '', label_name: Optional[str] = None) -> Counter:
+        """注册（或获取已注册的）计数器"""
+        return self._register(Counter, name, documentation, label_name)
+
+    def gauge(self, name: str, documentation: str = '', label_name: Optional[str] = None) -> Gauge:
+        """注册（或获取已注册的）仪表盘"""
+        return self._register(Gauge, name, documentation, label_name)
+
+    def histogram(self, name: str, documentation: str = '', label_name: Optional[str] = None,
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        """注册（或获取已注册的）直方图"""
+        return self._register(Histogram, name, documentation, label_name, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Family]:
+        return self._metrics.get(name)
+
+    def families(self) -> list:
+        """所有已注册的指标族"""
+        with self.lock:
+            return list(self._metrics.values())
+
+    def collect(self) -> Dict[str, Dict[Any, Any]]:
+        """汇总所有指标 {名称: {标签值: 值}}"""
+        return {family.name: family.collect() for family in self.families()}
+
+    def __repr__(self):
+        return f"<MetricsRegistry(metrics={len(self._metrics)})>"
+
+
+class MetricSet:
+    """
+    一个组件的统计指标
+
+    以组件原有的统计键名读写，指标名为 前缀_键名；带标签时（如每个用户一个监控器）
+    同一组件的所有实例共享指标族，按标签值区分序列
+    """
+
+    def __init__(self, prefix: str, counters: Iterable[str] = (), gauges: Optional[Dict[str, Any]] = None,
+                 histograms: Iterable[str] = (), label_name: Optional[str] = None, label: Any = None,
+                 registry: Optional[MetricsRegistry] = None):
+        """
+        初始化组件指标
+
+        Args:
+            prefix: 指标名前缀
+            counters: 计数器键名
+            gauges: 仪表盘键名及初始值
+            histograms: 直方图键名
+            label_name: 标签名（如 user_id）
+            label: 本实例的标签值
+            registry: 指标注册表，默认使用全局注册表
+        """
+        registry = registry or metrics
+        self.label = label
+        self._families = []
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        for key in counters:
+            family = registry.counter(f"{prefix}_{key}", label_name=label_name)
+            self._families.append(family)
+            self._counters[key] = family.labels(label)
+        for key, initial in (gauges or {}).items():
+            family = registry.gauge(f"{prefix}_{key}", label_name=label_name)
+            self._families.append(family)
+            self._gauges[key] = family.labels(label)
+            self._gauges[key].set(initial)
+        for key in histograms:
+            family = registry.histogram(f"{prefix}_{key}", label_name=label_name)
+            self._families.append(family)
+            self._histograms[key] = family.labels(label)
+
+    def inc(self, key: str, amount: float = 1) -> None:
+        """计数器加 amount（不加锁）"""
+        self._counters[key].inc(amount)
+
+    def set(self, key: str, value: Any) -> None:
+        """设置仪表盘的值"""
+        self._gauges[key].set(value)
+
+    def set_function(self, key: str, function: Callable[[], Any]) -> None:
+        """仪表盘改为读取时调用函数"""
+        self._gauges[key].set_function(function)
+
+    def observe(self, key: str, value: float) -> None:
+        """直方图记录一个观测值"""
+        self._histograms[key].observe(value)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._counters:
+            return self._counters[key].value()
+        if key in self._gauges:
+            return self._gauges[key].value()
+        return self._histograms[key].snapshot()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """按原有键名汇总为统计字典"""
+        stats = {key: series.value() for key, series in self._counters.items()}
+        stats.update((key, series.value()) for key, series in self._gauges.items())
+        stats.update((key, series.snapshot()) for key, series in self._histograms.items())
+        return stats
+
+    def remove(self) -> None:
+        """从注册表删除本实例的序列（带标签的组件实例退出时调用）"""
+        for family in self._families:
+            family.remove(self.label)
+
+
+# 全局指标注册表实例
+metrics = MetricsRegistry()
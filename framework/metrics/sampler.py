@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+线程栈采样器
+按固定间隔采集进程内所有线程的调用栈，累计为折叠栈格式（flamegraph.pl / speedscope 可直接读取），
+不需要附加外部性能分析工具
+"""
+import os
+import re
+import sys
+import threading
+import time
+import logging
+from typing import Any, Dict
+from ..config import TRACING_CONFIG
+from .registry import MetricSet
+
+# 线程名末尾的序号（EventWorker-3、UserMonitor_12）合并为同一类线程
+_THREAD_SUFFIX = re.compile(r'[-_]?\d+$')
+
+# 超过上限的新调用栈统一计入该键，避免内存无限增长
+TRUNCATED_STACK = '[truncated]'
+
+
+def write_collapsed(path: str, stacks: Dict[str, int]) -> int:
+    """
+    写出折叠栈文件（每行 "帧;帧;帧 次数"）
+
+    Args:
+        path: 文件路径
+        stacks: 折叠栈 {调用栈: 次数或耗时}
+
+    Returns:
+        int: 写出的行数
+    """
+    lines = [f"{stack} {count}" for stack, count in sorted(stacks.items()) if count > 0]
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+        if lines:
+            f.write('\n')
+    return len(lines)
+
+
+class StackSampler:
+    """线程栈采样器"""
+
+    def __init__(self, interval: float = 0.01, max_depth: int = 64, max_stacks: int = 20000):
+        """
+        初始化采样器
+
+        Args:
+            interval: 采样间隔（秒）
+            max_depth: 每个调用栈保留的最大帧数（保留靠近根的帧）
+            max_stacks: 最多保留的不同调用栈数量
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+
+        self.running = False
+        self.sampler_thread = None
+        self._stop_event = threading.Event()
+        self._frame_labels = {}  # {代码对象: 帧标签}
+        self.stacks = {}  # {折叠栈: 采样次数}
+
+        # 统计信息（计数器只增不减，reset 时记录基线，统计信息按基线报告本轮采样）
+        self.stats = MetricSet(
+            'stack_sampler',
+            counters=('samples', 'sampling_seconds'),
+            gauges={'started_at': None, 'distinct_stacks': 0}
+        )
+        self.stats.set_function('distinct_stacks', lambda: len(self.stacks))
+        self._baseline = {'samples': 0, 'sampling_seconds': 0.0}
+
+        self.logger = logging.getLogger(__name__)
+        self.lock = threading.Lock()
+
+    def _frame_label(self, code) -> str:
+        label = self._frame_labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._frame_labels[code] = label
+        return label
+
+    def sample_once(self) -> None:
+        """采集一次所有线程（不含采样线程自身）的调用栈"""
+        started = time.perf_counter()
+        own_ident = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+        collected = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(self._frame_label(frame.f_code))
+                frame = frame.f_back
+            labels = labels[-self.max_depth:]
+            labels.append(_THREAD_SUFFIX.sub('', names.get(ident, 'thread')))
+            collected.append(';'.join(reversed(labels)))
+
+        with self.lock:
+            for stack in collected:
+                if stack not in self.stacks and len(self.stacks) >= self.max_stacks:
+                    stack = TRUNCATED_STACK
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+        self.stats.inc('samples')
+        self.stats.inc('sampling_seconds', time.perf_counter() - started)
+
+    def _sample_loop(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.sample_once()
+            except Exception as e:
+                self.logger.error(f"线程栈采样失败: {e}")
+
+    def start(self) -> bool:
+        """
+        启动采样
+
+        Returns:
+            bool: 启动是否成功
+        """
+        if self.running:
+            return True
+        try:
+            self._stop_event.clear()
+            self.stats.set('started_at', time.time())
+            self.sampler_thread = threading.Thread(
+                target=self._sample_loop,
+                name="StackSampler",
+                daemon=True
+            )
+            self.sampler_thread.start()
+            self.running = True
+            self.logger.info(f"线程栈采样已启动: 间隔 {self.interval * 1000:.1f} 毫秒")
+            return True
+        except Exception as e:
+            self.logger.error(f"启动线程栈采样失败: {e}")
+            return False
+
+    def stop(self) -> None:
+        """停止采样（已采集的调用栈保留，可继续写出）"""
+        self._stop_event.set()
+        if self.sampler_thread and self.sampler_thread.is_alive():
+            self.sampler_thread.join(timeout=5.0)
+        self.sampler_thread = None
+        self.running = False
+
+    def reset(self) -> None:
+        """清空已采集的调用栈"""
+        with self.lock:
+            self.stacks.clear()
+            self._baseline = {key: self.stats[key] for key in self._baseline}
+
+    def collapsed(self) -> Dict[str, int]:
+        """折叠栈 {"线程;根帧;...;叶帧": 采样次数}"""
+        with self.lock:
+            return dict(self.stacks)
+
+    def write_collapsed(self, path: str) -> int:
+        """写出采样得到的折叠栈文件，返回写出的行数"""
+        return write_collapsed(path, self.collapsed())
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        stats = self.stats.snapshot()
+        for key, base in self._baseline.items():
+            stats[key] -= base
+        stats.update({
+            'running': self.running,
+            'interval': self.interval
+        })
+        if stats['samples']:
+            stats['avg_sample_ms'] = stats['sampling_seconds'] * 1000 / stats['samples']
+        return stats
+
+    def __repr__(self):
+        return f"<StackSampler(interval={self.interval}, running={self.running})>"
+
+
+# 全局线程栈采样器实例
+stack_sampler = StackSampler(
+    interval=TRACING_CONFIG.get('sample_interval', 0.01),
+    max_depth=TRACING_CONFIG.get('max_stack_depth', 64),
+    max_stacks=TRACING_CONFIG.get('max_stacks', 20000)
+)
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+热路径追踪
+在监控流水线的关键方法上记录轻量的时间区间（单调时钟、父子ID），写入固定容量的环形缓冲区；
+未启用时被装饰的方法只多一次属性判断
+"""
+import asyncio
+import functools
+import itertools
+import threading
+import time
+from collections import deque, namedtuple
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+from ..config import TRACING_CONFIG
+
+# 一个已结束的区间；start/end 为 time.perf_counter() 的值
+Span = namedtuple('Span', ('span_id', 'parent_id', 'name', 'tag', 'thread', 'start', 'end'))
+
+# 当前区间ID（线程和协程各自独立）
+_current_span = ContextVar('current_span', default=None)
+
+
+class _ActiveSpan:
+    """进行中的区间（上下文管理器）"""
+
+    __slots__ = ('tracer', 'name', 'tag', 'span_id', 'parent_id', 'start', 'token')
+
+    def __init__(self, tracer: 'Tracer', name: str, tag: Any):
+        self.tracer = tracer
+        self.name = name
+        self.tag = tag
+
+    def __enter__(self):
+        self.span_id = next(self.tracer._ids)
+        self.parent_id = _current_span.get()
+        self.token = _current_span.set(self.span_id)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        _current_span.reset(self.token)
+        # deque.append 是原子操作，满了自动丢弃最旧的区间
+        self.tracer._buffer.append(Span(
+            self.span_id, self.parent_id, self.name, self.tag,
+            threading.current_thread().name, self.start, end
+        ))
+        return False
+
+
+class _NoopSpan:
+    """未启用追踪时的空区间"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """区间追踪器"""
+
+    def __init__(self, enabled: bool = False, buffer_size: int = 65536):
+        """
+        初始化追踪器
+
+        Args:
+            enabled: 是否记录区间
+            buffer_size: 环形缓冲区容量（区间数）
+        """
+        self.enabled = enabled
+        self.buffer_size = buffer_size
+        self._buffer = deque(maxlen=buffer_size)
+        self._ids = itertools.count(1)
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def clear(self) -> None:
+        self._buffer.clear()
+
+    def span(self, name: str, tag: Any = None):
+        """
+        区间上下文管理器
+
+        Args:
+            name: 区间名称
+            tag: 附加标识（如用户ID）
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _ActiveSpan(self, name, tag)
+
+    def spans(self) -> List[Span]:
+        """缓冲区中已结束的区间（按结束顺序）"""
+        while True:
+            try:
+                return list(self._buffer)
+            except RuntimeError:
+                # 复制过程中有其他线程写入，重试
+                continue
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        按名称汇总缓冲区中的区间
+
+        Returns:
+            Dict: {名称: {count, total_seconds, self_seconds, avg_ms, max_ms}}，
+                  self_seconds 为扣除子区间后的耗时
+        """
+        spans = self.spans()
+        child_time = {}
+        for span in spans:
+            if span.parent_id is not None:
+                child_time[span.parent_id] = child_time.get(span.parent_id, 0.0) + span.end - span.start
+
+        summary = {}
+        for span in spans:
+            duration = span.end - span.start
+            item = summary.get(span.name)
+            if item is None:
+                item = summary[span.name] = {'count': 0, 'total_seconds': 0.0, 'self_seconds': 0.0, 'max_ms': 0.0}
+            item['count'] += 1
+            item['total_seconds'] += duration
+            item['self_seconds'] += max(0.0, duration - child_time.get(span.span_id, 0.0))
+            item['max_ms'] = max(item['max_ms'], duration * 1000)
+        for item in summary.values():
+            item['avg_ms'] = item['total_seconds'] * 1000 / item['count']
+        return summary
+
+    def collapsed(self) -> Dict[str, int]:
+        """
+        区间树转换为折叠栈格式 {"父;子;孙": 自身耗时微秒}，可直接生成火焰图；
+        父区间已被环形缓冲区淘汰的区间作为根
+        """
+        spans = self.spans()
+        by_id = {span.span_id: span for span in spans}
+        child_time = {}
+        for span in spans:
+            if span.parent_id in by_id:
+                child_time[span.parent_id] = child_time.get(span.parent_id, 0.0) + span.end - span.start
+
+        stacks = {}
+        for span in spans:
+            path = [span.name]
+            parent = by_id.get(span.parent_id)
+            while parent is not None:
+                path.append(parent.name)
+                parent = by_id.get(parent.parent_id)
+            key = ';'.join(reversed(path))
+            self_time = max(0.0, span.end - span.start - child_time.get(span.span_id, 0.0))
+            stacks[key] = stacks.get(key, 0) + int(self_time * 1_000_000)
+        return stacks
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        return {
+            'enabled': self.enabled,
+            'buffer_size': self.buffer_size,
+            'buffered_spans': len(self._buffer)
+        }
+
+    def __repr__(self):
+        return f"<Tracer(enabled={self.enabled}, spans={len(self._buffer)})>"
+
+
+def traced(name: str, tag: Optional[str] = None) -> Callable:
+    """
+    方法追踪装饰器（支持协程函数）
+
+    Args:
+        name: 区间名称
+        tag: 作为区间标识的实例属性名（如 'user_id'）
+    """
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not tracer.enabled:
+                    return await func(*args, **kwargs)
+                with tracer.span(name, getattr(args[0], tag, None) if tag and args else None):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with tracer.span(name, getattr(args[0], tag, None) if tag and args else None):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+# 全局追踪器实例
+tracer = Tracer(
+    enabled=TRACING_CONFIG.get('enabled', False),
+    buffer_size=TRACING_CONFIG.get('buffer_size', 65536)
+)
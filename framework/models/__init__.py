@@ -3,7 +3,7 @@
 数据模型模块
 """
 from .user import User
-from .order import Order
+from .order import Order, OrderChange, OrderChangeType
 from .strategy import UserStrategy
 
-__all__ = ['User', 'Order', 'UserStrategy']
\ No newline at end of file
+__all__ = ['User', 'Order', 'OrderChange', 'OrderChangeType', 'UserStrategy']
\ No newline at end of file
@@ -2,14 +2,92 @@
 """
 订单数据模型
 """
-from datetime import datetime
-from decimal import Decimal
-from typing import Optional, Dict, Any
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_EVEN
+from dataclasses import dataclass
+from enum import Enum
+from typing import Optional, Dict, Any, Tuple
 import json
 
 
+# 数量/价格按 DECIMAL(20,8) 的精度保存为缩放整数
+DECIMAL_SCALE = 8
+_SCALE_FACTOR = 10 ** DECIMAL_SCALE
+_QUANTUM = Decimal(1).scaleb(-DECIMAL_SCALE)
+
+# 无时区datetime保存为相对该纪元的微秒整数
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _to_scaled(value: Any) -> Optional[int]:
+    """将数值转换为缩放整数"""
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value * _SCALE_FACTOR
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    # 不超过8位小数（数据库读出的值）时乘法结果就是精确整数，省去quantize
+    scaled = value * _SCALE_FACTOR
+    integral = int(scaled)
+    if integral == scaled:
+        return integral
+    return int(value.quantize(_QUANTUM, rounding=ROUND_HALF_EVEN).scaleb(DECIMAL_SCALE))
+
+
+def _from_scaled(value: Optional[int]) -> Optional[Decimal]:
+    """将缩放整数还原为Decimal（除法得到最短的精确表示，如 1.5、0）"""
+    if value is None:
+        return None
+    return Decimal(value) / _SCALE_FACTOR
+
+
+def _format_scaled(value: int) -> str:
+    """
+    缩放整数按列精度格式化为定点小数字符串（如 '100.50000000'、'0.00000000'），只用整数运算
+
+    与 str() 数据库读出的 DECIMAL(20,8) 值一致，事件载荷和缓存记录的格式保持不变
+    """
+    sign = '-' if value < 0 else ''
+    whole, fraction = divmod(abs(value), _SCALE_FACTOR)
+    return f"{sign}{whole}.{fraction:0{DECIMAL_SCALE}d}"
+
+
+def _to_timestamp(value: Any) -> Any:
+    """将无时区datetime（或ISO字符串）转换为微秒整数，其他值原样保存"""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            return (value - _EPOCH) // _MICROSECOND
+        return value
+    if isinstance(value, str):
+        try:
+            return _to_timestamp(datetime.fromisoformat(value))
+        except ValueError:
+            return value
+    return value
+
+
+def _from_timestamp(value: Any) -> Any:
+    """将微秒整数还原为datetime"""
+    if isinstance(value, int):
+        return _EPOCH + timedelta(0, 0, value)
+    return value
+
+
 class Order:
-    """订单模型类"""
+    """
+    订单模型类
+    
+    使用 __slots__ 避免每个实例的 __dict__，数量和价格保存为缩放整数，
+    时间保存为微秒整数，仅在访问属性时才构造 Decimal/datetime
+    """
+    
+    __slots__ = (
+        'id', 'user_id', 'strategy_id', 'order_no', 'symbol', 'order_type', 'status',
+        '_quantity', '_price', '_filled_quantity', '_avg_price', '_commission',
+        '_order_time', '_update_time', '_extra_data',
+    )
     
     # 订单类型常量
     ORDER_TYPE_BUY = 1
@@ -22,6 +100,14 @@ class Order:
     STATUS_CANCELLED = 3    # 已取消
     STATUS_FAILED = 4       # 失败
     
+    STATUS_NAMES = {
+        STATUS_PENDING: "待处理",
+        STATUS_PARTIAL: "部分成交",
+        STATUS_FILLED: "完全成交",
+        STATUS_CANCELLED: "已取消",
+        STATUS_FAILED: "失败",
+    }
+    
     def __init__(self, id: int = None, user_id: int = None, strategy_id: int = None,
                  order_no: str = None, symbol: str = None, order_type: int = None,
                  quantity: Decimal = None, price: Decimal = None, status: int = STATUS_PENDING,
@@ -34,15 +120,84 @@ class Order:
         self.order_no = order_no
         self.symbol = symbol
         self.order_type = order_type
-        self.quantity = quantity or Decimal('0')
-        self.price = price or Decimal('0')
+        self._quantity = _to_scaled(quantity) or 0
+        self._price = _to_scaled(price) or 0
         self.status = status
-        self.filled_quantity = filled_quantity or Decimal('0')
-        self.avg_price = avg_price
-        self.commission = commission or Decimal('0')
-        self.order_time = order_time or datetime.now()
-        self.update_time = update_time or datetime.now()
-        self.extra_data = extra_data or {}
+        self._filled_quantity = _to_scaled(filled_quantity) or 0
+        self._avg_price = _to_scaled(avg_price)
+        self._commission = _to_scaled(commission) or 0
+        self._order_time = _to_timestamp(order_time or datetime.now())
+        self._update_time = _to_timestamp(update_time or datetime.now())
+        self._extra_data = extra_data or None
+    
+    # 数量和价格属性：按需构造Decimal
+    @property
+    def quantity(self) -> Decimal:
+        return _from_scaled(self._quantity)
+    
+    @quantity.setter
+    def quantity(self, value):
+        self._quantity = _to_scaled(value) or 0
+    
+    @property
+    def price(self) -> Decimal:
+        return _from_scaled(self._price)
+    
+    @price.setter
+    def price(self, value):
+        self._price = _to_scaled(value) or 0
+    
+    @property
+    def filled_quantity(self) -> Decimal:
+        return _from_scaled(self._filled_quantity)
+    
+    @filled_quantity.setter
+    def filled_quantity(self, value):
+        self._filled_quantity = _to_scaled(value) or 0
+    
+    @property
+    def avg_price(self) -> Optional[Decimal]:
+        return _from_scaled(self._avg_price)
+    
+    @avg_price.setter
+    def avg_price(self, value):
+        self._avg_price = _to_scaled(value)
+    
+    @property
+    def commission(self) -> Decimal:
+        return _from_scaled(self._commission)
+    
+    @commission.setter
+    def commission(self, value):
+        self._commission = _to_scaled(value) or 0
+    
+    # 时间属性：按需构造datetime
+    @property
+    def order_time(self) -> datetime:
+        return _from_timestamp(self._order_time)
+    
+    @order_time.setter
+    def order_time(self, value):
+        self._order_time = _to_timestamp(value)
+    
+    @property
+    def update_time(self) -> datetime:
+        return _from_timestamp(self._update_time)
+    
+    @update_time.setter
+    def update_time(self, value):
+        self._update_time = _to_timestamp(value)
+    
+    @property
+    def extra_data(self) -> Dict:
+        # 大多数订单没有扩展数据，首次访问时才创建字典
+        if self._extra_data is None:
+            self._extra_data = {}
+        return self._extra_data
+    
+    @extra_data.setter
+    def extra_data(self, value):
+        self._extra_data = value or None
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典格式"""
@@ -53,15 +208,15 @@ class Order:
             'order_no': self.order_no,
             'symbol': self.symbol,
             'order_type': self.order_type,
-            'quantity': str(self.quantity),
-            'price': str(self.price),
+            'quantity': _format_scaled(self._quantity),
+            'price': _format_scaled(self._price),
             'status': self.status,
-            'filled_quantity': str(self.filled_quantity),
-            'avg_price': str(self.avg_price) if self.avg_price else None,
-            'commission': str(self.commission),
+            'filled_quantity': _format_scaled(self._filled_quantity),
+            'avg_price': _format_scaled(self._avg_price) if self._avg_price else None,
+            'commission': _format_scaled(self._commission),
             'order_time': self.order_time.isoformat() if self.order_time else None,
             'update_time': self.update_time.isoformat() if self.update_time else None,
-            'extra_data': self.extra_data,
+            'extra_data': self._extra_data or {},
         }
     
     @classmethod
@@ -74,34 +229,72 @@ class Order:
             order_no=data.get('order_no'),
             symbol=data.get('symbol'),
             order_type=data.get('order_type'),
-            quantity=Decimal(str(data.get('quantity', '0'))),
-            price=Decimal(str(data.get('price', '0'))),
+            quantity=data.get('quantity', '0'),
+            price=data.get('price', '0'),
             status=data.get('status', cls.STATUS_PENDING),
-            filled_quantity=Decimal(str(data.get('filled_quantity', '0'))),
-            avg_price=Decimal(str(data.get('avg_price'))) if data.get('avg_price') else None,
-            commission=Decimal(str(data.get('commission', '0'))),
+            filled_quantity=data.get('filled_quantity', '0'),
+            avg_price=data.get('avg_price') or None,
+            commission=data.get('commission', '0'),
             order_time=data.get('order_time'),
             update_time=data.get('update_time'),
             extra_data=data.get('extra_data', {})
         )
     
+    def update_from_dict(self, data: Dict[str, Any]) -> None:
+        """用字典数据原地更新订单对象（字段转换规则与from_dict一致）"""
+        self.strategy_id = data.get('strategy_id', self.strategy_id)
+        self.order_no = data.get('order_no', self.order_no)
+        self.symbol = data.get('symbol', self.symbol)
+        self.order_type = data.get('order_type', self.order_type)
+        self.quantity = data.get('quantity', '0')
+        self.price = data.get('price', '0')
+        self.status = data.get('status', self.STATUS_PENDING)
+        self.filled_quantity = data.get('filled_quantity', '0')
+        self.avg_price = data.get('avg_price') or None
+        self.commission = data.get('commission', '0')
+        if data.get('order_time'):
+            self.order_time = data['order_time']
+        if data.get('update_time'):
+            self.update_time = data['update_time']
+        self.extra_data = data.get('extra_data')
+    
+    def fingerprint(self) -> Tuple:
+        """订单状态指纹（状态、成交数量、均价、手续费、更新时间），用于廉价地判断订单是否变化"""
+        return (self.status, self._filled_quantity, self._avg_price, self._commission, self._update_time)
+    
+    @staticmethod
+    def fingerprint_from_dict(data: Dict[str, Any]) -> Tuple:
+        """从订单字典计算状态指纹（与fingerprint()可直接比较）"""
+        return (
+            data.get('status', Order.STATUS_PENDING),
+            _to_scaled(data.get('filled_quantity', '0')) or 0,
+            _to_scaled(data.get('avg_price') or None),
+            _to_scaled(data.get('commission', '0')) or 0,
+            _to_timestamp(data.get('update_time')),
+        )
+    
+    @staticmethod
+    def scaled_to_decimal(value: Optional[int]) -> Optional[Decimal]:
+        """将指纹中的缩放整数还原为Decimal"""
+        return _from_scaled(value)
+    
     def is_active(self) -> bool:
         """检查订单是否活跃（需要监控）"""
-        return self.status in [self.STATUS_PENDING, self.STATUS_PARTIAL]
+        return self.status in (self.STATUS_PENDING, self.STATUS_PARTIAL)
     
     def is_completed(self) -> bool:
         """检查订单是否已完成"""
-        return self.status in [self.STATUS_FILLED, self.STATUS_CANCELLED, self.STATUS_FAILED]
+        return self.status in (self.STATUS_FILLED, self.STATUS_CANCELLED, self.STATUS_FAILED)
     
     def get_remaining_quantity(self) -> Decimal:
         """获取剩余数量"""
-        return self.quantity - self.filled_quantity
+        return _from_scaled(self._quantity - self._filled_quantity)
     
     def get_fill_percentage(self) -> float:
         """获取成交百分比"""
-        if self.quantity == 0:
+        if self._quantity == 0:
             return 0.0
-        return float(self.filled_quantity / self.quantity * 100)
+        return self._filled_quantity / self._quantity * 100
     
     def update_fill(self, filled_qty: Decimal, avg_price: Decimal = None, commission: Decimal = None):
         """更新成交信息"""
@@ -112,9 +305,9 @@ class Order:
             self.commission = commission
         
         # 更新状态
-        if self.filled_quantity >= self.quantity:
+        if self._filled_quantity >= self._quantity:
             self.status = self.STATUS_FILLED
-        elif self.filled_quantity > 0:
+        elif self._filled_quantity > 0:
             self.status = self.STATUS_PARTIAL
         
         self.update_time = datetime.now()
@@ -131,15 +324,25 @@ class Order:
     
     def get_status_name(self) -> str:
         """获取状态名称"""
-        status_names = {
-            self.STATUS_PENDING: "待处理",
-            self.STATUS_PARTIAL: "部分成交",
-            self.STATUS_FILLED: "完全成交",
-            self.STATUS_CANCELLED: "已取消",
-            self.STATUS_FAILED: "失败"
-        }
-        return status_names.get(self.status, "未知")
+        return self.STATUS_NAMES.get(self.status, "未知")
     
     def __repr__(self):
         return (f"<Order(id={self.id}, order_no='{self.order_no}', "
-                f"symbol='{self.symbol}', status={self.get_status_name()})>")
\ No newline at end of file
+                f"symbol='{self.symbol}', status={self.get_status_name()})>")
+
+
+class OrderChangeType(Enum):
+    """订单变化类型枚举"""
+    NEW = "new"            # 新订单
+    FILL = "fill"          # 成交信息变化（成交数量、均价、手续费）
+    STATUS = "status"      # 状态变化（如取消、失败）
+    REMOVED = "removed"    # 订单已不存在
+
+
+@dataclass
+class OrderChange:
+    """订单变化记录"""
+    change_type: OrderChangeType
+    order: Order
+    previous_status: Optional[int] = None
+    previous_filled_quantity: Optional[Decimal] = None
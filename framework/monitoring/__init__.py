@@ -7,6 +7,12 @@
 from .monitoring_engine import MonitoringEngine, monitoring_engine
 from .event_handler import EventHandler, OrderEvent, StrategyEvent
 from .user_monitor import UserMonitor
+from .scheduler import WheelScheduler, TimerWheel
+from .strategy_feed import StrategyChangeFeed, strategy_change_feed
+from .async_engine import AsyncMonitoringEngine, AsyncUserMonitor, async_monitoring_engine
+from .shard_supervisor import ShardSupervisor, shard_supervisor
+from .lease_manager import LeaseManager, lease_manager
+from .check_budget import CheckBudget, check_budget
 
 __all__ = [
     'MonitoringEngine',
@@ -14,5 +20,18 @@ __all__ = [
     'EventHandler', 
     'OrderEvent',
     'StrategyEvent',
-    'UserMonitor'
+    'UserMonitor',
+    'WheelScheduler',
+    'TimerWheel',
+    'StrategyChangeFeed',
+    'strategy_change_feed',
+    'AsyncMonitoringEngine',
+    'AsyncUserMonitor',
+    'async_monitoring_engine',
+    'ShardSupervisor',
+    'shard_supervisor',
+    'LeaseManager',
+    'lease_manager',
+    'CheckBudget',
+    'check_budget'
 ]
\ No newline at end of file
@@ -0,0 +1,720 @@
+# -*- coding: utf-8 -*-
+"""
+异步监控引擎
+基于asyncio的监控引擎变体：每个事件循环线程持有各自的异步MySQL/Redis客户端，
+用户监控器作为轻量协程任务运行，按 user_id 分配到事件循环；
+对外提供与 MonitoringEngine 相同的 start/stop/get_statistics 接口，便于对比
+"""
+import os
+import asyncio
+import threading
+import time
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from ..database.async_clients import AsyncMySQLManager, AsyncRedisManager
+from ..config import MONITOR_CONFIG
+from ..models import User, Order
+from .user_monitor import UserMonitor
+from .event_handler import event_handler, EventType, BaseEvent
+from .check_budget import check_budget
+from ..metrics import MetricSet, traced
+
+
+class AsyncUserMonitor(UserMonitor):
+    """
+    异步用户监控器
+
+    复用 UserMonitor 的策略对账、订单变化分发和统计逻辑，
+    数据库和缓存访问改为在所属事件循环上await异步客户端
+    """
+
+    def __init__(self, user_id: int, mysql: AsyncMySQLManager, redis: AsyncRedisManager,
+                 strategy_executor=None, user_data: Optional[Dict[str, Any]] = None):
+        """
+        初始化异步用户监控器
+
+        Args:
+            user_id: 用户ID
+            mysql: 所属事件循环的异步MySQL客户端
+            redis: 所属事件循环的异步Redis客户端
+            strategy_executor: 共享的策略回调线程池
+            user_data: 引擎批量预取的用户信息
+        """
+        super().__init__(user_id, strategy_executor=strategy_executor, user_data=user_data)
+        self.mysql = mysql
+        self.redis = redis
+        self.task = None
+        self._released = False
+        self._loop = None
+        self._async_wakeup = None  # asyncio.Event，wake() 通过所属事件循环设置，提前结束休眠
+
+        # 待交给策略处理的订单更新，由策略线程池按顺序逐个处理
+        self._order_updates = deque()
+        self._order_updates_lock = threading.Lock()
+        self._order_updates_draining = False
+
+    async def _load_user_info_async(self) -> bool:
+        """加载用户信息"""
+        try:
+            user_data, self._prefetched_user_data = self._prefetched_user_data, None
+            if not user_data:
+                user_data = await self.redis.get_or_load_user(
+                    self.user_id,
+                    lambda: self.mysql.get_user_by_id(self.user_id)
+                )
+
+            if user_data:
+                self.user = User.from_dict(user_data)
+                return True
+            self.logger.error(f"用户不存在: {self.user_id}")
+            return False
+
+        except Exception as e:
+            self.logger.error(f"加载用户信息失败: {e}")
+            return False
+
+    async def _check_user_strategies_async(self) -> bool:
+        """检查用户策略状态"""
+        try:
+            strategies_data = await self.mysql.get_user_strategies(self.user_id)
+            return self._reconcile_strategies(strategies_data)
+        except Exception as e:
+            self.logger.error(f"检查用户策略失败: {e}")
+            self.stats.inc('errors')
+            self.stats.set('last_error', str(e))
+            return True  # 出错时继续监控
+
+    async def _check_user_orders_async(self) -> bool:
+        """检查用户订单更新（变化通过订单变化回调分发）"""
+        try:
+            # 每轮只读取缓存中的活跃订单，首次加载、到达对账间隔或缓存不存在时全量读取
+            if not self.order_manager.full_load_due() and await self._refresh_active_orders_async():
+                return True
+
+            orders_data = await self.redis.get_or_load_user_orders(
+                self.user_id,
+                lambda: self.mysql.get_user_orders(self.user_id, limit=5000)
+            )
+            if orders_data:
+                self.order_manager.replace_orders(orders_data)
+            return True
+        except Exception as e:
+            self.logger.error(f"检查用户订单失败: {e}")
+            self.stats.inc('errors')
+            self.stats.set('last_error', str(e))
+            return False
+
+    async def _refresh_active_orders_async(self) -> bool:
+        """
+        从缓存读取活跃订单并应用，离开活跃集合的订单单独读取其最新状态
+
+        Returns:
+            bool: 缓存存在并已应用时返回True
+        """
+        active_data = await self.redis.get_cached_active_orders(self.user_id)
+        if active_data is None:
+            return False
+
+        departed_ids = self.order_manager.apply_active_orders(active_data)
+        if not departed_ids:
+            return True
+
+        departed_data = await self.redis.get_cached_orders(self.user_id, departed_ids)
+        if departed_data is None:
+            return False
+        self.order_manager.apply_departed_orders(departed_ids, departed_data)
+        return True
+
+    @traced('user_monitor.check_cycle', tag='user_id')
+    async def _run_check_cycle_async(self) -> bool:
+        """
+        执行一次检查周期
+
+        Returns:
+            bool: 是否继续监控
+        """
+        if not check_budget.try_acquire(self.user_id):
+            self.stats.inc('throttled_checks')
+            return True
+        started = time.perf_counter()
+        changes_before = self.stats['order_updates'] + self.stats['strategy_updates']
+
+        now = datetime.now()
+        if self._strategy_check_due(now):
+            has_active_strategies = await self._check_user_strategies_async()
+            self.last_strategy_check = now
+
+            if not has_active_strategies:
+                self.logger.info(f"用户 {self.user_id} 没有活跃策略，停止监控")
+                return False
+        elif self._pending_strategy_rows:
+            self._apply_pending_strategy_changes()
+
+        await self._check_user_orders_async()
+
+        self.stats.inc('total_checks')
+        self.stats.observe('check_duration_seconds', time.perf_counter() - started)
+        self.last_check_time = now
+        self._adapt_check_interval(self.stats['order_updates'] + self.stats['strategy_updates'] != changes_before)
+        return True
+
+    async def _monitor_task(self) -> None:
+        """监控协程"""
+        loop = asyncio.get_running_loop()
+
+        while self.running:
+            try:
+                start_time = loop.time()
+
+                if not await self._run_check_cycle_async():
+                    break
+
+                elapsed = loop.time() - start_time
+                await self._sleep_until_woken(max(0, self._effective_check_interval() - elapsed))
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"监控协程异常: {e}")
+                self.stats.inc('errors')
+                self.stats.set('last_error', str(e))
+                await asyncio.sleep(1.0)  # 出错时短暂休息
+
+        # 协程自行退出（如没有活跃策略）时释放资源，引擎扫描时回收该监控器
+        self.running = False
+        await self._release_async()
+
+    def _dispatch_order_updates(self, orders: List[Order]) -> None:
+        """订单更新提交到策略线程池处理，慢策略回调不阻塞事件循环上的其他监控器"""
+        if not orders:
+            return
+
+        with self._order_updates_lock:
+            self._order_updates.extend(orders)
+            if self._order_updates_draining:
+                return
+            self._order_updates_draining = True
+
+        try:
+            self.strategy_manager.executor.submit(self._drain_order_updates)
+        except RuntimeError as e:
+            # 线程池已关闭（引擎停止中）
+            with self._order_updates_lock:
+                self._order_updates.clear()
+                self._order_updates_draining = False
+            self.logger.error(f"提交订单更新失败: {e}")
+
+    def _drain_order_updates(self) -> None:
+        """在策略线程池中按到达顺序处理订单更新（同一用户同时只有一个线程在处理）"""
+        while True:
+            with self._order_updates_lock:
+                if not self._order_updates:
+                    self._order_updates_draining = False
+                    return
+                order = self._order_updates.popleft()
+            self.strategy_manager.handle_order_update(order)
+
+    async def _sleep_until_woken(self, timeout: float) -> None:
+        """休眠到检查间隔结束，或被 wake() 提前唤醒"""
+        try:
+            await asyncio.wait_for(self._async_wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._async_wakeup.clear()
+
+    def _interrupt_sleep(self) -> None:
+        """唤醒监控协程（可从其他线程调用）"""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._async_wakeup.set)
+
+    async def start_async(self) -> bool:
+        """
+        启动用户监控（在所属事件循环中调用）
+
+        Returns:
+            bool: 启动是否成功
+        """
+        if self.running:
+            return True
+
+        try:
+            if not await self._load_user_info_async():
+                return False
+
+            if not self.user.is_active():
+                self.logger.warning(f"用户 {self.user_id} 不是活跃状态")
+                return False
+
+            if not await self._check_user_orders_async():
+                self.logger.error("加载用户订单失败")
+                return False
+
+            if not await self._check_user_strategies_async():
+                self.logger.info(f"用户 {self.user_id} 没有活跃策略")
+                return False
+            self.last_strategy_check = datetime.now()
+
+            self._loop = asyncio.get_running_loop()
+            self._async_wakeup = asyncio.Event()
+            self.running = True
+            self.stats.set('start_time', datetime.now())
+            self.task = self._loop.create_task(
+                self._monitor_task(), name=f"UserMonitor-{self.user_id}"
+            )
+
+            await self.redis.add_active_users([self.user_id])
+
+            event_handler.emit_event(BaseEvent(
+                event_type=EventType.USER_ACTIVATE,
+                timestamp=datetime.now(),
+                user_id=self.user_id,
+                data={'username': self.user.username}
+            ))
+            return True
+
+        except Exception as e:
+            self.logger.error(f"启动用户监控失败: {e}")
+            self.running = False
+            return False
+
+    async def stop_async(self, timeout: float = 10.0) -> None:
+        """停止用户监控并释放资源（在所属事件循环中调用）"""
+        # running 已为False而协程未结束时，协程正在自行退出并释放资源，等待即可
+        exiting = not self.running
+        self.running = False
+
+        if self.task is not None and not self.task.done():
+            if not exiting:
+                self.task.cancel()
+            try:
+                await asyncio.wait_for(self.task, timeout)
+            except (asyncio.CancelledError, asyncio.TimeoutError):
+                pass
+            except Exception as e:
+                self.logger.error(f"监控协程结束异常: {e}")
+
+        await self._release_async()
+
+    async def _release_async(self) -> None:
+        """释放监控资源（只执行一次）"""
+        if self._released:
+            return
+        self._released = True
+        check_budget.unregister(self.user_id)
+
+        try:
+            # 策略停止和缓存清理使用同步客户端，放到线程中执行以免阻塞事件循环
+            await asyncio.to_thread(self.strategy_manager.cleanup)
+            await asyncio.to_thread(self.order_manager.cleanup)
+        except Exception as e:
+            self.logger.error(f"释放用户监控资源失败: {e}")
+        self.stats.remove()
+        self.logger.info(f"用户监控已停止: 用户 {self.user_id}")
+
+    def is_running(self) -> bool:
+        """检查是否正在运行"""
+        return self.running and self.task is not None and not self.task.done()
+
+
+class _EventLoopShard:
+    """一个事件循环线程，及绑定在该循环上的异步客户端和用户监控器"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.loop = asyncio.new_event_loop()
+        self.thread = None
+        self.mysql = AsyncMySQLManager()
+        self.redis = AsyncRedisManager()
+        self.monitors = {}  # {user_id: AsyncUserMonitor}，只在本循环中修改
+        self.start_semaphore = None
+
+    def start(self, max_concurrent_starts: int) -> None:
+        """启动事件循环线程"""
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.start_semaphore = asyncio.Semaphore(max_concurrent_starts)
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run, name=f"AsyncEngineLoop-{self.index}", daemon=True)
+        self.thread.start()
+
+    def submit(self, coro):
+        """在本循环中执行协程，返回 concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def initialize(self) -> bool:
+        """初始化本循环的异步客户端"""
+        return await self.mysql.initialize() and await self.redis.initialize()
+
+    async def close(self) -> None:
+        """关闭本循环的异步客户端"""
+        await self.mysql.close()
+        await self.redis.close()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """停止事件循环线程"""
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=timeout)
+        if not self.loop.is_running():
+            self.loop.close()
+
+
+class AsyncMonitoringEngine:
+    """异步监控引擎（每个事件循环一个线程，默认循环数等于CPU核数）"""
+
+    def __init__(self, loop_count: Optional[int] = None):
+        """
+        初始化异步监控引擎
+
+        Args:
+            loop_count: 事件循环数，默认读取 MONITOR_CONFIG['async_loops']，0表示等于CPU核数
+        """
+        self.loop_count = loop_count or MONITOR_CONFIG.get('async_loops', 0) or os.cpu_count() or 1
+        self.max_concurrent_users = MONITOR_CONFIG.get('max_workers', 100)
+        self.user_scan_interval = MONITOR_CONFIG.get('check_interval', 0.1)
+        self.batch_size = MONITOR_CONFIG.get('batch_size', 100)
+        self.strategy_workers = MONITOR_CONFIG.get('strategy_workers', 0) or os.cpu_count() or 1
+
+        self.shards = []  # [_EventLoopShard]
+        self.user_monitors = {}  # {user_id: AsyncUserMonitor}
+        self.running = False
+        self.scan_future = None
+        self.strategy_executor = None
+        self.lock = threading.RLock()
+
+        # 统计信息
+        self.stats = MetricSet(
+            'async_engine',
+            counters=('total_users_monitored', 'total_scans', 'failed_starts', 'failed_stops'),
+            gauges={'start_time': None, 'active_users': 0, 'last_scan_time': None}
+        )
+        self.stats.set_function(
+            'active_users', lambda: sum(1 for monitor in list(self.user_monitors.values()) if monitor.is_running())
+        )
+
+        self.logger = logging.getLogger(__name__)
+
+    def _shard_for(self, user_id: int) -> _EventLoopShard:
+        """用户所属的事件循环"""
+        return self.shards[user_id % len(self.shards)]
+
+    def _group_by_shard(self, user_ids: Iterable[int]) -> Dict[_EventLoopShard, List[int]]:
+        groups = {}
+        for user_id in user_ids:
+            groups.setdefault(self._shard_for(user_id), []).append(user_id)
+        return groups
+
+    async def _scan_active_users(self, shard: _EventLoopShard) -> List[int]:
+        """扫描需要监控的活跃用户"""
+        try:
+            active_users = await shard.redis.get_active_users()
+
+            if not active_users:
+                users_with_strategies = await shard.mysql.get_users_with_active_strategies()
+                active_users = [user['id'] for user in users_with_strategies]
+
+                # 查询结果只有部分用户字段，不写入用户缓存（由 _prefetch_users 按完整行加载）
+                await shard.redis.add_active_users(active_users)
+
+            return list(active_users)
+
+        except Exception as e:
+            self.logger.error(f"扫描活跃用户失败: {e}")
+            return []
+
+    async def _prefetch_users(self, shard: _EventLoopShard, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """批量预取用户信息：先MGET读取缓存，未命中的按批查询MySQL后回写缓存"""
+        try:
+            users = await shard.redis.get_cached_users(user_ids)
+            missing = [user_id for user_id in user_ids if user_id not in users]
+            if missing:
+                rows = await shard.mysql.get_users_by_ids(missing, self.batch_size)
+                if rows:
+                    await shard.redis.cache_users(rows)
+                    users.update({row['id']: row for row in rows})
+            return users
+        except Exception as e:
+            self.logger.error(f"批量预取用户信息失败: {e}")
+            return {}
+
+    async def _start_user_monitor(self, shard: _EventLoopShard, user_id: int,
+                                  user_data: Optional[Dict[str, Any]] = None) -> bool:
+        """在用户所属的事件循环中启动用户监控器"""
+        async with shard.start_semaphore:
+            try:
+                monitor = shard.monitors.get(user_id)
+                if monitor is not None:
+                    if monitor.is_running():
+                        return True
+                    await monitor.stop_async()
+                    self._forget_monitor(shard, user_id)
+
+                monitor = AsyncUserMonitor(user_id, shard.mysql, shard.redis,
+                                           strategy_executor=self.strategy_executor, user_data=user_data)
+                if await monitor.start_async():
+                    shard.monitors[user_id] = monitor
+                    with self.lock:
+                        self.user_monitors[user_id] = monitor
+                    self.stats.inc('total_users_monitored')
+                    return True
+
+                self.logger.warning(f"用户监控启动失败: {user_id}")
+                await monitor.stop_async()
+                self.stats.inc('failed_starts')
+                return False
+
+            except Exception as e:
+                self.logger.error(f"启动用户监控异常: {user_id}, 错误: {e}")
+                self.stats.inc('failed_starts')
+                return False
+
+    async def _stop_user_monitor(self, shard: _EventLoopShard, user_id: int) -> bool:
+        """在用户所属的事件循环中停止用户监控器"""
+        monitor = shard.monitors.get(user_id)
+        if monitor is None:
+            return True
+        try:
+            await monitor.stop_async()
+            return True
+        except Exception as e:
+            self.logger.error(f"停止用户监控异常: {user_id}, 错误: {e}")
+            self.stats.inc('failed_stops')
+            return False
+        finally:
+            self._forget_monitor(shard, user_id)
+
+    def _forget_monitor(self, shard: _EventLoopShard, user_id: int) -> None:
+        shard.monitors.pop(user_id, None)
+        with self.lock:
+            self.user_monitors.pop(user_id, None)
+
+    async def _start_users(self, shard: _EventLoopShard, user_ids: List[int],
+                           prefetched: Dict[int, Dict[str, Any]]) -> None:
+        await asyncio.gather(*(self._start_user_monitor(shard, user_id, prefetched.get(user_id))
+                               for user_id in user_ids))
+
+    async def _stop_users(self, shard: _EventLoopShard, user_ids: List[int]) -> None:
+        await asyncio.gather(*(self._stop_user_monitor(shard, user_id) for user_id in user_ids))
+
+    async def _run_on_shards(self, coros_by_shard: Dict[_EventLoopShard, Any]) -> None:
+        """在各自的事件循环中执行协程并等待全部完成"""
+        futures = [asyncio.wrap_future(shard.submit(coro)) for shard, coro in coros_by_shard.items()]
+        for result in await asyncio.gather(*futures, return_exceptions=True):
+            if isinstance(result, Exception):
+                self.logger.error(f"事件循环任务失败: {result}")
+
+    async def _user_scan_loop(self) -> None:
+        """用户扫描循环（运行在第一个事件循环中）"""
+        shard = self.shards[0]
+        loop = asyncio.get_running_loop()
+        self.logger.info("异步用户扫描循环启动")
+
+        while self.running:
+            try:
+                start_time = loop.time()
+
+                # 回收协程已退出的监控器（如没有活跃策略），仍在活跃集合中的用户随后重新启动
+                with self.lock:
+                    exited_users = [user_id for user_id, monitor in self.user_monitors.items()
+                                    if not monitor.is_running()]
+                if exited_users:
+                    self.logger.info(f"回收已退出的用户监控: {len(exited_users)} 个用户")
+                    await self._run_on_shards({
+                        target: self._stop_users(target, user_ids)
+                        for target, user_ids in self._group_by_shard(exited_users).items()
+                    })
+
+                active_users = set(await self._scan_active_users(shard))
+                with self.lock:
+                    current_users = set(self.user_monitors.keys())
+
+                users_to_start = active_users - current_users
+                users_to_stop = current_users - active_users
+
+                if users_to_start:
+                    self.logger.info(f"启动新用户监控: {len(users_to_start)} 个用户")
+                    prefetched = await self._prefetch_users(shard, list(users_to_start))
+                    await self._run_on_shards({
+                        target: self._start_users(target, user_ids, prefetched)
+                        for target, user_ids in self._group_by_shard(users_to_start).items()
+                    })
+
+                if users_to_stop:
+                    self.logger.info(f"停止用户监控: {len(users_to_stop)} 个用户")
+                    await self._run_on_shards({
+                        target: self._stop_users(target, user_ids)
+                        for target, user_ids in self._group_by_shard(users_to_stop).items()
+                    })
+
+                self.stats.inc('total_scans')
+                self.stats.set('last_scan_time', datetime.now())
+
+                elapsed = loop.time() - start_time
+                await asyncio.sleep(max(0, self.user_scan_interval - elapsed))
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"用户扫描循环异常: {e}")
+                await asyncio.sleep(5.0)  # 出错时休息5秒
+
+        self.logger.info("异步用户扫描循环结束")
+
+    def start(self) -> bool:
+        """
+        启动监控引擎
+
+        Returns:
+            bool: 启动是否成功
+        """
+        if self.running:
+            self.logger.warning("监控引擎已经在运行")
+            return True
+
+        try:
+            self.logger.info(f"启动异步监控引擎: {self.loop_count} 个事件循环")
+
+            event_handler.start()
+
+            self.strategy_executor = ThreadPoolExecutor(
+                max_workers=self.strategy_workers,
+                thread_name_prefix="strategy_callback"
+            )
+
+            per_loop_starts = max(1, self.max_concurrent_users // self.loop_count)
+            self.shards = [_EventLoopShard(index) for index in range(self.loop_count)]
+            for shard in self.shards:
+                shard.start(per_loop_starts)
+
+            for shard in self.shards:
+                if not shard.submit(shard.initialize()).result(timeout=30):
+                    raise RuntimeError(f"事件循环 {shard.index} 的异步客户端初始化失败")
+
+            self.running = True
+            self.stats.set('start_time', datetime.now())
+            self.scan_future = self.shards[0].submit(self._user_scan_loop())
+
+            self.logger.info("异步监控引擎启动成功")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"启动异步监控引擎失败: {e}")
+            self.running = False
+            self._shutdown_shards()
+            return False
+
+    def _shutdown_shards(self) -> None:
+        """关闭各事件循环的客户端和线程"""
+        for shard in self.shards:
+            try:
+                if shard.loop.is_running():
+                    shard.submit(shard.close()).result(timeout=5.0)
+            except Exception as e:
+                self.logger.error(f"关闭事件循环 {shard.index} 的客户端失败: {e}")
+            shard.stop()
+        self.shards = []
+
+        if self.strategy_executor:
+            self.strategy_executor.shutdown(wait=True)
+            self.strategy_executor = None
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """
+        停止监控引擎
+
+        Args:
+            timeout: 停止超时时间（秒）
+        """
+        if not self.running:
+            self.logger.warning("监控引擎未运行")
+            return
+
+        self.logger.info("正在停止异步监控引擎...")
+        self.running = False
+
+        if self.scan_future is not None:
+            self.scan_future.cancel()
+            self.scan_future = None
+
+        deadline = time.time() + timeout
+        stop_futures = [shard.submit(self._stop_users(shard, list(shard.monitors.keys()))) for shard in self.shards]
+        for future in stop_futures:
+            try:
+                future.result(timeout=max(0.1, deadline - time.time()))
+            except Exception as e:
+                self.logger.error(f"停止用户监控器失败: {e}")
+
+        self._shutdown_shards()
+        event_handler.stop()
+
+        self.logger.info("异步监控引擎已停止")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        with self.lock:
+            stats = self.stats.snapshot()
+            stats.update({
+                'running': self.running,
+                'scheduler_mode': 'asyncio',
+                'loop_count': len(self.shards),
+                'loop_user_counts': [len(shard.monitors) for shard in self.shards],
+                'total_user_monitors': len(self.user_monitors),
+                'active_user_monitors': len([m for m in self.user_monitors.values() if m.is_running()]),
+                'event_handler_stats': event_handler.get_statistics(),
+                'user_monitor_details': {
+                    user_id: monitor.get_statistics()
+                    for user_id, monitor in self.user_monitors.items()
+                }
+            })
+
+            if stats['start_time']:
+                stats['uptime_seconds'] = (datetime.now() - stats['start_time']).total_seconds()
+
+            return stats
+
+    def get_user_monitor(self, user_id: int) -> Optional[AsyncUserMonitor]:
+        """获取指定用户的监控器"""
+        with self.lock:
+            return self.user_monitors.get(user_id)
+
+    def restart_user_monitor(self, user_id: int) -> bool:
+        """
+        重启指定用户的监控器
+
+        Args:
+            user_id: 用户ID
+
+        Returns:
+            bool: 重启是否成功
+        """
+        if not self.running:
+            return False
+
+        shard = self._shard_for(user_id)
+
+        async def restart():
+            await self._stop_user_monitor(shard, user_id)
+            return await self._start_user_monitor(shard, user_id)
+
+        try:
+            return shard.submit(restart()).result(timeout=30)
+        except Exception as e:
+            self.logger.error(f"重启用户监控失败: {user_id}, 错误: {e}")
+            return False
+
+    def is_running(self) -> bool:
+        """检查监控引擎是否正在运行"""
+        return self.running
+
+    def __repr__(self):
+        return f"<AsyncMonitoringEngine(running={self.running}, loops={len(self.shards)}, users={len(self.user_monitors)})>"
+
+
+# 全局异步监控引擎实例（创建时不启动事件循环）
+async_monitoring_engine = AsyncMonitoringEngine()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+全局检查预算
+令牌桶限制所有用户监控器每秒的检查总数；令牌紧张时按权重公平分配，
+已用完本窗口公平份额的用户让出剩余令牌，避免高频用户挤占其他用户
+"""
+import threading
+import time
+import logging
+from typing import Any, Dict
+from ..config import MONITOR_CONFIG
+from ..metrics import MetricSet
+
+
+class CheckBudget:
+    """带加权公平份额的检查令牌桶（线程安全）"""
+
+    def __init__(self, rate: float = 0, burst: float = 0, window: float = 1.0, reserve_ratio: float = 0.5):
+        """
+        初始化检查预算
+
+        Args:
+            rate: 每秒允许的检查次数，0表示不限制
+            burst: 令牌桶容量，0表示等于rate
+            window: 公平份额统计窗口（秒）
+            reserve_ratio: 剩余令牌低于容量的该比例时开始按公平份额限制
+        """
+        self.rate = rate
+        self.burst = burst or rate
+        self.window = window
+        self.reserve_ratio = reserve_ratio
+
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.weights = {}  # {user_id: 权重}
+        self.total_weight = 0.0
+        self.window_start = self.updated
+        self.used = {}  # {user_id: 本窗口已用的检查次数}
+
+        self.lock = threading.Lock()
+
+        # 统计信息
+        self.stats = MetricSet('check_budget', counters=('granted', 'denied_empty', 'denied_fair_share'))
+
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def register(self, user_id: int, weight: float = 1.0) -> None:
+        """登记用户（或更新其权重），权重越大公平份额越多"""
+        with self.lock:
+            self.total_weight += weight - self.weights.get(user_id, 0.0)
+            self.weights[user_id] = weight
+
+    def unregister(self, user_id: int) -> None:
+        """注销用户"""
+        with self.lock:
+            self.total_weight -= self.weights.pop(user_id, 0.0)
+            self.used.pop(user_id, None)
+
+    def try_acquire(self, user_id: int) -> bool:
+        """
+        尝试为一次检查获取令牌（不阻塞）
+
+        Args:
+            user_id: 用户ID
+
+        Returns:
+            bool: 获取成功返回True，否则本次检查应跳过
+        """
+        if self.rate <= 0:
+            return True
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if now - self.window_start >= self.window:
+                self.window_start = now
+                self.used.clear()
+
+            outcome = self._take(user_id)
+
+        self.stats.inc(outcome)
+        return outcome == 'granted'
+
+    def _take(self, user_id: int) -> str:
+        """扣减令牌（调用方持有锁），返回结果对应的统计键名"""
+        if self.tokens < 1:
+            return 'denied_empty'
+
+        used = self.used.get(user_id, 0)
+        if self.tokens < self.burst * self.reserve_ratio and self.total_weight > 0:
+            share = self.rate * self.window * self.weights.get(user_id, 1.0) / self.total_weight
+            if used >= max(1.0, share):
+                return 'denied_fair_share'
+
+        self.tokens -= 1
+        self.used[user_id] = used + 1
+        return 'granted'
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        stats = self.stats.snapshot()
+        with self.lock:
+            stats.update({
+                'rate': self.rate,
+                'tokens': round(self.tokens, 2),
+                'users': len(self.weights),
+                'total_weight': self.total_weight
+            })
+        return stats
+
+    def __repr__(self):
+        return f"<CheckBudget(rate={self.rate}, users={len(self.weights)})>"
+
+
+# 全局检查预算实例
+check_budget = CheckBudget(
+    rate=MONITOR_CONFIG.get('check_budget_per_second', 0),
+    burst=MONITOR_CONFIG.get('check_budget_burst', 0)
+)
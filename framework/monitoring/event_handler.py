@@ -12,6 +12,12 @@ from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from ..metrics import MetricSet, metrics, traced
+
+# 事件在队列中的等待时间和每个处理器的执行时间
+QUEUE_WAIT_SECONDS = metrics.histogram('event_queue_wait_seconds', '事件从入队到被工作线程取出的等待时间')
+HANDLER_SECONDS = metrics.histogram('event_handler_duration_seconds', '事件处理器执行耗时（按事件类型）',
+                                    label_name='event_type')
 
 
 class EventType(Enum):
@@ -88,14 +94,13 @@ class EventHandler:
         self.running = False
         self.worker_threads = []
         
-        # 统计信息
-        self.stats = {
-            'total_events': 0,
-            'processed_events': 0,
-            'failed_events': 0,
-            'queue_size': 0,
-            'start_time': None
-        }
+        # 统计信息（分片计数器，发送和处理事件时不加锁）
+        self.stats = MetricSet(
+            'event_handler',
+            counters=('total_events', 'processed_events', 'failed_events'),
+            gauges={'queue_size': 0, 'start_time': None}
+        )
+        self.stats.set_function('queue_size', self.event_queue.qsize)
         
         self.logger = logging.getLogger(__name__)
         self.lock = threading.RLock()
@@ -149,12 +154,9 @@ class EventHandler:
                 self.logger.warning("事件处理器未运行，忽略事件")
                 return False
             
-            # 非阻塞方式加入队列
-            self.event_queue.put_nowait(event)
-            
-            with self.lock:
-                self.stats['total_events'] += 1
-                self.stats['queue_size'] = self.event_queue.qsize()
+            # 非阻塞方式加入队列（附带入队时间，用于统计排队等待）
+            self.event_queue.put_nowait((time.monotonic(), event))
+            self.stats.inc('total_events')
             
             self.logger.debug(f"事件已加入队列: {event.event_type.value}, ID: {event.event_id}")
             return True
@@ -178,6 +180,7 @@ class EventHandler:
         event = StrategyEvent(event_type, user_id, strategy_id, data)
         return self.emit_event(event)
     
+    @traced('event_handler.process_event')
     def _process_event(self, event: BaseEvent) -> None:
         """
         处理单个事件
@@ -206,17 +209,12 @@ class EventHandler:
                 except Exception as e:
                     self.logger.error(f"事件处理器执行异常: {e}")
             
-            with self.lock:
-                if success_count > 0:
-                    self.stats['processed_events'] += 1
-                else:
-                    self.stats['failed_events'] += 1
+            self.stats.inc('processed_events' if success_count > 0 else 'failed_events')
             
             self.logger.debug(f"事件处理完成: {event.event_type.value}, 成功处理器: {success_count}/{len(handlers)}")
             
         except Exception as e:
-            with self.lock:
-                self.stats['failed_events'] += 1
+            self.stats.inc('failed_events')
             self.logger.error(f"处理事件失败: {event.event_type.value}, 错误: {e}")
     
     def _safe_handle_event(self, handler: Callable[[BaseEvent], None], event: BaseEvent) -> bool:
@@ -230,12 +228,15 @@ class EventHandler:
         Returns:
             bool: 是否成功处理
         """
+        start = time.perf_counter()
         try:
             handler(event)
             return True
         except Exception as e:
             self.logger.error(f"事件处理器执行失败: {handler.__name__}, 事件: {event.event_type.value}, 错误: {e}")
             return False
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - start, event.event_type.value)
     
     def _worker_loop(self) -> None:
         """工作线程循环"""
@@ -245,7 +246,8 @@ class EventHandler:
         while self.running:
             try:
                 # 从队列获取事件，超时1秒
-                event = self.event_queue.get(timeout=1.0)
+                enqueued_at, event = self.event_queue.get(timeout=1.0)
+                QUEUE_WAIT_SECONDS.observe(time.monotonic() - enqueued_at)
                 
                 # 处理事件
                 self._process_event(event)
@@ -253,10 +255,6 @@ class EventHandler:
                 # 标记任务完成
                 self.event_queue.task_done()
                 
-                # 更新队列大小统计
-                with self.lock:
-                    self.stats['queue_size'] = self.event_queue.qsize()
-                
             except queue.Empty:
                 # 队列为空，继续循环
                 continue
@@ -273,7 +271,7 @@ class EventHandler:
             return
         
         self.running = True
-        self.stats['start_time'] = datetime.now()
+        self.stats.set('start_time', datetime.now())
         
         # 启动工作线程
         for i in range(self.max_workers):
@@ -325,9 +323,8 @@ class EventHandler:
     
     def get_statistics(self) -> Dict[str, Any]:
         """获取统计信息"""
+        stats = self.stats.snapshot()
         with self.lock:
-            stats = self.stats.copy()
-            stats['queue_size'] = self.event_queue.qsize()
             stats['registered_handlers'] = {
                 event_type.value: len(handlers) 
                 for event_type, handlers in self.event_handlers.items()
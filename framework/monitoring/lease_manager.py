@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+集群用户租约
+用户按 user_id 分桶，每个分桶的所有权是Redis中的一个带过期时间的租约，
+多个引擎节点通过心跳得知存活节点数并各自持有约 分桶数/节点数 个分桶；
+节点失效后其租约过期，由其他节点接管。每次获取租约都会发放递增的防护令牌，
+写入方可以用它拒绝已失去租约的旧持有者
+"""
+import hashlib
+import math
+import os
+import socket
+import threading
+import time
+import uuid
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from datetime import datetime
+from ..database import redis_manager
+from ..config import MONITOR_CONFIG
+from ..metrics import MetricSet
+
+
+class LeaseManager:
+    """基于Redis分桶租约的集群用户分配"""
+
+    def __init__(self, bucket_count: int = 256, lease_ttl: float = 15, renew_interval: float = 5):
+        """
+        初始化租约管理器
+
+        Args:
+            bucket_count: 用户分桶数
+            lease_ttl: 租约及节点心跳有效期（秒）
+            renew_interval: 续期间隔（秒）
+        """
+        self.bucket_count = bucket_count
+        self.lease_ttl = lease_ttl
+        self.renew_interval = renew_interval
+        # 本地认为租约有效的时间比Redis中的过期时间提前一点，抵消时钟误差和网络延迟
+        self.safety_margin = min(1.0, lease_ttl * 0.1)
+        self.node_id = None
+        self._preference = []
+        self._new_node_id()
+
+        self.leases = {}  # {分桶: 防护令牌}
+        self.deadlines = {}  # {分桶: 本地有效期截止时间(monotonic)}
+        self.live_nodes = []
+        self.lost_callbacks = []  # List[Callable[[Set[int]], None]] 租约失效时回调（参数为失效的分桶）
+
+        # 线程管理
+        self.running = False
+        self.heartbeat_thread = None
+        self.lock = threading.RLock()
+
+        # 统计信息
+        self.stats = MetricSet(
+            'lease_manager',
+            counters=('heartbeats', 'acquired', 'released', 'lost', 'renew_failures'),
+            gauges={'last_heartbeat_time': None, 'owned_buckets': 0}
+        )
+        self.stats.set_function('owned_buckets', lambda: len(self.get_owned_buckets()))
+
+        self.logger = logging.getLogger(__name__)
+
+    def _new_node_id(self) -> None:
+        """生成节点ID（fork出的子进程需要与父进程区分）"""
+        self.node_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # 每个节点对分桶的固定偏好顺序（最高随机权重），各节点优先持有自己偏好的分桶，减少来回迁移
+        self._preference = sorted(range(self.bucket_count), key=self._preference_score, reverse=True)
+
+    def _preference_score(self, bucket: int) -> int:
+        """本节点对分桶的偏好权重"""
+        return int.from_bytes(hashlib.md5(f"{self.node_id}:{bucket}".encode('utf-8')).digest()[:8], 'big')
+
+    def bucket_for(self, user_id: int) -> int:
+        """用户所属的分桶"""
+        return user_id % self.bucket_count
+
+    def owns_user(self, user_id: int) -> bool:
+        """本节点当前是否持有该用户所属分桶的有效租约"""
+        deadline = self.deadlines.get(self.bucket_for(user_id))
+        return deadline is not None and time.monotonic() < deadline
+
+    def fencing_token(self, user_id: int) -> Optional[int]:
+        """本节点持有该用户分桶租约时的防护令牌"""
+        if not self.owns_user(user_id):
+            return None
+        return self.leases.get(self.bucket_for(user_id))
+
+    def validate_fencing_token(self, user_id: int, token: int) -> bool:
+        """
+        检查防护令牌是否仍是该分桶最新发放的令牌（向Redis确认）
+
+        Args:
+            user_id: 用户ID
+            token: 写入方持有的防护令牌
+
+        Returns:
+            bool: 令牌仍然有效时返回True
+        """
+        return token is not None and redis_manager.get_lease_fence(self.bucket_for(user_id)) == token
+
+    def get_fencing_tokens(self, user_ids: Iterable[int]) -> Optional[Dict[int, Optional[int]]]:
+        """
+        批量获取用户所属分桶最新发放的防护令牌（一次往返），写入方据此拒绝旧令牌的写入
+
+        Returns:
+            Optional[Dict[int, Optional[int]]]: {user_id: 防护令牌}，Redis异常时返回None
+        """
+        user_ids = list(user_ids)
+        fences = redis_manager.get_lease_fences(sorted({self.bucket_for(user_id) for user_id in user_ids}))
+        if fences is None:
+            return None
+        return {user_id: fences.get(self.bucket_for(user_id)) for user_id in user_ids}
+
+    def add_lost_callback(self, callback: Callable[[Set[int]], None]) -> None:
+        """添加租约失效回调"""
+        if callback not in self.lost_callbacks:
+            self.lost_callbacks.append(callback)
+
+    def remove_lost_callback(self, callback: Callable[[Set[int]], None]) -> None:
+        """移除租约失效回调"""
+        if callback in self.lost_callbacks:
+            self.lost_callbacks.remove(callback)
+
+    def _notify_lost(self, buckets: Set[int]) -> None:
+        """通知租约失效"""
+        for callback in list(self.lost_callbacks):
+            try:
+                callback(buckets)
+            except Exception as e:
+                self.logger.error(f"租约失效回调执行失败: {e}")
+
+    def _record(self, leases: Dict[int, int], started: float) -> None:
+        """记录获取或续期成功的租约"""
+        deadline = started + self.lease_ttl - self.safety_margin
+        with self.lock:
+            for bucket, token in leases.items():
+                self.leases[bucket] = token
+                self.deadlines[bucket] = deadline
+
+    def _drop(self, buckets) -> Dict[int, int]:
+        """从本地移除租约（先于Redis释放，本节点立即停止认为自己持有）"""
+        dropped = {}
+        with self.lock:
+            for bucket in buckets:
+                self.deadlines.pop(bucket, None)
+                token = self.leases.pop(bucket, None)
+                if token is not None:
+                    dropped[bucket] = token
+        return dropped
+
+    def heartbeat(self) -> None:
+        """登记心跳、续期已持有的租约，并按存活节点数释放多余或获取空闲的分桶"""
+        started = time.monotonic()
+        nodes = redis_manager.heartbeat_lease_node(self.node_id, self.lease_ttl)
+
+        with self.lock:
+            held = dict(self.leases)
+        renewed = redis_manager.renew_leases(held, self.node_id, self.lease_ttl)
+        if renewed is None:
+            # Redis不可用：保留本地有效期，到期后自动视为失去租约
+            self.stats.inc('renew_failures')
+            return
+
+        lost = set(held) - renewed
+        if lost:
+            self._drop(lost)
+            self.logger.warning(f"租约已失效: {len(lost)} 个分桶")
+            self._notify_lost(lost)
+        self._record({bucket: held[bucket] for bucket in renewed}, started)
+
+        self.stats.inc('heartbeats')
+        self.stats.inc('lost', len(lost))
+        self.stats.set('last_heartbeat_time', datetime.now())
+
+        if nodes is None:
+            return
+        self.live_nodes = nodes
+        self._rebalance(len(nodes), started)
+
+    def _rebalance(self, node_count: int, started: float) -> None:
+        """持有分桶数向 ceil(分桶数/存活节点数) 靠拢"""
+        target = math.ceil(self.bucket_count / max(1, node_count))
+        with self.lock:
+            held = set(self.leases)
+
+        if len(held) > target:
+            # 新节点加入：释放偏好最低的多余分桶，由新节点获取
+            surplus = [bucket for bucket in reversed(self._preference) if bucket in held][:len(held) - target]
+            released = redis_manager.release_leases(self._drop(surplus), self.node_id)
+            self.stats.inc('released', released)
+            self.logger.info(f"释放多余租约: {len(surplus)} 个分桶, 目标 {target}")
+
+        elif len(held) < target:
+            # 只尝试当前空闲的分桶（其他节点失效或释放的）
+            candidates = [bucket for bucket in self._preference if bucket not in held]
+            free = redis_manager.get_free_lease_buckets(candidates)
+            wanted = [bucket for bucket in candidates if bucket in free][:target - len(held)]
+            acquired = redis_manager.acquire_leases(wanted, self.node_id, self.lease_ttl)
+            if acquired:
+                self._record(acquired, started)
+                self.stats.inc('acquired', len(acquired))
+                self.logger.info(f"获取租约: {len(acquired)} 个分桶, 持有 {len(held) + len(acquired)}/{target}")
+
+    def _heartbeat_loop(self) -> None:
+        """续期循环"""
+        self.logger.info("租约续期循环启动")
+
+        while self.running:
+            try:
+                start_time = time.time()
+
+                self.heartbeat()
+
+                elapsed = time.time() - start_time
+                sleep_time = max(0, self.renew_interval - elapsed)
+                if sleep_time > 0:
+                    time.sleep(sleep_time)
+
+            except Exception as e:
+                self.logger.error(f"租约续期异常: {e}")
+                time.sleep(1.0)
+
+        self.logger.info("租约续期循环结束")
+
+    def start(self) -> None:
+        """启动租约管理（先同步执行一次心跳，使引擎首次扫描时已持有分桶）"""
+        if self.running:
+            return
+
+        self._new_node_id()
+        self.running = True
+        try:
+            self.heartbeat()
+        except Exception as e:
+            self.logger.error(f"首次租约心跳失败: {e}")
+
+        self.heartbeat_thread = threading.Thread(
+            target=self._heartbeat_loop,
+            name="LeaseHeartbeat",
+            daemon=True
+        )
+        self.heartbeat_thread.start()
+        self.logger.info(f"租约管理已启动: 节点 {self.node_id}, 分桶数 {self.bucket_count}")
+
+    def stop(self) -> None:
+        """停止续期并释放所有租约，其他节点无需等待过期即可接管"""
+        if not self.running:
+            return
+
+        self.running = False
+        if self.heartbeat_thread and self.heartbeat_thread.is_alive():
+            self.heartbeat_thread.join(timeout=self.renew_interval + 5.0)
+
+        with self.lock:
+            buckets = list(self.leases)
+        released = redis_manager.release_leases(self._drop(buckets), self.node_id)
+        redis_manager.remove_lease_node(self.node_id)
+        self.stats.inc('released', released)
+        self.logger.info(f"租约管理已停止: 释放 {released} 个分桶")
+
+    def get_owned_buckets(self) -> List[int]:
+        """获取当前持有有效租约的分桶"""
+        now = time.monotonic()
+        with self.lock:
+            return sorted(bucket for bucket, deadline in self.deadlines.items() if now < deadline)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        stats = self.stats.snapshot()
+        stats.update({
+            'node_id': self.node_id,
+            'live_nodes': len(self.live_nodes),
+            'bucket_count': self.bucket_count
+        })
+        return stats
+
+    def __repr__(self):
+        return f"<LeaseManager(node={self.node_id}, buckets={len(self.leases)}/{self.bucket_count})>"
+
+
+# 全局租约管理器实例
+lease_manager = LeaseManager(
+    bucket_count=MONITOR_CONFIG.get('lease_bucket_count', 256),
+    lease_ttl=MONITOR_CONFIG.get('lease_ttl', 15),
+    renew_interval=MONITOR_CONFIG.get('lease_renew_interval', 5)
+)
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+过载保护
+根据数据库调用延迟、排队深度和引擎任务积压判断系统是否过载，
+过载时逐级拉长低优先级用户的检查间隔（有部分成交订单的用户不受影响），恢复后逐级还原
+"""
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict
+from ..database.concurrency import mysql_limiter, redis_limiter
+from ..config import MONITOR_CONFIG
+from ..metrics import MetricSet
+
+# 用户优先级（与 UserMonitor._activity_level 一致）
+PRIORITY_IDLE = 0
+PRIORITY_ACTIVE = 1
+PRIORITY_PARTIAL = 2
+
+
+class LoadShedder:
+    """按延迟SLO分级降载"""
+
+    def __init__(self, enabled: bool = True, latency_slo_ms: float = 200, db_queue_depth_slo: int = 20,
+                 executor_queue_depth_slo: int = 200, max_level: int = 4,
+                 evaluate_interval: float = 1.0, recover_intervals: int = 3):
+        """
+        初始化过载保护
+
+        Args:
+            enabled: 是否启用
+            latency_slo_ms: 数据库调用p95延迟阈值（毫秒）
+            db_queue_depth_slo: 等待数据库并发名额的调用数阈值
+            executor_queue_depth_slo: 登记的任务队列积压阈值
+            max_level: 最大降级等级
+            evaluate_interval: 判断间隔（秒）
+            recover_intervals: 连续多少次判断正常后降低一级
+        """
+        self.enabled = enabled
+        self.latency_slo = latency_slo_ms / 1000.0
+        self.db_queue_depth_slo = db_queue_depth_slo
+        self.executor_queue_depth_slo = executor_queue_depth_slo
+        self.max_level = max_level
+        self.evaluate_interval = evaluate_interval
+        self.recover_intervals = recover_intervals
+        self.limiters = [mysql_limiter, redis_limiter]
+
+        self.level = 0
+        self.healthy_streak = 0
+        self.last_evaluate = 0.0
+        self.last_reason = None
+        self.queue_gauges = {}  # {名称: 返回积压任务数的函数}
+        self.lock = threading.Lock()
+
+        # 统计信息
+        self.stats = MetricSet(
+            'load_shedder',
+            counters=('evaluations', 'breaches', 'level_ups', 'level_downs'),
+            gauges={'max_level_reached': 0, 'level': 0}
+        )
+        self.stats.set_function('level', lambda: self.level)
+
+        self.logger = logging.getLogger(__name__)
+
+    def add_queue_gauge(self, name: str, gauge: Callable[[], int]) -> None:
+        """登记一个任务队列积压深度，参与过载判断"""
+        self.queue_gauges[name] = gauge
+
+    def remove_queue_gauge(self, name: str) -> None:
+        """移除任务队列积压深度"""
+        self.queue_gauges.pop(name, None)
+
+    def _queue_depths(self) -> Dict[str, int]:
+        depths = {}
+        for name, gauge in list(self.queue_gauges.items()):
+            try:
+                depths[name] = gauge()
+            except Exception as e:
+                self.logger.error(f"读取队列深度失败 {name}: {e}")
+        return depths
+
+    def _check_breach(self):
+        """返回过载原因，正常时返回None"""
+        for limiter in self.limiters:
+            latency = limiter.latency_percentile(95)
+            if latency is not None and latency > self.latency_slo:
+                return f"{limiter.name} p95延迟 {latency * 1000:.0f}ms"
+            if limiter.waiting > self.db_queue_depth_slo:
+                return f"{limiter.name} 排队 {limiter.waiting}"
+        for name, depth in self._queue_depths().items():
+            if depth > self.executor_queue_depth_slo:
+                return f"{name} 积压 {depth}"
+        return None
+
+    def evaluate(self) -> int:
+        """
+        判断一次过载状态并调整降级等级
+
+        Returns:
+            int: 当前降级等级
+        """
+        reason = self._check_breach()
+        with self.lock:
+            self.stats.inc('evaluations')
+            self.last_reason = reason
+            if reason:
+                self.stats.inc('breaches')
+                self.healthy_streak = 0
+                if self.level < self.max_level:
+                    self.level += 1
+                    self.stats.inc('level_ups')
+                    self.stats.set('max_level_reached', max(self.stats['max_level_reached'], self.level))
+                    self.logger.warning(f"过载降级: 等级 {self.level}, 原因: {reason}")
+            elif self.level > 0:
+                self.healthy_streak += 1
+                if self.healthy_streak >= self.recover_intervals:
+                    self.healthy_streak = 0
+                    self.level -= 1
+                    self.stats.inc('level_downs')
+                    self.logger.info(f"过载恢复: 等级 {self.level}")
+            return self.level
+
+    def current_level(self) -> int:
+        """当前降级等级（距上次判断超过间隔时顺带重新判断）"""
+        if not self.enabled:
+            return 0
+        now = time.monotonic()
+        if now - self.last_evaluate >= self.evaluate_interval:
+            with self.lock:
+                due = now - self.last_evaluate >= self.evaluate_interval
+                if due:
+                    self.last_evaluate = now
+            if due:
+                self.evaluate()
+        return self.level
+
+    def stretch_factor(self, priority: int) -> float:
+        """
+        检查间隔放大倍数
+
+        空闲用户按 2^等级 放大；活跃用户只在等级超过2后放大；有部分成交订单的用户不放大
+
+        Args:
+            priority: 用户优先级
+
+        Returns:
+            float: 放大倍数
+        """
+        level = self.current_level()
+        if level == 0 or priority >= PRIORITY_PARTIAL:
+            return 1.0
+        if priority == PRIORITY_ACTIVE:
+            return float(2 ** max(0, level - 2))
+        return float(2 ** level)
+
+    def start_quota(self, base: int) -> int:
+        """过载时每次扫描允许启动的监控器数（按等级减半，至少1个）"""
+        level = self.current_level()
+        return max(1, base >> level) if base > 0 else base
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        stats = self.stats.snapshot()
+        stats.update({
+            'enabled': self.enabled,
+            'last_reason': self.last_reason
+        })
+        stats['queue_depths'] = self._queue_depths()
+        stats['limiters'] = {limiter.name: limiter.get_statistics() for limiter in self.limiters}
+        return stats
+
+    def __repr__(self):
+        return f"<LoadShedder(level={self.level}/{self.max_level})>"
+
+
+# 全局过载保护实例
+load_shedder = LoadShedder(
+    enabled=MONITOR_CONFIG.get('load_shedding', True),
+    latency_slo_ms=MONITOR_CONFIG.get('db_latency_slo_ms', 200),
+    db_queue_depth_slo=MONITOR_CONFIG.get('db_queue_depth_slo', 20),
+    executor_queue_depth_slo=MONITOR_CONFIG.get('executor_queue_depth_slo', 200),
+    max_level=MONITOR_CONFIG.get('shed_max_level', 4),
+    evaluate_interval=MONITOR_CONFIG.get('shed_evaluate_interval', 1.0),
+    recover_intervals=MONITOR_CONFIG.get('shed_recover_intervals', 3)
+)
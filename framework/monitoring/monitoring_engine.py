@@ -3,16 +3,24 @@
 高并发监控引擎
 负责管理所有用户的监控器，实现高并发订单监控
 """
+import os
 import threading
 import time
 import logging
 from typing import Dict, List, Set, Optional, Any
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed, wait
 from ..database import mysql_manager, redis_manager
 from ..config import MONITOR_CONFIG, SYSTEM_STATUS
 from .user_monitor import UserMonitor
+from .scheduler import WheelScheduler
 from .event_handler import event_handler, EventType
+from .strategy_feed import strategy_change_feed
+from .lease_manager import lease_manager
+from .check_budget import check_budget
+from .load_shedder import load_shedder
+from ..utils import order_write_buffer, HashRing
+from ..metrics import MetricSet
 
 
 class MonitoringEngine:
@@ -27,6 +35,27 @@ class MonitoringEngine:
         self.max_concurrent_users = MONITOR_CONFIG.get('max_workers', 100)
         self.user_scan_interval = MONITOR_CONFIG.get('check_interval', 0.1)
         self.health_check_interval = SYSTEM_STATUS.get('health_check_interval', 10)
+        self.scheduler_mode = MONITOR_CONFIG.get('scheduler_mode', 'thread')
+        self.batch_order_polling = MONITOR_CONFIG.get('batch_order_polling', False)
+        self.order_poll_interval = MONITOR_CONFIG.get('order_poll_interval', 1.0)
+        self.batch_size = MONITOR_CONFIG.get('batch_size', 100)
+        self.order_write_behind = MONITOR_CONFIG.get('order_write_behind', False)
+        self.strategy_change_feed = MONITOR_CONFIG.get('strategy_change_feed', False)
+        self.batch_strategy_polling = MONITOR_CONFIG.get('batch_strategy_polling', False)
+        self.strategy_poll_interval = MONITOR_CONFIG.get('strategy_poll_interval', 5.0)
+        self.strategy_snapshot = {}  # {user_id: {strategy_id: 活跃策略行}} 上一次的策略快照
+        
+        # 多进程分片：只监控一致性哈希环上归属本分片的用户（未设置时监控全部用户）
+        self.shard_id = None
+        self.shard_ring = None
+        
+        # 集群租约：只监控本节点持有分桶租约的用户（开启时取代分片哈希环，每个进程是一个节点）
+        self.cluster_leases = MONITOR_CONFIG.get('cluster_leases', False)
+        
+        # 过载保护：限制每次扫描启动的监控器数，统计线程池积压任务
+        self.max_starts_per_scan = MONITOR_CONFIG.get('max_starts_per_scan', 200)
+        self.start_wait_timeout = MONITOR_CONFIG.get('start_wait_timeout', 30)
+        self._starting = set()  # 启动任务尚未完成的用户，避免下一次扫描重复提交
         
         # 线程管理
         self.executor = ThreadPoolExecutor(
@@ -35,21 +64,26 @@ class MonitoringEngine:
         )
         self.scan_thread = None
         self.health_check_thread = None
+        self.order_poll_thread = None
+        self.strategy_poll_thread = None
+        
+        # 时间轮模式：所有用户检查共享调度器和策略回调线程池
+        self.scheduler = None
+        self.strategy_executor = None
         
         # 控制锁
         self.lock = threading.RLock()
         
-        # 统计信息
-        self.stats = {
-            'start_time': None,
-            'total_users_monitored': 0,
-            'active_users': 0,
-            'total_scans': 0,
-            'failed_starts': 0,
-            'failed_stops': 0,
-            'last_scan_time': None,
-            'last_health_check': None
-        }
+        # 统计信息（分片计数器，更新时不占用引擎锁；运行中的用户数在读取时计算）
+        self.stats = MetricSet(
+            'engine',
+            counters=('total_users_monitored', 'total_scans', 'failed_starts', 'failed_stops',
+                      'order_polls', 'polled_orders', 'strategy_polls', 'strategy_changes',
+                      'deferred_starts', 'start_timeouts', 'submitted_tasks', 'completed_tasks'),
+            gauges={'start_time': None, 'active_users': 0, 'last_scan_time': None, 'last_health_check': None,
+                    'last_order_poll_time': None, 'last_strategy_poll_time': None}
+        )
+        self.stats.set_function('active_users', self._count_running_monitors)
         
         self.logger = logging.getLogger(__name__)
         
@@ -80,14 +114,14 @@ class MonitoringEngine:
     def _handle_user_activate(self, event) -> None:
         """处理用户激活事件"""
         self.logger.info(f"用户激活: {event.user_id}")
-        with self.lock:
-            self.stats['active_users'] = len([m for m in self.user_monitors.values() if m.is_running()])
     
     def _handle_user_deactivate(self, event) -> None:
         """处理用户停用事件"""
         self.logger.info(f"用户停用: {event.user_id}")
-        with self.lock:
-            self.stats['active_users'] = len([m for m in self.user_monitors.values() if m.is_running()])
+    
+    def _count_running_monitors(self) -> int:
+        """运行中的用户监控器数量（读取统计时计算）"""
+        return sum(1 for monitor in list(self.user_monitors.values()) if monitor.is_running())
     
     def _scan_active_users(self) -> List[int]:
         """扫描需要监控的活跃用户"""
@@ -100,9 +134,9 @@ class MonitoringEngine:
                 users_with_strategies = mysql_manager.get_users_with_active_strategies()
                 active_users = [user['id'] for user in users_with_strategies]
                 
-                # 更新Redis缓存
-                for user_id in active_users:
-                    redis_manager.add_active_user(user_id)
+                # 更新Redis活跃用户集合（查询结果只有部分用户字段，不写入用户缓存，
+                # 用户信息由 _prefetch_users 按完整行加载）
+                redis_manager.add_active_users(active_users)
             
             self.logger.debug(f"扫描到活跃用户: {len(active_users)} 个")
             return active_users
@@ -111,12 +145,63 @@ class MonitoringEngine:
             self.logger.error(f"扫描活跃用户失败: {e}")
             return []
     
-    def _start_user_monitor(self, user_id: int) -> bool:
+    def set_shard(self, shard_id: int, ring: HashRing) -> None:
+        """
+        设置本引擎所属的分片和当前分片成员的哈希环
+        
+        下一次用户扫描时启动新归属本分片的用户，停止已迁移到其他分片的用户
+        
+        Args:
+            shard_id: 分片编号
+            ring: 当前存活分片组成的一致性哈希环
+        """
+        with self.lock:
+            self.shard_id = shard_id
+            self.shard_ring = ring
+        self.logger.info(f"分片设置: 分片 {shard_id}, 成员 {sorted(ring.nodes)}")
+    
+    def owns_user(self, user_id: int) -> bool:
+        """用户是否归属本节点（集群租约）或本分片"""
+        if self.cluster_leases:
+            return lease_manager.owns_user(user_id)
+        ring = self.shard_ring
+        return ring is None or ring.get_node(user_id) == self.shard_id
+    
+    def _on_leases_lost(self, buckets: Set[int]) -> None:
+        """租约失效回调：丢弃这些分桶用户尚未写库的订单更新（已由新持有者负责）"""
+        if self.order_write_behind:
+            order_write_buffer.discard_users(lambda user_id: lease_manager.bucket_for(user_id) in buckets)
+    
+    def _prefetch_users(self, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        批量预取用户信息：先一次MGET读取Redis缓存，未命中的按批查询MySQL后批量回写缓存
+        
+        Args:
+            user_ids: 用户ID列表
+            
+        Returns:
+            Dict[int, Dict[str, Any]]: {user_id: 用户数据}
+        """
+        try:
+            users = redis_manager.get_cached_users(user_ids)
+            missing = [user_id for user_id in user_ids if user_id not in users]
+            if missing:
+                rows = mysql_manager.get_users_by_ids(missing, self.batch_size)
+                if rows:
+                    redis_manager.cache_users(rows)
+                    users.update({row['id']: row for row in rows})
+            return users
+        except Exception as e:
+            self.logger.error(f"批量预取用户信息失败: {e}")
+            return {}
+    
+    def _start_user_monitor(self, user_id: int, user_data: Optional[Dict[str, Any]] = None) -> bool:
         """
         启动用户监控器
         
         Args:
             user_id: 用户ID
+            user_data: 预取的用户信息
             
         Returns:
             bool: 启动是否成功
@@ -135,55 +220,58 @@ class MonitoringEngine:
                         del self.user_monitors[user_id]
                 
                 # 创建新的监控器
-                monitor = UserMonitor(user_id)
+                monitor = UserMonitor(user_id, strategy_executor=self.strategy_executor, user_data=user_data)
+                monitor.external_order_feed = self.batch_order_polling
+                monitor.external_strategy_feed = self.strategy_change_feed or self.batch_strategy_polling
+                if self.cluster_leases:
+                    # 订单写入携带租约防护令牌，租约失效或被其他节点接管后不再写入
+                    monitor.order_manager.write_fence = lease_manager
                 
                 # 启动监控器
-                if monitor.start():
+                if monitor.start(scheduler=self.scheduler):
                     self.user_monitors[user_id] = monitor
-                    self.stats['total_users_monitored'] += 1
+                    self.stats.inc('total_users_monitored')
                     self.logger.info(f"用户监控启动成功: {user_id}")
                     return True
                 else:
                     self.logger.warning(f"用户监控启动失败: {user_id}")
                     monitor.cleanup()
-                    self.stats['failed_starts'] += 1
+                    self.stats.inc('failed_starts')
                     return False
                     
         except Exception as e:
             self.logger.error(f"启动用户监控异常: {user_id}, 错误: {e}")
-            self.stats['failed_starts'] += 1
+            self.stats.inc('failed_starts')
             return False
     
-    def _stop_user_monitor(self, user_id: int) -> bool:
+    def _stop_user_monitor(self, user_id: int, handoff: bool = False) -> bool:
         """
         停止用户监控器
         
         Args:
             user_id: 用户ID
+            handoff: 用户迁移到其他分片，保留其活跃状态和缓存
             
         Returns:
             bool: 停止是否成功
         """
         try:
+            # 先从字典中移除，停止过程不占用引擎锁，多个用户可以并发停止
             with self.lock:
-                monitor = self.user_monitors.get(user_id)
-                if not monitor:
-                    self.logger.debug(f"用户监控器不存在: {user_id}")
-                    return True
-                
-                # 停止监控器
-                monitor.stop()
-                monitor.cleanup()
-                
-                # 从字典中移除
-                del self.user_monitors[user_id]
-                
-                self.logger.info(f"用户监控停止成功: {user_id}")
+                monitor = self.user_monitors.pop(user_id, None)
+            if not monitor:
+                self.logger.debug(f"用户监控器不存在: {user_id}")
                 return True
+            
+            # 停止监控器并清理资源
+            monitor.cleanup(deactivate=not handoff)
+            
+            self.logger.info(f"用户监控停止成功: {user_id}")
+            return True
                 
         except Exception as e:
             self.logger.error(f"停止用户监控异常: {user_id}, 错误: {e}")
-            self.stats['failed_stops'] += 1
+            self.stats.inc('failed_stops')
             return False
     
     def _restart_user_monitor(self, user_id: int) -> bool:
@@ -207,6 +295,39 @@ class MonitoringEngine:
         # 再启动
         return self._start_user_monitor(user_id)
     
+    def _submit(self, fn, *args) -> Future:
+        """提交任务到线程池，并统计积压任务数"""
+        self.stats.inc('submitted_tasks')
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception:
+            self.stats.inc('completed_tasks')
+            raise
+        future.add_done_callback(self._task_done)
+        return future
+    
+    def _task_done(self, future: Future) -> None:
+        self.stats.inc('completed_tasks')
+    
+    @property
+    def pending_tasks(self) -> int:
+        """已提交到线程池但尚未完成的任务数"""
+        return max(0, self.stats['submitted_tasks'] - self.stats['completed_tasks'])
+    
+    def _submit_start(self, user_id: int, user_data: Optional[Dict[str, Any]] = None) -> Optional[Future]:
+        """提交用户监控启动任务（同一用户的启动任务未完成时不重复提交）"""
+        with self.lock:
+            if user_id in self._starting:
+                return None
+            self._starting.add(user_id)
+        future = self._submit(self._start_user_monitor, user_id, user_data)
+        future.add_done_callback(lambda _, user_id=user_id: self._start_done(user_id))
+        return future
+    
+    def _start_done(self, user_id: int) -> None:
+        with self.lock:
+            self._starting.discard(user_id)
+    
     def _user_scan_loop(self) -> None:
         """用户扫描循环"""
         self.logger.info("用户扫描循环启动")
@@ -216,43 +337,62 @@ class MonitoringEngine:
                 start_time = time.time()
                 
                 # 扫描活跃用户
-                active_users = set(self._scan_active_users())
-                current_users = set(self.user_monitors.keys())
+                scanned_users = set(self._scan_active_users())
+                active_users = {user_id for user_id in scanned_users if self.owns_user(user_id)}
+                with self.lock:
+                    current_users = set(self.user_monitors.keys())
+                    starting_users = set(self._starting)
                 
-                # 需要启动的用户
-                users_to_start = active_users - current_users
+                # 需要启动的用户（上次扫描提交的启动任务仍在执行的除外）
+                users_to_start = active_users - current_users - starting_users
                 
                 # 需要停止的用户
                 users_to_stop = current_users - active_users
                 
+                # 每次扫描启动的数量有上限，过载时按降级等级减半，其余留到后续扫描
+                quota = load_shedder.start_quota(self.max_starts_per_scan)
+                if quota and len(users_to_start) > quota:
+                    deferred = len(users_to_start) - quota
+                    users_to_start = set(sorted(users_to_start)[:quota])
+                    self.stats.inc('deferred_starts', deferred)
+                    self.logger.info(f"推迟启动 {deferred} 个用户监控（本次上限 {quota}）")
+                
                 # 并发启动新用户监控
                 if users_to_start:
                     self.logger.info(f"启动新用户监控: {len(users_to_start)} 个用户")
                     
-                    futures = []
-                    for user_id in users_to_start:
-                        future = self.executor.submit(self._start_user_monitor, user_id)
-                        futures.append((user_id, future))
+                    prefetched = self._prefetch_users(list(users_to_start))
                     
-                    # 等待启动完成
-                    for user_id, future in futures:
-                        try:
-                            future.result(timeout=30)  # 30秒超时
-                        except Exception as e:
-                            self.logger.error(f"启动用户监控超时或失败: {user_id}, 错误: {e}")
+                    futures = [self._submit_start(user_id, prefetched.get(user_id)) for user_id in users_to_start]
+                    
+                    # 等待启动完成（总超时，未完成的启动任务继续执行，下次扫描不会重复提交）
+                    done, not_done = wait([future for future in futures if future is not None],
+                                          timeout=self.start_wait_timeout)
+                    for future in done:
+                        if future.exception() is not None:
+                            self.logger.error(f"启动用户监控失败: {future.exception()}")
+                    if not_done:
+                        self.stats.inc('start_timeouts', len(not_done))
+                        self.logger.warning(f"{len(not_done)} 个用户监控启动超过 {self.start_wait_timeout} 秒")
                 
                 # 停止不需要的用户监控
                 if users_to_stop:
                     self.logger.info(f"停止用户监控: {len(users_to_stop)} 个用户")
                     
-                    for user_id in users_to_stop:
-                        self._stop_user_monitor(user_id)
+                    # 仍然活跃但已归属其他分片的用户只移交，不移出活跃用户集合
+                    futures = [
+                        self._submit(self._stop_user_monitor, user_id, user_id in scanned_users)
+                        for user_id in users_to_stop
+                    ]
+                    for future in futures:
+                        try:
+                            future.result(timeout=30)
+                        except Exception as e:
+                            self.logger.error(f"停止用户监控超时或失败: {e}")
                 
                 # 更新统计信息
-                with self.lock:
-                    self.stats['total_scans'] += 1
-                    self.stats['last_scan_time'] = datetime.now()
-                    self.stats['active_users'] = len([m for m in self.user_monitors.values() if m.is_running()])
+                self.stats.inc('total_scans')
+                self.stats.set('last_scan_time', datetime.now())
                 
                 # 计算休眠时间
                 elapsed = time.time() - start_time
@@ -267,6 +407,158 @@ class MonitoringEngine:
         
         self.logger.info("用户扫描循环结束")
     
+    def _on_strategy_changes(self, user_id: Optional[int], changes: Optional[List[Dict[str, Any]]]) -> None:
+        """
+        策略变更订阅回调：分发给对应的用户监控器
+        
+        Args:
+            user_id: 用户ID，为None时所有用户监控器重新全量对账
+            changes: 该用户的策略变更列表
+        """
+        with self.lock:
+            if user_id is None:
+                monitors = list(self.user_monitors.values())
+            else:
+                monitor = self.user_monitors.get(user_id)
+                monitors = [monitor] if monitor is not None else []
+        
+        if user_id is not None and not any(monitor.is_running() for monitor in monitors):
+            # 未被监控（或已因没有活跃策略停止）的用户启用了策略时，加入活跃用户集合并启动监控
+            if (self.running and self.owns_user(user_id)
+                    and any((change.get('row') or {}).get('status') == 1 for change in changes or [])):
+                redis_manager.add_active_user(user_id)
+                self._submit_start(user_id)
+            return
+        
+        for monitor in monitors:
+            monitor.notify_strategy_changes(changes)
+    
+    def _poll_orders(self) -> None:
+        """批量查询所有被监控用户的活跃订单，并分发给各用户的订单管理器"""
+        with self.lock:
+            monitors = {
+                user_id: monitor for user_id, monitor in self.user_monitors.items()
+                if monitor.is_running()
+            }
+        
+        if not monitors:
+            return
+        
+        orders_data = mysql_manager.get_active_orders_for_users(list(monitors.keys()), self.batch_size)
+        
+        orders_by_user = {}
+        for order_data in orders_data:
+            orders_by_user.setdefault(order_data['user_id'], []).append(order_data)
+        
+        # 分发活跃订单，收集已离开活跃状态的订单
+        departed = {}  # {order_id: user_id}
+        for user_id, monitor in monitors.items():
+            for order_id in monitor.order_manager.apply_active_orders(orders_by_user.get(user_id, [])):
+                departed[order_id] = user_id
+        
+        # 一次性查询已完成订单的最终状态
+        if departed:
+            refreshed = {}
+            for order_data in mysql_manager.get_orders_by_ids(list(departed.keys()), self.batch_size):
+                refreshed.setdefault(departed[order_data['id']], []).append(order_data)
+            
+            for user_id in set(departed.values()):
+                rows = refreshed.get(user_id, [])
+                found_ids = {row['id'] for row in rows}
+                missing_ids = [oid for oid, uid in departed.items() if uid == user_id and oid not in found_ids]
+                monitors[user_id].order_manager.apply_order_rows(rows, missing_ids)
+        
+        self.stats.inc('order_polls')
+        self.stats.inc('polled_orders', len(orders_data))
+        self.stats.set('last_order_poll_time', datetime.now())
+    
+    def _order_poll_loop(self) -> None:
+        """批量订单轮询循环"""
+        self.logger.info("批量订单轮询循环启动")
+        
+        while self.running:
+            try:
+                start_time = time.time()
+                
+                self._poll_orders()
+                
+                # 计算休眠时间
+                elapsed = time.time() - start_time
+                sleep_time = max(0, self.order_poll_interval - elapsed)
+                
+                if sleep_time > 0:
+                    self._interruptible_sleep(sleep_time)
+                
+            except Exception as e:
+                self.logger.error(f"批量订单轮询异常: {e}")
+                self._interruptible_sleep(5.0)  # 出错时休息5秒
+        
+        self.logger.info("批量订单轮询循环结束")
+    
+    def _poll_strategies(self) -> None:
+        """查询所有被监控用户的活跃策略快照，与上一次快照比较后只向有变化的用户分发"""
+        with self.lock:
+            monitors = {
+                user_id: monitor for user_id, monitor in self.user_monitors.items()
+                if monitor.is_running()
+            }
+        
+        if not monitors:
+            self.strategy_snapshot = {}
+            return
+        
+        rows = mysql_manager.get_active_strategies_for_users(list(monitors.keys()), self.batch_size)
+        
+        snapshot = {user_id: {} for user_id in monitors}
+        for row in rows:
+            if row['user_id'] in snapshot:
+                snapshot[row['user_id']][row['id']] = row
+        
+        # 新加入快照的用户以空快照为基线，其活跃策略全部分发一次（重复应用无副作用）
+        changed = 0
+        for user_id, current in snapshot.items():
+            previous = self.strategy_snapshot.get(user_id, {})
+            changes = [
+                {'user_id': user_id, 'strategy_id': strategy_id, 'row': row}
+                for strategy_id, row in current.items() if previous.get(strategy_id) != row
+            ]
+            changes.extend(
+                {'user_id': user_id, 'strategy_id': strategy_id, 'removed': True}
+                for strategy_id in previous.keys() - current.keys()
+            )
+            if changes:
+                monitors[user_id].notify_strategy_changes(changes)
+                changed += len(changes)
+        
+        self.strategy_snapshot = snapshot
+        
+        self.stats.inc('strategy_polls')
+        self.stats.inc('strategy_changes', changed)
+        self.stats.set('last_strategy_poll_time', datetime.now())
+    
+    def _strategy_poll_loop(self) -> None:
+        """策略快照轮询循环"""
+        self.logger.info("策略快照轮询循环启动")
+        
+        while self.running:
+            try:
+                start_time = time.time()
+                
+                self._poll_strategies()
+                
+                # 计算休眠时间
+                elapsed = time.time() - start_time
+                sleep_time = max(0, self.strategy_poll_interval - elapsed)
+                
+                if sleep_time > 0:
+                    self._interruptible_sleep(sleep_time)
+                
+            except Exception as e:
+                self.logger.error(f"策略快照轮询异常: {e}")
+                self._interruptible_sleep(5.0)  # 出错时休息5秒
+        
+        self.logger.info("策略快照轮询循环结束")
+    
     def _health_check_loop(self) -> None:
         """健康检查循环"""
         self.logger.info("健康检查循环启动")
@@ -311,8 +603,7 @@ class MonitoringEngine:
                     )
                 
                 # 更新统计信息
-                with self.lock:
-                    self.stats['last_health_check'] = datetime.now()
+                self.stats.set('last_health_check', datetime.now())
                 
                 # 计算休眠时间
                 elapsed = time.time() - start_time
@@ -333,6 +624,28 @@ class MonitoringEngine:
         while time.time() < end_time and self.running:
             time.sleep(min(1.0, end_time - time.time()))
     
+    def _start_scheduler(self) -> None:
+        """启动共享时间轮调度器和策略回调线程池"""
+        cores = os.cpu_count() or 1
+        self.scheduler = WheelScheduler(
+            max_workers=MONITOR_CONFIG.get('scheduler_workers') or cores,
+            tick=MONITOR_CONFIG.get('scheduler_tick', 0.01)
+        )
+        self.scheduler.start()
+        self.strategy_executor = ThreadPoolExecutor(
+            max_workers=MONITOR_CONFIG.get('strategy_workers') or cores,
+            thread_name_prefix="StrategyWorker"
+        )
+    
+    def _stop_scheduler(self) -> None:
+        """停止共享调度器和策略回调线程池"""
+        if self.scheduler:
+            self.scheduler.stop()
+            self.scheduler = None
+        if self.strategy_executor:
+            self.strategy_executor.shutdown(wait=True)
+            self.strategy_executor = None
+    
     def start(self) -> bool:
         """
         启动监控引擎
@@ -350,9 +663,33 @@ class MonitoringEngine:
             # 启动事件处理器
             event_handler.start()
             
+            # 时间轮模式下启动共享调度器
+            if self.scheduler_mode == 'wheel':
+                self._start_scheduler()
+            
+            # 启动订单写回缓冲区
+            if self.order_write_behind:
+                order_write_buffer.start()
+            
+            # 启动策略变更订阅
+            if self.strategy_change_feed:
+                strategy_change_feed.add_handler(self._on_strategy_changes)
+                strategy_change_feed.start()
+            
+            # 获取集群租约（首次扫描前已持有分桶）
+            if self.cluster_leases:
+                order_write_buffer.fence = lease_manager
+                lease_manager.add_lost_callback(self._on_leases_lost)
+                lease_manager.start()
+            
+            # 线程池与调度器的积压参与过载判断
+            load_shedder.add_queue_gauge('engine_executor', lambda: self.pending_tasks)
+            if self.scheduler:
+                load_shedder.add_queue_gauge('scheduler', self.scheduler.backlog)
+            
             # 设置运行标志
             self.running = True
-            self.stats['start_time'] = datetime.now()
+            self.stats.set('start_time', datetime.now())
             
             # 启动用户扫描线程
             self.scan_thread = threading.Thread(
@@ -370,6 +707,24 @@ class MonitoringEngine:
             )
             self.health_check_thread.start()
             
+            # 启动批量订单轮询线程
+            if self.batch_order_polling:
+                self.order_poll_thread = threading.Thread(
+                    target=self._order_poll_loop,
+                    name="OrderPollThread",
+                    daemon=True
+                )
+                self.order_poll_thread.start()
+            
+            # 启动策略快照轮询线程
+            if self.batch_strategy_polling:
+                self.strategy_poll_thread = threading.Thread(
+                    target=self._strategy_poll_loop,
+                    name="StrategyPollThread",
+                    daemon=True
+                )
+                self.strategy_poll_thread.start()
+            
             self.logger.info("监控引擎启动成功")
             return True
             
@@ -394,16 +749,20 @@ class MonitoringEngine:
         # 设置停止标志
         self.running = False
         
+        # 停止策略变更订阅
+        if self.strategy_change_feed:
+            strategy_change_feed.stop()
+        
         # 停止所有用户监控器
         with self.lock:
             user_ids = list(self.user_monitors.keys())
         
         self.logger.info(f"停止 {len(user_ids)} 个用户监控器")
         
-        # 并发停止所有用户监控器
+        # 并发停止所有用户监控器（集群租约模式下只移交，由其他节点接管）
         futures = []
         for user_id in user_ids:
-            future = self.executor.submit(self._stop_user_monitor, user_id)
+            future = self._submit(self._stop_user_monitor, user_id, self.cluster_leases)
             futures.append(future)
         
         # 等待所有监控器停止
@@ -425,8 +784,34 @@ class MonitoringEngine:
             if self.health_check_thread.is_alive():
                 self.logger.warning("健康检查线程未能及时停止")
         
+        # 等待批量订单轮询线程结束
+        if self.order_poll_thread and self.order_poll_thread.is_alive():
+            self.order_poll_thread.join(timeout=5.0)
+            if self.order_poll_thread.is_alive():
+                self.logger.warning("批量订单轮询线程未能及时停止")
+        
+        # 等待策略快照轮询线程结束
+        if self.strategy_poll_thread and self.strategy_poll_thread.is_alive():
+            self.strategy_poll_thread.join(timeout=5.0)
+            if self.strategy_poll_thread.is_alive():
+                self.logger.warning("策略快照轮询线程未能及时停止")
+        
+        # 释放集群租约
+        if self.cluster_leases:
+            lease_manager.remove_lost_callback(self._on_leases_lost)
+            lease_manager.stop()
+        
         # 关闭线程池
         self.executor.shutdown(wait=True)
+        load_shedder.remove_queue_gauge('engine_executor')
+        load_shedder.remove_queue_gauge('scheduler')
+        
+        # 停止共享调度器
+        self._stop_scheduler()
+        
+        # 写入写回缓冲区中剩余的订单更新
+        if self.order_write_behind:
+            order_write_buffer.stop()
         
         # 停止事件处理器
         event_handler.stop()
@@ -435,25 +820,37 @@ class MonitoringEngine:
     
     def get_statistics(self) -> Dict[str, Any]:
         """获取统计信息"""
+        stats = self.stats.snapshot()
         with self.lock:
-            stats = self.stats.copy()
-            
-            # 添加实时统计
-            stats.update({
-                'running': self.running,
-                'total_user_monitors': len(self.user_monitors),
-                'active_user_monitors': len([m for m in self.user_monitors.values() if m.is_running()]),
-                'event_handler_stats': event_handler.get_statistics(),
-                'user_monitor_details': {
-                    user_id: monitor.get_statistics() 
-                    for user_id, monitor in self.user_monitors.items()
-                }
-            })
-            
-            if stats['start_time']:
-                stats['uptime_seconds'] = (datetime.now() - stats['start_time']).total_seconds()
-            
-            return stats
+            monitors = dict(self.user_monitors)
+            starting_users = len(self._starting)
+        
+        # 添加实时统计
+        stats.update({
+            'running': self.running,
+            'scheduler_mode': self.scheduler_mode,
+            'shard_id': self.shard_id,
+            'scheduler_stats': self.scheduler.get_statistics() if self.scheduler else None,
+            'order_write_stats': order_write_buffer.get_statistics() if self.order_write_behind else None,
+            'strategy_feed_stats': strategy_change_feed.get_statistics() if self.strategy_change_feed else None,
+            'lease_stats': lease_manager.get_statistics() if self.cluster_leases else None,
+            'check_budget_stats': check_budget.get_statistics() if check_budget.enabled else None,
+            'backpressure': dict(load_shedder.get_statistics(), pending_tasks=self.pending_tasks,
+                                 starting_users=starting_users),
+            'local_cache_stats': redis_manager.get_local_cache_statistics(),
+            'total_user_monitors': len(monitors),
+            'active_user_monitors': stats['active_users'],
+            'event_handler_stats': event_handler.get_statistics(),
+            'user_monitor_details': {
+                user_id: monitor.get_statistics() 
+                for user_id, monitor in monitors.items()
+            }
+        })
+        
+        if stats['start_time']:
+            stats['uptime_seconds'] = (datetime.now() - stats['start_time']).total_seconds()
+        
+        return stats
     
     def get_user_monitor(self, user_id: int) -> Optional[UserMonitor]:
         """获取指定用户的监控器"""
@@ -0,0 +1,422 @@
+# -*- coding: utf-8 -*-
+"""
+共享时间轮调度器
+使用分层时间轮 + 固定大小工作线程池调度所有用户的周期性检查，
+替代每个用户一个监控线程的模式
+"""
+import os
+import threading
+import time
+import logging
+from typing import Callable, Dict, Any, Optional, List
+from concurrent.futures import ThreadPoolExecutor
+from ..metrics import MetricSet
+
+
+class TimerHandle:
+    """时间轮定时器句柄"""
+
+    def __init__(self, expires: int, callback: Callable[[], None]):
+        self.expires = expires  # 到期刻度（绝对tick）
+        self.callback = callback
+        self.cancelled = False
+        self._bucket = None  # 所在的槽位集合，便于O(1)取消
+
+    def cancel(self) -> None:
+        """取消定时器"""
+        self.cancelled = True
+        if self._bucket is not None:
+            self._bucket.discard(self)
+            self._bucket = None
+
+
+class TimerWheel:
+    """
+    分层时间轮（非线程安全，由调用方加锁）
+
+    第0层每个槽位代表1个tick，第L层每个槽位代表 wheel_size**L 个tick，
+    高层槽位在低层转完一圈时向下级联，插入和到期均为O(1)
+    """
+
+    def __init__(self, wheel_size: int = 64, levels: int = 4):
+        self.wheel_size = wheel_size
+        self.levels = levels
+        self.current_tick = 0
+        self._spans = [wheel_size ** level for level in range(levels + 1)]
+        self._wheels = [[set() for _ in range(wheel_size)] for _ in range(levels)]
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def schedule(self, delay_ticks: int, callback: Callable[[], None]) -> TimerHandle:
+        """在 delay_ticks 个tick后触发回调（至少1个tick）"""
+        handle = TimerHandle(self.current_tick + max(1, int(delay_ticks)), callback)
+        self._insert(handle)
+        self._count += 1
+        return handle
+
+    def _insert(self, handle: TimerHandle) -> None:
+        """按剩余刻度放入对应层级的槽位"""
+        delta = handle.expires - self.current_tick
+        for level in range(self.levels):
+            if delta < self._spans[level + 1]:
+                break
+        else:
+            # 超出时间轮最大跨度，先放入最高层最远槽位，级联时重新定位
+            level = self.levels - 1
+        slot = (handle.expires // self._spans[level]) % self.wheel_size
+        bucket = self._wheels[level][slot]
+        bucket.add(handle)
+        handle._bucket = bucket
+
+    def advance(self, ticks: int = 1) -> List[TimerHandle]:
+        """
+        推进时间轮
+
+        Args:
+            ticks: 推进的tick数
+
+        Returns:
+            List[TimerHandle]: 到期的定时器
+        """
+        expired = []
+        for _ in range(ticks):
+            self.current_tick += 1
+            tick = self.current_tick
+
+            # 低层转完一圈时，从高层级联到低层
+            for level in range(1, self.levels):
+                if tick % self._spans[level]:
+                    break
+                slot = (tick // self._spans[level]) % self.wheel_size
+                bucket = self._wheels[level][slot]
+                if bucket:
+                    self._wheels[level][slot] = set()
+                    for handle in bucket:
+                        self._insert(handle)
+
+            slot = tick % self.wheel_size
+            bucket = self._wheels[0][slot]
+            if not bucket:
+                continue
+
+            remaining = set()
+            for handle in bucket:
+                if handle.expires <= tick:
+                    handle._bucket = None
+                    self._count -= 1
+                    if not handle.cancelled:
+                        expired.append(handle)
+                else:
+                    # 超出最大跨度的定时器，等待下一圈
+                    remaining.add(handle)
+                    handle._bucket = remaining
+            self._wheels[0][slot] = remaining
+
+        return expired
+
+    def cancel(self, handle: TimerHandle) -> None:
+        """取消定时器"""
+        if handle._bucket is not None:
+            self._count -= 1
+        handle.cancel()
+
+
+class PeriodicJob:
+    """周期性任务"""
+
+    def __init__(self, name: str, interval: float, callback: Callable[[], Any]):
+        """
+        初始化周期性任务
+
+        Args:
+            name: 任务名称
+            interval: 执行间隔（秒），执行过程中可修改
+            callback: 任务函数，返回False时停止调度
+        """
+        self.name = name
+        self.interval = interval
+        self.callback = callback
+        self.next_deadline = 0.0
+        self.cancelled = False
+        self.timer = None
+
+        # 统计信息
+        self.runs = 0
+        self.missed_deadlines = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+
+        # 任务空闲事件，用于停止时等待正在执行的任务
+        self._idle = threading.Event()
+        self._idle.set()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """等待任务当前的执行结束"""
+        return self._idle.wait(timeout)
+
+    def is_active(self) -> bool:
+        """任务是否仍在调度中"""
+        return not self.cancelled
+
+    def __repr__(self):
+        return f"<PeriodicJob(name='{self.name}', interval={self.interval}, runs={self.runs})>"
+
+
+class WheelScheduler:
+    """基于分层时间轮的共享调度器"""
+
+    def __init__(self, max_workers: Optional[int] = None, tick: float = 0.01,
+                 wheel_size: int = 64, levels: int = 4):
+        """
+        初始化调度器
+
+        Args:
+            max_workers: 工作线程数，默认等于CPU核数
+            tick: 时间轮刻度（秒）
+            wheel_size: 每层槽位数
+            levels: 时间轮层数
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.tick = tick
+        self.wheel = TimerWheel(wheel_size=wheel_size, levels=levels)
+
+        self.executor = None
+        self.driver_thread = None
+        self.running = False
+        self.lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._base_time = None
+
+        self.jobs = {}  # {id(job): PeriodicJob}
+
+        # 统计信息
+        self.stats = MetricSet(
+            'scheduler',
+            counters=('submitted', 'dispatched', 'failed', 'missed_deadlines', 'total_lag'),
+            gauges={'start_time': None, 'max_lag': 0.0}
+        )
+
+        self.logger = logging.getLogger(__name__)
+
+    def _now_tick(self, now: float) -> int:
+        """将单调时间换算为绝对tick"""
+        return int((now - self._base_time) / self.tick)
+
+    def _arm(self, job: PeriodicJob) -> None:
+        """按任务的下一个截止时间放入时间轮（调用方持有锁）"""
+        deadline_tick = int((job.next_deadline - self._base_time) / self.tick + 0.999999)
+        job.timer = self.wheel.schedule(deadline_tick - self.wheel.current_tick,
+                                        lambda job=job: self._dispatch(job))
+
+    def schedule_periodic(self, interval: float, callback: Callable[[], Any],
+                          name: str = None, initial_delay: Optional[float] = None) -> PeriodicJob:
+        """
+        调度周期性任务
+
+        Args:
+            interval: 执行间隔（秒）
+            callback: 任务函数，返回False时停止调度
+            name: 任务名称
+            initial_delay: 首次执行延迟，默认等于interval
+
+        Returns:
+            PeriodicJob: 任务对象
+        """
+        if not self.running:
+            raise RuntimeError("调度器未运行")
+
+        job = PeriodicJob(name or getattr(callback, '__name__', 'job'), interval, callback)
+        delay = interval if initial_delay is None else initial_delay
+        with self.lock:
+            job.next_deadline = time.monotonic() + delay
+            self.jobs[id(job)] = job
+            self._arm(job)
+        return job
+
+    def cancel(self, job: PeriodicJob) -> None:
+        """取消周期性任务"""
+        with self.lock:
+            job.cancelled = True
+            if job.timer is not None:
+                self.wheel.cancel(job.timer)
+                job.timer = None
+            self.jobs.pop(id(job), None)
+
+    def reschedule(self, job: PeriodicJob, delay: float) -> bool:
+        """
+        提前任务的下一次执行（任务正在执行时不处理，执行结束后按新的间隔重新调度）
+
+        Args:
+            job: 周期性任务
+            delay: 距下一次执行的秒数
+
+        Returns:
+            bool: 是否已提前
+        """
+        with self.lock:
+            if job.cancelled or job.timer is None or not self.running:
+                return False
+            deadline = time.monotonic() + delay
+            if deadline >= job.next_deadline:
+                return False
+            self.wheel.cancel(job.timer)
+            job.next_deadline = deadline
+            self._arm(job)
+        return True
+
+    def _dispatch(self, job: PeriodicJob) -> None:
+        """将到期任务提交到工作线程池"""
+        job.timer = None
+        if job.cancelled:
+            return
+        job._idle.clear()
+        try:
+            self.executor.submit(self._run_job, job)
+            self.stats.inc('submitted')
+        except RuntimeError:
+            # 线程池已关闭
+            job._idle.set()
+
+    def _run_job(self, job: PeriodicJob) -> None:
+        """在工作线程中执行任务，并按截止时间重新调度"""
+        start = time.monotonic()
+        lag = max(0.0, start - job.next_deadline)
+        result = None
+        failed = False
+        try:
+            result = job.callback()
+        except Exception as e:
+            failed = True
+            self.logger.error(f"调度任务执行失败: {job.name}, 错误: {e}")
+        finally:
+            job.runs += 1
+            job.total_lag += lag
+            job.max_lag = max(job.max_lag, lag)
+
+        self.stats.inc('dispatched')
+        self.stats.inc('failed', int(failed))
+        self.stats.inc('total_lag', lag)
+
+        missed = 0
+        with self.lock:
+            if lag > self.stats['max_lag']:
+                self.stats.set('max_lag', lag)
+
+            if result is False or job.cancelled or not self.running:
+                job.cancelled = True
+                self.jobs.pop(id(job), None)
+            else:
+                # 以截止时间为基准推进，错过的周期直接跳过，不累积漂移
+                now = time.monotonic()
+                job.next_deadline += job.interval
+                if job.next_deadline <= now:
+                    missed = int((now - job.next_deadline) / job.interval) + 1
+                    job.next_deadline += missed * job.interval
+                    job.missed_deadlines += missed
+                self._arm(job)
+
+        if missed:
+            self.stats.inc('missed_deadlines', missed)
+
+        job._idle.set()
+
+    def _driver_loop(self) -> None:
+        """时间轮驱动线程"""
+        self.logger.info("时间轮调度线程启动")
+
+        while self.running:
+            try:
+                with self.lock:
+                    next_tick_time = self._base_time + (self.wheel.current_tick + 1) * self.tick
+                wait = next_tick_time - time.monotonic()
+                if wait > 0:
+                    self._wakeup.wait(wait)
+                    if not self.running:
+                        break
+
+                with self.lock:
+                    ticks = self._now_tick(time.monotonic()) - self.wheel.current_tick
+                    expired = self.wheel.advance(ticks) if ticks > 0 else []
+
+                for handle in expired:
+                    handle.callback()
+
+            except Exception as e:
+                self.logger.error(f"时间轮调度线程异常: {e}")
+                time.sleep(self.tick)
+
+        self.logger.info("时间轮调度线程结束")
+
+    def start(self) -> None:
+        """启动调度器"""
+        if self.running:
+            self.logger.warning("调度器已经在运行")
+            return
+
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                           thread_name_prefix="WheelWorker")
+        self._base_time = time.monotonic()
+        self.wheel.current_tick = 0
+        self._wakeup.clear()
+        self.running = True
+        self.stats.set('start_time', time.time())
+
+        self.driver_thread = threading.Thread(
+            target=self._driver_loop,
+            name="WheelScheduler",
+            daemon=True
+        )
+        self.driver_thread.start()
+
+        self.logger.info(f"时间轮调度器启动: 工作线程 {self.max_workers}, 刻度 {self.tick}s")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """
+        停止调度器
+
+        Args:
+            timeout: 停止超时时间（秒）
+        """
+        if not self.running:
+            return
+
+        self.running = False
+        self._wakeup.set()
+
+        if self.driver_thread and self.driver_thread.is_alive():
+            self.driver_thread.join(timeout=timeout)
+
+        with self.lock:
+            for job in list(self.jobs.values()):
+                job.cancelled = True
+                if job.timer is not None:
+                    self.wheel.cancel(job.timer)
+                    job.timer = None
+            self.jobs.clear()
+
+        self.executor.shutdown(wait=True)
+        self.logger.info("时间轮调度器已停止")
+
+    def backlog(self) -> int:
+        """已提交到工作线程池但尚未执行完的任务数"""
+        return max(0, self.stats['submitted'] - self.stats['dispatched'])
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        stats = self.stats.snapshot()
+        with self.lock:
+            stats.update({
+                'running': self.running,
+                'workers': self.max_workers,
+                'tick': self.tick,
+                'scheduled_jobs': len(self.jobs),
+                'pending_timers': len(self.wheel),
+                'backlog': self.backlog(),
+            })
+        stats['avg_lag'] = stats['total_lag'] / stats['dispatched'] if stats['dispatched'] else 0.0
+        return stats
+
+    def __repr__(self):
+        return f"<WheelScheduler(workers={self.max_workers}, jobs={len(self.jobs)}, running={self.running})>"
@@ -0,0 +1,379 @@
+# -*- coding: utf-8 -*-
+"""
+多进程分片监控
+监督进程启动多个监控引擎子进程（默认等于CPU核数），按用户ID一致性哈希分配用户，
+分片退出时将其用户重新分配给存活分片并延迟重启，统计信息跨分片汇总
+"""
+import os
+import signal
+import threading
+import time
+import logging
+import multiprocessing
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from ..config import MONITOR_CONFIG, METRICS_CONFIG
+from ..utils import HashRing
+from ..metrics import MetricSet
+
+# 跨分片累加的统计字段
+_SUMMED_STATS = (
+    'total_users_monitored', 'active_users', 'total_scans', 'failed_starts', 'failed_stops',
+    'order_polls', 'polled_orders', 'strategy_polls', 'strategy_changes',
+    'total_user_monitors', 'active_user_monitors'
+)
+
+
+def _run_shard(shard_id: int, members: List[int], replicas: int, conn, strategy_feed_poller: bool) -> None:
+    """
+    分片子进程入口：运行一个监控引擎，并处理监督进程的命令
+
+    命令为 (命令, 参数, 请求编号)，需要响应的命令回复 (请求编号, 结果):
+        ('members', [分片编号]) 更新存活分片成员
+        ('stats', include_details) 返回引擎统计信息
+        ('stop', None) 停止引擎并退出
+    """
+    # 由监督进程统一处理中断信号
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    from .monitoring_engine import monitoring_engine
+    from .strategy_feed import strategy_change_feed
+
+    # 只由一个分片做策略变更水位轮询，其他分片通过Redis通道接收
+    strategy_change_feed.poller = strategy_feed_poller
+
+    engine = monitoring_engine
+    engine.set_shard(shard_id, HashRing(members, replicas))
+    if not engine.start():
+        return
+
+    # 每个分片进程单独导出指标：端口为 基础端口+1+分片编号，文本文件名加分片后缀
+    exporter = None
+    if METRICS_CONFIG.get('enabled', False):
+        from ..metrics import metrics_exporter
+        exporter = metrics_exporter
+        port = METRICS_CONFIG.get('port', 9108)
+        textfile_path = METRICS_CONFIG.get('textfile_path')
+        if textfile_path:
+            root, ext = os.path.splitext(textfile_path)
+            textfile_path = f"{root}.shard{shard_id}{ext}"
+        exporter.start(port=port + 1 + shard_id if port else 0, textfile_path=textfile_path)
+
+    parent_pid = os.getppid()
+    try:
+        while True:
+            if not conn.poll(1.0):
+                # 监督进程已退出
+                if os.getppid() != parent_pid:
+                    break
+                continue
+
+            command, payload, request_id = conn.recv()
+            if command == 'stop':
+                break
+            try:
+                if command == 'members':
+                    engine.set_shard(shard_id, HashRing(payload, replicas))
+                elif command == 'stats':
+                    stats = engine.get_statistics()
+                    if not payload:
+                        stats.pop('user_monitor_details', None)
+                    conn.send((request_id, stats))
+            except (EOFError, OSError):
+                raise
+            except Exception as e:
+                engine.logger.error(f"处理分片命令失败: {command}, 错误: {e}")
+                if command == 'stats':
+                    conn.send((request_id, None))
+    except (EOFError, OSError):
+        pass
+    finally:
+        if exporter is not None:
+            exporter.stop()
+        engine.stop()
+
+
+class _Shard:
+    """分片子进程句柄"""
+
+    def __init__(self, shard_id: int, process, conn):
+        self.shard_id = shard_id
+        self.process = process
+        self.conn = conn
+        self.started_at = datetime.now()
+        self.lock = threading.Lock()  # 管道同一时间只允许一个请求
+        self.request_id = 0  # 请求编号，用于丢弃超时请求迟到的响应
+
+    def send(self, command: str, payload: Any = None) -> bool:
+        """发送命令"""
+        with self.lock:
+            try:
+                self.conn.send((command, payload, None))
+                return True
+            except (OSError, EOFError, BrokenPipeError):
+                return False
+
+    def request(self, command: str, payload: Any = None, timeout: float = 5.0) -> Optional[Any]:
+        """发送命令并等待响应（之前超时的请求迟到的响应按请求编号丢弃）"""
+        with self.lock:
+            self.request_id += 1
+            request_id = self.request_id
+            deadline = time.monotonic() + timeout
+            try:
+                self.conn.send((command, payload, request_id))
+                while self.conn.poll(max(0.0, deadline - time.monotonic())):
+                    reply_id, result = self.conn.recv()
+                    if reply_id == request_id:
+                        return result
+            except (OSError, EOFError, BrokenPipeError):
+                pass
+            return None
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+
+class ShardSupervisor:
+    """多进程分片监控监督器"""
+
+    def __init__(self, shard_count: Optional[int] = None, replicas: int = 100, check_interval: float = 1.0,
+                 restart_delay: float = 5.0, start_method: str = 'spawn'):
+        """
+        初始化分片监督器
+
+        Args:
+            shard_count: 分片进程数，默认等于CPU核数
+            replicas: 一致性哈希环每个分片的虚拟节点数
+            check_interval: 分片存活检查间隔（秒）
+            restart_delay: 分片退出后重启前的等待时间（秒）
+            start_method: 子进程启动方式（spawn 不继承父进程已建立的数据库连接）
+        """
+        self.shard_count = shard_count or os.cpu_count() or 1
+        self.replicas = replicas
+        self.check_interval = check_interval
+        self.restart_delay = restart_delay
+        self.context = multiprocessing.get_context(start_method)
+
+        self.shards = {}  # {shard_id: _Shard}
+        self.ring = HashRing((), replicas)  # 当前存活分片
+        self.pending_restarts = {}  # {shard_id: 计划重启时间}
+
+        # 线程管理
+        self.running = False
+        self.supervise_thread = None
+        self.lock = threading.RLock()
+
+        # 统计信息
+        self.stats = MetricSet(
+            'shard_supervisor',
+            counters=('shard_exits', 'shard_restarts', 'rebalances'),
+            gauges={'start_time': None, 'last_rebalance_time': None}
+        )
+
+        self.logger = logging.getLogger(__name__)
+
+    def _spawn_shard(self, shard_id: int, members: List[int]) -> _Shard:
+        """启动一个分片子进程"""
+        parent_conn, child_conn = self.context.Pipe()
+        process = self.context.Process(
+            target=_run_shard,
+            args=(shard_id, members, self.replicas, child_conn,
+                  shard_id == 0 and MONITOR_CONFIG.get('strategy_feed_poller', True)),
+            name=f"MonitoringShard-{shard_id}",
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        self.logger.info(f"启动监控分片: {shard_id}, 进程 {process.pid}")
+        return _Shard(shard_id, process, parent_conn)
+
+    def _broadcast_members(self) -> None:
+        """将当前存活分片成员发送给所有分片"""
+        with self.lock:
+            members = sorted(self.ring.nodes)
+            shards = list(self.shards.values())
+            self.stats.inc('rebalances')
+            self.stats.set('last_rebalance_time', datetime.now())
+
+        for shard in shards:
+            if shard.shard_id in members:
+                shard.send('members', members)
+        self.logger.info(f"分片成员变更: {members}")
+
+    def _check_shards(self) -> None:
+        """检查分片存活状态：移除退出的分片并重新分配其用户，到期后重启"""
+        changed = False
+        now = time.time()
+
+        with self.lock:
+            for shard_id, shard in list(self.shards.items()):
+                if shard_id in self.pending_restarts or shard.is_alive():
+                    continue
+                self.logger.error(f"监控分片退出: {shard_id}, 退出码 {shard.process.exitcode}")
+                shard.conn.close()
+                self.ring.remove_node(shard_id)
+                self.pending_restarts[shard_id] = now + self.restart_delay
+                self.stats.inc('shard_exits')
+                changed = True
+
+            for shard_id, restart_at in list(self.pending_restarts.items()):
+                if now < restart_at:
+                    continue
+                del self.pending_restarts[shard_id]
+                self.ring.add_node(shard_id)
+                self.shards[shard_id] = self._spawn_shard(shard_id, sorted(self.ring.nodes))
+                self.stats.inc('shard_restarts')
+                changed = True
+
+        if changed:
+            self._broadcast_members()
+
+    def _supervise_loop(self) -> None:
+        """分片监督循环"""
+        self.logger.info("分片监督循环启动")
+
+        while self.running:
+            try:
+                self._check_shards()
+            except Exception as e:
+                self.logger.error(f"分片监督循环异常: {e}")
+            time.sleep(self.check_interval)
+
+        self.logger.info("分片监督循环结束")
+
+    def start(self) -> bool:
+        """
+        启动所有分片
+
+        Returns:
+            bool: 启动是否成功
+        """
+        if self.running:
+            self.logger.warning("分片监督器已经在运行")
+            return True
+
+        try:
+            self.logger.info(f"启动分片监控: {self.shard_count} 个分片")
+            members = list(range(self.shard_count))
+            with self.lock:
+                self.ring = HashRing(members, self.replicas)
+                for shard_id in members:
+                    self.shards[shard_id] = self._spawn_shard(shard_id, members)
+
+            self.running = True
+            self.stats.set('start_time', datetime.now())
+
+            self.supervise_thread = threading.Thread(
+                target=self._supervise_loop,
+                name="ShardSupervisor",
+                daemon=True
+            )
+            self.supervise_thread.start()
+            return True
+
+        except Exception as e:
+            self.logger.error(f"启动分片监控失败: {e}")
+            self.stop()
+            return False
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """
+        停止所有分片
+
+        Args:
+            timeout: 等待分片退出的超时时间（秒）
+        """
+        self.running = False
+        if self.supervise_thread and self.supervise_thread.is_alive():
+            self.supervise_thread.join(timeout=self.check_interval + 5.0)
+
+        with self.lock:
+            shards = list(self.shards.values())
+            self.shards = {}
+            self.pending_restarts = {}
+            self.ring = HashRing((), self.replicas)
+
+        for shard in shards:
+            shard.send('stop')
+
+        deadline = time.time() + timeout
+        for shard in shards:
+            shard.process.join(timeout=max(0.1, deadline - time.time()))
+            if shard.process.is_alive():
+                self.logger.warning(f"监控分片 {shard.shard_id} 未能及时停止，强制终止")
+                shard.process.terminate()
+                shard.process.join(timeout=5.0)
+            shard.conn.close()
+
+        self.logger.info("分片监控已停止")
+
+    def get_statistics(self, include_details: bool = False) -> Dict[str, Any]:
+        """
+        获取跨分片汇总的统计信息
+
+        Args:
+            include_details: 是否包含每个用户监控器的详细统计
+
+        Returns:
+            Dict[str, Any]: 汇总统计信息，shards 中为各分片的统计
+        """
+        with self.lock:
+            stats = self.stats.snapshot()
+            shards = list(self.shards.values())
+            members = sorted(self.ring.nodes)
+
+        totals = {key: 0 for key in _SUMMED_STATS}
+        shard_stats = {}
+        details = {}
+
+        for shard in shards:
+            shard_info = {
+                'pid': shard.process.pid,
+                'alive': shard.is_alive(),
+                'started_at': shard.started_at,
+                'stats': None
+            }
+            if shard_info['alive']:
+                engine_stats = shard.request('stats', include_details)
+                if engine_stats:
+                    for key in _SUMMED_STATS:
+                        totals[key] += engine_stats.get(key) or 0
+                    details.update(engine_stats.pop('user_monitor_details', None) or {})
+                    shard_info['stats'] = engine_stats
+            shard_stats[shard.shard_id] = shard_info
+
+        stats.update(totals)
+        stats.update({
+            'running': self.running,
+            'engine_mode': 'sharded',
+            'shard_count': self.shard_count,
+            'live_shards': members,
+            'pending_restarts': sorted(self.pending_restarts),
+            'shards': shard_stats
+        })
+        if include_details:
+            stats['user_monitor_details'] = details
+        if stats['start_time']:
+            stats['uptime_seconds'] = (datetime.now() - stats['start_time']).total_seconds()
+        return stats
+
+    def is_running(self) -> bool:
+        """检查分片监督器是否正在运行"""
+        return self.running
+
+    def __repr__(self):
+        return f"<ShardSupervisor(running={self.running}, shards={self.shard_count})>"
+
+
+# 全局分片监督器实例
+shard_supervisor = ShardSupervisor(
+    shard_count=MONITOR_CONFIG.get('shard_count', 0) or None,
+    replicas=MONITOR_CONFIG.get('shard_replicas', 100),
+    check_interval=MONITOR_CONFIG.get('shard_check_interval', 1.0),
+    restart_delay=MONITOR_CONFIG.get('shard_restart_delay', 5.0),
+    start_method=MONITOR_CONFIG.get('shard_start_method', 'spawn')
+)
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+策略变更订阅
+引擎内单个轮询线程按 updated_at 水位查询所有用户的策略变更，分发给本进程的用户监控器，
+并发布到Redis通道供其他进程订阅；写入方也可以直接发布变更通知
+"""
+import json
+import threading
+import time
+import uuid
+import logging
+from typing import Any, Callable, Dict, List, Optional
+from datetime import datetime, timedelta
+from redis.exceptions import RedisError
+from ..database import mysql_manager, redis_manager
+from ..database.codecs import STRATEGY_SCHEMA, json_default
+from ..config import MONITOR_CONFIG, REDIS_KEYS
+from ..metrics import MetricSet
+
+# 变更处理器: handler(user_id, changes)，user_id 为None表示订阅中断过，所有用户需要全量对账
+StrategyChangeHandler = Callable[[Optional[int], Optional[List[Dict[str, Any]]]], None]
+
+
+class StrategyChangeFeed:
+    """策略变更订阅（水位轮询 + Redis发布/订阅）"""
+
+    def __init__(self, poll_interval: float = 1.0, overlap: float = 2, batch_size: int = 1000,
+                 poller: bool = True):
+        """
+        初始化策略变更订阅
+
+        Args:
+            poll_interval: 水位轮询间隔（秒）
+            overlap: 水位回看窗口（秒），覆盖同一秒内及延迟提交的更新
+            batch_size: 每次查询的最大行数
+            poller: 是否在本进程运行水位轮询（多进程部署时可只在一个进程开启）
+        """
+        self.poll_interval = poll_interval
+        self.overlap = timedelta(seconds=overlap)
+        self.batch_size = batch_size
+        self.poller = poller
+        self.channel = REDIS_KEYS['strategy_change_channel']
+        self.node_id = uuid.uuid4().hex
+
+        self.handlers = []
+        self.watermark = None  # 已处理的 updated_at 高水位
+        self._seen = {}  # {strategy_id: row} 回看窗口内已分发的行，用于去重
+
+        # 线程管理
+        self.running = False
+        self.poll_thread = None
+        self.listen_thread = None
+        self.lock = threading.Lock()
+
+        # 统计信息（分片计数器）
+        self.stats = MetricSet(
+            'strategy_feed',
+            counters=('polls', 'polled_rows', 'changes', 'published', 'received', 'resyncs', 'errors'),
+            gauges={'last_poll_time': None}
+        )
+
+        self.logger = logging.getLogger(__name__)
+
+    def add_handler(self, handler: StrategyChangeHandler) -> None:
+        """注册变更处理器（重复注册只保留一个）"""
+        if handler not in self.handlers:
+            self.handlers.append(handler)
+
+    def _dispatch(self, user_id: Optional[int], changes: Optional[List[Dict[str, Any]]]) -> None:
+        """将变更分发给所有处理器"""
+        for handler in self.handlers:
+            try:
+                handler(user_id, changes)
+            except Exception as e:
+                self.logger.error(f"策略变更处理器执行失败: 用户 {user_id}, 错误: {e}")
+
+    def _dispatch_changes(self, changes: List[Dict[str, Any]]) -> None:
+        """按用户分组分发变更"""
+        by_user = {}
+        for change in changes:
+            by_user.setdefault(change['user_id'], []).append(change)
+        for user_id, user_changes in by_user.items():
+            self._dispatch(user_id, user_changes)
+
+    def publish(self, changes: List[Dict[str, Any]]) -> bool:
+        """
+        发布策略变更到Redis通道
+
+        Args:
+            changes: 变更列表，每项包含 user_id、strategy_id，可选 row（完整策略行）
+
+        Returns:
+            bool: 是否发布成功
+        """
+        if not changes:
+            return True
+        try:
+            message = json.dumps({'origin': self.node_id, 'changes': changes},
+                                 ensure_ascii=False, default=json_default)
+        except (TypeError, ValueError) as e:
+            self.logger.error(f"序列化策略变更失败: {e}")
+            return False
+
+        redis_manager.publish(self.channel, message)
+        self.stats.inc('published', len(changes))
+        return True
+
+    def notify_strategy_change(self, user_id: int, strategy_id: int) -> bool:
+        """写入方通知某个策略已变更（订阅方重新加载该用户的策略）"""
+        return self.publish([{'user_id': user_id, 'strategy_id': strategy_id}])
+
+    def _handle_message(self, data: Any) -> None:
+        """处理其他进程发布的变更消息"""
+        try:
+            message = json.loads(data)
+        except (json.JSONDecodeError, TypeError):
+            return
+        if message.get('origin') == self.node_id:
+            return
+
+        changes = message.get('changes') or []
+        for change in changes:
+            if change.get('row'):
+                STRATEGY_SCHEMA.decode_record(change['row'])
+        self.stats.inc('received', len(changes))
+        self._dispatch_changes(changes)
+
+    def _init_watermark(self) -> None:
+        """以数据库中当前最大的 updated_at 作为起始水位（启动时监控器已全量加载策略）"""
+        self.watermark = mysql_manager.get_strategy_update_watermark() or datetime(1970, 1, 1)
+
+    def poll(self) -> int:
+        """
+        查询水位之后更新过的策略并分发
+
+        Returns:
+            int: 变更的策略数
+        """
+        if self.watermark is None:
+            self._init_watermark()
+            return 0
+
+        cursor_time = self.watermark - self.overlap
+        after_id = None
+        changes = []
+        fetched = 0
+
+        while True:
+            rows = mysql_manager.get_strategies_updated_since(cursor_time, after_id, limit=self.batch_size)
+            fetched += len(rows)
+
+            for row in rows:
+                # 回看窗口内重复读到的未变化行不再分发
+                if self._seen.get(row['id']) == row:
+                    continue
+                self._seen[row['id']] = row
+                changes.append({'user_id': row['user_id'], 'strategy_id': row['id'], 'row': row})
+                if row['updated_at'] > self.watermark:
+                    self.watermark = row['updated_at']
+
+            if len(rows) < self.batch_size:
+                break
+
+            # 按 (updated_at, id) 翻页
+            cursor_time, after_id = rows[-1]['updated_at'], rows[-1]['id']
+
+        # 清理已滑出回看窗口的去重记录
+        horizon = self.watermark - self.overlap
+        for strategy_id in [sid for sid, row in self._seen.items() if row['updated_at'] < horizon]:
+            del self._seen[strategy_id]
+
+        if changes:
+            self.logger.debug(f"策略变更: 拉取 {fetched}, 变化 {len(changes)}")
+            self._dispatch_changes(changes)
+            self.publish(changes)
+
+        self.stats.inc('polls')
+        self.stats.inc('polled_rows', fetched)
+        self.stats.inc('changes', len(changes))
+        self.stats.set('last_poll_time', datetime.now())
+        return len(changes)
+
+    def _poll_loop(self) -> None:
+        """水位轮询循环"""
+        self.logger.info("策略变更轮询循环启动")
+
+        while self.running:
+            try:
+                start_time = time.time()
+
+                self.poll()
+
+                elapsed = time.time() - start_time
+                sleep_time = max(0, self.poll_interval - elapsed)
+                if sleep_time > 0:
+                    time.sleep(sleep_time)
+
+            except Exception as e:
+                self.logger.error(f"策略变更轮询异常: {e}")
+                self.stats.inc('errors')
+                time.sleep(5.0)  # 出错时休息5秒
+
+        self.logger.info("策略变更轮询循环结束")
+
+    def _listen_loop(self) -> None:
+        """订阅变更通道，订阅中断后重新订阅并通知所有用户全量对账"""
+        subscribed_once = False
+
+        while self.running:
+            pubsub = None
+            try:
+                pubsub = redis_manager.pubsub()
+                pubsub.subscribe(self.channel)
+
+                # 订阅中断期间的变更消息可能已丢失
+                if subscribed_once:
+                    self.stats.inc('resyncs')
+                    self._dispatch(None, None)
+                subscribed_once = True
+
+                while self.running:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get('type') == 'message':
+                        self._handle_message(message['data'])
+
+            except RedisError as e:
+                self.logger.error(f"策略变更订阅中断: {e}")
+                self.stats.inc('errors')
+                time.sleep(1.0)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def start(self) -> None:
+        """启动轮询和订阅线程"""
+        if self.running:
+            return
+
+        self.running = True
+
+        if self.poller:
+            try:
+                self._init_watermark()
+            except Exception as e:
+                self.logger.error(f"初始化策略变更水位失败: {e}")
+            self.poll_thread = threading.Thread(
+                target=self._poll_loop,
+                name="StrategyFeedPoll",
+                daemon=True
+            )
+            self.poll_thread.start()
+
+        self.listen_thread = threading.Thread(
+            target=self._listen_loop,
+            name="StrategyFeedListen",
+            daemon=True
+        )
+        self.listen_thread.start()
+        self.logger.info(f"策略变更订阅已启动: 轮询={'开启' if self.poller else '关闭'}")
+
+    def stop(self) -> None:
+        """停止轮询和订阅线程"""
+        if not self.running:
+            return
+
+        self.running = False
+        for thread in (self.poll_thread, self.listen_thread):
+            if thread and thread.is_alive():
+                thread.join(timeout=5.0)
+                if thread.is_alive():
+                    self.logger.warning(f"{thread.name} 线程未能及时停止")
+        self.logger.info("策略变更订阅已停止")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        stats = self.stats.snapshot()
+        stats['watermark'] = self.watermark.isoformat() if self.watermark else None
+        stats['poller'] = self.poller
+        return stats
+
+    def __repr__(self):
+        return f"<StrategyChangeFeed(running={self.running}, watermark={self.watermark})>"
+
+
+# 全局策略变更订阅实例
+strategy_change_feed = StrategyChangeFeed(
+    poll_interval=MONITOR_CONFIG.get('strategy_feed_interval', 1.0),
+    overlap=MONITOR_CONFIG.get('strategy_feed_overlap', 2),
+    batch_size=MONITOR_CONFIG.get('strategy_feed_batch_size', 1000),
+    poller=MONITOR_CONFIG.get('strategy_feed_poller', True)
+)
@@ -8,71 +8,101 @@ import time
 import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
-from ..models import User, UserStrategy, Order
+from concurrent.futures import Executor
+from ..models import User, UserStrategy, Order, OrderChange, OrderChangeType
 from ..database import mysql_manager, redis_manager
 from ..strategies import StrategyManager
 from ..utils import UserOrderManager
 from ..logging import get_user_logger
+from ..config import MONITOR_CONFIG
+from ..metrics import MetricSet, traced
 from .event_handler import event_handler, EventType
+from .scheduler import WheelScheduler
+from .check_budget import check_budget
+from .load_shedder import load_shedder
 
 
 class UserMonitor:
     """用户监控器"""
     
-    def __init__(self, user_id: int):
+    def __init__(self, user_id: int, strategy_executor: Optional[Executor] = None,
+                 user_data: Optional[Dict[str, Any]] = None):
         """
         初始化用户监控器
         
         Args:
             user_id: 用户ID
+            strategy_executor: 共享的策略回调线程池，为None时策略管理器自建线程池
+            user_data: 引擎批量预取的用户信息，提供时启动阶段不再单独查询
         """
         self.user_id = user_id
         self.user = None
+        self._prefetched_user_data = user_data
         self.running = False
         self.last_check_time = datetime.now()
         
         # 组件管理器
-        self.strategy_manager = StrategyManager(user_id)
+        self.strategy_manager = StrategyManager(user_id, executor=strategy_executor)
         self.order_manager = UserOrderManager(user_id)
         
         # 监控配置
         self.check_interval = 1.0  # 检查间隔（秒）
         self.strategy_check_interval = 5.0  # 策略检查间隔（秒）
+        
+        # 自适应检查间隔：按订单活跃程度调整检查间隔，空闲用户指数退避
+        self.adaptive_check = MONITOR_CONFIG.get('adaptive_check', False)
+        self.partial_check_interval = MONITOR_CONFIG.get('partial_check_interval', 0.25)
+        self.active_check_interval = MONITOR_CONFIG.get('active_check_interval', 0.5)
+        self.idle_check_interval = MONITOR_CONFIG.get('idle_check_interval', 1.0)
+        self.idle_check_max_interval = MONITOR_CONFIG.get('idle_check_max_interval', 30.0)
+        self.idle_backoff_factor = MONITOR_CONFIG.get('idle_backoff_factor', 2.0)
+        self.active_check_weight = MONITOR_CONFIG.get('active_check_weight', 4)
+        self._budget_weight = None  # 在全局检查预算中登记的权重
+        self._priority = 0  # 最近一次检查时的订单活跃程度，过载降级时决定检查间隔的放大倍数
+        if self.adaptive_check:
+            self.check_interval = self.idle_check_interval
         self.last_strategy_check = datetime.now()
+        self.external_order_feed = False  # 订单由引擎批量轮询推送，不再逐用户加载
+        self.external_strategy_feed = False  # 策略变更由引擎推送，只按对账间隔全量查询
+        self.strategy_resync_interval = MONITOR_CONFIG.get('strategy_resync_interval', 300)
+        self._pending_strategy_rows = {}  # {strategy_id: 推送的策略行，None表示已不再活跃}，在检查周期中应用
+        self._strategy_resync_requested = False
         
         # 线程管理
         self.monitor_thread = None
+        self.scheduler = None  # 共享时间轮调度器（调度模式下使用）
+        self.check_job = None
+        self._wakeup = threading.Event()  # 提前结束监控线程的休眠（推送的变化、停止）
         self.lock = threading.RLock()
         
-        # 统计信息
-        self.stats = {
-            'start_time': None,
-            'total_checks': 0,
-            'strategy_updates': 0,
-            'order_updates': 0,
-            'errors': 0,
-            'last_error': None
-        }
+        # 统计信息（按用户标签区分，监控器清理时从注册表删除）
+        self.stats = MetricSet(
+            'user_monitor',
+            counters=('total_checks', 'strategy_updates', 'order_updates', 'errors', 'throttled_checks'),
+            gauges={'start_time': None, 'last_error': None},
+            histograms=('check_duration_seconds',),
+            label_name='user_id',
+            label=user_id
+        )
         
         self.logger = get_user_logger(user_id)
         
-        # 注册订单更新回调
-        self.order_manager.add_order_update_callback(self._on_order_update)
+        # 注册订单变化回调（只接收真实的状态变化）
+        self.order_manager.add_order_change_callback(self._on_order_changes)
         
         self.logger.info(f"用户监控器初始化: 用户 {user_id}")
     
     def _load_user_info(self) -> bool:
         """加载用户信息"""
         try:
-            # 先从Redis缓存获取
-            user_data = redis_manager.get_cached_user(self.user_id)
-            
+            # 优先使用引擎批量预取的数据，其次从Redis缓存获取
+            user_data, self._prefetched_user_data = self._prefetched_user_data, None
             if not user_data:
-                # 从MySQL获取
-                user_data = mysql_manager.get_user_by_id(self.user_id)
-                if user_data:
-                    # 缓存到Redis
-                    redis_manager.cache_user(self.user_id, user_data)
+                # 缓存未命中时单飞回源MySQL并回填缓存
+                user_data = redis_manager.get_or_load_user(
+                    self.user_id,
+                    lambda: mysql_manager.get_user_by_id(self.user_id)
+                )
             
             if user_data:
                 self.user = User.from_dict(user_data)
@@ -91,106 +121,325 @@ class UserMonitor:
         try:
             # 从数据库获取最新的策略状态
             strategies_data = mysql_manager.get_user_strategies(self.user_id)
-            
-            if not strategies_data:
-                self.logger.info(f"用户 {self.user_id} 没有活跃策略，停止监控")
-                return False
-            
-            # 检查策略变化
-            current_strategy_ids = set()
-            for strategy_data in strategies_data:
-                strategy = UserStrategy.from_dict(strategy_data)
-                current_strategy_ids.add(strategy.id)
-                
-                # 检查策略是否需要启动或停止
-                if strategy.is_active():
-                    if not self.strategy_manager.is_strategy_running(strategy.id):
-                        # 启动策略
-                        success = self.strategy_manager.start_strategy(strategy)
-                        if success:
-                            self.stats['strategy_updates'] += 1
-                            self.logger.info(f"启动策略: {strategy.name} (ID: {strategy.id})")
-                            
-                            # 发送策略启动事件
-                            event_handler.emit_strategy_event(
-                                EventType.STRATEGY_START,
-                                self.user_id,
-                                strategy.id,
-                                {'strategy_name': strategy.name, 'strategy_type': strategy.strategy_type}
-                            )
-                else:
-                    if self.strategy_manager.is_strategy_running(strategy.id):
-                        # 停止策略
-                        success = self.strategy_manager.stop_strategy(strategy.id)
-                        if success:
-                            self.stats['strategy_updates'] += 1
-                            self.logger.info(f"停止策略: {strategy.name} (ID: {strategy.id})")
-                            
-                            # 发送策略停止事件
-                            event_handler.emit_strategy_event(
-                                EventType.STRATEGY_STOP,
-                                self.user_id,
-                                strategy.id,
-                                {'strategy_name': strategy.name, 'reason': 'status_changed'}
-                            )
-            
-            # 移除不再存在的策略
-            running_strategy_ids = set(self.strategy_manager.get_running_strategy_ids())
-            for strategy_id in running_strategy_ids - current_strategy_ids:
-                self.strategy_manager.stop_strategy(strategy_id)
-                self.logger.info(f"移除策略: ID {strategy_id}")
-            
-            return len(current_strategy_ids) > 0
+            return self._reconcile_strategies(strategies_data)
             
         except Exception as e:
             self.logger.error(f"检查用户策略失败: {e}")
-            self.stats['errors'] += 1
-            self.stats['last_error'] = str(e)
+            self.stats.inc('errors')
+            self.stats.set('last_error', str(e))
             return True  # 出错时继续监控
     
+    def _reconcile_strategies(self, strategies_data: List[Dict[str, Any]]) -> bool:
+        """
+        按用户的全部策略行启动、停止和移除策略
+        
+        Returns:
+            bool: 用户是否还有策略
+        """
+        if not strategies_data:
+            self.logger.info(f"用户 {self.user_id} 没有活跃策略，停止监控")
+            return False
+        
+        # 检查策略变化
+        current_strategy_ids = set()
+        for strategy_data in strategies_data:
+            strategy = UserStrategy.from_dict(strategy_data)
+            current_strategy_ids.add(strategy.id)
+            self._apply_strategy(strategy)
+        
+        # 移除不再存在的策略
+        running_strategy_ids = set(self.strategy_manager.get_running_strategy_ids())
+        for strategy_id in running_strategy_ids - current_strategy_ids:
+            self.strategy_manager.stop_strategy(strategy_id)
+            self.logger.info(f"移除策略: ID {strategy_id}")
+        
+        return len(current_strategy_ids) > 0
+    
+    def _apply_strategy(self, strategy: UserStrategy) -> None:
+        """根据策略的最新状态启动或停止策略"""
+        if strategy.is_active():
+            if not self.strategy_manager.is_strategy_running(strategy.id):
+                # 启动策略
+                success = self.strategy_manager.start_strategy(strategy)
+                if success:
+                    self.stats.inc('strategy_updates')
+                    self.logger.info(f"启动策略: {strategy.strategy_name} (ID: {strategy.id})")
+                    
+                    # 新启动的策略需要先看到当前所有活跃订单
+                    self._replay_active_orders(strategy.id)
+                    
+                    # 发送策略启动事件
+                    event_handler.emit_strategy_event(
+                        EventType.STRATEGY_START,
+                        self.user_id,
+                        strategy.id,
+                        {'strategy_name': strategy.strategy_name, 'strategy_type': strategy.strategy_type}
+                    )
+        else:
+            if self.strategy_manager.is_strategy_running(strategy.id):
+                # 停止策略
+                success = self.strategy_manager.stop_strategy(strategy.id)
+                if success:
+                    self.stats.inc('strategy_updates')
+                    self.logger.info(f"停止策略: {strategy.strategy_name} (ID: {strategy.id})")
+                    
+                    # 发送策略停止事件
+                    event_handler.emit_strategy_event(
+                        EventType.STRATEGY_STOP,
+                        self.user_id,
+                        strategy.id,
+                        {'strategy_name': strategy.strategy_name, 'reason': 'status_changed'}
+                    )
+    
+    def _stop_removed_strategy(self, strategy_id: int) -> None:
+        """停止已不再活跃的策略"""
+        if not self.strategy_manager.is_strategy_running(strategy_id):
+            return
+        if self.strategy_manager.stop_strategy(strategy_id):
+            self.stats.inc('strategy_updates')
+            self.logger.info(f"停止策略: ID {strategy_id}")
+            
+            # 发送策略停止事件
+            event_handler.emit_strategy_event(
+                EventType.STRATEGY_STOP,
+                self.user_id,
+                strategy_id,
+                {'reason': 'status_changed'}
+            )
+    
+    def notify_strategy_changes(self, changes: Optional[List[Dict[str, Any]]]) -> None:
+        """
+        接收推送的策略变更（在下一个检查周期中应用）
+        
+        Args:
+            changes: 变更列表，带 row 的直接应用，带 removed 的停止该策略，
+                其余或为None时重新查询该用户的全部策略
+        """
+        with self.lock:
+            if changes is None:
+                self._strategy_resync_requested = True
+                return
+            for change in changes:
+                row = change.get('row')
+                if row is not None or change.get('removed'):
+                    self._pending_strategy_rows[change['strategy_id']] = row
+                else:
+                    self._strategy_resync_requested = True
+        self.wake()
+    
+    def _apply_pending_strategy_changes(self) -> None:
+        """应用推送的策略行"""
+        with self.lock:
+            pending = list(self._pending_strategy_rows.items())
+            self._pending_strategy_rows.clear()
+        
+        for strategy_id, row in pending:
+            try:
+                if row is None:
+                    self._stop_removed_strategy(strategy_id)
+                else:
+                    self._apply_strategy(UserStrategy.from_dict(row))
+            except Exception as e:
+                self.logger.error(f"应用策略变更失败: 策略 {strategy_id}, 错误: {e}")
+                self.stats.inc('errors')
+                self.stats.set('last_error', str(e))
+    
     def _check_user_orders(self) -> None:
-        """检查用户订单更新"""
+        """检查用户订单更新（变化通过订单变化回调分发）"""
         try:
-            # 重新加载订单（如果有更新）
-            self.order_manager.load_orders()
-            
-            # 获取活跃订单
-            active_orders = self.order_manager.get_active_orders()
-            
-            # 将订单更新传递给策略管理器
-            for order in active_orders:
-                self.strategy_manager.handle_order_update(order)
-            
-            self.stats['order_updates'] += len(active_orders)
+            # 重新加载订单（如果有更新），批量轮询模式下由引擎推送
+            if not self.external_order_feed:
+                self.order_manager.load_orders()
             
         except Exception as e:
             self.logger.error(f"检查用户订单失败: {e}")
-            self.stats['errors'] += 1
-            self.stats['last_error'] = str(e)
+            self.stats.inc('errors')
+            self.stats.set('last_error', str(e))
     
-    def _on_order_update(self, order: Order) -> None:
-        """订单更新回调"""
-        try:
-            # 发送订单更新事件
-            event_handler.emit_order_event(
-                EventType.ORDER_UPDATE,
-                self.user_id,
-                order.id,
-                order.strategy_id,
-                {
-                    'order_no': order.order_no,
-                    'symbol': order.symbol,
-                    'status': order.status,
-                    'filled_quantity': float(order.filled_quantity),
-                    'remaining_quantity': float(order.get_remaining_quantity())
-                }
-            )
-            
-            # 通知策略管理器
+    def _replay_active_orders(self, strategy_id: int) -> None:
+        """将策略的当前活跃订单推送给该策略"""
+        orders = [order for order in self.order_manager.get_orders_by_strategy(strategy_id) if order.is_active()]
+        self._dispatch_order_updates(orders)
+    
+    def _dispatch_order_updates(self, orders: List[Order]) -> None:
+        """按顺序把订单更新交给策略处理（异步监控器改为提交到策略线程池）"""
+        for order in orders:
             self.strategy_manager.handle_order_update(order)
+    
+    def _on_order_changes(self, changes: List[OrderChange]) -> None:
+        """订单变化回调"""
+        updated_orders = []
+        for change in changes:
+            try:
+                order = change.order
+                
+                if change.change_type == OrderChangeType.FILL:
+                    event_type = EventType.ORDER_FILL
+                elif change.change_type == OrderChangeType.STATUS and order.status == Order.STATUS_CANCELLED:
+                    event_type = EventType.ORDER_CANCEL
+                else:
+                    event_type = EventType.ORDER_UPDATE
+                
+                # 发送订单事件
+                event_handler.emit_order_event(
+                    event_type,
+                    self.user_id,
+                    order.id,
+                    order.strategy_id,
+                    {
+                        'change_type': change.change_type.value,
+                        'order_no': order.order_no,
+                        'symbol': order.symbol,
+                        'status': order.status,
+                        'previous_status': change.previous_status,
+                        'filled_quantity': float(order.filled_quantity),
+                        'remaining_quantity': float(order.get_remaining_quantity())
+                    }
+                )
+                
+                # 通知策略管理器（已移除的订单无需再交给策略处理）
+                if change.change_type != OrderChangeType.REMOVED:
+                    updated_orders.append(order)
+                
+            except Exception as e:
+                self.logger.error(f"处理订单变化回调失败: {e}")
+        
+        self._dispatch_order_updates(updated_orders)
+        self.stats.inc('order_updates', len(changes))
+        
+        # 引擎推送的订单变化：结束空闲退避
+        if self.external_order_feed:
+            self.wake()
+    
+    def _activity_level(self) -> int:
+        """订单活跃程度: 2-有部分成交订单, 1-有活跃订单, 0-空闲"""
+        if self.order_manager.status_index.get(Order.STATUS_PARTIAL):
+            return 2
+        return 1 if self.order_manager.active_orders else 0
+    
+    def _effective_check_interval(self) -> float:
+        """实际检查间隔：过载降级时按用户优先级放大"""
+        return self.check_interval * load_shedder.stretch_factor(self._priority)
+    
+    def _set_check_interval(self, interval: float) -> None:
+        """修改检查间隔（调度模式下同步修改调度任务的间隔）"""
+        self.check_interval = interval
+        if self.check_job is not None:
+            self.check_job.interval = self._effective_check_interval()
+    
+    def _adapt_check_interval(self, changed: bool) -> None:
+        """
+        按本次检查后的订单状态调整下一次检查间隔，并更新在全局检查预算中的权重
+        
+        Args:
+            changed: 本次检查是否发现了订单或策略变化
+        """
+        level = self._activity_level()
+        self._priority = level
+        
+        weight = self.active_check_weight if level else 1.0
+        if check_budget.enabled and weight != self._budget_weight:
+            check_budget.register(self.user_id, weight)
+            self._budget_weight = weight
+        
+        if not self.adaptive_check:
+            # 检查间隔不变，只同步过载降级的放大倍数
+            self._set_check_interval(self.check_interval)
+            return
+        
+        if level == 2:
+            interval = self.partial_check_interval
+        elif level == 1:
+            interval = self.active_check_interval
+        elif changed:
+            interval = self.idle_check_interval
+        else:
+            interval = min(self.idle_check_max_interval,
+                           max(self.idle_check_interval, self.check_interval) * self.idle_backoff_factor)
+        
+        self._set_check_interval(interval)
+    
+    def wake(self) -> None:
+        """有推送的变化时结束空闲退避，尽快执行下一次检查"""
+        if not self.adaptive_check or not self.running:
+            return
+        
+        if self.check_interval > self.idle_check_interval:
+            self._set_check_interval(self.idle_check_interval)
+        self._interrupt_sleep()
+    
+    def _interrupt_sleep(self) -> None:
+        """结束当前的检查间隔休眠，立即执行下一次检查"""
+        if self.check_job is not None:
+            self.scheduler.reschedule(self.check_job, 0)
+        else:
+            self._wakeup.set()
+    
+    def _strategy_check_due(self, now: datetime) -> bool:
+        """是否需要全量检查策略（需要时丢弃待应用的推送变更，全量查询已包含这些变更）"""
+        interval = self.strategy_resync_interval if self.external_strategy_feed else self.strategy_check_interval
+        with self.lock:
+            if self._strategy_resync_requested or (now - self.last_strategy_check).total_seconds() >= interval:
+                self._strategy_resync_requested = False
+                self._pending_strategy_rows.clear()
+                return True
+        return False
+    
+    @traced('user_monitor.check_cycle', tag='user_id')
+    def _run_check_cycle(self) -> bool:
+        """
+        执行一次检查周期
+        
+        Returns:
+            bool: 是否继续监控
+        """
+        # 全局检查预算不足时跳过本次检查（不计入空闲退避）
+        if not check_budget.try_acquire(self.user_id):
+            self.stats.inc('throttled_checks')
+            return True
+        started = time.perf_counter()
+        changes_before = self.stats['order_updates'] + self.stats['strategy_updates']
+        
+        # 检查策略状态（定期检查，订阅模式下只做低频全量对账）
+        now = datetime.now()
+        if self._strategy_check_due(now):
+            has_active_strategies = self._check_user_strategies()
+            self.last_strategy_check = now
             
+            # 如果没有活跃策略，停止监控
+            if not has_active_strategies:
+                self.logger.info(f"用户 {self.user_id} 没有活跃策略，停止监控")
+                return False
+        elif self._pending_strategy_rows:
+            self._apply_pending_strategy_changes()
+        
+        # 检查订单更新
+        self._check_user_orders()
+        
+        # 更新统计信息
+        self.stats.inc('total_checks')
+        self.stats.observe('check_duration_seconds', time.perf_counter() - started)
+        self.last_check_time = now
+        
+        # 按订单活跃程度调整下一次检查间隔
+        self._adapt_check_interval(self.stats['order_updates'] + self.stats['strategy_updates'] != changes_before)
+        return True
+    
+    def _scheduled_check(self) -> bool:
+        """调度器回调：执行一次检查，返回False时停止调度"""
+        if not self.running:
+            return False
+        
+        try:
+            if not self._run_check_cycle():
+                self.running = False
+                return False
         except Exception as e:
-            self.logger.error(f"处理订单更新回调失败: {e}")
+            self.logger.error(f"调度检查异常: {e}")
+            self.stats.inc('errors')
+            self.stats.set('last_error', str(e))
+        
+        return self.running
     
     def _monitor_loop(self) -> None:
         """监控主循环"""
@@ -200,43 +449,32 @@ class UserMonitor:
             try:
                 start_time = time.time()
                 
-                # 检查策略状态（定期检查）
-                now = datetime.now()
-                if (now - self.last_strategy_check).total_seconds() >= self.strategy_check_interval:
-                    has_active_strategies = self._check_user_strategies()
-                    self.last_strategy_check = now
-                    
-                    # 如果没有活跃策略，停止监控
-                    if not has_active_strategies:
-                        self.logger.info(f"用户 {self.user_id} 没有活跃策略，停止监控")
-                        break
-                
-                # 检查订单更新
-                self._check_user_orders()
-                
-                # 更新统计信息
-                self.stats['total_checks'] += 1
-                self.last_check_time = now
+                if not self._run_check_cycle():
+                    break
                 
                 # 计算休眠时间
                 elapsed = time.time() - start_time
-                sleep_time = max(0, self.check_interval - elapsed)
+                sleep_time = max(0, self._effective_check_interval() - elapsed)
                 
                 if sleep_time > 0:
-                    time.sleep(sleep_time)
+                    self._wakeup.wait(sleep_time)
+                    self._wakeup.clear()
                 
             except Exception as e:
                 self.logger.error(f"监控循环异常: {e}")
-                self.stats['errors'] += 1
-                self.stats['last_error'] = str(e)
+                self.stats.inc('errors')
+                self.stats.set('last_error', str(e))
                 time.sleep(1.0)  # 出错时短暂休息
         
         self.logger.info(f"用户监控循环结束: 用户 {self.user_id}")
     
-    def start(self) -> bool:
+    def start(self, scheduler: Optional[WheelScheduler] = None) -> bool:
         """
         启动用户监控
         
+        Args:
+            scheduler: 共享时间轮调度器，为None时启动独立监控线程
+        
         Returns:
             bool: 启动是否成功
         """
@@ -264,16 +502,25 @@ class UserMonitor:
                 self.logger.info(f"用户 {self.user_id} 没有活跃策略")
                 return False
             
-            # 启动监控线程
             self.running = True
-            self.stats['start_time'] = datetime.now()
+            self.stats.set('start_time', datetime.now())
             
-            self.monitor_thread = threading.Thread(
-                target=self._monitor_loop,
-                name=f"UserMonitor-{self.user_id}",
-                daemon=True
-            )
-            self.monitor_thread.start()
+            if scheduler is not None:
+                # 由共享调度器按检查间隔调度
+                self.scheduler = scheduler
+                self.check_job = scheduler.schedule_periodic(
+                    self.check_interval,
+                    self._scheduled_check,
+                    name=f"UserMonitor-{self.user_id}"
+                )
+            else:
+                # 启动监控线程
+                self.monitor_thread = threading.Thread(
+                    target=self._monitor_loop,
+                    name=f"UserMonitor-{self.user_id}",
+                    daemon=True
+                )
+                self.monitor_thread.start()
             
             # 添加到活跃用户列表
             redis_manager.add_active_user(self.user_id)
@@ -296,12 +543,13 @@ class UserMonitor:
             self.running = False
             return False
     
-    def stop(self, timeout: float = 10.0) -> None:
+    def stop(self, timeout: float = 10.0, deactivate: bool = True) -> None:
         """
         停止用户监控
         
         Args:
             timeout: 停止超时时间（秒）
+            deactivate: 是否将用户移出活跃用户集合（用户迁移到其他分片时为False）
         """
         if not self.running:
             self.logger.warning("用户监控未运行")
@@ -311,9 +559,18 @@ class UserMonitor:
         
         # 设置停止标志
         self.running = False
+        self._wakeup.set()
+        check_budget.unregister(self.user_id)
+        self._budget_weight = None
         
         # 停止策略管理器
-        self.strategy_manager.stop_all_strategies()
+        self.strategy_manager.stop_all_strategies(deactivate)
+        
+        # 取消调度任务，并等待正在执行的检查结束
+        if self.check_job is not None:
+            self.scheduler.cancel(self.check_job)
+            if not self.check_job.wait_idle(timeout):
+                self.logger.warning(f"调度检查未能及时结束: 用户 {self.user_id}")
         
         # 等待监控线程结束
         if self.monitor_thread and self.monitor_thread.is_alive():
@@ -322,7 +579,8 @@ class UserMonitor:
                 self.logger.warning(f"监控线程未能及时停止: 用户 {self.user_id}")
         
         # 从活跃用户列表移除
-        redis_manager.remove_active_user(self.user_id)
+        if deactivate:
+            redis_manager.remove_active_user(self.user_id)
         
         # 发送用户停用事件
         from .event_handler import BaseEvent
@@ -338,16 +596,20 @@ class UserMonitor:
     
     def is_running(self) -> bool:
         """检查是否正在运行"""
+        if self.check_job is not None:
+            return self.running and self.check_job.is_active()
         return self.running and self.monitor_thread and self.monitor_thread.is_alive()
     
     def get_statistics(self) -> Dict[str, Any]:
         """获取统计信息"""
         with self.lock:
-            stats = self.stats.copy()
+            stats = self.stats.snapshot()
             stats.update({
                 'user_id': self.user_id,
                 'username': self.user.username if self.user else None,
                 'running': self.running,
+                'check_interval': self.check_interval,
+                'effective_check_interval': self._effective_check_interval(),
                 'last_check_time': self.last_check_time.isoformat(),
                 'strategy_manager_stats': self.strategy_manager.get_statistics(),
                 'order_manager_stats': self.order_manager.get_order_statistics(),
@@ -375,15 +637,22 @@ class UserMonitor:
         except Exception as e:
             self.logger.error(f"强制检查订单失败: {e}")
     
-    def cleanup(self) -> None:
-        """清理资源"""
+    def cleanup(self, deactivate: bool = True) -> None:
+        """
+        清理资源
+        
+        Args:
+            deactivate: 是否移出活跃用户集合并清除用户缓存（用户迁移到其他分片时为False）
+        """
         try:
             # 停止监控
-            self.stop()
+            if self.running:
+                self.stop(deactivate=deactivate)
             
             # 清理组件
-            self.strategy_manager.cleanup()
+            self.strategy_manager.cleanup(deactivate)
             self.order_manager.cleanup()
+            self.stats.remove()
             
             self.logger.info(f"用户监控器清理完成: 用户 {self.user_id}")
             
@@ -7,48 +7,58 @@ import threading
 import time
 import logging
 from typing import Dict, List, Optional, Any
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Executor, ThreadPoolExecutor
 from ..models import UserStrategy, Order
 from ..database import mysql_manager, redis_manager
 from ..logging import get_user_logger
+from ..metrics import metrics, traced
 from .base_strategy import BaseStrategy, StrategyFactory
 
+# 策略回调（on_order_update/on_market_data/on_timer）的执行耗时
+CALLBACK_SECONDS = metrics.histogram('strategy_callback_duration_seconds', '策略回调执行耗时（按回调）',
+                                     label_name='callback')
+
+
+def _timed_callback(callback, *args) -> None:
+    """执行策略回调并记录耗时"""
+    start = time.perf_counter()
+    try:
+        callback(*args)
+    finally:
+        CALLBACK_SECONDS.observe(time.perf_counter() - start, callback.__name__)
+
 
 class StrategyManager:
     """策略管理器"""
     
-    def __init__(self, user_id: int):
+    def __init__(self, user_id: int, executor: Optional[Executor] = None):
         """
         初始化策略管理器
         
         Args:
             user_id: 用户ID
+            executor: 共享的策略回调线程池，为None时创建私有线程池
         """
         self.user_id = user_id
         self.strategies = {}  # {strategy_id: BaseStrategy}
         self.logger = get_user_logger(user_id)
         self.is_running = False
         self.lock = threading.RLock()
-        self.executor = ThreadPoolExecutor(max_workers=10, thread_name_prefix=f"strategy_user_{user_id}")
+        
+        # 共享线程池由创建方负责关闭
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=10, thread_name_prefix=f"strategy_user_{user_id}")
         
         self.logger.info(f"策略管理器初始化: 用户 {user_id}")
     
     def load_strategies(self) -> bool:
         """从数据库加载用户策略"""
         try:
-            # 先尝试从Redis缓存获取
-            cached_strategies = redis_manager.get_cached_user_strategies(self.user_id)
-            
-            if cached_strategies:
-                strategies_data = cached_strategies
-                self.logger.debug(f"从缓存加载策略: 用户 {self.user_id}")
-            else:
-                # 从MySQL获取
-                strategies_data = mysql_manager.get_user_strategies(self.user_id, status=1)  # 只获取启用的策略
-                if strategies_data:
-                    # 缓存到Redis
-                    redis_manager.cache_user_strategies(self.user_id, strategies_data)
-                    self.logger.debug(f"从数据库加载策略: 用户 {self.user_id}")
+            # 先从Redis缓存获取，未命中时单飞回源MySQL（只获取启用的策略）并回填缓存
+            strategies_data = redis_manager.get_or_load_user_strategies(
+                self.user_id,
+                lambda: mysql_manager.get_user_strategies(self.user_id, status=1)
+            )
             
             if not strategies_data:
                 self.logger.warning(f"用户 {self.user_id} 没有启用的策略")
@@ -97,8 +107,13 @@ class StrategyManager:
         
         return self.is_running
     
-    def stop_all_strategies(self) -> None:
-        """停止所有策略"""
+    def stop_all_strategies(self, deactivate: bool = True) -> None:
+        """
+        停止所有策略
+        
+        Args:
+            deactivate: 是否将用户移出活跃用户集合
+        """
         with self.lock:
             for strategy_id, strategy in self.strategies.items():
                 try:
@@ -108,7 +123,8 @@ class StrategyManager:
                     self.logger.error(f"策略停止异常: {strategy.strategy_name}, 错误: {e}")
         
         self.is_running = False
-        redis_manager.remove_active_user(self.user_id)
+        if deactivate:
+            redis_manager.remove_active_user(self.user_id)
         self.logger.info(f"用户 {self.user_id} 所有策略已停止")
     
     def add_strategy(self, strategy_config: UserStrategy) -> bool:
@@ -190,7 +206,7 @@ class StrategyManager:
                 if strategy_id in self.strategies:
                     strategy = self.strategies[strategy_id]
                     # 异步处理订单更新
-                    self.executor.submit(strategy.on_order_update, order)
+                    self.executor.submit(_timed_callback, strategy.on_order_update, order)
                 else:
                     self.logger.warning(f"订单对应的策略不存在: 策略ID {strategy_id}, 订单 {order.order_no}")
         except Exception as e:
@@ -203,7 +219,7 @@ class StrategyManager:
                 for strategy in self.strategies.values():
                     if strategy.is_running:
                         # 异步处理市场数据
-                        self.executor.submit(strategy.on_market_data, symbol, market_data)
+                        self.executor.submit(_timed_callback, strategy.on_market_data, symbol, market_data)
         except Exception as e:
             self.logger.error(f"处理市场数据失败: {symbol}, 错误: {e}")
     
@@ -214,7 +230,7 @@ class StrategyManager:
                 for strategy in self.strategies.values():
                     if strategy.is_running:
                         # 异步执行定时器回调
-                        self.executor.submit(strategy.on_timer)
+                        self.executor.submit(_timed_callback, strategy.on_timer)
         except Exception as e:
             self.logger.error(f"运行定时器回调失败: 错误: {e}")
     
@@ -282,9 +298,10 @@ class StrategyManager:
         with self.lock:
             strategy = self.strategies.get(strategy_id)
             if strategy:
-                return strategy.is_running()
+                return strategy.is_running
             return False
     
+    @traced('strategy_manager.handle_order_update', tag='user_id')
     def handle_order_update(self, order: Order) -> None:
         """处理订单更新"""
         try:
@@ -292,7 +309,7 @@ class StrategyManager:
                 # 找到对应的策略并处理订单更新
                 strategy = self.strategies.get(order.strategy_id)
                 if strategy:
-                    strategy.on_order_update(order)
+                    _timed_callback(strategy.on_order_update, order)
                     self.logger.debug(f"订单更新已处理: 策略 {order.strategy_id}, 订单 {order.id}")
                 else:
                     self.logger.warning(f"未找到策略 {order.strategy_id} 来处理订单更新 {order.id}")
@@ -340,7 +357,7 @@ class StrategyManager:
             with self.lock:
                 running_ids = []
                 for strategy_id, strategy in self.strategies.items():
-                    if hasattr(strategy, 'is_running') and strategy.is_running():
+                    if hasattr(strategy, 'is_running') and strategy.is_running:
                         running_ids.append(strategy_id)
                     elif hasattr(strategy, 'running') and strategy.running:
                         running_ids.append(strategy_id)
@@ -349,12 +366,28 @@ class StrategyManager:
             self.logger.error(f"获取运行中策略ID失败: {e}")
             return []
 
-    def cleanup(self) -> None:
-        """清理资源"""
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        with self.lock:
+            return {
+                'is_running': self.is_running,
+                'total_strategies': len(self.strategies),
+                'running_strategies': len(self.get_running_strategy_ids())
+            }
+
+    def cleanup(self, deactivate: bool = True) -> None:
+        """
+        清理资源
+        
+        Args:
+            deactivate: 是否移出活跃用户集合并清除用户缓存
+        """
         try:
-            self.stop_all_strategies()
-            self.executor.shutdown(wait=True)
-            redis_manager.clear_user_cache(self.user_id)
+            self.stop_all_strategies(deactivate)
+            if self._owns_executor:
+                self.executor.shutdown(wait=True)
+            if deactivate:
+                redis_manager.clear_user_cache(self.user_id)
             self.logger.info(f"用户 {self.user_id} 策略管理器清理完成")
         except Exception as e:
             self.logger.error(f"策略管理器清理失败: 用户 {self.user_id}, 错误: {e}")
@@ -3,5 +3,7 @@
 工具模块
 """
 from .user_order_manager import UserOrderManager
+from .order_write_buffer import OrderWriteBuffer, order_write_buffer
+from .hash_ring import HashRing
 
-__all__ = ['UserOrderManager']
\ No newline at end of file
+__all__ = ['UserOrderManager', 'OrderWriteBuffer', 'order_write_buffer', 'HashRing']
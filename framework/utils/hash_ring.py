@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+一致性哈希环
+节点增减时只有相邻区间的键改变归属，用于在多个监控分片之间分配用户
+"""
+import bisect
+import hashlib
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class HashRing:
+    """带虚拟节点的一致性哈希环"""
+
+    def __init__(self, nodes: Iterable[Any] = (), replicas: int = 100):
+        """
+        初始化哈希环
+
+        Args:
+            nodes: 初始节点
+            replicas: 每个节点的虚拟节点数，越大分布越均匀
+        """
+        self.replicas = replicas
+        self.nodes = set()
+        self._keys = []  # 已排序的虚拟节点哈希值
+        self._ring = {}  # {虚拟节点哈希值: 节点}
+
+        for node in nodes:
+            self.add_node(node)
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        """计算64位哈希值"""
+        return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], 'big')
+
+    def add_node(self, node: Any) -> None:
+        """添加节点"""
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for i in range(self.replicas):
+            point = self._hash(f"{node}#{i}")
+            self._ring[point] = node
+            bisect.insort(self._keys, point)
+
+    def remove_node(self, node: Any) -> None:
+        """移除节点"""
+        if node not in self.nodes:
+            return
+        self.nodes.discard(node)
+        for i in range(self.replicas):
+            self._ring.pop(self._hash(f"{node}#{i}"), None)
+        self._keys = sorted(self._ring)
+
+    def get_node(self, key: Any) -> Optional[Any]:
+        """
+        获取键所属的节点
+
+        Args:
+            key: 键（如用户ID）
+
+        Returns:
+            Optional[Any]: 节点，环为空时返回None
+        """
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, self._hash(str(key))) % len(self._keys)
+        return self._ring[self._keys[index]]
+
+    def assign(self, keys: Iterable[Any]) -> Dict[Any, List[Any]]:
+        """按节点分组键"""
+        assignment = {node: [] for node in self.nodes}
+        for key in keys:
+            node = self.get_node(key)
+            if node is not None:
+                assignment[node].append(key)
+        return assignment
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __repr__(self):
+        return f"<HashRing(nodes={sorted(self.nodes, key=str)}, replicas={self.replicas})>"
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+订单写回缓冲区
+合并短时间窗口内对同一订单的多次更新，按批写入MySQL，
+将每次更新一次提交的开销摊薄到每批一次提交
+"""
+import atexit
+import threading
+import time
+import logging
+from typing import Dict, Any, List, Callable, Optional
+from ..models import Order
+from ..database import mysql_manager
+from ..config import MONITOR_CONFIG
+from ..metrics import MetricSet
+
+
+class OrderWriteBuffer:
+    """订单写回缓冲区"""
+
+    def __init__(self, flush_interval: float = None, batch_size: int = None, max_pending: int = None):
+        """
+        初始化写回缓冲区
+
+        Args:
+            flush_interval: 最大刷新延迟（秒）
+            batch_size: 每批写入的最大行数
+            max_pending: 待写订单数达到该值时立即刷新
+        """
+        self.flush_interval = flush_interval or MONITOR_CONFIG.get('order_write_flush_interval', 0.05)
+        self.batch_size = batch_size or MONITOR_CONFIG.get('order_write_batch_size', 500)
+        self.max_pending = max_pending or MONITOR_CONFIG.get('order_write_max_pending', 5000)
+
+        self.pending = {}  # {order_id: {'user_id', 'status', 'filled_quantity', 'avg_price', 'commission', 'fencing_token'}}
+        self.inflight = {}  # 正在写入数据库的批次
+        self.pending_since = None  # 最早一条未刷新更新的入队时间
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()  # 保证同一时间只有一个刷新过程
+        self._wakeup = threading.Event()
+
+        self.running = False
+        self.flush_thread = None
+        self._atexit_registered = False
+
+        # 防护令牌校验（集群租约模式下由引擎设置为 lease_manager，需提供 get_fencing_tokens），
+        # 刷新时丢弃令牌已不是最新的更新，避免失去租约的节点覆盖新持有者的写入
+        self.fence = None
+
+        # 统计信息
+        self.stats = MetricSet(
+            'order_write_buffer',
+            counters=('submitted', 'coalesced', 'flushed_rows', 'flush_batches',
+                      'failed_flushes', 'fenced_rows', 'discarded'),
+            gauges={'max_flush_latency': 0.0, 'pending': 0}
+        )
+        self.stats.set_function('pending', lambda: len(self.pending))
+
+        self.logger = logging.getLogger(__name__)
+
+    def submit(self, user_id: int, order: Order, fencing_token: Optional[int] = None) -> None:
+        """
+        提交订单的最新状态，同一订单未刷新的旧状态会被覆盖
+
+        Args:
+            user_id: 用户ID
+            order: 订单对象
+            fencing_token: 提交时持有的用户租约防护令牌，刷新时校验
+        """
+        record = {
+            'user_id': user_id,
+            'status': order.status,
+            'filled_quantity': order.filled_quantity,
+            'avg_price': order.avg_price,
+            'commission': order.commission,
+            'fencing_token': fencing_token,
+        }
+
+        if not self.running:
+            self.start()
+
+        with self.lock:
+            coalesced = order.id in self.pending
+            self.pending[order.id] = record
+            first = self.pending_since is None
+            if first:
+                self.pending_since = time.monotonic()
+            pending_count = len(self.pending)
+
+        self.stats.inc('submitted')
+        if coalesced:
+            self.stats.inc('coalesced')
+
+        # 缓冲区由空变为非空时唤醒刷新线程重新计算截止时间，积压过多时立即刷新
+        if first or pending_count >= self.max_pending:
+            self._wakeup.set()
+
+    def is_pending(self, order_id: int) -> bool:
+        """订单是否有尚未写入数据库的更新"""
+        return order_id in self.pending or order_id in self.inflight
+
+    def pending_count(self) -> int:
+        """待写订单数"""
+        return len(self.pending)
+
+    def discard_users(self, predicate: Callable[[int], bool]) -> int:
+        """
+        丢弃指定用户尚未刷新的更新（用户租约失效时调用）
+
+        Args:
+            predicate: 按 user_id 判断是否丢弃
+
+        Returns:
+            int: 丢弃的订单数
+        """
+        with self.lock:
+            order_ids = [order_id for order_id, record in self.pending.items() if predicate(record['user_id'])]
+            for order_id in order_ids:
+                del self.pending[order_id]
+            if not self.pending:
+                self.pending_since = None
+        self.stats.inc('discarded', len(order_ids))
+        if order_ids:
+            self.logger.warning(f"丢弃失去租约用户的待写订单更新: {len(order_ids)} 条")
+        return len(order_ids)
+
+    def _drop_fenced(self, batch: Dict[int, Dict[str, Any]], order_ids: List[int]) -> List[int]:
+        """
+        丢弃防护令牌已不是最新的更新（一次往返查询本批涉及用户的最新令牌）
+
+        Returns:
+            List[int]: 令牌仍然有效（或未携带令牌）的订单ID
+        """
+        fenced_users = {batch[order_id]['user_id'] for order_id in order_ids
+                        if batch[order_id]['fencing_token'] is not None}
+        if not fenced_users:
+            return order_ids
+        fences = self.fence.get_fencing_tokens(fenced_users)
+        if fences is None:
+            raise RuntimeError("无法确认防护令牌")
+
+        valid = []
+        for order_id in order_ids:
+            record = batch[order_id]
+            token = record['fencing_token']
+            if token is None or fences.get(record['user_id']) == token:
+                valid.append(order_id)
+
+        stale = len(order_ids) - len(valid)
+        if stale:
+            self.stats.inc('fenced_rows', stale)
+            self.logger.warning(f"丢弃防护令牌已过期的订单更新: {stale} 条")
+        return valid
+
+    def flush(self) -> int:
+        """
+        将所有待写更新写入数据库
+
+        Returns:
+            int: 成功写入的订单数
+        """
+        with self.flush_lock:
+            with self.lock:
+                if not self.pending:
+                    return 0
+                batch, self.pending = self.pending, {}
+                pending_since, self.pending_since = self.pending_since, None
+                self.inflight = batch
+
+            order_ids = list(batch.keys())
+            written = 0
+            try:
+                if self.fence is not None:
+                    order_ids = self._drop_fenced(batch, order_ids)
+                for i in range(0, len(order_ids), self.batch_size):
+                    chunk = order_ids[i:i + self.batch_size]
+                    updates = [dict(batch[order_id], order_id=order_id) for order_id in chunk]
+                    mysql_manager.update_orders_batch(updates)
+                    written += len(chunk)
+
+                    self.stats.inc('flush_batches')
+                    self.stats.inc('flushed_rows', len(chunk))
+            except Exception as e:
+                self.logger.error(f"订单批量写回失败: 待写 {len(order_ids) - written}, 错误: {e}")
+                self._requeue(batch, order_ids[written:])
+            finally:
+                self.inflight = {}
+
+            # 刷新过程由 flush_lock 串行化，最大延迟无需再加锁
+            if written:
+                latency = time.monotonic() - pending_since
+                if latency > self.stats['max_flush_latency']:
+                    self.stats.set('max_flush_latency', latency)
+
+            return written
+
+    def _requeue(self, batch: Dict[int, Dict[str, Any]], order_ids: List[int]) -> None:
+        """写入失败的更新放回缓冲区，已有更新的订单保留新状态，一个刷新间隔后重试"""
+        self.stats.inc('failed_flushes')
+        with self.lock:
+            for order_id in order_ids:
+                self.pending.setdefault(order_id, batch[order_id])
+            self.pending_since = time.monotonic()
+
+    def _flush_loop(self) -> None:
+        """后台刷新线程，保证每条更新的写入延迟不超过flush_interval"""
+        self.logger.info("订单写回线程启动")
+
+        while self.running:
+            try:
+                with self.lock:
+                    pending_since = self.pending_since
+
+                if pending_since is None:
+                    wait = self.flush_interval
+                else:
+                    wait = pending_since + self.flush_interval - time.monotonic()
+
+                if wait > 0 and len(self.pending) < self.max_pending:
+                    self._wakeup.wait(wait)
+                    self._wakeup.clear()
+                    continue
+
+                self.flush()
+
+            except Exception as e:
+                self.logger.error(f"订单写回线程异常: {e}")
+                time.sleep(self.flush_interval)
+
+        self.logger.info("订单写回线程结束")
+
+    def start(self) -> None:
+        """启动后台刷新线程"""
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+
+        self.flush_thread = threading.Thread(
+            target=self._flush_loop,
+            name="OrderWriteBuffer",
+            daemon=True
+        )
+        self.flush_thread.start()
+
+        # 进程退出时刷新剩余更新
+        if not self._atexit_registered:
+            atexit.register(self.stop)
+            self._atexit_registered = True
+
+        self.logger.info(f"订单写回缓冲区启动: 刷新间隔 {self.flush_interval}s, 批大小 {self.batch_size}")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        停止后台刷新线程，并同步写入所有剩余更新
+
+        Args:
+            timeout: 等待刷新线程结束的超时时间（秒）
+        """
+        if self.running:
+            self.running = False
+            self._wakeup.set()
+            if self.flush_thread and self.flush_thread.is_alive():
+                self.flush_thread.join(timeout=timeout)
+
+        self.flush()
+        if self.pending:
+            self.logger.error(f"订单写回缓冲区停止时仍有 {len(self.pending)} 条更新未写入")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        stats = self.stats.snapshot()
+        stats['running'] = self.running
+        return stats
+
+    def __repr__(self):
+        return f"<OrderWriteBuffer(pending={len(self.pending)}, running={self.running})>"
+
+
+# 全局订单写回缓冲区实例
+order_write_buffer = OrderWriteBuffer()
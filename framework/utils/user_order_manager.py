@@ -6,13 +6,15 @@
 import threading
 import time
 import logging
-from typing import Dict, List, Optional, Any, Callable
+from typing import Dict, List, Optional, Any, Callable, Iterable, Set
 from decimal import Decimal
-from datetime import datetime
-from ..models import Order, User
+from datetime import datetime, timedelta
+from ..models import Order, OrderChange, OrderChangeType, User
 from ..database import mysql_manager, redis_manager
-from ..config import CACHE_CONFIG
+from ..config import CACHE_CONFIG, MONITOR_CONFIG
 from ..logging import get_user_logger
+from ..metrics import traced
+from .order_write_buffer import order_write_buffer
 
 
 class UserOrderManager:
@@ -28,12 +30,41 @@ class UserOrderManager:
         self.user_id = user_id
         self.orders = {}  # {order_id: Order}
         self.active_orders = {}  # {order_id: Order} 活跃订单缓存
+        
+        # 二级索引，随订单变更增量维护，查询无需遍历全部订单
+        self.order_no_index = {}  # {order_no: order_id}
+        self.strategy_index = {}  # {strategy_id: Set[order_id]}
+        self.symbol_index = {}  # {symbol: Set[order_id]}
+        self.status_index = {}  # {status: Set[order_id]}
+        self._index_keys = {}  # {order_id: (order_no, strategy_id, symbol, status)} 订单当前所在的索引键
         self.logger = get_user_logger(user_id)
         self.lock = threading.RLock()
         self.last_update_time = datetime.now()
         
+        # 增量同步配置：记录已同步到的订单 update_time 高水位
+        self.sync_mode = MONITOR_CONFIG.get('order_sync_mode', 'full')
+        self.sync_overlap = timedelta(seconds=MONITOR_CONFIG.get('order_sync_overlap', 2))
+        self.sync_batch_size = MONITOR_CONFIG.get('order_sync_batch_size', 1000)
+        self.update_watermark = None
+        
+        # 缓存读取：完成全量加载后每轮只读取活跃订单，按间隔全量读取哈希表对账
+        self.cache_resync_interval = timedelta(seconds=MONITOR_CONFIG.get('order_cache_resync_interval', 60))
+        self.last_full_load_time = None
+        
+        # 写回模式：订单更新先进入写回缓冲区，合并后批量写库
+        self.write_behind = MONITOR_CONFIG.get('order_write_behind', False)
+        
+        # 写入防护（集群租约模式下由引擎设置为 lease_manager）：写入携带用户租约的防护令牌，
+        # 写库前确认令牌仍是最新发放的，失去租约后放弃写入
+        self.write_fence = None
+        
+        # 订单状态指纹，用于只在真实状态变化时触发回调
+        self._fingerprints = {}  # {order_id: tuple}
+        self._baseline_loaded = False
+        
         # 订单更新回调函数列表
         self.order_update_callbacks = []  # List[Callable[[Order], None]]
+        self.order_change_callbacks = []  # List[Callable[[List[OrderChange]], None]]
         
         self.logger.info(f"用户订单管理器初始化: 用户 {user_id}")
     
@@ -46,6 +77,15 @@ class UserOrderManager:
         if callback in self.order_update_callbacks:
             self.order_update_callbacks.remove(callback)
     
+    def add_order_change_callback(self, callback: Callable[[List[OrderChange]], None]) -> None:
+        """添加订单变化回调函数（按批接收变化集合）"""
+        self.order_change_callbacks.append(callback)
+    
+    def remove_order_change_callback(self, callback: Callable[[List[OrderChange]], None]) -> None:
+        """移除订单变化回调函数"""
+        if callback in self.order_change_callbacks:
+            self.order_change_callbacks.remove(callback)
+    
     def _notify_order_update(self, order: Order) -> None:
         """通知订单更新"""
         for callback in self.order_update_callbacks:
@@ -54,6 +94,115 @@ class UserOrderManager:
             except Exception as e:
                 self.logger.error(f"订单更新回调执行失败: {e}")
     
+    def _notify_order_changes(self, changes: List[OrderChange]) -> None:
+        """通知订单变化集合"""
+        if not changes:
+            return
+        
+        for callback in self.order_change_callbacks:
+            try:
+                callback(changes)
+            except Exception as e:
+                self.logger.error(f"订单变化回调执行失败: {e}")
+        
+        for change in changes:
+            if change.change_type != OrderChangeType.REMOVED:
+                self._notify_order_update(change.order)
+    
+    def _diff_order(self, order: Order) -> Optional[OrderChange]:
+        """
+        比较订单与上次记录的指纹，并记录新指纹（调用方持有锁）
+        
+        Returns:
+            Optional[OrderChange]: 真实的状态变化，仅更新时间变化时返回None
+        """
+        current = order.fingerprint()
+        previous = self._fingerprints.get(order.id)
+        self._fingerprints[order.id] = current
+        
+        if previous is None:
+            return OrderChange(OrderChangeType.NEW, order)
+        if current == previous:
+            return None
+        
+        # 指纹中的数量为缩放整数，按位置直接比较，无需构造Decimal
+        status, filled, avg_price, commission, _ = current
+        prev_status, prev_filled, prev_avg_price, prev_commission, _ = previous
+        if filled != prev_filled or avg_price != prev_avg_price or commission != prev_commission:
+            change_type = OrderChangeType.FILL
+        elif status != prev_status:
+            change_type = OrderChangeType.STATUS
+        else:
+            return None
+        
+        return OrderChange(change_type, order, previous_status=prev_status,
+                           previous_filled_quantity=Order.scaled_to_decimal(prev_filled))
+    
+    def _index_order(self, order: Order) -> None:
+        """
+        按订单当前字段更新二级索引（调用方持有锁）
+        
+        订单字段可能被原地修改，因此先按记录的旧键移除再按新键加入
+        """
+        keys = (order.order_no, order.strategy_id, order.symbol, order.status)
+        previous = self._index_keys.get(order.id)
+        if previous == keys:
+            return
+        if previous is not None:
+            self._unindex_order(order.id)
+        
+        self._index_keys[order.id] = keys
+        order_no, strategy_id, symbol, status = keys
+        if order_no is not None:
+            self.order_no_index[order_no] = order.id
+        self.strategy_index.setdefault(strategy_id, set()).add(order.id)
+        self.symbol_index.setdefault(symbol, set()).add(order.id)
+        self.status_index.setdefault(status, set()).add(order.id)
+    
+    def _unindex_order(self, order_id: int) -> None:
+        """从二级索引中移除订单（调用方持有锁）"""
+        keys = self._index_keys.pop(order_id, None)
+        if keys is None:
+            return
+        
+        order_no, strategy_id, symbol, status = keys
+        if order_no is not None and self.order_no_index.get(order_no) == order_id:
+            del self.order_no_index[order_no]
+        for index, key in ((self.strategy_index, strategy_id),
+                           (self.symbol_index, symbol),
+                           (self.status_index, status)):
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(order_id)
+                if not ids:
+                    del index[key]
+    
+    def _clear_indexes(self) -> None:
+        """清空二级索引（调用方持有锁）"""
+        self.order_no_index.clear()
+        self.strategy_index.clear()
+        self.symbol_index.clear()
+        self.status_index.clear()
+        self._index_keys.clear()
+    
+    def _orders_for_ids(self, order_ids: Optional[Set[int]]) -> List[Order]:
+        """根据索引中的ID集合取订单，按订单ID排序以保证结果顺序稳定（调用方持有锁）"""
+        if not order_ids:
+            return []
+        return [self.orders[order_id] for order_id in sorted(order_ids)]
+    
+    def _remove_order(self, order_id: int) -> Optional[OrderChange]:
+        """从内存中移除订单（调用方持有锁）"""
+        order = self.orders.pop(order_id, None)
+        self.active_orders.pop(order_id, None)
+        self._fingerprints.pop(order_id, None)
+        self._unindex_order(order_id)
+        if order is None:
+            return None
+        return OrderChange(OrderChangeType.REMOVED, order, previous_status=order.status,
+                           previous_filled_quantity=order.filled_quantity)
+    
+    @traced('order_manager.load_orders', tag='user_id')
     def load_orders(self, force_reload: bool = False) -> bool:
         """
         加载用户订单
@@ -64,49 +213,287 @@ class UserOrderManager:
         Returns:
             bool: 加载是否成功
         """
+        # 增量模式下，已完成首次全量加载后只同步变化的订单；
+        # 到达对账间隔时从数据库全量重载，清理已被删除的订单（增量同步看不到删除）
+        if self.sync_mode == 'delta' and self.update_watermark is not None and not force_reload:
+            if not self.full_load_due():
+                return self.sync_orders()
+            force_reload = True
+        
         try:
-            orders_data = None
-            
-            if not force_reload:
-                # 先尝试从Redis缓存获取
-                orders_data = redis_manager.get_cached_user_orders(self.user_id)
-                if orders_data:
-                    self.logger.debug(f"从缓存加载订单: 用户 {self.user_id}")
+            # 每轮只读取缓存中的活跃订单，缓存不存在时回退到全量加载
+            if not force_reload and not self.full_load_due() and self._refresh_active_from_cache():
+                return True
             
-            if not orders_data:
-                # 从MySQL获取
+            if force_reload:
+                # 强制从MySQL获取
                 orders_data = mysql_manager.get_user_orders(self.user_id, limit=5000)
                 if orders_data:
                     # 缓存到Redis
                     redis_manager.cache_user_orders(self.user_id, orders_data)
                     self.logger.debug(f"从数据库加载订单: 用户 {self.user_id}")
+            else:
+                # 先从Redis缓存获取，未命中时单飞回源MySQL并回填缓存
+                orders_data = redis_manager.get_or_load_user_orders(
+                    self.user_id,
+                    lambda: mysql_manager.get_user_orders(self.user_id, limit=5000)
+                )
             
             if not orders_data:
                 self.logger.info(f"用户 {self.user_id} 没有订单")
                 return True
             
-            # 转换为Order对象
-            with self.lock:
-                self.orders.clear()
-                self.active_orders.clear()
-                
-                for order_data in orders_data:
+            self.replace_orders(orders_data)
+            
+            self.logger.info(f"加载订单完成: 用户 {self.user_id}, 总订单 {len(self.orders)}, 活跃订单 {len(self.active_orders)}")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"加载订单失败: 用户 {self.user_id}, 错误: {e}")
+            return False
+    
+    def replace_orders(self, orders_data: List[Dict[str, Any]]) -> None:
+        """
+        用一次全量加载的订单行替换内存中的订单，并通知变化
+        
+        Args:
+            orders_data: 用户的全部订单行
+        """
+        # 转换为Order对象，并与上次加载结果比较得到变化集合
+        changes = []
+        with self.lock:
+            previous_orders = dict(self.orders)
+            self.orders.clear()
+            self.active_orders.clear()
+            self._clear_indexes()
+            
+            for order_data in orders_data:
+                order_id = order_data['id']
+                if (self.write_behind and order_id in previous_orders
+                        and order_write_buffer.is_pending(order_id)):
+                    # 尚未写回数据库的订单保留内存状态
+                    order = previous_orders[order_id]
+                else:
                     order = Order.from_dict(order_data)
-                    self.orders[order.id] = order
+                self.orders[order.id] = order
+                self._index_order(order)
+                
+                # 缓存活跃订单
+                if order.is_active():
+                    self.active_orders[order.id] = order
+                
+                self._advance_watermark(order.update_time)
+                change = self._diff_order(order)
+                if change is not None:
+                    changes.append(change)
+            
+            for order_id in previous_orders.keys() - self.orders.keys():
+                removed = previous_orders[order_id]
+                self._fingerprints.pop(order_id, None)
+                changes.append(OrderChange(OrderChangeType.REMOVED, removed, previous_status=removed.status,
+                                           previous_filled_quantity=removed.filled_quantity))
+            
+            self.last_update_time = datetime.now()
+            self.last_full_load_time = self.last_update_time
+            
+            # 首次加载只建立基线，不产生变化通知
+            if not self._baseline_loaded:
+                self._baseline_loaded = True
+                changes = []
+        
+        self._notify_order_changes(changes)
+    
+    def _refresh_active_from_cache(self) -> bool:
+        """
+        从缓存读取活跃订单集合对应的订单（HMGET），离开活跃集合的订单单独读取其最新状态
+        
+        Returns:
+            bool: 缓存存在并已应用时返回True
+        """
+        active_data = redis_manager.get_cached_active_orders(self.user_id)
+        if active_data is None:
+            return False
+        
+        departed_ids = self.apply_active_orders(active_data)
+        if not departed_ids:
+            return True
+        
+        departed_data = redis_manager.get_cached_orders(self.user_id, departed_ids)
+        if departed_data is None:
+            return False
+        self.apply_departed_orders(departed_ids, departed_data)
+        return True
+    
+    def full_load_due(self) -> bool:
+        """是否需要全量读取订单（首次加载或到达对账间隔）"""
+        return (self.last_full_load_time is None
+                or datetime.now() - self.last_full_load_time >= self.cache_resync_interval)
+    
+    def apply_departed_orders(self, departed_ids: Iterable[int], orders_data: List[Dict[str, Any]]) -> None:
+        """
+        应用从缓存读取的离开活跃集合的订单，缓存中已不存在的订单从内存移除
+        
+        Args:
+            departed_ids: 本地仍为活跃但已不在缓存活跃集合中的订单ID
+            orders_data: 按这些ID从缓存读取到的订单
+        """
+        changes = []
+        with self.lock:
+            for order_data in orders_data:
+                change = self._apply_order_row(order_data)
+                if change is not None:
+                    changes.append(change)
+            
+            for order_id in set(departed_ids) - {order_data['id'] for order_data in orders_data}:
+                # 尚未写回数据库的订单以内存状态为准
+                if self.write_behind and order_write_buffer.is_pending(order_id):
+                    continue
+                change = self._remove_order(order_id)
+                if change is not None:
+                    changes.append(change)
+        
+        self._notify_order_changes(changes)
+    
+    def sync_orders(self) -> bool:
+        """
+        增量同步订单：只拉取 update_time 不早于水位（减去回看窗口）的订单并原地应用
+        
+        Returns:
+            bool: 同步是否成功
+        """
+        if self.update_watermark is None:
+            return self.load_orders(force_reload=True)
+        
+        try:
+            cursor_time = self.update_watermark - self.sync_overlap
+            after_id = None
+            changes = []
+            fetched = 0
+            
+            while True:
+                rows = mysql_manager.get_user_orders_since(
+                    self.user_id, cursor_time, after_id, limit=self.sync_batch_size
+                )
+                fetched += len(rows)
+                
+                with self.lock:
+                    for order_data in rows:
+                        change = self._apply_order_row(order_data)
+                        if change is not None:
+                            changes.append(change)
                     
-                    # 缓存活跃订单
-                    if order.is_active():
-                        self.active_orders[order.id] = order
+                    if rows:
+                        self.last_update_time = datetime.now()
                 
-                self.last_update_time = datetime.now()
+                if len(rows) < self.sync_batch_size:
+                    break
+                
+                # 按 (update_time, id) 翻页
+                cursor_time, after_id = rows[-1]['update_time'], rows[-1]['id']
             
-            self.logger.info(f"加载订单完成: 用户 {self.user_id}, 总订单 {len(self.orders)}, 活跃订单 {len(self.active_orders)}")
+            self._notify_order_changes(changes)
+            
+            if changes:
+                self.logger.debug(f"增量同步订单: 用户 {self.user_id}, 拉取 {fetched}, 变化 {len(changes)}")
             return True
             
         except Exception as e:
-            self.logger.error(f"加载订单失败: 用户 {self.user_id}, 错误: {e}")
+            self.logger.error(f"增量同步订单失败: 用户 {self.user_id}, 错误: {e}")
             return False
     
+    def _advance_watermark(self, update_time: Any) -> None:
+        """推进订单 update_time 高水位（调用方持有锁）"""
+        if isinstance(update_time, datetime):
+            if self.update_watermark is None or update_time > self.update_watermark:
+                self.update_watermark = update_time
+    
+    def _apply_order_row(self, order_data: Dict[str, Any]) -> Optional[OrderChange]:
+        """
+        将一行订单数据原地应用到内存（调用方持有锁）
+        
+        Returns:
+            Optional[OrderChange]: 订单的真实状态变化，无变化时为None
+        """
+        order_id = order_data['id']
+        order = self.orders.get(order_id)
+        
+        # 尚未写回数据库的订单以内存状态为准，跳过数据库中的旧数据
+        if order is not None and self.write_behind and order_write_buffer.is_pending(order_id):
+            return None
+        
+        if order is None:
+            order = Order.from_dict(order_data)
+            self.orders[order_id] = order
+        else:
+            # 指纹相同则跳过，避免重复解析Decimal和分配对象
+            if Order.fingerprint_from_dict(order_data) == self._fingerprints.get(order_id):
+                return None
+            order.update_from_dict(order_data)
+        
+        if order.is_active():
+            self.active_orders[order_id] = order
+        else:
+            self.active_orders.pop(order_id, None)
+        
+        self._index_order(order)
+        self._advance_watermark(order.update_time)
+        return self._diff_order(order)
+    
+    def apply_active_orders(self, orders_data: List[Dict[str, Any]]) -> Set[int]:
+        """
+        应用引擎批量轮询得到的活跃订单
+        
+        Args:
+            orders_data: 该用户当前所有活跃订单的数据库行
+            
+        Returns:
+            Set[int]: 本地仍为活跃但已不在活跃列表中的订单ID，需要调用方刷新
+        """
+        changes = []
+        with self.lock:
+            seen_ids = set()
+            for order_data in orders_data:
+                change = self._apply_order_row(order_data)
+                if change is not None:
+                    changes.append(change)
+                seen_ids.add(order_data['id'])
+            
+            self.last_update_time = datetime.now()
+            departed_ids = set(self.active_orders.keys()) - seen_ids
+        
+        self._notify_order_changes(changes)
+        
+        return departed_ids
+    
+    def apply_order_rows(self, orders_data: List[Dict[str, Any]], missing_ids: Iterable[int] = ()) -> None:
+        """
+        应用批量查询得到的订单行
+        
+        Args:
+            orders_data: 订单数据库行
+            missing_ids: 数据库中已不存在的订单ID
+        """
+        missing_ids = list(missing_ids)
+        changes = []
+        with self.lock:
+            for order_data in orders_data:
+                change = self._apply_order_row(order_data)
+                if change is not None:
+                    changes.append(change)
+            
+            for order_id in missing_ids:
+                change = self._remove_order(order_id)
+                if change is not None:
+                    changes.append(change)
+            
+            self.last_update_time = datetime.now()
+        
+        # 数据库中已不存在的订单同时从Redis缓存中移除
+        for order_id in missing_ids:
+            redis_manager.remove_cached_user_order(self.user_id, order_id)
+        
+        self._notify_order_changes(changes)
+    
     def get_order_by_id(self, order_id: int) -> Optional[Order]:
         """根据ID获取订单"""
         with self.lock:
@@ -115,25 +502,23 @@ class UserOrderManager:
     def get_order_by_no(self, order_no: str) -> Optional[Order]:
         """根据订单号获取订单"""
         with self.lock:
-            for order in self.orders.values():
-                if order.order_no == order_no:
-                    return order
-            return None
+            order_id = self.order_no_index.get(order_no)
+            return self.orders.get(order_id) if order_id is not None else None
     
     def get_orders_by_strategy(self, strategy_id: int) -> List[Order]:
         """获取指定策略的订单"""
         with self.lock:
-            return [order for order in self.orders.values() if order.strategy_id == strategy_id]
+            return self._orders_for_ids(self.strategy_index.get(strategy_id))
     
     def get_orders_by_symbol(self, symbol: str) -> List[Order]:
         """获取指定标的的订单"""
         with self.lock:
-            return [order for order in self.orders.values() if order.symbol == symbol]
+            return self._orders_for_ids(self.symbol_index.get(symbol))
     
     def get_orders_by_status(self, status: int) -> List[Order]:
         """获取指定状态的订单"""
         with self.lock:
-            return [order for order in self.orders.values() if order.status == status]
+            return self._orders_for_ids(self.status_index.get(status))
     
     def get_active_orders(self) -> List[Order]:
         """获取所有活跃订单"""
@@ -163,16 +548,21 @@ class UserOrderManager:
                 # 如果是活跃订单，添加到活跃订单缓存
                 if order.is_active():
                     self.active_orders[order.id] = order
+                else:
+                    self.active_orders.pop(order.id, None)
                 
+                self._index_order(order)
+                change = self._diff_order(order)
                 self.last_update_time = datetime.now()
             
-            # 清除Redis缓存，强制下次从数据库重新加载
-            redis_manager.delete(f"{redis_manager.config['user_orders_prefix']}{self.user_id}")
+            # 将新订单写入Redis缓存
+            self._patch_order_cache(order)
             
             self.logger.info(f"添加订单: {order.order_no}, 状态: {order.get_status_name()}")
             
-            # 通知订单更新
-            self._notify_order_update(order)
+            # 通知订单变化
+            if change is not None:
+                self._notify_order_changes([change])
             
             return True
             
@@ -180,6 +570,46 @@ class UserOrderManager:
             self.logger.error(f"添加订单失败: {order.order_no}, 错误: {e}")
             return False
     
+    def _patch_order_cache(self, order: Order) -> None:
+        """将订单的最新状态写入Redis订单缓存（只修改该订单对应的字段）"""
+        redis_manager.patch_cached_user_order(self.user_id, order.to_dict())
+    
+    def _persist_order(self, order: Order, **fields) -> bool:
+        """
+        持久化订单更新
+        
+        写回模式下提交到写回缓冲区，由其合并后批量写库；否则立即更新数据库。
+        两种模式下都只更新Redis缓存中该订单的字段，不使整个用户的订单缓存失效
+        
+        Args:
+            order: 已在内存中更新的订单
+            **fields: 传给 update_order_status 的字段
+            
+        Returns:
+            bool: 是否成功
+        """
+        fencing_token = None
+        if self.write_fence is not None:
+            fencing_token = self.write_fence.fencing_token(self.user_id)
+            if fencing_token is None:
+                self.logger.warning(f"已失去用户所有权，放弃订单写入: {order.order_no}")
+                return False
+        
+        if self.write_behind:
+            # 写回缓冲区刷新时校验令牌
+            order_write_buffer.submit(self.user_id, order, fencing_token)
+            self._patch_order_cache(order)
+            return True
+        
+        if fencing_token is not None and not self.write_fence.validate_fencing_token(self.user_id, fencing_token):
+            self.logger.warning(f"防护令牌已过期，放弃订单写入: {order.order_no}")
+            return False
+        
+        success = mysql_manager.update_order_status(order_id=order.id, **fields)
+        if success:
+            self._patch_order_cache(order)
+        return success
+    
     def update_order(self, order_id: int, **kwargs) -> bool:
         """
         更新订单信息
@@ -217,11 +647,13 @@ class UserOrderManager:
                     # 添加到活跃订单
                     self.active_orders[order_id] = order
                 
+                self._index_order(order)
+                change = self._diff_order(order)
                 self.last_update_time = datetime.now()
             
             # 更新数据库
-            success = mysql_manager.update_order_status(
-                order_id=order_id,
+            success = self._persist_order(
+                order,
                 status=kwargs.get('status', order.status),
                 filled_quantity=float(kwargs.get('filled_quantity', order.filled_quantity)),
                 avg_price=float(kwargs.get('avg_price', order.avg_price)) if order.avg_price else None,
@@ -229,13 +661,11 @@ class UserOrderManager:
             )
             
             if success:
-                # 清除Redis缓存
-                redis_manager.delete(f"{redis_manager.config['user_orders_prefix']}{self.user_id}")
-                
                 self.logger.info(f"更新订单: {order.order_no}, 状态: {old_status} -> {order.status}")
                 
-                # 通知订单更新
-                self._notify_order_update(order)
+                # 通知订单变化
+                if change is not None:
+                    self._notify_order_changes([change])
                 
                 return True
             else:
@@ -275,11 +705,13 @@ class UserOrderManager:
                 if order.is_completed():
                     self.active_orders.pop(order_id, None)
                 
+                self._index_order(order)
+                change = self._diff_order(order)
                 self.last_update_time = datetime.now()
             
             # 更新数据库
-            success = mysql_manager.update_order_status(
-                order_id=order_id,
+            success = self._persist_order(
+                order,
                 status=order.status,
                 filled_quantity=float(filled_quantity),
                 avg_price=float(avg_price) if avg_price else None,
@@ -287,13 +719,11 @@ class UserOrderManager:
             )
             
             if success:
-                # 清除Redis缓存
-                redis_manager.delete(f"{redis_manager.config['user_orders_prefix']}{self.user_id}")
-                
                 self.logger.info(f"更新订单成交: {order.order_no}, 成交量: {filled_quantity}, 状态: {order.get_status_name()}")
                 
-                # 通知订单更新
-                self._notify_order_update(order)
+                # 通知订单变化
+                if change is not None:
+                    self._notify_order_changes([change])
                 
                 return True
             else:
@@ -331,19 +761,19 @@ class UserOrderManager:
                 # 从活跃订单中移除
                 self.active_orders.pop(order_id, None)
                 
+                self._index_order(order)
+                change = self._diff_order(order)
                 self.last_update_time = datetime.now()
             
             # 更新数据库
-            success = mysql_manager.update_order_status(order_id, Order.STATUS_CANCELLED)
+            success = self._persist_order(order, status=Order.STATUS_CANCELLED)
             
             if success:
-                # 清除Redis缓存
-                redis_manager.delete(f"{redis_manager.config['user_orders_prefix']}{self.user_id}")
-                
                 self.logger.info(f"取消订单: {order.order_no}")
                 
-                # 通知订单更新
-                self._notify_order_update(order)
+                # 通知订单变化
+                if change is not None:
+                    self._notify_order_changes([change])
                 
                 return True
             else:
@@ -360,20 +790,14 @@ class UserOrderManager:
             total_orders = len(self.orders)
             active_orders = len(self.active_orders)
             
+            # 分布直接取自二级索引的集合大小
             status_count = {}
-            symbol_count = {}
-            strategy_count = {}
+            for status, ids in self.status_index.items():
+                status_name = Order.STATUS_NAMES.get(status, "未知")
+                status_count[status_name] = status_count.get(status_name, 0) + len(ids)
             
-            for order in self.orders.values():
-                # 状态统计
-                status_name = order.get_status_name()
-                status_count[status_name] = status_count.get(status_name, 0) + 1
-                
-                # 标的统计
-                symbol_count[order.symbol] = symbol_count.get(order.symbol, 0) + 1
-                
-                # 策略统计
-                strategy_count[order.strategy_id] = strategy_count.get(order.strategy_id, 0) + 1
+            symbol_count = {symbol: len(ids) for symbol, ids in self.symbol_index.items()}
+            strategy_count = {strategy_id: len(ids) for strategy_id, ids in self.strategy_index.items()}
             
             return {
                 'user_id': self.user_id,
@@ -388,10 +812,17 @@ class UserOrderManager:
     def cleanup(self) -> None:
         """清理资源"""
         try:
+            # 写回模式下先把缓冲的更新写入数据库
+            if self.write_behind:
+                order_write_buffer.flush()
+            
             with self.lock:
                 self.orders.clear()
                 self.active_orders.clear()
+                self._clear_indexes()
+                self._fingerprints.clear()
                 self.order_update_callbacks.clear()
+                self.order_change_callbacks.clear()
             
             self.logger.info(f"用户订单管理器清理完成: 用户 {self.user_id}")
         except Exception as e:
@@ -4,6 +4,7 @@
 整合所有框架组件，提供统一的启动入口
 """
 import sys
+import argparse
 from framework.app import OrderMonitoringApp
 
 
@@ -32,8 +33,25 @@ def main():
             else:
                 print("系统测试失败")
                 sys.exit(1)
+        elif command == 'profile':
+            # 采样模式：运行指定时长后写出折叠栈文件
+            parser = argparse.ArgumentParser(prog='python app.py profile', description='采样线程栈和热路径区间')
+            parser.add_argument('--seconds', type=float, default=30, help='采样时长（秒）')
+            parser.add_argument('--output', type=str, default=None, help='折叠栈文件路径')
+            args = parser.parse_args(sys.argv[2:])
+
+            result = app.profile(args.seconds, args.output)
+            if not result:
+                print("系统启动失败，无法采样")
+                sys.exit(1)
+            print(f"线程栈: {result['output']} ({result['stacks']} 个调用栈, {result['sampler']['samples']} 次采样)")
+            print(f"区间树: {result['spans_output']} ({result['span_stacks']} 个路径)")
+            print("区间耗时 (次数 / 平均毫秒 / 最大毫秒 / 自身总秒数):")
+            spans = sorted(result['spans'].items(), key=lambda item: item[1]['self_seconds'], reverse=True)
+            for name, item in spans:
+                print(f"  {name}: {item['count']} / {item['avg_ms']:.3f} / {item['max_ms']:.3f} / {item['self_seconds']:.3f}")
         else:
-            print("用法: python app.py [start|status|test]")
+            print("用法: python app.py [start|status|test|profile [--seconds N] [--output PATH]]")
             sys.exit(1)
     else:
         # 默认运行模式